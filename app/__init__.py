@@ -10,6 +10,8 @@ from flask import Flask
 from flask_jwt_extended import JWTManager
 from config import config
 from .db_connection import init_app as init_db_connection
+from .query_instrumentation import init_app as init_query_instrumentation
+from .analysis_cache import init_app as init_analysis_cache
 from utils.seed_data import seed_data
 import sys # Used for exiting the application on critical startup errors.
 
@@ -49,6 +51,8 @@ def create_app(config_name='default'):
         # Initialize Flask extensions with the application instance.
         # init_db_connection sets up database teardown context and might raise ConnectionError.
         init_db_connection(app)  # Integrates database connection management with Flask's lifecycle.
+        init_query_instrumentation(app) # Times repository SQL and adds Server-Timing headers.
+        init_analysis_cache(app) # Invalidates cached analysis results after each request's writes.
         jwt.init_app(app) # Initializes JWT support for the application.
 
         # Import and register blueprints for different functional areas of the application.
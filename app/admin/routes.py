@@ -18,11 +18,77 @@ from app.repositories.enrolment_repository import enrolment_repository
 from app.repositories.attendance_record_repository import attendance_record_repository
 from app.repositories.submission_record_repository import submission_record_repository
 from app.repositories.grade_repository import grade_repository
+from app.repositories.detection_job_repository import detection_job_repository
+from app.repositories.base_repository import ConflictError, UpsertResult
 from flask_jwt_extended import jwt_required
 from app.utils.decorators import role_required
-from app.db_connection import get_db # Import get_db for transaction management
+from app.db_connection import get_db, get_pool # Import get_db for transaction management
+from app.admin.services import submit_survey_response
+from app.query_instrumentation import get_query_log
+from app.analysis_cache import get_analysis_cache
+from app.utils.pagination import parse_page_args
+from app.utils.streaming import stream_events, stream_json_array
 import sqlite3 # Import sqlite3 for rollback in case of db error
 
+# region List Helpers
+def list_response(repo, get_all):
+    """
+    Builds the JSON response of a list endpoint, paginating when asked to.
+
+    Without `limit` or `after` in the query string the complete list is returned
+    as a JSON array, as before. With either parameter a single page is returned as
+    `{'items': [...], 'next_cursor': <str or null>}`; the client passes `next_cursor`
+    back as `after` to fetch the following page (see `BaseRepository.get_page`).
+    With `stream=1` (and no pagination) the complete array is streamed from the
+    database cursor instead of being built in memory (see `app/utils/streaming.py`).
+    With `fields=a,b,c` only those fields (plus `id`) are selected from the
+    database and returned, validated against the repository's `list_fields`.
+
+    Args:
+        repo (BaseRepository): The repository of the listed entity.
+        get_all (callable): Returns the complete list when no pagination is requested.
+
+    Returns:
+        Response | tuple: A Flask response (and status code); 400 for an invalid `limit` or cursor.
+    """
+    def serialize(records):
+        return [r.to_dict() if hasattr(r, 'to_dict') else r for r in records]
+
+    fields = None
+    if 'fields' in request.args:
+        try:
+            fields = repo.select_fields(request.args['fields'])
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+    if 'limit' not in request.args and 'after' not in request.args:
+        if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+            return stream_json_array(repo.iter_list(current_app.config.get('STREAM_BATCH_SIZE', 500), fields=fields))
+        if fields:
+            return jsonify(list(repo.iter_list(fields=fields))), 200
+        return jsonify(serialize(get_all())), 200
+    try:
+        limit, after = parse_page_args(request.args, current_app.config.get('DEFAULT_PAGE_SIZE', 50),
+                                       current_app.config.get('MAX_PAGE_SIZE', 500))
+        records, next_cursor = repo.get_page(limit, after, fields=fields)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    return jsonify({'items': serialize(records), 'next_cursor': next_cursor}), 200
+
+def conflict_response(error, values):
+    """
+    Builds the 409 response for a write that collided with an existing record.
+
+    Args:
+        error (ConflictError): The error raised by the repository.
+        values (dict): The values that were written; the conflicting key is taken from them.
+
+    Returns:
+        tuple: The JSON response, e.g. `{'message': ..., 'conflict': {'student_id': 1, 'week_number': 3}}`, and 409.
+    """
+    return jsonify({'message': str(error), 'conflict': {column: values.get(column) for column in error.columns}}), 409
+# endregion
+
 # region Module Endpoints
 @admin.route('/modules', methods=['GET', 'POST'])
 @jwt_required()
@@ -36,10 +102,9 @@ def handle_modules():
     if request.method == 'GET':
         @role_required(['admin', 'course_director'])
         def get_all_modules():
-            """Retrieves all modules."""
+            """Retrieves all modules, or one page of them with `?limit=&after=`."""
             try:
-                modules = module_repository.get_all_modules()
-                return jsonify([module.to_dict() for module in modules]), 200
+                return list_response(module_repository, module_repository.get_all_modules)
             except Exception as e:
                 current_app.logger.error(f"Error getting all modules: {e}", exc_info=True)
                 return jsonify({'message': 'An unexpected error occurred.'}), 500
@@ -153,6 +218,72 @@ def get_alerts():
         current_app.logger.error(f"Error getting alerts: {e}", exc_info=True)
         return jsonify({'message': 'An unexpected error occurred.'}), 500
 
+@admin.route('/alerts/feed', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'wellbeing_officer'])
+def get_alert_feed():
+    """
+    Retrieves the alerts created, resolved, updated or deleted since a cursor.
+    Requires 'admin' or 'wellbeing_officer' role.
+
+    Without `since` no changes are returned, only the current cursor: a client
+    takes it, loads `GET /alerts` once and then polls `?since=<cursor>`, applying
+    each change to its list by `alert_id`. `has_more` asks the client to poll again
+    straight away. `limit` caps the change log entries read (default and maximum
+    `ALERT_FEED_BATCH_SIZE`).
+
+    Returns:
+        JSON: `{'changes': [...], 'cursor': <str>, 'has_more': <bool>}`, or a 400 message
+              for an invalid cursor or limit.
+    """
+    batch_size = current_app.config.get('ALERT_FEED_BATCH_SIZE', 200)
+    try:
+        limit, _ = parse_page_args(request.args, batch_size, batch_size)
+        since = request.args.get('since')
+        if since is None:
+            return jsonify({'changes': [], 'cursor': alert_repository.get_change_cursor(), 'has_more': False}), 200
+        changes, cursor, has_more = alert_repository.get_changes(limit, since)
+        return jsonify({'changes': changes, 'cursor': cursor, 'has_more': has_more}), 200
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error getting alert feed: {e}", exc_info=True)
+        return jsonify({'message': 'An unexpected error occurred.'}), 500
+
+@admin.route('/alerts/stream', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'wellbeing_officer'])
+def stream_alert_changes():
+    """
+    Pushes alert changes to the client as server-sent events.
+    Requires 'admin' or 'wellbeing_officer' role.
+
+    Every `alerts` event carries the coalesced changes found by one poll of the
+    feed (see `get_alert_feed`) and has the feed cursor as its id. The stream
+    starts at `since`, the `Last-Event-ID` header of a reconnecting client, or the
+    current cursor, and is closed after `ALERT_STREAM_MAX_SECONDS`.
+
+    Returns:
+        Response: A `text/event-stream` response, or a 400 message for an invalid cursor.
+    """
+    config = current_app.config
+    batch_size = config.get('ALERT_FEED_BATCH_SIZE', 200)
+    try:
+        since = request.args.get('since') or request.headers.get('Last-Event-ID')
+        if since is None:
+            since = alert_repository.get_change_cursor()
+        alert_repository.get_changes(1, since) # Validate the cursor before the stream starts.
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error starting alert stream: {e}", exc_info=True)
+        return jsonify({'message': 'An unexpected error occurred.'}), 500
+
+    return stream_events(lambda cursor: alert_repository.get_changes(batch_size, cursor), since, 'alerts',
+                         poll_interval=config.get('ALERT_STREAM_POLL_SECONDS', 2),
+                         heartbeat_interval=config.get('ALERT_STREAM_HEARTBEAT_SECONDS', 15),
+                         max_seconds=config.get('ALERT_STREAM_MAX_SECONDS', 300))
+
 @admin.route('/alerts/student/<int:student_id>', methods=['GET'])
 @jwt_required()
 @role_required(['admin', 'wellbeing_officer', 'course_director'])
@@ -229,10 +360,9 @@ def handle_students():
     if request.method == 'GET':
         @role_required(['admin', 'course_director', 'wellbeing_officer'])
         def get_all_students():
-            """Retrieves all students."""
+            """Retrieves all students, or one page of them with `?limit=&after=`."""
             try:
-                students = student_repository.get_all_students()
-                return jsonify([s.to_dict() for s in students]), 200
+                return list_response(student_repository, student_repository.get_all_students)
             except Exception as e:
                 current_app.logger.error(f"Error getting all students: {e}", exc_info=True)
                 return jsonify({'message': 'An unexpected error occurred.'}), 500
@@ -341,8 +471,7 @@ def handle_users():
     """
     if request.method == 'GET':
         try:
-            users = user_repository.get_all_users()
-            return jsonify([user.to_dict() for user in users]), 200
+            return list_response(user_repository, user_repository.get_all_users)
         except Exception as e:
             current_app.logger.error(f"Error getting all users: {e}", exc_info=True)
             return jsonify({'message': 'An unexpected error occurred.'}), 500
@@ -448,7 +577,112 @@ def reset_user_password(user_id):
         return jsonify({'message': 'An unexpected error occurred.'}), 500
 # endregion
 
+# region Debug Endpoints
+@admin.route('/debug/pool', methods=['GET'])
+@jwt_required()
+@role_required('admin')
+def get_db_pool_stats():
+    """
+    Retrieves connection pool statistics for monitoring.
+    Idle connections are health-checked as part of the request.
+    Requires 'admin' role.
+    """
+    try:
+        pool = get_pool()
+        health = pool.health_check()
+        return jsonify({'pool': pool.stats(), 'health_check': health}), 200
+    except Exception as e:
+        current_app.logger.error(f"Error getting connection pool stats: {e}", exc_info=True)
+        return jsonify({'message': 'An unexpected error occurred.'}), 500
+
+@admin.route('/debug/queries', methods=['GET', 'DELETE'])
+@jwt_required()
+@role_required('admin')
+def handle_query_stats():
+    """
+    Retrieves (GET) or clears (DELETE) the SQL instrumentation statistics.
+    GET returns per-endpoint query counts and database time plus the rolling slow-query log.
+    Requires 'admin' role.
+    """
+    try:
+        query_log = get_query_log()
+        if request.method == 'DELETE':
+            query_log.reset()
+            return jsonify({'message': 'Query statistics cleared.'}), 200
+        return jsonify(query_log.snapshot()), 200
+    except Exception as e:
+        current_app.logger.error(f"Error handling query statistics: {e}", exc_info=True)
+        return jsonify({'message': 'An unexpected error occurred.'}), 500
+
+@admin.route('/debug/analysis-cache', methods=['GET', 'DELETE'])
+@jwt_required()
+@role_required('admin')
+def handle_analysis_cache_stats():
+    """
+    Retrieves (GET) the analysis cache statistics or clears (DELETE) the cache.
+    GET returns hit/miss counters, the number of cached results and the per-table version counters.
+    Requires 'admin' role.
+    """
+    try:
+        cache = get_analysis_cache()
+        if request.method == 'DELETE':
+            cache.clear()
+            return jsonify({'message': 'Analysis cache cleared.'}), 200
+        return jsonify(cache.stats()), 200
+    except Exception as e:
+        current_app.logger.error(f"Error handling analysis cache statistics: {e}", exc_info=True)
+        return jsonify({'message': 'An unexpected error occurred.'}), 500
+
+@admin.route('/debug/detection-queue', methods=['GET'])
+@jwt_required()
+@role_required('admin')
+def get_detection_queue_stats():
+    """
+    Retrieves the depth and lag of the stress-event and alert detection queue.
+    Returns pending, ready, leased and failed job counts and the age of the oldest pending job.
+    Requires 'admin' role.
+    """
+    try:
+        return jsonify(detection_job_repository.get_stats()), 200
+    except Exception as e:
+        current_app.logger.error(f"Error getting detection queue statistics: {e}", exc_info=True)
+        return jsonify({'message': 'An unexpected error occurred.'}), 500
+# endregion
+
 # region Generic CRUD
+def create_survey_response(data):
+    """
+    Submits a survey response through `submit_survey_response()` in one transaction.
+
+    The response reports the statements and commits the submission issued, and,
+    when the checks ran inline (`SURVEY_DETECTION_INLINE`), the stress events and
+    alerts they created.
+
+    Args:
+        data (dict): The validated request body.
+
+    Returns:
+        Response: A 201 response with the new ID and the submission's statement counts, or an error.
+    """
+    try:
+        detect_inline = current_app.config.get('SURVEY_DETECTION_INLINE', False)
+        submission = submit_survey_response(
+            data['student_id'], data.get('module_id'), data['week_number'], data['stress_level'],
+            data['hours_slept'], data.get('mood_comment'), detect_inline=detect_inline
+        )
+        body = {
+            'message': 'survey-responses created successfully',
+            'id': submission.response.id,
+            'statements': submission.statements,
+            'commits': submission.commits,
+        }
+        if detect_inline:
+            body.update(stress_events_created=submission.stress_events, alerts_created=submission.alerts)
+        return jsonify(body), 201
+    except Exception as e:
+        current_app.logger.error(f"Error creating survey-responses: {e}", exc_info=True)
+        return jsonify({'message': 'An unexpected error occurred.'}), 500
+
 def add_crud_routes(endpoint, repo, required_fields, roles):
     """
     Dynamically adds CRUD (Create, Read, Update, Delete) routes for a given entity.
@@ -473,14 +707,10 @@ def add_crud_routes(endpoint, repo, required_fields, roles):
         if request.method == 'GET':
             @role_required(roles.get('get', ['admin']))
             def get_all():
-                """Retrieves all records for the entity."""
+                """Retrieves all records for the entity, or one page of them with `?limit=&after=`."""
                 try:
-                    records = getattr(repo, f'get_all_{endpoint.replace("-", "_")}')()
-                    # Check if records are model instances or dictionaries and convert accordingly.
-                    if records and hasattr(records[0], 'to_dict'):
-                        return jsonify([r.to_dict() for r in records]), 200
-                    else:
-                        return jsonify(records), 200 # Directly jsonify if already dictionaries.
+                    # Model instances and dictionaries are both serialized by list_response.
+                    return list_response(repo, getattr(repo, f'get_all_{endpoint.replace("-", "_")}'))
                 except Exception as e:
                     current_app.logger.error(f"Error getting all {endpoint}: {e}", exc_info=True)
                     return jsonify({'message': 'An unexpected error occurred.'}), 500
@@ -492,12 +722,17 @@ def add_crud_routes(endpoint, repo, required_fields, roles):
                 data = request.get_json()
                 if not data or not all(k in data for k in required_fields):
                     return jsonify({'message': f'Missing required fields for {endpoint}.'}), 400
+                if endpoint == 'survey-responses':
+                    return create_survey_response(data)
                 db = get_db() # Get db connection for transaction
                 try:
                     create_method_name = f'create_{endpoint.replace("-", "_").rstrip("s")}'
                     record = getattr(repo, create_method_name)(**data)
                     db.commit() # Commit on success
                     return jsonify({'message': f'{endpoint} created successfully', 'id': record.id}), 201
+                except ConflictError as e:
+                    db.rollback()
+                    return conflict_response(e, data)
                 except Exception as e:
                     db.rollback() # Rollback on error
                     current_app.logger.error(f"Error creating {endpoint}: {e}", exc_info=True)
@@ -578,6 +813,9 @@ def add_crud_routes(endpoint, repo, required_fields, roles):
                     updated_record = update_method(record_id, **update_data)
                     db.commit() # Commit on success
                     return jsonify({'message': f'{endpoint} updated successfully'}), 200
+                except ConflictError as e:
+                    db.rollback()
+                    return conflict_response(e, update_data)
                 except Exception as e:
                     db.rollback() # Rollback on error
                     current_app.logger.error(f"Error updating {endpoint} {record_id}: {e}", exc_info=True)
@@ -601,6 +839,67 @@ def add_crud_routes(endpoint, repo, required_fields, roles):
                     return jsonify({'message': 'An unexpected error occurred.'}), 500
             return delete_single(record_id)
 
+def add_bulk_route(endpoint, repo, roles):
+    """
+    Adds a `POST /<endpoint>/bulk` route that creates many records in one transaction.
+
+    The request body is a JSON array of objects, validated against the repository's
+    `bulk_schema`. Valid rows are written with a single statement (an `INSERT ... SELECT`
+    over `json_each()`, or an upsert on the natural key for attendance records) through the repository's
+    `bulk_create_<endpoint>()` method and committed together; invalid
+    rows are skipped and reported. The response counts the `created`, `updated` and
+    `failed` rows and lists one result per input row: `{'index': i, 'status': 'created', 'id': ...}`,
+    `{'index': i, 'status': 'updated', 'id': ...}` (an upsert that found the natural key's
+    record) or `{'index': i, 'status': 'error', 'errors': [...]}`.
+
+    Status codes: 201 if every row was written, 207 if only some were, 400 if none were
+    (or the payload is not an array / exceeds `BULK_MAX_ROWS`).
+
+    Args:
+        endpoint (str): The base URL endpoint for the entity (e.g., 'grades').
+        repo (BaseRepository): The repository instance; must define `bulk_schema`.
+        roles (list | str): The roles allowed to use the bulk endpoint.
+    """
+    @admin.route(f'/{endpoint}/bulk', methods=['POST'], endpoint=f'bulk_{endpoint}')
+    @jwt_required()
+    @role_required(roles)
+    def bulk_create():
+        """Creates all valid records of the payload in one transaction."""
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list) or not rows:
+            return jsonify({'message': 'Request body must be a non-empty JSON array.'}), 400
+        max_rows = current_app.config.get('BULK_MAX_ROWS', 50000)
+        if len(rows) > max_rows:
+            return jsonify({'message': f'A bulk request may contain at most {max_rows} rows.'}), 400
+        db = get_db() # Get db connection for transaction
+        try:
+            valid, errors = repo.validate_bulk_rows(rows)
+            summary = {}
+            ids, existed = [], []
+            if valid:
+                result = getattr(repo, f'bulk_create_{endpoint.replace("-", "_")}')([row for _, row in valid])
+                if isinstance(result, UpsertResult): # Upserts report which rows updated an existing record.
+                    ids, existed = result
+                elif isinstance(result, tuple): # Survey batches also report the events and alerts they raised.
+                    ids, stress_events, alerts = result
+                    summary = {'stress_events_created': stress_events, 'alerts_created': alerts}
+                else:
+                    ids = result
+                db.commit() # One commit for the whole batch.
+            existed = existed or [False] * len(ids)
+            results = [{'index': index, 'status': 'error', 'errors': messages} for index, messages in errors.items()]
+            results += [{'index': index, 'status': 'updated' if was_there else 'created', 'id': record_id}
+                        for (index, _), record_id, was_there in zip(valid, ids, existed)]
+            results.sort(key=lambda r: r['index'])
+            status = 201 if not errors else (207 if valid else 400)
+            updated = sum(existed)
+            return jsonify({'created': len(valid) - updated, 'updated': updated, 'failed': len(errors), **summary,
+                            'results': results}), status
+        except Exception as e:
+            db.rollback() # Rollback on error
+            current_app.logger.error(f"Error bulk creating {endpoint}: {e}", exc_info=True)
+            return jsonify({'message': 'An unexpected error occurred.'}), 500
+
 # Register specific CRUD routes using the generic function.
 add_crud_routes('alerts', alert_repository, ['student_id', 'reason'], {'get': ['admin', 'wellbeing_officer'], 'post': 'admin', 'delete': 'admin', 'put': 'admin'})
 add_crud_routes('enrolments', enrolment_repository, ['student_id', 'module_id'], {'get': ['admin', 'course_director'], 'post': 'admin', 'delete': 'admin', 'put': 'admin'})
@@ -608,3 +907,8 @@ add_crud_routes('grades', grade_repository, ['student_id', 'module_id', 'assessm
 add_crud_routes('survey-responses', survey_response_repository, ['student_id', 'week_number', 'stress_level'], {'get': ['admin', 'wellbeing_officer'], 'post': ['admin', 'wellbeing_officer', 'user', 'student'], 'delete': 'admin', 'put': 'admin'})
 add_crud_routes('attendance-records', attendance_record_repository, ['student_id', 'module_id', 'week_number'], {'get': ['admin', 'course_director'], 'post': 'admin', 'delete': 'admin', 'put': 'admin'})
 add_crud_routes('submission-records', submission_record_repository, ['student_id', 'module_id', 'assessment_name'], {'get': ['admin', 'course_director'], 'post': 'admin', 'delete': 'admin', 'put': 'admin'})
+
+# Register bulk create routes for the high-volume entities.
+add_bulk_route('grades', grade_repository, 'admin')
+add_bulk_route('attendance-records', attendance_record_repository, 'admin')
+add_bulk_route('survey-responses', survey_response_repository, ['admin', 'wellbeing_officer'])
@@ -0,0 +1,105 @@
+"""
+Administrative service layer.
+
+This module provides business logic for operations that span several
+repositories and must run as one transaction, such as submitting a survey
+response or re-evaluating the stress event and alert rules over the survey
+history.
+"""
+
+import time
+from collections import namedtuple
+from flask import current_app
+from app.db_connection import get_db
+from app.query_instrumentation import record_statements
+from app.repositories.survey_response_repository import survey_response_repository
+
+AlertEvaluation = namedtuple('AlertEvaluation', ['stress_events', 'alerts', 'seconds'])
+SurveySubmission = namedtuple('SurveySubmission', ['response', 'stress_events', 'alerts', 'statements', 'commits'])
+
+def submit_survey_response(student_id: int, module_id: int | None, week_number: int, stress_level: int, hours_slept: float,
+                           mood_comment: str | None, detect_inline: bool | None = None) -> SurveySubmission:
+    """
+    Stores a survey response and schedules or runs its stress checks in one transaction.
+
+    The response is inserted with `RETURNING *`, so it is not read back. By default
+    a detection job is enqueued in the same transaction for `flask worker`: two
+    statements and one commit. With `detect_inline` (or `SURVEY_DETECTION_INLINE`)
+    the stress event and alert rules run instead as the two set-based statements
+    of `check_for_stress_events_and_alerts()`, whose alert insert combines the
+    previous-week lookup and the de-duplication against existing alerts: three
+    statements and still one commit, with no worker needed.
+
+    Args:
+        student_id (int): The ID of the student submitting the response.
+        module_id (int | None): The ID of the module related to the survey (can be None).
+        week_number (int): The academic week number of the survey.
+        stress_level (int): The reported stress level (1-5).
+        hours_slept (float): The reported hours of sleep.
+        mood_comment (str | None): Any comments on the mood.
+        detect_inline (bool | None, optional): Run the checks in the request. Defaults to None
+                                               (the `SURVEY_DETECTION_INLINE` setting).
+
+    Returns:
+        SurveySubmission: The created response, the stress events and alerts created (always
+                          0 when the checks are left to the worker), and the statements and
+                          commits the submission issued.
+
+    Raises:
+        Exception: If a database error occurs; nothing is committed.
+    """
+    if detect_inline is None:
+        detect_inline = current_app.config.get('SURVEY_DETECTION_INLINE', False)
+    stress_events = alerts = 0
+    with record_statements() as recorder:
+        db = get_db() # The recording proxy; every statement and the commit below are counted.
+        try:
+            response = survey_response_repository.create_survey_response(
+                student_id, module_id, week_number, stress_level, hours_slept, mood_comment, enqueue_detection=not detect_inline
+            )
+            if detect_inline:
+                stress_events, alerts = survey_response_repository.check_for_stress_events_and_alerts([response.id])
+            db.commit()
+        except Exception:
+            db.rollback() # The response never exists without its detection job or its checks.
+            raise
+    return SurveySubmission(response, stress_events, alerts, len(recorder.statements), recorder.commits)
+
+def evaluate_alerts(from_week: int | None = None, to_week: int | None = None, threshold: int = 4) -> AlertEvaluation:
+    """
+    Creates the stress events and alerts missing from a range of weeks.
+
+    Runs `SurveyResponseRepository.evaluate_stress_history()`, which finds every
+    consecutive high-stress run in one pass, and commits the new events and
+    alerts together. Existing events and alerts are kept, so the evaluation can
+    be repeated safely, e.g. after a backfill or with a lower threshold.
+
+    Args:
+        from_week (int | None, optional): The first week evaluated. Defaults to None (from the first week).
+        to_week (int | None, optional): The last week evaluated. Defaults to None (to the last week).
+        threshold (int, optional): The stress level threshold (1-5). Defaults to 4.
+
+    Returns:
+        AlertEvaluation: The number of stress events and alerts created and the seconds taken.
+
+    Raises:
+        ValueError: If the threshold is not between 1 and 5, or `from_week` is after `to_week`.
+        Exception: If a database error occurs; nothing is committed.
+    """
+    if not 1 <= threshold <= 5:
+        raise ValueError("The threshold must be between 1 and 5.")
+    if from_week is not None and to_week is not None and from_week > to_week:
+        raise ValueError("'from_week' must not be after 'to_week'.")
+
+    db = get_db() # Get the database connection for transaction management.
+    started_at = time.perf_counter()
+    try:
+        stress_events, alerts = survey_response_repository.evaluate_stress_history(from_week, to_week, threshold)
+        db.commit()
+    except Exception:
+        # Rollback so that an evaluation never leaves part of its events and alerts behind.
+        db.rollback()
+        raise
+    if alerts:
+        current_app.logger.warning(f"{alerts} alert(s) created by re-evaluating weeks {from_week or 'first'}-{to_week or 'last'}.")
+    return AlertEvaluation(stress_events, alerts, time.perf_counter() - started_at)
@@ -7,12 +7,13 @@ are typically accessed by staff roles (admin, course_director, wellbeing_officer
 to gain insights and identify at-risk students.
 """
 
-from flask import jsonify, current_app # Import current_app for logging
+from flask import jsonify, request, current_app # Import current_app for logging
 from . import analysis
 from app.repositories.student_repository import student_repository
 from app.repositories.analysis_repository import analysis_repository
 from flask_jwt_extended import jwt_required
 from app.utils.decorators import role_required
+from app.utils.pagination import parse_page_args
 
 @analysis.route('/students', methods=['GET'])
 @jwt_required()
@@ -21,12 +22,23 @@ def get_students():
     """
     Retrieves a list of all students with basic details for analysis purposes.
 
+    Query Parameters:
+        fields (str, optional): Comma-separated subset of student fields to return
+                                (e.g. `id,full_name`). Only these columns are read from the database.
+
     Returns:
         Response: JSON array of student objects.
                   - 200 OK: Successfully retrieved student list.
+                  - 400 Bad Request: Unknown field requested.
                   - 500 Internal Server Error: An unexpected error occurred.
     """
     try:
+        if 'fields' in request.args:
+            try:
+                fields = student_repository.select_fields(request.args['fields'])
+            except ValueError as e:
+                return jsonify({'message': str(e)}), 400
+            return jsonify(list(student_repository.iter_list(fields=fields))), 200
         students = student_repository.get_all_students()
         return jsonify([{
             'id': student.id,
@@ -134,6 +146,240 @@ def get_average_attendance_for_student(student_id):
         current_app.logger.error(f"Error getting average attendance for student {student_id}: {e}", exc_info=True)
         return jsonify({'message': 'An unexpected error occurred.'}), 500
 
+@analysis.route('/students/<int:student_id>/overview', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'course_director', 'wellbeing_officer'])
+def get_student_overview(student_id):
+    """
+    Retrieves everything the student detail page shows in one request.
+
+    Args:
+        student_id (int): The ID of the student.
+
+    Returns:
+        Response: JSON object with `student`, `enrolments`, `stress_trend`, `attendance_trend`,
+                  `average_attendance`, `grades_by_module`, `submissions` and `alerts`.
+                  - 200 OK: Successfully retrieved the overview.
+                  - 404 Not Found: Student not found.
+                  - 500 Internal Server Error: An unexpected error occurred.
+    """
+    try:
+        overview = analysis_repository.get_student_overview(student_id)
+        if overview is None:
+            return jsonify({'message': 'Student not found'}), 404
+        return jsonify(overview), 200
+    except Exception as e:
+        current_app.logger.error(f"Error getting overview for student {student_id}: {e}", exc_info=True)
+        return jsonify({'message': 'An unexpected error occurred.'}), 500
+
+@analysis.route('/cohort-trends', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'course_director', 'wellbeing_officer'])
+def get_cohort_trends():
+    """
+    Retrieves the weekly stress and attendance series of many students in one request.
+
+    At least one selector is required; students must match all of them.
+
+    Query Parameters:
+        student_ids (str, optional): Comma-separated student IDs.
+        course_name (str, optional): Students on this course.
+        module_id (int, optional): Students enrolled on this module.
+        year_of_study (int, optional): Students in this year of study.
+
+    Returns:
+        Response: JSON object with `weeks`, `students` (`id`, `full_name`) and the `stress` and
+                  `attendance` matrices (one row per student, one value per week, null where
+                  the student has no records that week).
+                  - 200 OK: Successfully retrieved the series.
+                  - 400 Bad Request: No selector, a malformed parameter or too many students.
+                  - 500 Internal Server Error: An unexpected error occurred.
+    """
+    try:
+        options = {'max_students': current_app.config.get('COHORT_TRENDS_MAX_STUDENTS', 500)}
+        try:
+            if 'student_ids' in request.args:
+                options['student_ids'] = tuple(sorted({int(i) for i in request.args['student_ids'].split(',') if i.strip()}))
+            for name in ('module_id', 'year_of_study'):
+                if name in request.args:
+                    options[name] = int(request.args[name])
+        except ValueError:
+            return jsonify({'message': "'student_ids', 'module_id' and 'year_of_study' must be integers."}), 400
+        if request.args.get('course_name'):
+            options['course_name'] = request.args['course_name']
+        try:
+            trends = analysis_repository.get_cohort_trends(**options)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        return jsonify(trends), 200
+    except Exception as e:
+        current_app.logger.error(f"Error getting cohort trends: {e}", exc_info=True)
+        return jsonify({'message': 'An unexpected error occurred.'}), 500
+
+@analysis.route('/module-week-heatmap', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'course_director', 'wellbeing_officer'])
+def get_module_week_heatmap():
+    """
+    Retrieves a module x week heatmap of one metric, read from the weekly module rollups.
+
+    Query Parameters:
+        metric (str, optional): `stress` (default), `attendance` (percentage) or `sleep` (hours).
+        academic_year (str, optional): Only include modules of this academic year (e.g. `2025/2026`).
+
+    Returns:
+        Response: JSON object with `metric`, `weeks`, `modules` and the `data` (weekly means)
+                  and `counts` matrices, one row per module.
+                  - 200 OK: Successfully built the heatmap.
+                  - 400 Bad Request: Unknown metric.
+                  - 500 Internal Server Error: An unexpected error occurred.
+    """
+    try:
+        try:
+            heatmap = analysis_repository.get_module_week_heatmap(request.args.get('metric', 'stress'),
+                                                                  request.args.get('academic_year') or None)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        return jsonify(heatmap), 200
+    except Exception as e:
+        current_app.logger.error(f"Error getting module-week heatmap: {e}", exc_info=True)
+        return jsonify({'message': 'An unexpected error occurred.'}), 500
+
+@analysis.route('/modules/<int:module_id>/weekly-trends', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'course_director', 'wellbeing_officer'])
+def get_module_weekly_trends(module_id):
+    """
+    Retrieves the weekly stress, attendance and sleep trend lines of a module, read from the weekly module rollups.
+
+    Args:
+        module_id (int): The ID of the module.
+
+    Returns:
+        Response: JSON object with `module`, `weeks` and the weekly `mean`, `stddev` and `count`
+                  of `stress`, `attendance` (percentage) and `sleep`.
+                  - 200 OK: Successfully retrieved the trends.
+                  - 404 Not Found: Module not found.
+                  - 500 Internal Server Error: An unexpected error occurred.
+    """
+    try:
+        trends = analysis_repository.get_module_weekly_trends(module_id)
+        if trends is None:
+            return jsonify({'message': 'Module not found'}), 404
+        return jsonify(trends), 200
+    except Exception as e:
+        current_app.logger.error(f"Error getting weekly trends for module {module_id}: {e}", exc_info=True)
+        return jsonify({'message': 'An unexpected error occurred.'}), 500
+
+def _histogram_scope_args():
+    """Reads the optional integer `module_id` and `week` query parameters; raises ValueError if malformed."""
+    try:
+        return {name: int(request.args[name]) for name in ('module_id', 'week') if request.args.get(name)}
+    except ValueError as e:
+        raise ValueError("'module_id' and 'week' must be integers.") from e
+
+@analysis.route('/percentiles', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'course_director', 'wellbeing_officer'])
+def get_metric_percentiles():
+    """
+    Retrieves percentiles of attendance, grade or stress, read from the metric's histogram sketch.
+
+    Query Parameters:
+        metric (str): `attendance` (percentage), `grade` or `stress`.
+        percentiles (str, optional): Comma-separated percentiles, 0-100 (default `10,25,50,75,90`).
+        module_id (int, optional): Percentiles of the students' averages in this module.
+        week (int, optional): Percentiles of the records of this week (attendance and stress only).
+                              Without `module_id` or `week`, the percentiles of the cohort's averages.
+
+    Returns:
+        Response: JSON object with `metric`, `scope`, `scope_id`, `count`, `resolution` and
+                  `percentiles` (`{percentile, value}` each).
+                  - 200 OK: Successfully computed the percentiles.
+                  - 400 Bad Request: Unknown metric, invalid percentiles or scope.
+                  - 500 Internal Server Error: An unexpected error occurred.
+    """
+    try:
+        try:
+            options = _histogram_scope_args()
+            if request.args.get('percentiles'):
+                try:
+                    options['percentiles'] = tuple(float(p) for p in request.args['percentiles'].split(',') if p.strip())
+                except ValueError as e:
+                    raise ValueError("'percentiles' must be comma-separated numbers.") from e
+            data = analysis_repository.get_metric_percentiles(request.args.get('metric', ''), **options)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        return jsonify(data), 200
+    except Exception as e:
+        current_app.logger.error(f"Error getting metric percentiles: {e}", exc_info=True)
+        return jsonify({'message': 'An unexpected error occurred.'}), 500
+
+@analysis.route('/students/<int:student_id>/percentiles', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'course_director', 'wellbeing_officer'])
+def get_student_percentiles(student_id):
+    """
+    Retrieves the percentile rank of a student's attendance, grade and stress.
+
+    Args:
+        student_id (int): The ID of the student.
+
+    Query Parameters:
+        module_id (int, optional): Rank the student's averages in this module among its students.
+        week (int, optional): Rank the student's averages in this week among the week's records.
+                              Without `module_id` or `week`, rank the averages within the cohort.
+
+    Returns:
+        Response: JSON object with `student_id`, `scope`, `scope_id` and `metrics`
+                  (`{value, percentile, count}` or null per metric).
+                  - 200 OK: Successfully computed the ranks.
+                  - 400 Bad Request: Invalid scope.
+                  - 404 Not Found: Student not found.
+                  - 500 Internal Server Error: An unexpected error occurred.
+    """
+    try:
+        try:
+            ranks = analysis_repository.get_student_percentiles(student_id, **_histogram_scope_args())
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        if ranks is None:
+            return jsonify({'message': 'Student not found'}), 404
+        return jsonify(ranks), 200
+    except Exception as e:
+        current_app.logger.error(f"Error getting percentiles for student {student_id}: {e}", exc_info=True)
+        return jsonify({'message': 'An unexpected error occurred.'}), 500
+
+@analysis.route('/dashboard', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'course_director', 'wellbeing_officer'])
+def get_dashboard():
+    """
+    Retrieves several dashboard panels in one request, computed from one consistent snapshot.
+
+    Query Parameters:
+        panels (str, optional): Comma-separated panels to include (default: all): `dashboard_summary`,
+                                `grade_distribution`, `stress_grade_correlation`, `overall_attendance_rate`,
+                                `submission_status_distribution`, `stress_by_module`, `high_risk_students`.
+                                Hyphenated names (as in the individual endpoints) are accepted too.
+
+    Returns:
+        Response: JSON object mapping each requested panel to the body of its individual endpoint
+                  (high-risk students use the default thresholds, ordered by severity).
+                  - 200 OK: Successfully computed the panels.
+                  - 400 Bad Request: Unknown panel requested.
+                  - 500 Internal Server Error: An unexpected error occurred.
+    """
+    try:
+        try:
+            panels = analysis_repository.parse_dashboard_panels(request.args.get('panels'))
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        return jsonify(analysis_repository.get_dashboard(panels)), 200
+    except Exception as e:
+        current_app.logger.error(f"Error getting dashboard panels: {e}", exc_info=True)
+        return jsonify({'message': 'An unexpected error occurred.'}), 500
+
 @analysis.route('/grade-distribution', methods=['GET'])
 @jwt_required()
 @role_required(['admin', 'course_director', 'wellbeing_officer'])
@@ -158,15 +404,28 @@ def get_grade_distribution():
 @role_required(['admin', 'course_director', 'wellbeing_officer'])
 def get_stress_grade_correlation():
     """
-    Retrieves data points for correlating average stress levels with average grades for each student.
+    Retrieves the correlation between students' average stress levels and average grades.
+
+    Query Parameters:
+        points (str, optional): `sample` for an evenly spread sample of students, or `page` for one
+                                page of students ordered by ID. Without it no points are returned.
+        limit (int, optional): The sample or page size (default `DEFAULT_PAGE_SIZE`, at most `MAX_PAGE_SIZE`).
+        after (str, optional): With `points=page`, the `next_cursor` of the previous page.
 
     Returns:
-        Response: JSON object containing labels (student names) and data (stress-grade data points).
+        Response: JSON object with `count`, `pearson`, `spearman`, `regression` and the `density` grid,
+                  plus `points` when requested.
                   - 200 OK: Successfully retrieved correlation data.
+                  - 400 Bad Request: Invalid `points`, `limit` or `after`.
                   - 500 Internal Server Error: An unexpected error occurred.
     """
     try:
-        data = analysis_repository.get_stress_grade_correlation()
+        try:
+            limit, after = parse_page_args(request.args, current_app.config.get('DEFAULT_PAGE_SIZE', 50),
+                                           current_app.config.get('MAX_PAGE_SIZE', 500))
+            data = analysis_repository.get_stress_grade_correlation(request.args.get('points') or None, limit, after)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         return jsonify(data), 200
     except Exception as e:
         current_app.logger.error(f"Error getting stress-grade correlation: {e}", exc_info=True)
@@ -235,15 +494,36 @@ def get_submission_status_distribution():
 def get_high_risk_students():
     """
     Identifies and retrieves a list of students who are considered high-risk
-    based on predefined thresholds for attendance, grades, and stress levels.
+    based on thresholds for attendance, grades, and stress levels.
+
+    Query Parameters:
+        attendance_threshold (float, optional): Attendance percentage below which a student is at risk. Defaults to 70.
+        grade_threshold (float, optional): Average grade below which a student is at risk. Defaults to 40.
+        stress_threshold (float, optional): Average stress level (1-5) at or above which a student is at risk. Defaults to 4.
+        sort (str, optional): `severity` (highest first), `attendance`, `grade`, `stress`, `name` or `id`. Defaults to `id`.
+        limit (int, optional): Return at most this many students.
 
     Returns:
-        Response: JSON array of high-risk student objects with reasons.
+        Response: JSON array of high-risk student objects with reasons, per-factor values and a severity score.
                   - 200 OK: Successfully retrieved high-risk students.
+                  - 400 Bad Request: A parameter is not a number or is out of range.
                   - 500 Internal Server Error: An unexpected error occurred.
     """
     try:
-        students = analysis_repository.get_high_risk_students()
+        options = {}
+        for name, convert in (('attendance_threshold', float), ('grade_threshold', float),
+                              ('stress_threshold', float), ('limit', int)):
+            if name in request.args:
+                try:
+                    options[name] = convert(request.args[name])
+                except ValueError:
+                    return jsonify({'message': f"'{name}' must be a number."}), 400
+        if 'sort' in request.args:
+            options['sort'] = request.args['sort']
+        try:
+            students = analysis_repository.get_high_risk_students(**options)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         return jsonify(students), 200
     except Exception as e:
         current_app.logger.error(f"Error getting high-risk students: {e}", exc_info=True)
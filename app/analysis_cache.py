@@ -0,0 +1,300 @@
+"""
+Result cache for the analysis queries.
+
+The `/api/analysis/*` endpoints aggregate whole tables, yet the data behind
+them only changes when someone writes, and at busy times (e.g. staff opening
+the dashboard in the morning) many users request identical results. The
+`@cached_analysis(*tables)` decorator used by `AnalysisRepository` memoizes a
+method's result, keyed by the method and its arguments, in an
+application-wide `AnalysisCache`.
+
+Invalidation is driven by writes rather than guesses: the cache keeps a
+version counter per table, and `record_write()` increments the counters of the
+tables a statement wrote to. `BaseRepository` calls it from every write helper.
+Each entry remembers the versions of the tables it was computed from and is
+discarded on lookup once any of them has moved on. Because a write is only
+visible to other connections once the request commits, the tables written
+during a request are bumped a second time when the request ends; a result
+computed from the pre-commit data in the meantime is therefore never served.
+
+The in-process counters cannot see writes made by other processes. For the
+tables that another process writes routinely, `PERSISTED_VERSIONS` names a
+query that returns a counter which every committed change advances: the
+`alerts` written by the detection worker (`flask worker`) are versioned by the
+`alert_changes` log its triggers append to. Before a result computed from such
+a table is served, the counter is read on the request's connection and
+compared with the one the result was computed at, so a pending-alert count is
+recomputed as soon as the worker commits, not when the entry expires.
+
+Entries are also evicted least-recently-used beyond `ANALYSIS_CACHE_MAX_ENTRIES`
+and expire after `ANALYSIS_CACHE_TTL_SECONDS`. The TTL bounds how long the
+occasional writes of other processes to the remaining tables (CLI imports and
+maintenance commands) stay invisible. Concurrent misses for the same key are
+coalesced so that only one of them runs the query.
+
+Hit/miss statistics are exposed through the admin-only
+`/api/admin/debug/analysis-cache` endpoint.
+"""
+
+import contextlib
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app, g, has_app_context, has_request_context
+from app.db_connection import get_db
+
+_CacheEntry = namedtuple('_CacheEntry', ['value', 'versions', 'expires_at'])
+
+# Tables written by other processes, with a query returning a counter that every committed change to them advances.
+PERSISTED_VERSIONS = {
+    'alerts': "SELECT COALESCE(MAX(id), 0) FROM alert_changes", # Appended by the triggers of every change to an active alert.
+}
+
+class AnalysisCache:
+    """
+    Application-wide, thread-safe LRU/TTL cache with per-table version counters.
+    """
+    def __init__(self, max_entries=256, ttl_seconds=300.0, wait_timeout=30.0):
+        """
+        Initializes the AnalysisCache.
+
+        Args:
+            max_entries (int, optional): Entries kept before the least recently used one is evicted. Defaults to 256.
+            ttl_seconds (float, optional): Seconds after which an entry expires regardless of writes. Defaults to 300.
+            wait_timeout (float, optional): Seconds a coalesced miss waits for the computing request
+                                            before checking again. Defaults to 30.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # Maps key -> _CacheEntry, least recently used first.
+        self._pending = {} # Maps key -> threading.Event of the request computing it.
+        self._versions = {} # Maps table name -> write counter.
+        self._counters = {'hits': 0, 'misses': 0, 'coalesced': 0, 'stale': 0, 'expired': 0, 'evictions': 0}
+
+    def bump(self, tables):
+        """
+        Increments the version counters of the given tables, invalidating every entry that read them.
+
+        Args:
+            tables (Iterable[str]): The tables that were written to.
+        """
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def versions(self, tables):
+        """
+        Returns the current version counters of the given tables.
+
+        Args:
+            tables (Iterable[str]): The table names.
+
+        Returns:
+            tuple[int]: One counter per table, 0 for tables never written.
+        """
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def get_or_compute(self, key, tables, compute, persisted_versions=()):
+        """
+        Returns the cached value for `key`, computing and storing it on a miss.
+
+        Args:
+            key (Hashable): The cache key.
+            tables (tuple[str]): The tables the value is computed from.
+            compute (callable): Computes the value. Exceptions propagate and nothing is cached.
+            persisted_versions (tuple, optional): The persisted counters of the tables other processes
+                                                  write (see `PERSISTED_VERSIONS`), read just before
+                                                  the lookup. Defaults to ().
+
+        Returns:
+            Any: The cached or freshly computed value.
+        """
+        while True:
+            with self._lock:
+                versions = tuple(self._versions.get(table, 0) for table in tables) + tuple(persisted_versions)
+                entry = self._entries.get(key)
+                if entry is not None:
+                    if entry.versions != versions:
+                        self._counters['stale'] += 1
+                        del self._entries[key]
+                    elif entry.expires_at <= time.monotonic():
+                        self._counters['expired'] += 1
+                        del self._entries[key]
+                    else:
+                        self._entries.move_to_end(key)
+                        self._counters['hits'] += 1
+                        return entry.value
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    self._counters['misses'] += 1
+                    break
+                self._counters['coalesced'] += 1
+            # Another request is computing the same value; wait for it and look again.
+            pending.wait(self.wait_timeout)
+
+        try:
+            value = compute()
+        except BaseException:
+            with self._lock:
+                self._pending.pop(key).set()
+            raise
+        with self._lock:
+            # Stored with the versions read before computing; a write in between makes it stale at once.
+            self._entries[key] = _CacheEntry(value, versions, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+            self._pending.pop(key).set()
+        return value
+
+    def stats(self):
+        """
+        Returns a copy of the cache statistics.
+
+        Returns:
+            dict: Hit/miss counters, `hit_ratio`, the current number of entries, the limits
+                  and the table version counters.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+            stats['entries'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+            stats['ttl_seconds'] = self.ttl_seconds
+            stats['table_versions'] = dict(sorted(self._versions.items()))
+            return stats
+
+    def clear(self):
+        """Drops all entries and resets the statistics; table versions keep counting."""
+        with self._lock:
+            self._entries.clear()
+            for name in self._counters:
+                self._counters[name] = 0
+
+def get_analysis_cache(app=None):
+    """
+    Retrieves (creating on first use) the analysis cache for a Flask application.
+
+    Args:
+        app (Flask, optional): The application. Defaults to `current_app`.
+
+    Returns:
+        AnalysisCache: The application's analysis cache.
+    """
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get('analysis_cache')
+    if cache is None:
+        cache = AnalysisCache(
+            max_entries=app.config.get('ANALYSIS_CACHE_MAX_ENTRIES', 256),
+            ttl_seconds=app.config.get('ANALYSIS_CACHE_TTL_SECONDS', 300.0)
+        )
+        app.extensions['analysis_cache'] = cache
+    return cache
+
+def record_write(*tables):
+    """
+    Invalidates the cached results computed from `tables`.
+
+    Called by `BaseRepository` after every successful write. The tables are also
+    remembered for the current request and bumped again once it has ended (see
+    `_bump_written_tables()`). Does nothing outside an application context.
+
+    Args:
+        *tables (str): The tables that were written to.
+    """
+    if not has_app_context():
+        return
+    get_analysis_cache().bump(tables)
+    if has_request_context():
+        g.setdefault('written_tables', set()).update(tables)
+
+def cached_analysis(*tables):
+    """
+    Decorator that caches a repository method's result until one of `tables` is written.
+
+    Calls are keyed by the method and its bound arguments (defaults applied, so
+    positional and keyword calls share an entry). Cached values are shared between
+    requests and must be treated as read-only by callers. For tables listed in
+    `PERSISTED_VERSIONS`, every lookup also reads their persisted counters.
+
+    Args:
+        *tables (str): The tables the method reads.
+
+    Returns:
+        callable: The decorator.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+        persisted = tuple(PERSISTED_VERSIONS[table] for table in tables if table in PERSISTED_VERSIONS)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not current_app.config.get('ANALYSIS_CACHE_ENABLED', True) or g.get('analysis_cache_bypass'):
+                return method(self, *args, **kwargs)
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            key = (method.__qualname__,) + tuple(bound.arguments.items())[1:]
+            return get_analysis_cache().get_or_compute(key, tables, lambda: method(self, *args, **kwargs),
+                                                       _read_persisted_versions(persisted))
+        return wrapper
+    return decorator
+
+def _read_persisted_versions(queries):
+    """
+    Reads the persisted change counters of the tables other processes write.
+
+    Read before the value is computed, so a change committed in between only
+    makes the stored entry look older than it is and never serves stale data.
+
+    Args:
+        queries (tuple[str]): The `PERSISTED_VERSIONS` queries of the method's tables.
+
+    Returns:
+        tuple[int]: One counter per query.
+    """
+    db = get_db()
+    return tuple(db.execute(query).fetchone()[0] for query in queries)
+
+@contextlib.contextmanager
+def bypass_analysis_cache():
+    """
+    Context manager under which `@cached_analysis` methods neither read nor fill the cache.
+
+    Used where results must come from the current connection's own snapshot: the
+    dashboard bundle's read transaction and the query-plan report's database copy.
+    Only affects the current application context.
+    """
+    previous = g.get('analysis_cache_bypass', False)
+    g.analysis_cache_bypass = True
+    try:
+        yield
+    finally:
+        g.analysis_cache_bypass = previous
+
+def _bump_written_tables(exc=None):
+    """
+    Bumps the tables written during the request again, now that it has committed or rolled back.
+
+    Args:
+        exc (Exception, optional): The exception that ended the request, if any.
+    """
+    tables = g.pop('written_tables', None)
+    if tables:
+        get_analysis_cache().bump(tables)
+
+def init_app(app):
+    """
+    Registers the end-of-request invalidation hook with the Flask application.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    app.teardown_request(_bump_written_tables)
@@ -0,0 +1,413 @@
+"""
+Optional in-memory analytics engine backed by NumPy.
+
+With `ANALYSIS_ENGINE = 'numpy'` (and NumPy installed), the analysis methods of
+`AnalysisRepository` that are marked `@numpy_backed` are answered by a
+`NumpyAnalysisEngine` instead of SQL. The engine keeps the active rows of
+`grades`, `attendance_records`, `survey_responses` and `submission_records`,
+plus the `students` and `modules` lookups, as columnar arrays sorted by
+student, and computes the trends, distributions, correlation, high-risk
+students and stress by module with vectorized group-bys (`np.bincount` over
+dense student and module positions). The results are the same as the SQL
+implementation's; floating-point sums may differ in the last bits because they
+are added up in a different order.
+
+Each table is reloaded on its own when the analysis cache's version counter for
+it moves (see `app/analysis_cache.py`), i.e. after a repository write, so a new
+grade reloads `grades` only. Writes by other processes are not counted there,
+so all tables are also reloaded once the snapshot is older than
+`ANALYSIS_ENGINE_MAX_AGE_SECONDS`.
+
+Without NumPy, or with any other `ANALYSIS_ENGINE` value, the SQL queries are
+used. Calls made under `bypass_analysis_cache()` (the dashboard bundle's read
+transaction, the query-plan report) always use SQL, as they must read the
+connection's own snapshot.
+"""
+
+import functools
+import threading
+import time
+from flask import current_app, g
+from app.analysis_cache import get_analysis_cache
+from app.repositories.base_repository import BaseRepository
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional; the SQL implementation is used without it.
+    np = None
+
+# How each table is loaded: the query and the kind of every selected column.
+# Event rows are ordered by student and week so that one student's rows are a contiguous slice.
+_TABLE_LOADS = {
+    'students': ("SELECT id, full_name, is_active FROM students ORDER BY id",
+                 {'id': 'int', 'full_name': 'str', 'is_active': 'int'}),
+    'modules': ("SELECT id, module_title, is_active FROM modules ORDER BY id",
+                {'id': 'int', 'module_title': 'str', 'is_active': 'int'}),
+    'survey_responses': ("""SELECT student_id, COALESCE(module_id, -1) AS module_id, week_number, stress_level
+                            FROM survey_responses WHERE is_active = 1 ORDER BY student_id, week_number""",
+                         {'student_id': 'int', 'module_id': 'int', 'week_number': 'int', 'stress_level': 'float'}),
+    'attendance_records': ("""SELECT student_id, week_number, attendance_rate
+                              FROM attendance_records WHERE is_active = 1 ORDER BY student_id, week_number""",
+                           {'student_id': 'int', 'week_number': 'int', 'attendance_rate': 'float'}),
+    'grades': ("SELECT student_id, grade FROM grades WHERE is_active = 1 AND grade IS NOT NULL ORDER BY student_id",
+               {'student_id': 'int', 'grade': 'float'}),
+    'submission_records': ("SELECT is_submitted, is_late FROM submission_records WHERE is_active = 1",
+                           {'is_submitted': 'int', 'is_late': 'int'}),
+}
+
+# Folds ASCII letters only, like SQLite's NOCASE collation.
+_NOCASE = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+def _positions(ids, keys):
+    """
+    Maps foreign keys to positions in a sorted ID array.
+
+    Args:
+        ids (np.ndarray): Sorted, unique IDs.
+        keys (np.ndarray): The foreign keys to look up.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The position of every key and a mask of the keys that were found.
+    """
+    if len(ids) == 0:
+        return np.zeros(len(keys), dtype=np.int64), np.zeros(len(keys), dtype=bool)
+    positions = np.searchsorted(ids, keys)
+    found = (positions < len(ids)) & (ids[np.minimum(positions, len(ids) - 1)] == keys)
+    return positions, found
+
+def _grouped_mean(groups, values, size):
+    """
+    Averages `values` per group, ignoring NaN (SQL NULL) values.
+
+    Args:
+        groups (np.ndarray): The group (0 to `size` - 1) of every value.
+        values (np.ndarray): The values.
+        size (int): The number of groups.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The mean (NaN for empty groups) and the count of every group.
+    """
+    present = ~np.isnan(values)
+    sums = np.bincount(groups[present], weights=values[present], minlength=size)
+    counts = np.bincount(groups[present], minlength=size)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return sums / counts, counts
+
+def _optional(value):
+    """Converts a NumPy scalar to a Python float, or None for NaN."""
+    return None if np.isnan(value) else float(value)
+
+def _average_ranks(values):
+    """Ranks `values` from 1, averaging the ranks of ties (as the `RANK()` windows of `AnalysisRepository._get_correlation_sums()`)."""
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    starts = np.cumsum(counts) - counts
+    return (starts + (counts + 1) / 2)[inverse]
+
+def _pearson(x, y):
+    """Pearson's r of two arrays, or None with fewer than two values or a constant array."""
+    if len(x) < 2 or np.ptp(x) == 0 or np.ptp(y) == 0:
+        return None
+    dx, dy = x - x.mean(), y - y.mean()
+    return float((dx @ dy) / np.sqrt((dx @ dx) * (dy @ dy)))
+
+class NumpyAnalysisEngine:
+    """
+    Columnar snapshot of the analysed tables with NumPy implementations of the analysis methods.
+
+    Methods have the names, arguments and results of their `AnalysisRepository`
+    counterparts. Loading runs on the current request's database connection.
+    """
+    def __init__(self, cache, max_age_seconds=300.0):
+        """
+        Initializes the NumpyAnalysisEngine. Nothing is loaded until first use.
+
+        Args:
+            cache (AnalysisCache): The cache whose table version counters trigger reloads.
+            max_age_seconds (float, optional): Seconds after which every table is reloaded. Defaults to 300.
+        """
+        self.cache = cache
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._tables = {} # Maps table name -> (version, {column: array}).
+        self._loaded_at = None
+        self._loads = {} # Maps table name -> number of times it was loaded.
+        self._loader = BaseRepository('analysis_engine', None) # Runs the instrumented load queries.
+
+    def _load(self, table):
+        """
+        Reads a table into one array per column.
+
+        Args:
+            table (str): A key of `_TABLE_LOADS`.
+
+        Returns:
+            dict: `{column: np.ndarray}`; NULLs of float columns become NaN.
+        """
+        query, columns = _TABLE_LOADS[table]
+        rows = self._loader._execute_query(query, fetch_all_dicts=True)
+        arrays = {}
+        for column, kind in columns.items():
+            values = [row[column] for row in rows]
+            if kind == 'str':
+                arrays[column] = np.array(values, dtype=str)
+            else:
+                arrays[column] = np.array(values, dtype=np.int64 if kind == 'int' else float)
+        self._loads[table] = self._loads.get(table, 0) + 1
+        return arrays
+
+    def _columns(self, *tables):
+        """
+        Returns the arrays of the given tables, reloading those that changed since they were loaded.
+
+        Args:
+            *tables (str): The tables needed.
+
+        Returns:
+            list[dict]: The `{column: np.ndarray}` of every table, in argument order.
+        """
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.max_age_seconds:
+                self._tables.clear()
+                self._loaded_at = time.monotonic()
+            # Versions are read before loading; a write in between leaves the table marked stale.
+            for table, version in zip(tables, self.cache.versions(tables)):
+                loaded = self._tables.get(table)
+                if loaded is None or loaded[0] != version:
+                    self._tables[table] = (version, self._load(table))
+            return [self._tables[table][1] for table in tables]
+
+    def stats(self):
+        """
+        Returns how often each table was loaded and the age of the snapshot.
+
+        Returns:
+            dict: `table_loads` and `age_seconds` (None before the first load).
+        """
+        with self._lock:
+            age = round(time.monotonic() - self._loaded_at, 3) if self._loaded_at is not None else None
+            return {'table_loads': dict(sorted(self._loads.items())), 'age_seconds': age}
+
+    def _weekly_means(self, table, column, student_id):
+        """
+        Averages a column of one student's rows per week.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: The weeks, the weekly means and the weekly counts.
+        """
+        columns, = self._columns(table)
+        start, end = np.searchsorted(columns['student_id'], [student_id, student_id + 1])
+        weeks, groups = np.unique(columns['week_number'][start:end], return_inverse=True)
+        means, counts = _grouped_mean(groups.ravel(), columns[column][start:end], len(weeks))
+        return weeks, means, counts
+
+    def get_stress_trend_for_student(self, student_id):
+        """See `AnalysisRepository.get_stress_trend_for_student()`."""
+        weeks, means, _ = self._weekly_means('survey_responses', 'stress_level', student_id)
+        return {
+            'labels': [f"Week {week}" for week in weeks],
+            'data': [round(float(mean), 2) for mean in means]
+        }
+
+    def get_attendance_trend_for_student(self, student_id):
+        """See `AnalysisRepository.get_attendance_trend_for_student()`."""
+        weeks, means, counts = self._weekly_means('attendance_records', 'attendance_rate', student_id)
+        return {
+            'labels': [f"Week {week}" for week in weeks],
+            'data': [round(float(mean) * 100, 2) if count else 0 for mean, count in zip(means, counts)]
+        }
+
+    def get_average_attendance_for_student(self, student_id):
+        """See `AnalysisRepository.get_average_attendance_for_student()`."""
+        attendance, = self._columns('attendance_records')
+        start, end = np.searchsorted(attendance['student_id'], [student_id, student_id + 1])
+        rates = attendance['attendance_rate'][start:end]
+        rates = rates[~np.isnan(rates)]
+        return round(float(rates.sum() / len(rates)) * 100, 2) if len(rates) else 0
+
+    def _student_averages(self):
+        """
+        Computes the average attendance (0-1), grade and stress of every active student with any activity.
+
+        Returns:
+            dict: `id`, `full_name`, `attendance`, `grade` and `stress` arrays (NaN where the student
+                  has no such records), ordered by student ID.
+        """
+        students, attendance, grades, surveys = self._columns('students', 'attendance_records', 'grades', 'survey_responses')
+        ids = students['id']
+        averages, activity = {}, np.zeros(len(ids), dtype=np.int64)
+        for name, rows, column in (('attendance', attendance, 'attendance_rate'), ('grade', grades, 'grade'),
+                                   ('stress', surveys, 'stress_level')):
+            positions, found = _positions(ids, rows['student_id'])
+            averages[name], counts = _grouped_mean(positions[found], rows[column][found], len(ids))
+            activity += counts
+        selected = (students['is_active'] == 1) & (activity > 0)
+        result = {name: values[selected] for name, values in averages.items()}
+        result.update(id=ids[selected], full_name=students['full_name'][selected])
+        return result
+
+    def get_grade_distribution(self):
+        """See `AnalysisRepository.get_grade_distribution()`."""
+        from app.repositories.analysis_repository import AnalysisRepository
+        grades = self._student_averages()['grade']
+        grades = grades[~np.isnan(grades)]
+        bounds = [bound for _, bound in AnalysisRepository.GRADE_BANDS[1:]]
+        counts = np.bincount(np.searchsorted(bounds, grades, side='right'), minlength=len(AnalysisRepository.GRADE_BANDS))
+        return {'labels': [label for label, _ in AnalysisRepository.GRADE_BANDS], 'data': counts.tolist()}
+
+    def get_stress_grade_correlation(self, points=None, limit=500, after=None):
+        """See `AnalysisRepository.get_stress_grade_correlation()`."""
+        from app.repositories.analysis_repository import AnalysisRepository
+        AnalysisRepository._validate_correlation_options(points, limit, after)
+        averages = self._student_averages()
+        selected = ~np.isnan(averages['stress']) & ~np.isnan(averages['grade'])
+        x, y = averages['stress'][selected], averages['grade'][selected]
+
+        pearson, regression = None, None
+        if len(x) > 1 and np.ptp(x) > 0:
+            # The centred sums are computed once and shared by Pearson's r and the regression line.
+            dx, dy = x - x.mean(), y - y.mean()
+            sxx, sxy = dx @ dx, dx @ dy
+            if np.ptp(y) > 0:
+                pearson = float(sxy / np.sqrt(sxx * (dy @ dy)))
+            slope = float(sxy / sxx)
+            regression = {'slope': slope, 'intercept': float(y.mean() - slope * x.mean()),
+                          'r_squared': pearson ** 2 if pearson is not None else None}
+
+        # Same bins as `AnalysisRepository._density_bin_sql()`, counted with one bincount over the flattened grid.
+        x_edges, y_edges = AnalysisRepository.CORRELATION_STRESS_EDGES, AnalysisRepository.CORRELATION_GRADE_EDGES
+        x_bins = np.clip(np.searchsorted(x_edges, x, side='right') - 1, 0, len(x_edges) - 2)
+        y_bins = np.clip(np.searchsorted(y_edges, y, side='right') - 1, 0, len(y_edges) - 2)
+        shape = (len(x_edges) - 1, len(y_edges) - 1)
+        counts = np.bincount(x_bins * shape[1] + y_bins, minlength=shape[0] * shape[1]).reshape(shape)
+
+        result = {
+            'count': int(len(x)),
+            'pearson': pearson,
+            'spearman': _pearson(_average_ranks(x), _average_ranks(y)),
+            'regression': regression,
+            'density': {'x_edges': list(x_edges), 'y_edges': list(y_edges), 'counts': counts.tolist()},
+        }
+        if points is not None:
+            result['points'] = AnalysisRepository._correlation_points(
+                averages['id'][selected], averages['full_name'][selected], x, y, points, limit, after)
+        return result
+
+    def get_overall_attendance_rate(self):
+        """See `AnalysisRepository.get_overall_attendance_rate()`."""
+        attendance, = self._columns('attendance_records')
+        rates = attendance['attendance_rate']
+        rates = rates[~np.isnan(rates)]
+        return round(float(rates.sum() / len(rates)) * 100, 2) if len(rates) else 0
+
+    def get_submission_status_distribution(self):
+        """See `AnalysisRepository.get_submission_status_distribution()`."""
+        submissions, = self._columns('submission_records')
+        submitted, late = submissions['is_submitted'], submissions['is_late']
+        return {
+            'labels': ['Submitted On Time', 'Submitted Late', 'Not Submitted'],
+            'data': [int(np.count_nonzero((submitted == 1) & (late == 0))),
+                     int(np.count_nonzero((submitted == 1) & (late == 1))),
+                     int(np.count_nonzero(submitted == 0))]
+        }
+
+    def get_high_risk_students(self, attendance_threshold=70, grade_threshold=40, stress_threshold=4, sort='id', limit=None):
+        """See `AnalysisRepository.get_high_risk_students()`."""
+        from app.repositories.analysis_repository import analysis_repository
+        analysis_repository._validate_high_risk_options(attendance_threshold, grade_threshold, stress_threshold, sort, limit)
+        averages = self._student_averages()
+        attendance, grade, stress = averages['attendance'] * 100, averages['grade'], averages['stress']
+
+        # NaN compares false, so students without records never count as at risk (as NULL in SQL).
+        at_risk = {'attendance': attendance < attendance_threshold, 'grade': grade < grade_threshold,
+                   'stress': stress >= stress_threshold}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = {
+                'attendance': np.where(at_risk['attendance'], (attendance_threshold - attendance) / attendance_threshold, 0.0),
+                'grade': np.where(at_risk['grade'], (grade_threshold - grade) / grade_threshold, 0.0),
+                'stress': np.where(at_risk['stress'], (stress - stress_threshold) / (5 - stress_threshold) if stress_threshold < 5 else 1.0, 0.0),
+            }
+        severity = scores['attendance'] + scores['grade'] + scores['stress']
+        selected = np.flatnonzero(at_risk['attendance'] | at_risk['grade'] | at_risk['stress'])
+
+        # `np.lexsort` sorts by the last key first; each ordering mirrors `AnalysisRepository.HIGH_RISK_SORTS`.
+        ids = averages['id'][selected]
+        sort_keys = {
+            'severity': lambda: (ids, -severity[selected]),
+            'attendance': lambda: (ids, np.nan_to_num(attendance[selected]), np.isnan(attendance[selected])),
+            'grade': lambda: (ids, np.nan_to_num(grade[selected]), np.isnan(grade[selected])),
+            'stress': lambda: (ids, np.nan_to_num(-stress[selected], nan=np.inf)),
+            'name': lambda: (ids, np.array([str(name).translate(_NOCASE) for name in averages['full_name'][selected]], dtype=str)),
+            'id': lambda: (ids,),
+        }
+        order = selected[np.lexsort(sort_keys[sort]())]
+        if limit is not None:
+            order = order[:limit]
+
+        return [
+            analysis_repository._high_risk_entry({
+                'id': int(averages['id'][i]), 'full_name': str(averages['full_name'][i]),
+                'avg_attendance': _optional(attendance[i]), 'avg_grade': _optional(grade[i]), 'avg_stress': _optional(stress[i]),
+                'attendance_score': float(scores['attendance'][i]), 'grade_score': float(scores['grade'][i]),
+                'stress_score': float(scores['stress'][i]), 'severity': float(severity[i]),
+            }, attendance_threshold, grade_threshold, stress_threshold)
+            for i in order
+        ]
+
+    def get_stress_level_by_module(self):
+        """See `AnalysisRepository.get_stress_level_by_module()`."""
+        modules, surveys = self._columns('modules', 'survey_responses')
+        positions, found = _positions(modules['id'], surveys['module_id'])
+        found[found] = modules['is_active'][positions[found]] == 1
+        # Modules sharing a title are reported together, as with `GROUP BY module_title`.
+        titles, title_of_module = np.unique(modules['module_title'], return_inverse=True)
+        means, counts = _grouped_mean(title_of_module.ravel()[positions[found]], surveys['stress_level'][found], len(titles))
+        reported = np.flatnonzero(counts > 0)
+        reported = reported[np.argsort(-means[reported], kind='stable')]
+        return {
+            'labels': [str(title) for title in titles[reported]],
+            'data': [round(float(mean), 2) for mean in means[reported]]
+        }
+
+def get_analysis_engine(app=None):
+    """
+    Retrieves (creating on first use) the NumPy analysis engine, if it is selected and available.
+
+    Args:
+        app (Flask, optional): The application. Defaults to `current_app`.
+
+    Returns:
+        NumpyAnalysisEngine | None: The engine, or None when the SQL implementation is to be used.
+    """
+    app = app or current_app._get_current_object()
+    if app.config.get('ANALYSIS_ENGINE', 'sql') != 'numpy':
+        return None
+    engine = app.extensions.get('analysis_engine')
+    if engine is None:
+        if np is None:
+            app.logger.warning("ANALYSIS_ENGINE is 'numpy' but NumPy is not installed; using the SQL implementation.")
+            engine = False # Remembered so that the warning is logged once.
+        else:
+            engine = NumpyAnalysisEngine(get_analysis_cache(app), max_age_seconds=app.config.get('ANALYSIS_ENGINE_MAX_AGE_SECONDS', 300.0))
+        app.extensions['analysis_engine'] = engine
+    return engine or None
+
+def numpy_backed(method):
+    """
+    Decorator that answers an `AnalysisRepository` method from the NumPy engine when it is enabled.
+
+    The engine method of the same name is called with the same arguments. Apply
+    it below `@cached_analysis`, so that engine results are cached as well.
+
+    Args:
+        method (callable): The SQL implementation.
+
+    Returns:
+        callable: The dispatching method.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        engine = None if g.get('analysis_cache_bypass') else get_analysis_engine()
+        if engine is None:
+            return method(self, *args, **kwargs)
+        return getattr(engine, method.__name__)(*args, **kwargs)
+    return wrapper
@@ -2,69 +2,382 @@
 Database connection management for the Flask application.
 
 This module is responsible for establishing and managing the lifecycle of
-the SQLite database connection within the Flask application context.
-It ensures that a single database connection is used per request and
-is properly closed when the request finishes.
+the SQLite database connections used by the Flask application. Connections
+are held in a bounded, per-application `ConnectionPool`: each request context
+checks out a single pre-configured connection and returns it to the pool when
+the context is torn down, so the connect cost, PRAGMA setup, page cache and
+prepared statement cache are paid once per connection rather than once per
+request.
 
 Note on Error Handling:
 This module's primary responsibility is to provide and manage the database
 connection's lifecycle. It specifically handles errors that occur during
 the *establishment* of the database connection (e.g., file not found,
-permission issues). Errors during actual database *operations* (e.g.,
-executing queries) are delegated to the repository layer
+permission issues, pool exhaustion). Errors during actual database
+*operations* (e.g., executing queries) are delegated to the repository layer
 (see `app/repositories/base_repository.py`) to maintain separation of concerns.
 """
 
 import sqlite3
-import os
+import threading
+import time
+from contextlib import contextmanager
 from flask import current_app, g
 
+# Oldest SQLite library the repositories work with: they use `INSERT ... RETURNING` (3.35),
+# aggregate `FILTER` clauses (3.30), window functions (3.25) and UPSERT (3.24), plus the JSON1 functions.
+MIN_SQLITE_VERSION = (3, 35, 0)
+
+def _close_quietly(conn):
+    """Closes a connection, ignoring errors from one that is already broken."""
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+class ConnectionPool:
+    """
+    A bounded, thread-aware pool of pre-configured SQLite connections.
+
+    Idle connections are kept on a LIFO stack so that the most recently used
+    (and therefore warmest) connection is handed out first. At most `size`
+    connections exist at any time; callers that arrive while every connection
+    is checked out wait up to `timeout` seconds for one to be returned.
+
+    Every connection is configured exactly once when it is created
+    (`row_factory`, type detection, statement cache size and PRAGMAs) and is
+    health-checked with a cheap `SELECT 1` before being handed out if it has
+    been idle for longer than `ping_interval` seconds.
+    """
+    def __init__(self, database_path, size=5, timeout=10.0, statement_cache_size=256,
+                 pragmas=None, ping_interval=30.0):
+        """
+        Initializes the ConnectionPool. No connections are opened until first use.
+
+        Args:
+            database_path (str): Path to the SQLite database file.
+            size (int, optional): Maximum number of open connections. Defaults to 5.
+            timeout (float, optional): Seconds to wait for a free connection before giving up. Defaults to 10.
+            statement_cache_size (int, optional): Number of prepared statements cached per connection. Defaults to 256.
+            pragmas (dict, optional): PRAGMA name/value pairs applied once to every new connection.
+            ping_interval (float, optional): Idle seconds after which a connection is health-checked
+                                             before reuse. Use 0 to check on every checkout. Defaults to 30.
+        """
+        if size < 1:
+            raise ValueError("Connection pool size must be at least 1.")
+        self.database_path = database_path
+        self.size = size
+        self.timeout = timeout
+        self.statement_cache_size = statement_cache_size
+        self.pragmas = dict(pragmas or {})
+        self.ping_interval = ping_interval
+
+        self._lock = threading.Condition(threading.Lock())
+        self._idle = [] # Stack of (connection, returned_at) tuples; the top is the warmest connection.
+        self._in_use = {} # Maps id(connection) -> (connection, owning thread ident, checked out at).
+        self._open_count = 0
+        self._closed = False
+
+        # Counters exposed through `stats()` for monitoring.
+        self._created = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._health_check_failures = 0
+        self._discarded = 0
+
+    def _connect(self):
+        """
+        Opens and configures a brand new connection.
+
+        Returns:
+            sqlite3.Connection: The configured connection.
+
+        Raises:
+            sqlite3.Error: If the database cannot be opened or a PRAGMA fails.
+        """
+        conn = sqlite3.connect(
+            self.database_path,
+            detect_types=sqlite3.PARSE_DECLTYPES, # Automatically parse types like datetime.
+            cached_statements=self.statement_cache_size, # Keep more prepared statements per connection.
+            check_same_thread=False # Ownership is enforced by the pool instead of by sqlite3.
+        )
+        try:
+            # Configure the connection to return rows as dict-like objects.
+            conn.row_factory = sqlite3.Row
+            for name, value in self.pragmas.items():
+                conn.execute(f"PRAGMA {name} = {value}")
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    def _is_healthy(self, conn):
+        """
+        Runs a cheap round trip on a connection to verify that it is still usable.
+
+        Args:
+            conn (sqlite3.Connection): The connection to check.
+
+        Returns:
+            bool: True if the connection answered `SELECT 1`, False otherwise.
+        """
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        """Closes a connection that is no longer usable and frees its pool slot. Caller holds the lock."""
+        _close_quietly(conn)
+        self._open_count -= 1
+        self._discarded += 1
+        self._lock.notify()
+
+    def checkout(self):
+        """
+        Checks a connection out of the pool, opening a new one if below capacity.
+
+        Returns:
+            sqlite3.Connection: A healthy, configured connection owned by the calling thread.
+
+        Raises:
+            ConnectionError: If the pool is closed, no connection became available
+                             within `timeout` seconds, or a new connection could not be opened.
+        """
+        deadline = time.monotonic() + self.timeout
+        with self._lock:
+            waited = False
+            while True:
+                if self._closed:
+                    raise ConnectionError("Connection pool has been closed.")
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    if time.monotonic() - returned_at >= self.ping_interval and not self._is_healthy(conn):
+                        self._health_check_failures += 1
+                        self._discard(conn)
+                        continue
+                    break
+                if self._open_count < self.size:
+                    # Reserve the slot before releasing the lock to open the connection.
+                    self._open_count += 1
+                    self._lock.release()
+                    try:
+                        conn = self._connect()
+                    except sqlite3.Error as e:
+                        self._lock.acquire()
+                        self._open_count -= 1
+                        self._lock.notify()
+                        raise ConnectionError(f"Could not connect to the database: {e}") from e
+                    self._lock.acquire()
+                    self._created += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise ConnectionError(
+                        f"Timed out after {self.timeout}s waiting for a database connection "
+                        f"(pool size {self.size}, all connections in use)."
+                    )
+                if not waited:
+                    self._waits += 1
+                    waited = True
+                self._lock.wait(remaining)
+
+            self._checkouts += 1
+            self._in_use[id(conn)] = (conn, threading.get_ident(), time.monotonic())
+            return conn
+
+    def checkin(self, conn):
+        """
+        Returns a connection to the pool.
+
+        Any transaction left open by the caller is rolled back so that the next
+        owner starts from a clean state, mirroring the behaviour of closing
+        a connection without committing. A connection this pool does not own
+        (e.g. one checked out of a pool that has since been disposed) is closed
+        instead, so it never keeps a replaced database file open.
+
+        Args:
+            conn (sqlite3.Connection): A connection previously obtained from `checkout()`.
+        """
+        with self._lock:
+            entry = self._in_use.pop(id(conn), None)
+            if entry is None:
+                current_app.logger.warning("Attempted to check in a connection that is not checked out of this pool; closing it.")
+                _close_quietly(conn)
+                return
+            if entry[1] != threading.get_ident():
+                current_app.logger.warning("Database connection checked in by a different thread than the one that checked it out.")
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                self._discard(conn)
+                return
+            if self._closed:
+                self._discard(conn)
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager that checks a connection out and always checks it back in.
+
+        Useful for long-lived callers (e.g. streaming responses, CLI workers) that
+        should hold a connection only for the duration of a unit of work rather
+        than for a whole request context.
+
+        Yields:
+            sqlite3.Connection: A pooled connection.
+        """
+        conn = self.checkout()
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+
+    def health_check(self):
+        """
+        Pings every idle connection and discards the ones that fail.
+
+        Returns:
+            dict: The number of idle connections checked and how many were discarded.
+        """
+        with self._lock:
+            checked, failed = 0, 0
+            healthy = []
+            for conn, returned_at in self._idle:
+                checked += 1
+                if self._is_healthy(conn):
+                    healthy.append((conn, returned_at))
+                else:
+                    failed += 1
+                    self._health_check_failures += 1
+                    self._discard(conn)
+            self._idle = healthy
+            return {'checked': checked, 'failed': failed}
+
+    def stats(self):
+        """
+        Returns a snapshot of the pool's state and lifetime counters for monitoring.
+
+        Returns:
+            dict: Pool configuration, current occupancy and cumulative counters.
+        """
+        with self._lock:
+            return {
+                'database_path': self.database_path,
+                'size': self.size,
+                'open': self._open_count,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'created': self._created,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'health_check_failures': self._health_check_failures,
+                'discarded': self._discarded,
+                'statement_cache_size': self.statement_cache_size,
+            }
+
+    def dispose(self):
+        """
+        Closes every idle connection and marks the pool as closed.
+
+        Connections that are still checked out are closed when they are checked in.
+        """
+        with self._lock:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._discard(conn)
+            self._idle = []
+            self._lock.notify_all()
+
+def get_pool(app=None):
+    """
+    Retrieves (creating on first use) the connection pool for a Flask application.
+
+    The pool is stored in `app.extensions` so that each application instance
+    (e.g. each test app) has its own pool bound to its configured database.
+
+    Args:
+        app (Flask, optional): The application. Defaults to `current_app`.
+
+    Returns:
+        ConnectionPool: The application's connection pool.
+    """
+    app = app or current_app._get_current_object()
+    pool = app.extensions.get('db_pool')
+    if pool is None:
+        pool = ConnectionPool(
+            app.config['DATABASE_PATH'],
+            size=app.config.get('DB_POOL_SIZE', 5),
+            timeout=app.config.get('DB_POOL_TIMEOUT', 10.0),
+            statement_cache_size=app.config.get('DB_STATEMENT_CACHE_SIZE', 256),
+            pragmas=app.config.get('DB_PRAGMAS'),
+            ping_interval=app.config.get('DB_POOL_PING_INTERVAL', 30.0)
+        )
+        app.extensions['db_pool'] = pool
+    return pool
+
+def dispose_pool(app=None):
+    """
+    Closes and forgets the application's connection pool, if one exists.
+
+    This must be called before the database file is deleted or replaced
+    (e.g. by `init-db`) so that no pooled connection keeps the old file open.
+
+    Args:
+        app (Flask, optional): The application. Defaults to `current_app`.
+    """
+    app = app or current_app._get_current_object()
+    pool = app.extensions.pop('db_pool', None)
+    if pool is not None:
+        pool.dispose()
+
 def get_db():
     """
-    Establishes and retrieves the application's configured database connection.
+    Retrieves the database connection for the current application context.
 
-    The database connection is stored in Flask's `g` object (application context
-    global) to ensure that:
-    1. A new connection is created only once per request.
+    The connection is checked out of the application's `ConnectionPool` and
+    stored in Flask's `g` object (application context global) to ensure that:
+    1. A connection is checked out only once per request.
     2. The same connection is reused if `get_db()` is called multiple times
        within the same request.
 
-    The connection is configured to return rows as `sqlite3.Row` objects,
+    Pooled connections are configured to return rows as `sqlite3.Row` objects,
     allowing column access by name.
 
     Returns:
         sqlite3.Connection: The active database connection object.
 
     Raises:
-        ConnectionError: If the database file cannot be opened or accessed,
-                         indicating a critical failure to establish connection.
+        ConnectionError: If the database file cannot be opened or accessed, or no
+                         pooled connection became available in time, indicating a
+                         critical failure to establish connection.
     """
     # Check if the database connection already exists in the current application context.
     if 'db' not in g:
-        db_path = current_app.config['DATABASE_PATH']
         try:
-            # Attempt to establish a new SQLite database connection.
-            g.db = sqlite3.connect(
-                db_path,
-                detect_types=sqlite3.PARSE_DECLTYPES # Automatically parse types like datetime.
-            )
-            # Configure the connection to return rows as dict-like objects.
-            g.db.row_factory = sqlite3.Row
-        except sqlite3.OperationalError as e:
+            g.db = get_pool().checkout()
+        except ConnectionError as e:
             # Log a critical error if the database connection fails.
-            current_app.logger.critical(f"Failed to connect to database at {db_path}: {e}")
-            # Re-raise a custom ConnectionError to signal a critical failure to the caller.
-            raise ConnectionError(f"Could not connect to the database: {e}") from e
-        
+            current_app.logger.critical(f"Failed to obtain a connection to database at {current_app.config['DATABASE_PATH']}: {e}")
+            raise
+
     return g.db
 
 def close_db(e=None):
     """
-    Closes the database connection at the end of the request or application context.
+    Returns the database connection to the pool at the end of the request or application context.
 
     This function is registered with Flask's `teardown_appcontext` to be
     automatically called when the application context is torn down, ensuring
-    that database connections are properly released.
+    that database connections are always released. Uncommitted work is rolled back.
 
     Args:
         e (Exception, optional): An exception that might have occurred during
@@ -73,10 +386,15 @@ def close_db(e=None):
     # Retrieve the database connection from the application context, if it exists.
     db = g.pop('db', None)
 
-    # If a database connection was established, close it.
-    if db is not None:
-        db.close()
-        # current_app.logger.debug("Database connection closed.") # Optional: for verbose logging
+    if db is None:
+        return
+    # Hand the connection back to the pool it came from. If that pool was disposed
+    # meanwhile (e.g. by `init-db`), close the connection rather than creating a new pool.
+    pool = current_app.extensions.get('db_pool')
+    if pool is not None:
+        pool.checkin(db)
+    else:
+        _close_quietly(db)
 
 def init_app(app):
     """
@@ -87,7 +405,14 @@ def init_app(app):
 
     Args:
         app (Flask): The Flask application instance.
+
+    Raises:
+        RuntimeError: If the SQLite library is older than `MIN_SQLITE_VERSION`.
     """
+    # Fail at startup rather than on the first upsert or RETURNING statement.
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        required = '.'.join(map(str, MIN_SQLITE_VERSION))
+        raise RuntimeError(f"SQLite {required} or newer is required (found {sqlite3.sqlite_version}).")
     # Register `close_db` to be called automatically when the application
-    # context ends, ensuring database connections are always closed.
+    # context ends, ensuring database connections are always returned to the pool.
     app.teardown_appcontext(close_db)
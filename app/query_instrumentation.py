@@ -0,0 +1,265 @@
+"""
+SQL instrumentation for the repository layer.
+
+Every statement executed through `BaseRepository` is timed and reported to
+`record_query()`. This module aggregates those measurements at three levels:
+
+1. Per request: the statements issued while handling the current request are
+   kept in `g.query_stats` and summarised in a `Server-Timing` response header
+   (`db;dur=<total ms>;desc="<n> queries"`), so the numbers show up directly in
+   the browser's network panel.
+2. Per endpoint: cumulative request count, query count and database time,
+   which shows which endpoints issue many queries or spend the most time in SQL.
+3. Slow queries: a rolling log of the most recent statements that exceeded
+   `SLOW_QUERY_THRESHOLD_MS`.
+
+The endpoint and slow-query aggregates are exposed through the admin-only
+`/api/admin/debug/queries` endpoint. Bound parameter values are never recorded,
+only the SQL text, so the log does not leak personal data.
+
+`record_statements()` records what a unit of work sends to SQLite, including raw
+statements and commits that bypass the repository helpers. It serves write paths
+whose cost is reported with the response (e.g. survey submission) and the
+query-plan report (`utils/query_plans.py`).
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from flask import current_app, g, has_request_context, request
+from app.db_connection import get_db
+
+class QueryLog:
+    """
+    Application-wide, thread-safe store of per-endpoint query statistics and slow queries.
+    """
+    def __init__(self, slow_threshold_ms=100.0, max_slow_queries=100):
+        """
+        Initializes the QueryLog.
+
+        Args:
+            slow_threshold_ms (float, optional): Statements taking at least this long are logged as slow. Defaults to 100.
+            max_slow_queries (int, optional): Number of slow queries retained; older entries are dropped. Defaults to 100.
+        """
+        self.slow_threshold_ms = slow_threshold_ms
+        self._lock = threading.Lock()
+        self._slow_queries = deque(maxlen=max_slow_queries)
+        self._endpoints = {} # Maps endpoint name -> cumulative counters.
+
+    def record_slow_query(self, entry):
+        """
+        Adds a statement to the rolling slow-query log if it exceeded the threshold.
+
+        Args:
+            entry (dict): A statement record as built by `record_query()`.
+        """
+        if entry['duration_ms'] < self.slow_threshold_ms:
+            return
+        with self._lock:
+            self._slow_queries.append(entry)
+
+    def record_request(self, endpoint, statements):
+        """
+        Folds the statements of one finished request into the per-endpoint counters.
+
+        Args:
+            endpoint (str): The Flask endpoint name (or the path if no endpoint matched).
+            statements (list[dict]): The statement records collected during the request.
+        """
+        total_ms = sum(s['duration_ms'] for s in statements)
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'endpoint': endpoint, 'requests': 0, 'queries': 0, 'max_queries': 0,
+                'db_time_ms': 0.0, 'max_db_time_ms': 0.0,
+            })
+            stats['requests'] += 1
+            stats['queries'] += len(statements)
+            stats['max_queries'] = max(stats['max_queries'], len(statements))
+            stats['db_time_ms'] += total_ms
+            stats['max_db_time_ms'] = max(stats['max_db_time_ms'], total_ms)
+
+    def snapshot(self):
+        """
+        Returns a copy of the collected statistics.
+
+        Returns:
+            dict: `slow_queries` (most recent first) and `endpoints` (ordered by total database time),
+                  with per-endpoint averages filled in.
+        """
+        with self._lock:
+            endpoints = []
+            for stats in self._endpoints.values():
+                stats = dict(stats)
+                stats['avg_queries'] = round(stats['queries'] / stats['requests'], 2)
+                stats['avg_db_time_ms'] = round(stats['db_time_ms'] / stats['requests'], 3)
+                stats['db_time_ms'] = round(stats['db_time_ms'], 3)
+                stats['max_db_time_ms'] = round(stats['max_db_time_ms'], 3)
+                endpoints.append(stats)
+            endpoints.sort(key=lambda s: s['db_time_ms'], reverse=True)
+            return {
+                'slow_query_threshold_ms': self.slow_threshold_ms,
+                'slow_queries': list(reversed(self._slow_queries)),
+                'endpoints': endpoints,
+            }
+
+    def reset(self):
+        """Clears all collected statistics."""
+        with self._lock:
+            self._slow_queries.clear()
+            self._endpoints.clear()
+
+def get_query_log(app=None):
+    """
+    Retrieves (creating on first use) the query log for a Flask application.
+
+    Args:
+        app (Flask, optional): The application. Defaults to `current_app`.
+
+    Returns:
+        QueryLog: The application's query log.
+    """
+    app = app or current_app._get_current_object()
+    log = app.extensions.get('query_log')
+    if log is None:
+        log = QueryLog(
+            slow_threshold_ms=app.config.get('SLOW_QUERY_THRESHOLD_MS', 100.0),
+            max_slow_queries=app.config.get('SLOW_QUERY_LOG_SIZE', 100)
+        )
+        app.extensions['query_log'] = log
+    return log
+
+def record_query(repository, kind, sql, duration_ms, rows):
+    """
+    Records one executed statement for the current request and the slow-query log.
+
+    Called by `BaseRepository` after every statement. Does nothing when
+    `QUERY_INSTRUMENTATION_ENABLED` is False.
+
+    Args:
+        repository (str): The table name of the repository that issued the statement.
+        kind (str): 'query', 'insert', 'upsert' or 'update/delete'.
+        sql (str): The SQL text (without bound values).
+        duration_ms (float): Wall time spent executing and fetching, in milliseconds.
+        rows (int): Rows returned (queries) or affected (writes).
+    """
+    if not current_app.config.get('QUERY_INSTRUMENTATION_ENABLED', True):
+        return
+    entry = {
+        'repository': repository,
+        'kind': kind,
+        'sql': ' '.join(sql.split()),
+        'duration_ms': round(duration_ms, 3),
+        'rows': rows,
+    }
+    if has_request_context():
+        # Outside of requests (CLI commands, workers) there is no request to attribute statements to.
+        g.setdefault('query_stats', []).append(entry)
+
+    log = get_query_log()
+    if duration_ms >= log.slow_threshold_ms:
+        slow_entry = dict(entry, recorded_at=datetime.now().isoformat())
+        if has_request_context():
+            slow_entry['endpoint'] = request.endpoint or request.path
+        log.record_slow_query(slow_entry)
+        current_app.logger.warning(f"Slow query ({duration_ms:.1f} ms) in {repository} repository: {entry['sql'][:200]}")
+
+def _start_request():
+    """Resets the per-request statement list (the application context may outlive a single request)."""
+    g.query_stats = []
+    g.request_started_at = time.perf_counter()
+
+def _finish_request(response):
+    """
+    Adds the `Server-Timing` header and folds the request into the per-endpoint statistics.
+
+    Args:
+        response (Response): The outgoing response.
+
+    Returns:
+        Response: The same response, with the header added.
+    """
+    if not current_app.config.get('QUERY_INSTRUMENTATION_ENABLED', True):
+        return response
+    statements = g.get('query_stats', [])
+    total_ms = sum(s['duration_ms'] for s in statements)
+    timings = [f'db;dur={total_ms:.3f};desc="{len(statements)} queries"']
+    if 'request_started_at' in g:
+        timings.append(f'app;dur={(time.perf_counter() - g.request_started_at) * 1000:.3f}')
+    response.headers.add('Server-Timing', ', '.join(timings))
+    get_query_log().record_request(request.endpoint or request.path, statements)
+    return response
+
+def init_app(app):
+    """
+    Registers the per-request instrumentation hooks with the Flask application.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+class RecordingConnection:
+    """
+    A thin proxy around a `sqlite3.Connection` that records statements and counts commits.
+
+    Only `execute`, `executemany` and `commit` are intercepted; everything else is
+    delegated to the wrapped connection. Installed as `g.db` by `record_statements()`.
+    """
+    def __init__(self, conn):
+        """
+        Initializes the proxy.
+
+        Args:
+            conn (sqlite3.Connection): The connection to wrap.
+        """
+        self._conn = conn
+        self.statements = [] # List of (sql, params) tuples in execution order.
+        self.commits = 0
+
+    def execute(self, sql, params=()):
+        self.statements.append((sql, params if isinstance(params, dict) else tuple(params))) # Named parameters stay a dict.
+        return self._conn.execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        self.statements.append((sql, tuple(seq_of_params[0]) if seq_of_params else ()))
+        return self._conn.executemany(sql, seq_of_params)
+
+    def commit(self):
+        self.commits += 1
+        return self._conn.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+@contextmanager
+def record_statements(conn=None):
+    """
+    Records the statements and commits issued through `get_db()` while the block runs.
+
+    `g.db` is replaced by a `RecordingConnection`, so the repositories and the
+    caller's own `commit()` are recorded whether or not they go through
+    `record_query()`. The connection previously stored in `g.db` is put back
+    afterwards, and the normal teardown returns it to the pool.
+
+    Args:
+        conn (sqlite3.Connection, optional): The connection to run the block on. Defaults to
+                                             None (the request's own connection).
+
+    Yields:
+        RecordingConnection: The proxy; `statements` and `commits` are final once the block exits.
+    """
+    if conn is None:
+        conn = get_db()
+    previous = g.pop('db', None)
+    recorder = RecordingConnection(conn)
+    g.db = recorder
+    try:
+        yield recorder
+    finally:
+        g.pop('db', None)
+        if previous is not None:
+            g.db = previous
@@ -5,11 +5,15 @@ This module defines the `AlertRepository` class, which provides methods
 for interacting with the 'alerts' table in the database. It extends
 `BaseRepository` to handle CRUD operations for alerts, including
 retrieving specific alerts, marking them as resolved, and creating new ones.
+It also reads the `alert_changes` log (migration `0009_alert_changes.sql`)
+behind the incremental alert feed.
 """
 
+import json
 import sqlite3
 from app.db_connection import get_db
 from app.models.alert import Alert
+from app.utils.pagination import decode_cursor, encode_cursor
 from .base_repository import BaseRepository
 
 class AlertRepository(BaseRepository):
@@ -20,6 +24,14 @@ class AlertRepository(BaseRepository):
     and error handling. Provides specific methods for querying and managing
     student alerts, often joining with student and module information.
     """
+    # Fields clients may select with `?fields=`.
+    list_fields = ('id', 'student_id', 'module_id', 'week_number', 'reason', 'created_at', 'resolved', 'is_active', 'student_name', 'module_title')
+    page_as_dicts = True # Pages contain the joined student and module details, like get_all_*().
+    page_descending = True # Newest alerts first.
+    # At most one active alert per student and week (migration 0010).
+    natural_key = ('student_id', 'week_number')
+    natural_key_where = 'is_active = 1'
+
     def __init__(self):
         """
         Initializes the AlertRepository.
@@ -28,14 +40,14 @@ class AlertRepository(BaseRepository):
         """
         super().__init__('alerts', Alert)
 
-    def get_all_alerts(self) -> list[dict]:
+    def _list_query(self) -> tuple[str, tuple]:
         """
-        Retrieves all active alerts from the database, including associated
-        student and module information for richer context.
+        Returns the query listing all active alerts with their student and module details.
+
+        Shared by `get_all_alerts()` and the paginated `get_page()`.
 
         Returns:
-            list[dict]: A list of dictionaries, where each dictionary represents
-                        an alert with joined student and module details.
+            tuple[str, tuple]: The SQL string and its parameters.
         """
         query = """
             SELECT a.id, a.student_id, a.module_id, a.week_number, a.reason, a.created_at, a.resolved, a.is_active,
@@ -44,10 +56,21 @@ class AlertRepository(BaseRepository):
             JOIN students s ON a.student_id = s.id
             LEFT JOIN modules m ON a.module_id = m.id
             WHERE a.is_active = 1
-            ORDER BY a.created_at DESC
         """
+        return query, ()
+
+    def get_all_alerts(self) -> list[dict]:
+        """
+        Retrieves all active alerts from the database, including associated
+        student and module information for richer context.
+
+        Returns:
+            list[dict]: A list of dictionaries, where each dictionary represents
+                        an alert with joined student and module details.
+        """
+        query, params = self._list_query()
         # _execute_query handles exceptions and returns results as dictionaries due to fetch_all_dicts=True.
-        return self._execute_query(query, fetch_all_dicts=True)
+        return self._execute_query(query + " ORDER BY a.created_at DESC", params, fetch_all_dicts=True)
 
     def get_recent_alerts_per_student(self) -> list[dict]:
         """
@@ -78,6 +101,68 @@ class AlertRepository(BaseRepository):
         """
         return self._execute_query(query, fetch_all_dicts=True)
 
+    def get_change_cursor(self) -> str:
+        """
+        Returns the cursor of the latest alert change.
+
+        A client takes this cursor before loading the alert list, then follows
+        `get_changes()` from it; changes made while the list loads are replayed,
+        so none is missed.
+
+        Returns:
+            str: An opaque cursor for `get_changes()`.
+        """
+        last_id = self._execute_query("SELECT COALESCE(MAX(id), 0) FROM alert_changes", fetch_one=True)
+        return encode_cursor([last_id])
+
+    def get_changes(self, limit: int, since: str) -> tuple[list[dict], str, bool]:
+        """
+        Retrieves the alerts that changed after `since`, oldest change first.
+
+        At most `limit` log entries are read. Several changes of one alert within
+        them are coalesced into a single entry at the position of its latest change,
+        carrying the alert's current state, so a burst of edits costs the client
+        one update.
+
+        Args:
+            limit (int): Maximum number of change log entries to read.
+            since (str): A cursor from `get_change_cursor()` or a previous call.
+
+        Returns:
+            tuple[list[dict], str, bool]: The changes (`alert_id`, `change` ('created',
+                                          'resolved', 'updated' or 'deleted'), `changed_at`
+                                          and `alert`, the alert with its student and module
+                                          details, or None once it is deleted), the cursor to
+                                          continue from, and whether `limit` entries were read,
+                                          so that more changes may be pending.
+
+        Raises:
+            ValueError: If `since` is not a valid cursor.
+        """
+        after_id, = decode_cursor(since, 1)
+        if not isinstance(after_id, int):
+            raise ValueError("Invalid pagination cursor.")
+        rows = self._execute_query(
+            "SELECT id, alert_id, change, changed_at FROM alert_changes WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit), fetch_all_dicts=True
+        )
+        if not rows:
+            return [], since, False
+
+        latest = {}
+        for row in rows:
+            latest.pop(row['alert_id'], None) # Re-inserted below, so the order follows the latest change.
+            latest[row['alert_id']] = row
+        query, params = self._list_query()
+        alerts = self._execute_query(query + " AND a.id IN (SELECT value FROM json_each(?))",
+                                     params + (json.dumps(list(latest)),), fetch_all_dicts=True)
+        alerts_by_id = {alert['id']: alert for alert in alerts}
+        changes = [
+            {'alert_id': alert_id, 'change': row['change'], 'changed_at': row['changed_at'], 'alert': alerts_by_id.get(alert_id)}
+            for alert_id, row in latest.items()
+        ]
+        return changes, encode_cursor([rows[-1]['id']]), len(rows) == limit
+
     def get_alerts_by_student_id(self, student_id: int) -> list[dict]:
         """
         Retrieves all active alerts for a specific student.
@@ -141,6 +226,10 @@ class AlertRepository(BaseRepository):
         """
         Creates a new alert record in the database.
 
+        A student has at most one active alert per week (migration 0010). The alert
+        is written with a single `INSERT ... ON CONFLICT DO NOTHING`; if the student
+        already has an active alert for the week, that alert is returned unchanged.
+
         Args:
             student_id (int): The ID of the student to whom the alert pertains.
             module_id (int | None): The ID of the module related to the alert (can be None).
@@ -148,10 +237,13 @@ class AlertRepository(BaseRepository):
             reason (str): The descriptive reason for the alert.
 
         Returns:
-            Alert: The newly created `Alert` object.
+            Alert: The newly created `Alert` object, or the student's existing alert for the week.
         """
-        query = "INSERT INTO alerts (student_id, module_id, week_number, reason, resolved, is_active) VALUES (?, ?, ?, ?, 0, 1)"
-        alert_id = self._execute_insert(query, (student_id, module_id, week_number, reason))
+        alert_id = self.upsert({'student_id': student_id, 'module_id': module_id, 'week_number': week_number,
+                                'reason': reason, 'resolved': 0, 'is_active': 1})
+        if alert_id is None:
+            return self._execute_query("SELECT * FROM alerts WHERE student_id = ? AND week_number = ? AND is_active = 1",
+                                       (student_id, week_number), fetch_one=True)
         return self.get_alert_by_id(alert_id)
 
 # Instantiate the repository for use throughout the application.
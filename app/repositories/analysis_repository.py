@@ -5,9 +5,31 @@ This module defines the `AnalysisRepository` class, which provides methods
 for performing various analytical queries on student data. It extends
 `BaseRepository` but primarily focuses on custom SQL queries to extract
 insights related to student wellbeing, academic performance, and engagement.
+
+Cohort-wide per-student averages (stress/grade correlation, high-risk students,
+stress by module) read the `student_metrics` and `student_module_metrics` read
+model (see `student_metrics_repository.py`), so they scan one row per student
+instead of every attendance, grade and survey row. The grade distribution and
+percentiles read the `metric_histograms` read model instead (see
+`metric_histogram_repository.py`).
+The module-week heatmap and module trend lines read the `module_week_rollups`
+read model in the same way (see `module_week_rollup_repository.py`).
+
+Every query method is wrapped in `@cached_analysis(...)`, naming the tables it
+reads: results are served from the analysis cache until one of those tables is
+written (see `app/analysis_cache.py`). Methods also marked `@numpy_backed` are
+answered by the in-memory NumPy engine when `ANALYSIS_ENGINE = 'numpy'` (see
+`app/analysis_engine.py`).
 """
 
+import bisect
+import contextlib
+import itertools
+import json
+import math
 import sqlite3
+from app.analysis_cache import bypass_analysis_cache, cached_analysis
+from app.analysis_engine import numpy_backed
 from app.db_connection import get_db
 from app.models.survey_response import SurveyResponse
 from app.models.attendance_record import AttendanceRecord
@@ -16,8 +38,11 @@ from app.models.student import Student
 from app.models.module import Module
 from app.models.alert import Alert
 from app.models.submission_record import SubmissionRecord
+from app.utils.pagination import decode_cursor, encode_cursor
 from datetime import datetime
+from .alert_repository import alert_repository
 from .base_repository import BaseRepository
+from .metric_histogram_repository import HISTOGRAM_SCALES
 
 class AnalysisRepository(BaseRepository):
     """
@@ -38,6 +63,8 @@ class AnalysisRepository(BaseRepository):
         """
         super().__init__('analysis', None) 
 
+    @cached_analysis('survey_responses')
+    @numpy_backed
     def get_stress_trend_for_student(self, student_id: int) -> dict:
         """
         Retrieves the stress level trend for a specific student over academic weeks.
@@ -65,6 +92,8 @@ class AnalysisRepository(BaseRepository):
             'data': [round(row['average_stress_level'], 2) for row in records]
         }
 
+    @cached_analysis('attendance_records')
+    @numpy_backed
     def get_attendance_trend_for_student(self, student_id: int) -> dict:
         """
         Retrieves the attendance rate trend for a specific student over academic weeks.
@@ -92,6 +121,8 @@ class AnalysisRepository(BaseRepository):
             'data': [round(row['average_attendance_rate'] * 100, 2) if row['average_attendance_rate'] is not None else 0 for row in records]
         }
 
+    @cached_analysis('student_metrics')
+    @numpy_backed
     def get_average_attendance_for_student(self, student_id: int) -> float:
         """
         Calculates the overall average attendance rate for a specific student across all modules.
@@ -104,77 +135,248 @@ class AnalysisRepository(BaseRepository):
                    Returns 0 if no attendance records are found.
         """
         query = """
-            SELECT AVG(attendance_rate) AS overall_average_attendance
-            FROM attendance_records
-            WHERE student_id = ? AND is_active = 1
+            SELECT attendance_sum / NULLIF(attendance_count, 0) AS overall_average_attendance
+            FROM student_metrics
+            WHERE student_id = ?
         """
         result = self._execute_query(query, (student_id,), fetch_one=True)
         return round(result * 100, 2) if result is not None else 0
 
+    def _get_student_averages(self) -> list[dict]:
+        """
+        Retrieves the average attendance, grade and stress of every active student with any activity.
+
+        Read by the opt-in points of the stress/grade correlation and the SQL tests of the NumPy engine.
+
+        Returns:
+            list[dict]: `id`, `full_name`, `average_attendance` (0-1), `average_grade` and
+                        `average_stress` per student (None where the student has no such records),
+                        ordered by student ID.
+        """
+        query = """
+            SELECT s.id, s.full_name,
+                   sm.attendance_sum / NULLIF(sm.attendance_count, 0) AS average_attendance,
+                   sm.grade_sum / NULLIF(sm.grade_count, 0) AS average_grade,
+                   sm.stress_sum / NULLIF(sm.stress_count, 0) AS average_stress
+            FROM students s
+            JOIN student_metrics sm ON s.id = sm.student_id
+            WHERE s.is_active = 1
+            ORDER BY s.id
+        """
+        return self._execute_query(query, fetch_all_dicts=True)
+
+    # Bin edges of the stress/grade density grid: average stress (1-5) by average grade (%).
+    CORRELATION_STRESS_EDGES = (1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0)
+    CORRELATION_GRADE_EDGES = (0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100)
+    CORRELATION_POINT_MODES = ('sample', 'page')
+
+    @staticmethod
+    def _validate_correlation_options(points, limit, after):
+        """Validates the point options of `get_stress_grade_correlation()`; raises ValueError."""
+        if points is not None and points not in AnalysisRepository.CORRELATION_POINT_MODES:
+            raise ValueError(f"'points' must be one of: {', '.join(AnalysisRepository.CORRELATION_POINT_MODES)}.")
+        if limit < 1:
+            raise ValueError("'limit' must be a positive integer.")
+        if after is not None and points != 'page':
+            raise ValueError("'after' can only be used with points=page.")
+        if after is not None and not isinstance(decode_cursor(after, 1)[0], int):
+            raise ValueError("Invalid pagination cursor.")
+
+    @staticmethod
+    def _density_bin_sql(column: str, edges) -> str:
+        """
+        Returns an SQL expression for the bin of `edges` containing `column`.
+
+        The bin is the number of inner edges at or below the value, so values
+        outside the edges fall in the outer bins and no division can round a
+        value into the neighbouring bin.
+        """
+        return '(' + ' + '.join(f"({column} >= {edge})" for edge in edges[1:-1]) + ')'
+
+    @staticmethod
+    def _centred_sums(n, sum_x, sum_y, sum_xx, sum_yy, sum_xy) -> tuple[float, float, float]:
+        """Turns raw sums into the centred sums of squares and products (Sxx, Syy, Sxy)."""
+        return sum_xx - sum_x * sum_x / n, sum_yy - sum_y * sum_y / n, sum_xy - sum_x * sum_y / n
+
+    @staticmethod
+    def _correlation_points(ids, names, xs, ys, points, limit, after=None) -> dict:
+        """
+        Selects the opt-in scatter points of `get_stress_grade_correlation()`.
+
+        Works on any indexable columns ordered by student ID (lists or NumPy arrays).
+        A sample takes `limit` points spread evenly over the ID order, so it is the
+        same on every call; a page takes the `limit` points after the `after` cursor.
+
+        Returns:
+            dict: `mode`, `total` and `data` (`{id, name, x, y}` per point), plus `next_cursor` for a page.
+        """
+        total = len(ids)
+        if points == 'sample':
+            indices = [i * total // limit for i in range(min(limit, total))]
+        else:
+            start = bisect.bisect_right(ids, decode_cursor(after, 1)[0]) if after else 0
+            indices = range(start, min(start + limit, total))
+        result = {
+            'mode': points, 'total': total,
+            'data': [{'id': int(ids[i]), 'name': str(names[i]), 'x': float(xs[i]), 'y': float(ys[i])} for i in indices]
+        }
+        if points == 'page':
+            result['next_cursor'] = encode_cursor([int(ids[indices[-1]])]) if indices and indices[-1] + 1 < total else None
+        return result
+
+    def _get_correlation_sums(self) -> list[dict]:
+        """
+        Aggregates the stress/grade averages of every active student in one query over `student_metrics`.
+
+        Each student's average stress (x) and grade (y) and their tie-averaged ranks
+        (for Spearman's rho) are summed per density cell, so the statistics of the
+        whole cohort follow from at most one row per cell.
+
+        Returns:
+            list[dict]: Per non-empty cell: `x_bin`, `y_bin`, `n`, the sums `sx`, `sy`, `sxx`, `syy`,
+                        `sxy` of the values and `rx`, `ry`, `rxx`, `ryy`, `rxy` of their ranks, and
+                        `min_x`, `max_x`, `min_y`, `max_y`.
+        """
+        x_bin = self._density_bin_sql('x', self.CORRELATION_STRESS_EDGES)
+        y_bin = self._density_bin_sql('y', self.CORRELATION_GRADE_EDGES)
+        query = f"""
+            WITH pairs AS (
+                SELECT sm.stress_sum / sm.stress_count AS x, sm.grade_sum / sm.grade_count AS y
+                FROM students s
+                JOIN student_metrics sm ON s.id = sm.student_id
+                WHERE s.is_active = 1 AND sm.stress_count > 0 AND sm.grade_count > 0
+            ),
+            ranked AS (
+                -- Tied values share the average of their ranks.
+                SELECT x, y,
+                       RANK() OVER (ORDER BY x) + (COUNT(*) OVER (PARTITION BY x) - 1) / 2.0 AS rank_x,
+                       RANK() OVER (ORDER BY y) + (COUNT(*) OVER (PARTITION BY y) - 1) / 2.0 AS rank_y
+                FROM pairs
+            )
+            SELECT {x_bin} AS x_bin, {y_bin} AS y_bin, COUNT(*) AS n,
+                   SUM(x) AS sx, SUM(y) AS sy, SUM(x * x) AS sxx, SUM(y * y) AS syy, SUM(x * y) AS sxy,
+                   SUM(rank_x) AS rx, SUM(rank_y) AS ry, SUM(rank_x * rank_x) AS rxx, SUM(rank_y * rank_y) AS ryy,
+                   SUM(rank_x * rank_y) AS rxy,
+                   MIN(x) AS min_x, MAX(x) AS max_x, MIN(y) AS min_y, MAX(y) AS max_y
+            FROM ranked
+            GROUP BY x_bin, y_bin
+        """
+        return self._execute_query(query, fetch_all_dicts=True)
+
+    @staticmethod
+    def _stress_grade_correlation_from(cells: list[dict]) -> dict:
+        """
+        Derives the correlation statistics (see `get_stress_grade_correlation()`) from `_get_correlation_sums()`.
+
+        The sums of the cells are added once; Pearson's r, Spearman's rho and the
+        regression line all follow from those totals without revisiting a student.
+        """
+        x_edges, y_edges = AnalysisRepository.CORRELATION_STRESS_EDGES, AnalysisRepository.CORRELATION_GRADE_EDGES
+        counts = [[0] * (len(y_edges) - 1) for _ in range(len(x_edges) - 1)]
+        totals = dict.fromkeys(('n', 'sx', 'sy', 'sxx', 'syy', 'sxy', 'rx', 'ry', 'rxx', 'ryy', 'rxy'), 0)
+        for cell in cells:
+            counts[cell['x_bin']][cell['y_bin']] = cell['n']
+            for key in totals:
+                totals[key] += cell[key]
+        n = totals['n']
+        varies_x = bool(cells) and min(c['min_x'] for c in cells) < max(c['max_x'] for c in cells)
+        varies_y = bool(cells) and min(c['min_y'] for c in cells) < max(c['max_y'] for c in cells)
+
+        pearson = spearman = regression = None
+        if n > 1 and varies_x:
+            sxx, syy, sxy = AnalysisRepository._centred_sums(n, *(totals[k] for k in ('sx', 'sy', 'sxx', 'syy', 'sxy')))
+            if varies_y:
+                pearson = sxy / math.sqrt(sxx * syy)
+                rxx, ryy, rxy = AnalysisRepository._centred_sums(n, *(totals[k] for k in ('rx', 'ry', 'rxx', 'ryy', 'rxy')))
+                spearman = rxy / math.sqrt(rxx * ryy)
+            slope = sxy / sxx
+            regression = {'slope': slope, 'intercept': (totals['sy'] - slope * totals['sx']) / n,
+                          'r_squared': pearson ** 2 if pearson is not None else None}
+
+        return {
+            'count': n,
+            'pearson': pearson,
+            'spearman': spearman,
+            'regression': regression,
+            'density': {'x_edges': list(x_edges), 'y_edges': list(y_edges), 'counts': counts},
+        }
+
+    # Grade bands of `get_grade_distribution()`: label and lower bound of the average grade.
+    GRADE_BANDS = (('Fail (<40)', None), ('Pass (40-49)', 40), ('Merit (50-59)', 50),
+                   ('Distinction (60-69)', 60), ('Excellent (70+)', 70))
+
+    @cached_analysis('metric_histograms')
+    @numpy_backed
     def get_grade_distribution(self) -> dict:
         """
         Calculates the distribution of average grades across all active students.
 
         Students are categorized into predefined grade bands (Fail, Pass, Merit, etc.).
+        The bands are counted in SQL from the cohort's grade histogram, whose bins
+        (half a point wide) never straddle a band boundary, so the counts are exact.
 
         Returns:
             dict: A dictionary containing two lists:
                   - 'labels': List of grade band names (e.g., "Fail (<40)", "Pass (40-49)").
                   - 'data': List of the count of students falling into each grade band.
         """
-        grade_bands = {
-            'Fail (<40)': 0, 'Pass (40-49)': 0, 'Merit (50-59)': 0,
-            'Distinction (60-69)': 0, 'Excellent (70+)': 0
-        }
-        
-        query = """
-            SELECT s.id, AVG(g.grade) AS average_grade
-            FROM students s
-            JOIN grades g ON s.id = g.student_id
-            WHERE s.is_active = 1 AND g.is_active = 1
-            GROUP BY s.id
-        """
-        avg_grades = self._execute_query(query, fetch_all_dicts=True)
-
-        for row in avg_grades:
-            avg_grade = row['average_grade']
-            if avg_grade is None: continue # Skip students with no grades.
-            if avg_grade < 40: grade_bands['Fail (<40)'] += 1
-            elif 40 <= avg_grade < 50: grade_bands['Pass (40-49)'] += 1
-            elif 50 <= avg_grade < 60: grade_bands['Merit (50-59)'] += 1
-            elif 60 <= avg_grade < 70: grade_bands['Distinction (60-69)'] += 1
-            else: grade_bands['Excellent (70+)'] += 1
-        
-        return {'labels': list(grade_bands.keys()), 'data': list(grade_bands.values())}
+        scale = HISTOGRAM_SCALES['grade']
+        bounds = [bound for _, bound in self.GRADE_BANDS[1:]]
+        columns = []
+        for lower, upper in zip([None] + bounds, bounds + [None]):
+            conditions = ([f"bucket >= {lower * scale}"] if lower is not None else []) + \
+                         ([f"bucket < {upper * scale}"] if upper is not None else [])
+            columns.append(f"COALESCE(SUM(count) FILTER (WHERE {' AND '.join(conditions)}), 0) AS band_{len(columns)}")
+        query = f"""
+            SELECT {', '.join(columns)}
+            FROM metric_histograms
+            WHERE metric = 'grade' AND scope = 'cohort' AND scope_id = 0
+        """
+        row = self._execute_query(query, fetch_one=True, fetch_all_dicts=True)
+        return {'labels': [label for label, _ in self.GRADE_BANDS], 'data': [row[f'band_{i}'] for i in range(len(columns))]}
 
-    def get_stress_grade_correlation(self) -> dict:
+    @cached_analysis('students', 'student_metrics')
+    @numpy_backed
+    def get_stress_grade_correlation(self, points: str | None = None, limit: int = 500, after: str | None = None) -> dict:
         """
-        Retrieves data for correlating average stress levels with average grades for each student.
+        Summarizes the relationship between each student's average stress level and average grade.
 
-        This data can be used to plot scatter charts to visualize potential relationships.
+        Only students with both a stress and a grade average are included. Instead
+        of one point per student, the result holds Pearson's and Spearman's
+        coefficients, a least-squares regression line (grade on stress) and the
+        student counts of a fixed stress-by-grade grid, so its size does not grow
+        with the cohort. Individual points are opt-in: a deterministic sample of
+        `limit` points, or one page of `limit` points ordered by student ID.
+
+        Args:
+            points (str | None, optional): 'sample' or 'page' to include points. Defaults to None (no points).
+            limit (int, optional): The sample or page size. Defaults to 500.
+            after (str | None, optional): With `points='page'`, the `next_cursor` of the previous page.
 
         Returns:
             dict: A dictionary containing:
-                  - 'labels': List of student full names.
-                  - 'data': List of dictionaries, each representing a data point with 'x' (average stress),
-                            'y' (average grade), and 'name' (student full name).
-        """
-        query = """
-            SELECT s.full_name, AVG(sr.stress_level) AS average_stress, AVG(g.grade) AS average_grade
-            FROM students s
-            LEFT JOIN survey_responses sr ON s.id = sr.student_id AND sr.is_active = 1
-            LEFT JOIN grades g ON s.id = g.student_id AND g.is_active = 1
-            WHERE s.is_active = 1
-            GROUP BY s.id, s.full_name
-            HAVING average_stress IS NOT NULL AND average_grade IS NOT NULL
-        """
-        correlation_data = self._execute_query(query, fetch_all_dicts=True)
+                  - 'count': The number of students included.
+                  - 'pearson' / 'spearman': The correlation coefficients, or None with fewer than two
+                    students or no variation.
+                  - 'regression': `slope`, `intercept` and `r_squared` of the regression line, or None.
+                  - 'density': `x_edges` (stress), `y_edges` (grade) and `counts`, one row per stress bin
+                    and one column per grade bin. The outer bins include values beyond the edges.
+                  - 'points' (only when requested): `mode`, `total`, `data` (`{id, name, x, y}` per point)
+                    and, for a page, `next_cursor` (None on the last page).
 
-        labels = [row['full_name'] for row in correlation_data]
-        data = [{'x': row['average_stress'], 'y': row['average_grade'], 'name': row['full_name']} for row in correlation_data]
-        
-        return {'labels': labels, 'data': data}
+        Raises:
+            ValueError: If `points` is unknown, `limit` is not positive or `after` is not a valid cursor.
+        """
+        self._validate_correlation_options(points, limit, after)
+        result = self._stress_grade_correlation_from(self._get_correlation_sums())
+        if points is not None:
+            rows = [row for row in self._get_student_averages() if row['average_stress'] is not None and row['average_grade'] is not None]
+            result['points'] = self._correlation_points([row['id'] for row in rows], [row['full_name'] for row in rows],
+                                                        [row['average_stress'] for row in rows],
+                                                        [row['average_grade'] for row in rows], points, limit, after)
+        return result
 
+    @cached_analysis('students', 'modules', 'alerts', 'users')
     def get_dashboard_summary(self) -> dict:
         """
         Retrieves a summary of key metrics for the application dashboard.
@@ -196,6 +398,8 @@ class AnalysisRepository(BaseRepository):
             'total_users': total_users if total_users is not None else 0
         }
 
+    @cached_analysis('attendance_records')
+    @numpy_backed
     def get_overall_attendance_rate(self) -> float:
         """
         Calculates the overall average attendance rate across all active students and modules.
@@ -207,6 +411,8 @@ class AnalysisRepository(BaseRepository):
         result = self._execute_query("SELECT AVG(attendance_rate) AS avg_rate FROM attendance_records WHERE is_active = 1", fetch_one=True)
         return round(result * 100, 2) if result is not None else 0
 
+    @cached_analysis('submission_records')
+    @numpy_backed
     def get_submission_status_distribution(self) -> dict:
         """
         Calculates the distribution of assessment submission statuses (on time, late, not submitted).
@@ -216,80 +422,148 @@ class AnalysisRepository(BaseRepository):
                   - 'labels': List of submission status categories.
                   - 'data': List of counts for each submission status.
         """
-        total_submissions = self._execute_query("SELECT COUNT(id) AS count FROM submission_records WHERE is_active = 1", fetch_one=True)
-        if total_submissions == 0:
-            return {'labels': ['Submitted On Time', 'Submitted Late', 'Not Submitted'], 'data': [0, 0, 0]}
+        # A single scan counts all three statuses.
+        query = """
+            SELECT COALESCE(SUM(is_submitted = 1 AND is_late = 0), 0) AS on_time,
+                   COALESCE(SUM(is_submitted = 1 AND is_late = 1), 0) AS late,
+                   COALESCE(SUM(is_submitted = 0), 0) AS not_submitted
+            FROM submission_records WHERE is_active = 1
+        """
+        row = self._execute_query(query, fetch_one=True, fetch_all_dicts=True) or {}
+        return {
+            'labels': ['Submitted On Time', 'Submitted Late', 'Not Submitted'],
+            'data': [row.get('on_time', 0), row.get('late', 0), row.get('not_submitted', 0)]
+        }
 
-        submitted_count = self._execute_query("SELECT COUNT(id) AS count FROM submission_records WHERE is_active = 1 AND is_submitted = 1 AND is_late = 0", fetch_one=True)
-        late_count = self._execute_query("SELECT COUNT(id) AS count FROM submission_records WHERE is_active = 1 AND is_submitted = 1 AND is_late = 1", fetch_one=True)
-        not_submitted_count = self._execute_query("SELECT COUNT(id) AS count FROM submission_records WHERE is_active = 1 AND is_submitted = 0", fetch_one=True)
+    # Orderings accepted by `get_high_risk_students(sort=...)`; ties are broken by student ID.
+    HIGH_RISK_SORTS = {
+        'severity': 'severity DESC, id',
+        'attendance': 'avg_attendance IS NULL, avg_attendance, id',
+        'grade': 'avg_grade IS NULL, avg_grade, id',
+        'stress': 'avg_stress DESC, id',
+        'name': 'full_name COLLATE NOCASE, id',
+        'id': 'id',
+    }
+
+    def _validate_high_risk_options(self, attendance_threshold, grade_threshold, stress_threshold, sort, limit):
+        """Raises ValueError for options `get_high_risk_students()` does not accept."""
+        if not 0 <= attendance_threshold <= 100 or not 0 <= grade_threshold <= 100:
+            raise ValueError("'attendance_threshold' and 'grade_threshold' must be between 0 and 100.")
+        if not 1 <= stress_threshold <= 5:
+            raise ValueError("'stress_threshold' must be between 1 and 5.")
+        if sort not in self.HIGH_RISK_SORTS:
+            raise ValueError(f"'sort' must be one of: {', '.join(self.HIGH_RISK_SORTS)}.")
+        if limit is not None and limit < 1:
+            raise ValueError("'limit' must be a positive integer.")
+
+    @staticmethod
+    def _high_risk_entry(row, attendance_threshold, grade_threshold, stress_threshold) -> dict:
+        """
+        Builds one student of the `get_high_risk_students()` result.
+
+        Args:
+            row (dict): `id`, `full_name`, `avg_attendance` (0-100), `avg_grade`, `avg_stress`, the
+                        three `<factor>_score` values and `severity`.
+            attendance_threshold (float): The attendance threshold in use.
+            grade_threshold (float): The grade threshold in use.
+            stress_threshold (float): The stress threshold in use.
 
+        Returns:
+            dict: The student's entry, with reasons and per-factor details.
+        """
+        factors = {
+            'attendance': (row['avg_attendance'], attendance_threshold, row['avg_attendance'] is not None and row['avg_attendance'] < attendance_threshold),
+            'grade': (row['avg_grade'], grade_threshold, row['avg_grade'] is not None and row['avg_grade'] < grade_threshold),
+            'stress': (row['avg_stress'], stress_threshold, row['avg_stress'] is not None and row['avg_stress'] >= stress_threshold),
+        }
+        reasons = []
+        if factors['attendance'][2]:
+            reasons.append(f"Low attendance (<{attendance_threshold:g}%)")
+        if factors['grade'][2]:
+            reasons.append(f"Low average grade (<{grade_threshold:g})")
+        reason = list(reasons)
+        if factors['stress'][2]:
+            reasons.append(f"High average stress (>={stress_threshold:g})")
+            reason.append(f"High average stress (>{stress_threshold - 1:g})") # The wording `reason` has always used.
         return {
-            'labels': ['Submitted On Time', 'Submitted Late', 'Not Submitted'],
-            'data': [submitted_count if submitted_count is not None else 0, 
-                     late_count if late_count is not None else 0, 
-                     not_submitted_count if not_submitted_count is not None else 0]
+            'id': row['id'],
+            'name': row['full_name'],
+            'reason': ', '.join(reason),
+            'reasons': reasons,
+            'severity': round(row.get('severity') or 0.0, 3),
+            'factors': {
+                name: {
+                    'value': round(value, 2) if value is not None else None,
+                    'threshold': threshold,
+                    'at_risk': at_risk,
+                    'score': round(row.get(f'{name}_score') or 0.0, 3),
+                } for name, (value, threshold, at_risk) in factors.items()
+            },
         }
 
-    def get_high_risk_students(self, attendance_threshold: int = 70, grade_threshold: int = 40, stress_threshold: int = 4) -> list[dict]:
+    @cached_analysis('students', 'student_metrics')
+    @numpy_backed
+    def get_high_risk_students(self, attendance_threshold: float = 70, grade_threshold: float = 40, stress_threshold: float = 4,
+                               sort: str = 'id', limit: int | None = None) -> list[dict]:
         """
         Identifies high-risk students based on configurable thresholds for attendance, grades, and stress levels.
 
+        All three factors are evaluated in a single pass over `student_metrics`, and
+        sorting and limiting happen in SQL, so changing a threshold costs one query.
+        Each breached factor adds a score between 0 and 1 to the student's `severity`:
+        the relative shortfall below the attendance or grade threshold, and for stress
+        the position of the average between the threshold and the maximum level of 5
+        (1 when the threshold is 5). A student exactly at a threshold scores 0.
+
         Args:
-            attendance_threshold (int, optional): The attendance percentage below which a student is considered at risk. Defaults to 70.
-            grade_threshold (int, optional): The average grade below which a student is considered at risk. Defaults to 40.
-            stress_threshold (int, optional): The average stress level (1-5) above which a student is considered at risk. Defaults to 4.
+            attendance_threshold (float, optional): The attendance percentage below which a student is considered at risk. Defaults to 70.
+            grade_threshold (float, optional): The average grade below which a student is considered at risk. Defaults to 40.
+            stress_threshold (float, optional): The average stress level (1-5) at or above which a student is considered at risk. Defaults to 4.
+            sort (str, optional): One of `HIGH_RISK_SORTS`. Defaults to 'id'.
+            limit (int | None, optional): Return at most this many students. Defaults to None (all).
 
         Returns:
-            list[dict]: A list of dictionaries, each representing a high-risk student
-                        and a concatenated string of reasons for their risk status.
-        """
-        high_risk_students = {}
+            list[dict]: A list of dictionaries, each representing a high-risk student with
+                        `reason` (the reasons joined into one string, stress worded as before,
+                        e.g. "High average stress (>3)"), `reasons`, `severity`
+                        and `factors` (`value`, `threshold`, `at_risk` and `score` per factor).
 
-        # Query for students with low attendance.
-        query_low_attendance = f"""
-            SELECT s.id, s.full_name, AVG(ar.attendance_rate) * 100 AS avg_attendance
-            FROM students s
-            JOIN attendance_records ar ON s.id = ar.student_id
-            WHERE s.is_active = 1 AND ar.is_active = 1
-            GROUP BY s.id, s.full_name
-            HAVING avg_attendance < ?
+        Raises:
+            ValueError: If a threshold is out of range, `sort` is unknown or `limit` is not positive.
         """
-        for row in self._execute_query(query_low_attendance, (attendance_threshold,), fetch_all_dicts=True):
-            high_risk_students[row['id']] = {'id': row['id'], 'name': row['full_name'], 'reason': f"Low attendance (<{attendance_threshold}%)"}
+        self._validate_high_risk_options(attendance_threshold, grade_threshold, stress_threshold, sort, limit)
 
-        # Query for students with low grades.
-        query_low_grades = f"""
-            SELECT s.id, s.full_name, AVG(g.grade) AS avg_grade
-            FROM students s
-            JOIN grades g ON s.id = g.student_id
-            WHERE s.is_active = 1 AND g.is_active = 1
-            GROUP BY s.id, s.full_name
-            HAVING avg_grade < ?
-        """
-        for row in self._execute_query(query_low_grades, (grade_threshold,), fetch_all_dicts=True):
-            if row['id'] not in high_risk_students:
-                high_risk_students[row['id']] = {'id': row['id'], 'name': row['full_name'], 'reason': f"Low average grade (<{grade_threshold})"}
-            else:
-                high_risk_students[row['id']]['reason'] += f", Low average grade (<{grade_threshold})"
-
-        # Query for students with high stress levels.
-        query_high_stress = f"""
-            SELECT s.id, s.full_name, AVG(sr.stress_level) AS avg_stress
-            FROM students s
-            JOIN survey_responses sr ON s.id = sr.student_id
-            WHERE s.is_active = 1 AND sr.is_active = 1
-            GROUP BY s.id, s.full_name
-            HAVING avg_stress >= ?
-        """
-        for row in self._execute_query(query_high_stress, (stress_threshold,), fetch_all_dicts=True):
-            if row['id'] not in high_risk_students:
-                high_risk_students[row['id']] = {'id': row['id'], 'name': row['full_name'], 'reason': f"High average stress (>{stress_threshold-1})"}
-            else:
-                high_risk_students[row['id']]['reason'] += f", High average stress (>{stress_threshold-1})"
-        
-        return list(high_risk_students.values())
+        # Each average is NULL if the student has no such records, which never counts as a risk.
+        query = f"""
+            WITH averages AS (
+                SELECT s.id, s.full_name,
+                       sm.attendance_sum / NULLIF(sm.attendance_count, 0) * 100 AS avg_attendance,
+                       sm.grade_sum / NULLIF(sm.grade_count, 0) AS avg_grade,
+                       sm.stress_sum / NULLIF(sm.stress_count, 0) AS avg_stress
+                FROM students s
+                JOIN student_metrics sm ON s.id = sm.student_id
+                WHERE s.is_active = 1
+            ),
+            scored AS (
+                SELECT *,
+                       CASE WHEN avg_attendance < :attendance THEN (:attendance - avg_attendance) / :attendance ELSE 0 END AS attendance_score,
+                       CASE WHEN avg_grade < :grade THEN (:grade - avg_grade) / :grade ELSE 0 END AS grade_score,
+                       CASE WHEN avg_stress >= :stress THEN COALESCE((avg_stress - :stress) / NULLIF(5 - :stress, 0), 1) ELSE 0 END AS stress_score
+                FROM averages
+                WHERE avg_attendance < :attendance OR avg_grade < :grade OR avg_stress >= :stress
+            )
+            SELECT *, attendance_score + grade_score + stress_score AS severity
+            FROM scored
+            ORDER BY {self.HIGH_RISK_SORTS[sort]}
+            LIMIT :limit
+        """
+        params = {'attendance': float(attendance_threshold), 'grade': float(grade_threshold),
+                  'stress': float(stress_threshold), 'limit': -1 if limit is None else limit}
+        return [self._high_risk_entry(row, attendance_threshold, grade_threshold, stress_threshold)
+                for row in self._execute_query(query, params, fetch_all_dicts=True)]
 
+    @cached_analysis('modules', 'student_module_metrics')
+    @numpy_backed
     def get_stress_level_by_module(self) -> dict:
         """
         Calculates the average stress level for each active module.
@@ -300,10 +574,10 @@ class AnalysisRepository(BaseRepository):
                   - 'data': List of average stress levels for each corresponding module.
         """
         query = """
-            SELECT m.module_title, AVG(sr.stress_level) AS average_stress
+            SELECT m.module_title, SUM(smm.stress_sum) / SUM(smm.stress_count) AS average_stress
             FROM modules m
-            JOIN survey_responses sr ON m.id = sr.module_id
-            WHERE m.is_active = 1 AND sr.is_active = 1
+            JOIN student_module_metrics smm ON m.id = smm.module_id
+            WHERE m.is_active = 1 AND smm.stress_count > 0
             GROUP BY m.module_title
             ORDER BY average_stress DESC
         """
@@ -313,5 +587,515 @@ class AnalysisRepository(BaseRepository):
         data = [round(row['average_stress'], 2) for row in results]
         return {'labels': labels, 'data': data}
 
+    # Metrics of `module_week_rollups` and the factor their values are reported in (attendance as a percentage).
+    ROLLUP_METRICS = {'stress': 1, 'attendance': 100, 'sleep': 1}
+
+    @staticmethod
+    def _rollup_stats(count, total, sumsq, scale=1):
+        """
+        Derives the mean and population standard deviation from a rollup's count, sum and sum of squares.
+
+        Returns:
+            tuple[float | None, float | None]: Both rounded to 2 decimals and multiplied by `scale`,
+                                               or None for an empty rollup.
+        """
+        if not count:
+            return None, None
+        mean = total / count
+        variance = max(sumsq / count - mean * mean, 0.0) # Rounding can push a zero variance slightly negative.
+        return round(mean * scale, 2), round(math.sqrt(variance) * scale, 2)
+
+    @cached_analysis('modules', 'module_week_rollups')
+    def get_module_week_heatmap(self, metric: str = 'stress', academic_year: str | None = None) -> dict:
+        """
+        Builds a module x week matrix of one metric's weekly mean from the `module_week_rollups` read model.
+
+        Args:
+            metric (str, optional): 'stress', 'attendance' (percentage) or 'sleep' (hours). Defaults to 'stress'.
+            academic_year (str | None, optional): Only include modules of this academic year. Defaults to all.
+
+        Returns:
+            dict: `metric`, `weeks`, `modules` (`id`, `module_code`, `module_title`, `academic_year`; active
+                  modules with data, ordered by code), and the `data` (means) and `counts` matrices with
+                  one row per module and one column per week. Cells without data are None and 0.
+
+        Raises:
+            ValueError: If `metric` is unknown.
+        """
+        if metric not in self.ROLLUP_METRICS:
+            raise ValueError(f"'metric' must be one of: {', '.join(self.ROLLUP_METRICS)}.")
+        year_filter = "AND r.academic_year = :academic_year" if academic_year is not None else ""
+        query = f"""
+            SELECT m.id, m.module_code, m.module_title, m.academic_year, r.week_number,
+                   r.{metric}_count AS count, r.{metric}_sum AS total, r.{metric}_sumsq AS sumsq
+            FROM module_week_rollups r
+            JOIN modules m ON m.id = r.module_id
+            WHERE m.is_active = 1 AND r.{metric}_count > 0 {year_filter}
+            ORDER BY m.module_code, r.week_number
+        """
+        params = {'academic_year': academic_year} if academic_year is not None else ()
+        rows = self._execute_query(query, params, fetch_all_dicts=True)
+
+        weeks = sorted({row['week_number'] for row in rows})
+        column_of = {week: i for i, week in enumerate(weeks)}
+        modules, data, counts = [], [], []
+        for row in rows:
+            if not modules or modules[-1]['id'] != row['id']:
+                modules.append({key: row[key] for key in ('id', 'module_code', 'module_title', 'academic_year')})
+                data.append([None] * len(weeks))
+                counts.append([0] * len(weeks))
+            data[-1][column_of[row['week_number']]] = self._rollup_stats(row['count'], row['total'], row['sumsq'], self.ROLLUP_METRICS[metric])[0]
+            counts[-1][column_of[row['week_number']]] = row['count']
+        return {'metric': metric, 'weeks': weeks, 'modules': modules, 'data': data, 'counts': counts}
+
+    @cached_analysis('modules', 'module_week_rollups')
+    def get_module_weekly_trends(self, module_id: int) -> dict | None:
+        """
+        Retrieves the weekly trend lines of one module from the `module_week_rollups` read model.
+
+        Args:
+            module_id (int): The unique identifier of the module.
+
+        Returns:
+            dict | None: `module` (`id`, `module_code`, `module_title`, `academic_year`), `weeks`, and for
+                         each of `stress`, `attendance` (percentage) and `sleep` the weekly `mean`,
+                         `stddev` and `count` lists (None where the week has no data for that metric),
+                         or None if no active module has this ID.
+        """
+        query = """
+            SELECT m.id, m.module_code, m.module_title, m.academic_year, r.*
+            FROM modules m
+            LEFT JOIN module_week_rollups r ON r.module_id = m.id
+            WHERE m.id = ? AND m.is_active = 1
+            ORDER BY r.week_number
+        """
+        rows = self._execute_query(query, (module_id,), fetch_all_dicts=True)
+        if not rows:
+            return None
+        # Weeks whose rows were all deleted keep an empty rollup; they are left out.
+        weeks = [row for row in rows if row['week_number'] is not None
+                 and any(row[f'{metric}_count'] for metric in self.ROLLUP_METRICS)]
+        result = {
+            'module': {key: rows[0][key] for key in ('id', 'module_code', 'module_title', 'academic_year')},
+            'weeks': [row['week_number'] for row in weeks],
+        }
+        for metric, scale in self.ROLLUP_METRICS.items():
+            stats = [self._rollup_stats(row[f'{metric}_count'], row[f'{metric}_sum'], row[f'{metric}_sumsq'], scale) for row in weeks]
+            result[metric] = {
+                'mean': [mean for mean, _ in stats],
+                'stddev': [stddev for _, stddev in stats],
+                'count': [row[f'{metric}_count'] for row in weeks],
+            }
+        return result
+
+    # Metrics with histogram sketches (see `metric_histogram_repository.py`), and the factor
+    # from the stored value to the reported one (attendance is reported as a percentage).
+    PERCENTILE_METRICS = {'attendance': 100, 'grade': 1, 'stress': 1}
+
+    @staticmethod
+    def _histogram_scope(module_id: int | None, week: int | None) -> tuple[str, int]:
+        """Returns the `(scope, scope_id)` of the sketch selected by `module_id` or `week` (the cohort by default)."""
+        if module_id is not None and week is not None:
+            raise ValueError("Select either 'module_id' or 'week', not both.")
+        if module_id is not None:
+            return 'module', module_id
+        if week is not None:
+            return 'week', week
+        return 'cohort', 0
+
+    @staticmethod
+    def _bucket_value(metric: str, bucket: int) -> float:
+        """Returns the lower edge of a histogram bin, in the reported unit of `metric`."""
+        return round(bucket / HISTOGRAM_SCALES[metric] * AnalysisRepository.PERCENTILE_METRICS[metric], 2)
+
+    @cached_analysis('metric_histograms')
+    def get_metric_percentiles(self, metric: str, percentiles: tuple[float, ...] = (10, 25, 50, 75, 90),
+                               module_id: int | None = None, week: int | None = None) -> dict:
+        """
+        Retrieves percentiles of a metric from its histogram sketch.
+
+        For the cohort and a module the values are per-student averages (of active
+        students); for a week they are the individual survey responses or attendance
+        records of that week. The answer is read from the group's occupied bins (a
+        few hundred rows at most) rather than by sorting the values. A percentile is
+        the nearest-rank value, reported as the lower edge of its bin, so it is
+        accurate to within `resolution`.
+
+        Args:
+            metric (str): 'attendance' (percentage), 'grade' or 'stress'.
+            percentiles (tuple[float, ...], optional): Percentiles to compute, each 0-100.
+                                                       Defaults to (10, 25, 50, 75, 90).
+            module_id (int | None, optional): Use the sketch of this module.
+            week (int | None, optional): Use the sketch of this week (not available for grades).
+
+        Returns:
+            dict: `metric`, `scope` ('cohort', 'module' or 'week'), `scope_id`, `count` (values
+                  in the sketch), `resolution` (bin width) and `percentiles`, a list of
+                  `{percentile, value}` (value None when the sketch is empty).
+
+        Raises:
+            ValueError: If `metric` is unknown, a percentile is out of range, both `module_id`
+                        and `week` are given, or weekly grades are requested.
+        """
+        if metric not in self.PERCENTILE_METRICS:
+            raise ValueError(f"'metric' must be one of: {', '.join(self.PERCENTILE_METRICS)}.")
+        if not percentiles or any(not 0 <= p <= 100 for p in percentiles):
+            raise ValueError("'percentiles' must be between 0 and 100.")
+        scope, scope_id = self._histogram_scope(module_id, week)
+        if scope == 'week' and metric == 'grade':
+            raise ValueError("Grades are not recorded per week; weekly percentiles cover attendance and stress.")
+
+        bins = self._execute_query("""
+            SELECT bucket, count FROM metric_histograms
+            WHERE metric = ? AND scope = ? AND scope_id = ? AND count > 0
+            ORDER BY bucket
+        """, (metric, scope, scope_id), fetch_all_dicts=True)
+        cumulative = list(itertools.accumulate(row['count'] for row in bins))
+        total = cumulative[-1] if cumulative else 0
+
+        values = []
+        for percentile in percentiles:
+            value = None
+            if total:
+                rank = max(1, math.ceil(percentile * total / 100)) # Nearest rank, from 1.
+                value = self._bucket_value(metric, bins[bisect.bisect_left(cumulative, rank)]['bucket'])
+            values.append({'percentile': percentile, 'value': value})
+        return {
+            'metric': metric, 'scope': scope, 'scope_id': scope_id, 'count': total,
+            'resolution': self._bucket_value(metric, 1), 'percentiles': values
+        }
+
+    @cached_analysis('students', 'student_metrics', 'student_module_metrics', 'survey_responses',
+                     'attendance_records', 'metric_histograms')
+    def get_student_percentiles(self, student_id: int, module_id: int | None = None, week: int | None = None) -> dict | None:
+        """
+        Retrieves the percentile rank of a student's attendance, grade and stress.
+
+        The student's value is their average over the cohort, a module or a week,
+        and is ranked within the matching sketch (see `get_metric_percentiles()`;
+        the weekly average is ranked among that week's individual records). The
+        rank is the share of values below the student's bin plus half of those in
+        it, read with one indexed aggregate over the sketch bins.
+
+        Args:
+            student_id (int): The unique identifier of the student.
+            module_id (int | None, optional): Rank within this module.
+            week (int | None, optional): Rank within this week.
+
+        Returns:
+            dict | None: `student_id`, `scope`, `scope_id` and `metrics`, mapping each metric to
+                         `{value, percentile, count}` (None when the student has no such value),
+                         or None if the student does not exist or is inactive.
+
+        Raises:
+            ValueError: If both `module_id` and `week` are given.
+        """
+        scope, scope_id = self._histogram_scope(module_id, week)
+        averages = {
+            'cohort': """
+                SELECT attendance_sum / NULLIF(attendance_count, 0) AS attendance, grade_sum / NULLIF(grade_count, 0) AS grade,
+                       stress_sum / NULLIF(stress_count, 0) AS stress
+                FROM student_metrics WHERE student_id = :student_id
+            """,
+            'module': """
+                SELECT attendance_sum / NULLIF(attendance_count, 0) AS attendance, grade_sum / NULLIF(grade_count, 0) AS grade,
+                       stress_sum / NULLIF(stress_count, 0) AS stress
+                FROM student_module_metrics WHERE student_id = :student_id AND module_id = :scope_id
+            """,
+            'week': """
+                SELECT (SELECT AVG(attendance_rate) FROM attendance_records
+                        WHERE student_id = :student_id AND week_number = :scope_id AND is_active = 1) AS attendance,
+                       NULL AS grade,
+                       (SELECT AVG(stress_level) FROM survey_responses
+                        WHERE student_id = :student_id AND week_number = :scope_id AND is_active = 1) AS stress
+            """,
+        }[scope]
+        params = {'student_id': student_id, 'scope_id': scope_id}
+        row = self._execute_query(f"""
+            SELECT s.id, v.attendance, v.grade, v.stress
+            FROM students s LEFT JOIN ({averages}) v ON 1
+            WHERE s.id = :student_id AND s.is_active = 1
+        """, params, fetch_one=True, fetch_all_dicts=True)
+        if row is None:
+            return None
+
+        # Bins are computed as the triggers compute them (CAST truncates like int()).
+        buckets = {metric: int(row[metric] * HISTOGRAM_SCALES[metric]) for metric in self.PERCENTILE_METRICS
+                   if row[metric] is not None}
+        ranks = {}
+        if buckets:
+            ranks = {rank['metric']: rank for rank in self._execute_query("""
+                SELECT b.key AS metric, TOTAL(h.count) AS total,
+                       TOTAL(h.count) FILTER (WHERE h.bucket < b.value) AS below,
+                       TOTAL(h.count) FILTER (WHERE h.bucket = b.value) AS same
+                FROM json_each(:buckets) b
+                JOIN metric_histograms h ON h.metric = b.key AND h.scope = :scope AND h.scope_id = :scope_id
+                GROUP BY b.key
+            """, {'buckets': json.dumps(buckets), 'scope': scope, 'scope_id': scope_id}, fetch_all_dicts=True)}
+
+        metrics = {}
+        for metric, factor in self.PERCENTILE_METRICS.items():
+            rank = ranks.get(metric)
+            if row[metric] is None or not rank or not rank['total']:
+                metrics[metric] = None
+                continue
+            metrics[metric] = {
+                'value': round(row[metric] * factor, 2),
+                'percentile': round((rank['below'] + rank['same'] / 2) / rank['total'] * 100, 1),
+                'count': int(rank['total'])
+            }
+        return {'student_id': student_id, 'scope': scope, 'scope_id': scope_id, 'metrics': metrics}
+
+    # Panels of `get_dashboard()`, in response order. Each value is what the
+    # analysis endpoint of the same name returns.
+    DASHBOARD_PANELS = ('dashboard_summary', 'grade_distribution', 'stress_grade_correlation', 'overall_attendance_rate',
+                        'submission_status_distribution', 'stress_by_module', 'high_risk_students')
+
+    def parse_dashboard_panels(self, panels: str | None) -> tuple[str, ...]:
+        """
+        Validates a comma-separated panel list (hyphens or underscores) for `get_dashboard()`.
+
+        Args:
+            panels (str | None): The requested panels; None or empty for all of them.
+
+        Returns:
+            tuple[str, ...]: The requested panels, in `DASHBOARD_PANELS` order.
+
+        Raises:
+            ValueError: If a panel is unknown.
+        """
+        if not panels or not panels.strip():
+            return self.DASHBOARD_PANELS
+        requested = {name.strip().replace('-', '_') for name in panels.split(',') if name.strip()}
+        unknown = sorted(requested - set(self.DASHBOARD_PANELS))
+        if unknown:
+            raise ValueError(f"Unknown panel(s): {', '.join(unknown)}. Choose from: {', '.join(self.DASHBOARD_PANELS)}.")
+        return tuple(name for name in self.DASHBOARD_PANELS if name in requested)
+
+    @contextlib.contextmanager
+    def _read_snapshot(self):
+        """
+        Runs the enclosed reads in one read transaction, so that they all see the same committed state.
+
+        Inside a write transaction (the caller's uncommitted changes) there is
+        nothing to start or end, and the reads see those changes instead.
+        """
+        db = get_db()
+        own_transaction = not db.in_transaction
+        if own_transaction:
+            db.execute("BEGIN") # The snapshot is taken by the first read and held until the end.
+        try:
+            yield
+        finally:
+            if own_transaction:
+                db.rollback() # Ends the read transaction; nothing was written.
+
+    @cached_analysis('students', 'modules', 'alerts', 'users', 'attendance_records', 'submission_records',
+                     'student_metrics', 'student_module_metrics', 'metric_histograms')
+    def get_dashboard(self, panels: tuple[str, ...] = DASHBOARD_PANELS) -> dict:
+        """
+        Computes several dashboard panels at once from one consistent snapshot.
+
+        All panels are read inside a single read transaction on the request's
+        connection, so they reflect the same committed state even while other
+        requests write. The bundle is cached as a whole; the individual panels
+        bypass the cache so that they are never mixed with results computed at
+        another time. High-risk students use the default thresholds and are ordered
+        by severity.
+
+        Args:
+            panels (tuple[str, ...], optional): Panels to compute, validated with
+                                                `parse_dashboard_panels()`. Defaults to all.
+
+        Returns:
+            dict: `{panel: value}` for every requested panel.
+        """
+        result = {}
+        with bypass_analysis_cache(), self._read_snapshot():
+            for panel in panels:
+                if panel == 'dashboard_summary':
+                    result[panel] = self.get_dashboard_summary()
+                elif panel == 'grade_distribution':
+                    result[panel] = self.get_grade_distribution()
+                elif panel == 'stress_grade_correlation':
+                    result[panel] = self.get_stress_grade_correlation()
+                elif panel == 'overall_attendance_rate':
+                    result[panel] = {'overall_attendance_rate': self.get_overall_attendance_rate()}
+                elif panel == 'submission_status_distribution':
+                    result[panel] = self.get_submission_status_distribution()
+                elif panel == 'stress_by_module':
+                    result[panel] = self.get_stress_level_by_module()
+                elif panel == 'high_risk_students':
+                    result[panel] = self.get_high_risk_students(sort='severity')
+        return result
+
+    @cached_analysis('students', 'enrolments', 'survey_responses', 'attendance_records')
+    def get_cohort_trends(self, student_ids: tuple[int, ...] | None = None, course_name: str | None = None,
+                          module_id: int | None = None, year_of_study: int | None = None, max_students: int = 500) -> dict:
+        """
+        Retrieves the weekly stress and attendance series of a whole cohort at once.
+
+        The cohort is the active students matching every given selector. It is read
+        once, and each metric is then aggregated for all of its students by one
+        grouped query (three queries in total, however large the cohort). The series
+        are returned as a dense matrix over a shared week axis; each value equals the
+        corresponding entry of `get_stress_trend_for_student()` or
+        `get_attendance_trend_for_student()`, and weeks without records are None.
+
+        Args:
+            student_ids (tuple[int, ...] | None, optional): Include only these students.
+            course_name (str | None, optional): Include only students on this course.
+            module_id (int | None, optional): Include only students actively enrolled on this module.
+                                              The series still cover all of their modules.
+            year_of_study (int | None, optional): Include only students in this year of study.
+            max_students (int, optional): Largest cohort returned. Defaults to 500.
+
+        Returns:
+            dict: `weeks` (week numbers), `students` (`id` and `full_name`, ordered by ID), and
+                  `stress` and `attendance` (percentages), each a list with one row per student
+                  and one value per week.
+
+        Raises:
+            ValueError: If no selector is given or the cohort has more than `max_students` students.
+        """
+        conditions, params = ["s.is_active = 1"], {'limit': max_students + 1}
+        if student_ids is not None:
+            conditions.append("s.id IN (SELECT value FROM json_each(:student_ids))")
+            params['student_ids'] = json.dumps(list(student_ids))
+        if course_name is not None:
+            conditions.append("s.course_name = :course_name")
+            params['course_name'] = course_name
+        if module_id is not None:
+            conditions.append("EXISTS (SELECT 1 FROM enrolments e WHERE e.student_id = s.id AND e.module_id = :module_id AND e.is_active = 1)")
+            params['module_id'] = module_id
+        if year_of_study is not None:
+            conditions.append("s.year_of_study = :year_of_study")
+            params['year_of_study'] = year_of_study
+        if len(conditions) == 1:
+            raise ValueError("Select the cohort with 'student_ids', 'course_name', 'module_id' or 'year_of_study'.")
+
+        cohort = f"SELECT s.id, s.full_name FROM students s WHERE {' AND '.join(conditions)} ORDER BY s.id LIMIT :limit"
+        students = self._execute_query(cohort, params, fetch_all_dicts=True)
+        if len(students) > max_students:
+            raise ValueError(f"The cohort has more than {max_students} students; narrow the selection.")
+
+        # Each metric is averaged per student and week in one pass over the cohort's rows (student/week indexes).
+        ids = json.dumps([student['id'] for student in students])
+        series = {}
+        for name, table, column in (('stress', 'survey_responses', 'stress_level'), ('attendance', 'attendance_records', 'attendance_rate')):
+            series[name] = self._execute_query(f"""
+                SELECT student_id, week_number, AVG({column}) AS average
+                FROM {table}
+                WHERE student_id IN (SELECT value FROM json_each(?)) AND is_active = 1
+                GROUP BY student_id, week_number
+            """, (ids,), fetch_all_dicts=True)
+
+        weeks = sorted({row['week_number'] for rows in series.values() for row in rows})
+        row_of = {student['id']: i for i, student in enumerate(students)}
+        column_of = {week: i for i, week in enumerate(weeks)}
+        result = {'weeks': weeks, 'students': students}
+        for name, rows in series.items():
+            matrix = [[None] * len(weeks) for _ in students]
+            for row in rows:
+                if name == 'stress':
+                    value = round(row['average'], 2)
+                else:
+                    value = round(row['average'] * 100, 2) if row['average'] is not None else 0
+                matrix[row_of[row['student_id']]][column_of[row['week_number']]] = value
+            result[name] = matrix
+        return result
+
+    @cached_analysis('students', 'enrolments', 'modules', 'student_metrics', 'survey_responses', 'attendance_records',
+                     'grades', 'submission_records', 'alerts')
+    def get_student_overview(self, student_id: int) -> dict | None:
+        """
+        Retrieves everything the student detail page shows in one call.
+
+        Six queries, each an indexed lookup by student ID, run inside one read
+        transaction: the profile with its overall attendance, the enrolments, both
+        weekly trends (in one statement), the grades, the submissions and the alerts.
+        The trends and the average attendance equal the results of the individual
+        analysis methods.
+
+        Args:
+            student_id (int): The unique identifier of the student.
+
+        Returns:
+            dict | None: `student` (the profile), `enrolments`, `stress_trend`, `attendance_trend`,
+                         `average_attendance`, `grades_by_module` (with `average_grade` per module),
+                         `submissions` and `alerts` (active ones, newest first), or None if no active
+                         student has this ID.
+        """
+        with self._read_snapshot():
+            profile = self._execute_query("""
+                SELECT s.*, sm.attendance_sum / NULLIF(sm.attendance_count, 0) AS average_attendance
+                FROM students s
+                LEFT JOIN student_metrics sm ON s.id = sm.student_id
+                WHERE s.id = ? AND s.is_active = 1
+            """, (student_id,), fetch_one=True, fetch_all_dicts=True)
+            if profile is None:
+                return None
+            enrolments = self._execute_query("""
+                SELECT e.id, e.module_id, e.enrol_date, m.module_code, m.module_title
+                FROM enrolments e
+                JOIN modules m ON e.module_id = m.id
+                WHERE e.student_id = ? AND e.is_active = 1
+                ORDER BY m.module_code
+            """, (student_id,), fetch_all_dicts=True)
+            weekly = self._execute_query("""
+                SELECT 'stress' AS series, week_number, AVG(stress_level) AS average
+                FROM survey_responses WHERE student_id = :student AND is_active = 1 GROUP BY week_number
+                UNION ALL
+                SELECT 'attendance', week_number, AVG(attendance_rate)
+                FROM attendance_records WHERE student_id = :student AND is_active = 1 GROUP BY week_number
+                ORDER BY series, week_number
+            """, {'student': student_id}, fetch_all_dicts=True)
+            grades = self._execute_query("""
+                SELECT g.id, g.module_id, m.module_code, m.module_title, g.assessment_name, g.grade
+                FROM grades g
+                LEFT JOIN modules m ON g.module_id = m.id
+                WHERE g.student_id = ? AND g.is_active = 1
+                ORDER BY g.module_id, g.id
+            """, (student_id,), fetch_all_dicts=True)
+            submissions = self._execute_query("""
+                SELECT sr.id, sr.module_id, m.module_title, sr.assessment_name, sr.due_date, sr.submitted_date,
+                       sr.is_submitted, sr.is_late
+                FROM submission_records sr
+                LEFT JOIN modules m ON sr.module_id = m.id
+                WHERE sr.student_id = ? AND sr.is_active = 1
+                ORDER BY sr.due_date, sr.id
+            """, (student_id,), fetch_all_dicts=True)
+            alerts = alert_repository.get_alerts_by_student_id(student_id)
+
+        grades_by_module = {}
+        for row in grades:
+            module = grades_by_module.setdefault(row['module_id'], {
+                'module_id': row['module_id'], 'module_code': row['module_code'], 'module_title': row['module_title'], 'grades': []
+            })
+            module['grades'].append({'id': row['id'], 'assessment_name': row['assessment_name'], 'grade': row['grade']})
+        for module in grades_by_module.values():
+            marks = [grade['grade'] for grade in module['grades'] if grade['grade'] is not None]
+            module['average_grade'] = round(sum(marks) / len(marks), 2) if marks else None
+
+        stress = [row for row in weekly if row['series'] == 'stress']
+        attendance = [row for row in weekly if row['series'] == 'attendance']
+        average_attendance = profile.pop('average_attendance')
+        return {
+            'student': Student.from_row(profile).to_dict(),
+            'enrolments': enrolments,
+            'stress_trend': {
+                'labels': [f"Week {row['week_number']}" for row in stress],
+                'data': [round(row['average'], 2) for row in stress]
+            },
+            'attendance_trend': {
+                'labels': [f"Week {row['week_number']}" for row in attendance],
+                'data': [round(row['average'] * 100, 2) if row['average'] is not None else 0 for row in attendance]
+            },
+            'average_attendance': round(average_attendance * 100, 2) if average_attendance is not None else 0,
+            'grades_by_module': list(grades_by_module.values()),
+            'submissions': [dict(row, is_submitted=bool(row['is_submitted']), is_late=bool(row['is_late'])) for row in submissions],
+            'alerts': alerts,
+        }
+
 # Instantiate the repository for use throughout the application.
 analysis_repository = AnalysisRepository()
@@ -11,7 +11,8 @@ student and module information.
 import sqlite3
 from app.db_connection import get_db
 from app.models.attendance_record import AttendanceRecord
-from .base_repository import BaseRepository
+from app.utils.bulk import BulkField
+from .base_repository import BaseRepository, UpsertResult
 
 class AttendanceRecordRepository(BaseRepository):
     """
@@ -21,6 +22,25 @@ class AttendanceRecordRepository(BaseRepository):
     and error handling. Provides specific methods for querying and managing
     student attendance records, including calculated attendance rates.
     """
+    # Fields clients may select with `?fields=`.
+    list_fields = ('id', 'student_id', 'module_id', 'week_number', 'attended_sessions', 'total_sessions', 'attendance_rate', 'is_active', 'student_name', 'module_title')
+    page_as_dicts = True # Pages contain the joined student and module details, like get_all_*().
+    # The metrics, rollup and histogram triggers of migrations 0005-0007 keep these in step with every write.
+    side_effect_tables = ('student_metrics', 'student_module_metrics', 'module_week_rollups', 'metric_histograms')
+    # Fields accepted by `POST /api/admin/attendance-records/bulk`.
+    bulk_schema = (
+        BulkField('student_id', int, references='students'),
+        BulkField('module_id', int, references='modules'),
+        BulkField('week_number', int, minimum=1),
+        BulkField('attended_sessions', int, minimum=0),
+        BulkField('total_sessions', int, minimum=0),
+    )
+    # One active record per student, module and week (migration 0010); recording it again updates it.
+    natural_key = ('student_id', 'module_id', 'week_number')
+    natural_key_where = 'is_active = 1'
+    # Columns a repeated record overwrites.
+    upsert_columns = ('attended_sessions', 'total_sessions', 'attendance_rate')
+
     def __init__(self):
         """
         Initializes the AttendanceRecordRepository.
@@ -29,14 +49,14 @@ class AttendanceRecordRepository(BaseRepository):
         """
         super().__init__('attendance_records', AttendanceRecord)
 
-    def get_all_attendance_records(self) -> list[dict]:
+    def _list_query(self) -> tuple[str, tuple]:
         """
-        Retrieves all active attendance records from the database, including
-        associated student and module information for richer context.
+        Returns the query listing all active attendance records with their student and module details.
+
+        Shared by `get_all_attendance_records()` and the paginated `get_page()`.
 
         Returns:
-            list[dict]: A list of dictionaries, where each dictionary represents
-                        an attendance record with joined student and module details.
+            tuple[str, tuple]: The SQL string and its parameters.
         """
         query = """
             SELECT ar.id, ar.student_id, ar.module_id, ar.week_number, ar.attended_sessions, ar.total_sessions, ar.attendance_rate, ar.is_active,
@@ -46,8 +66,20 @@ class AttendanceRecordRepository(BaseRepository):
             JOIN modules m ON ar.module_id = m.id
             WHERE ar.is_active = 1
         """
+        return query, ()
+
+    def get_all_attendance_records(self) -> list[dict]:
+        """
+        Retrieves all active attendance records from the database, including
+        associated student and module information for richer context.
+
+        Returns:
+            list[dict]: A list of dictionaries, where each dictionary represents
+                        an attendance record with joined student and module details.
+        """
+        query, params = self._list_query()
         # _execute_query handles exceptions and returns results as dictionaries due to fetch_all_dicts=True.
-        return self._execute_query(query, fetch_all_dicts=True)
+        return self._execute_query(query, params, fetch_all_dicts=True)
 
     def get_attendance_record_by_id(self, record_id: int) -> AttendanceRecord | None:
         """
@@ -63,9 +95,12 @@ class AttendanceRecordRepository(BaseRepository):
 
     def create_attendance_record(self, student_id: int, module_id: int, week_number: int, attended_sessions: int, total_sessions: int) -> AttendanceRecord:
         """
-        Creates a new attendance record in the database.
+        Creates a new attendance record in the database, or updates the student's
+        record for that module and week if one exists.
 
         Automatically calculates the `attendance_rate` based on provided sessions.
+        The record is written with a single upsert on the natural key, so submitting
+        the same week twice, even concurrently, never creates a duplicate.
 
         Args:
             student_id (int): The ID of the student.
@@ -75,17 +110,41 @@ class AttendanceRecordRepository(BaseRepository):
             total_sessions (int): The total number of sessions held for the module in that week.
 
         Returns:
-            AttendanceRecord: The newly created `AttendanceRecord` object.
+            AttendanceRecord: The created or updated `AttendanceRecord` object.
         """
         # Calculate attendance rate, handling division by zero.
         attendance_rate = attended_sessions / total_sessions if total_sessions > 0 else 0.0
-        query = """
-            INSERT INTO attendance_records (student_id, module_id, week_number, attended_sessions, total_sessions, attendance_rate, is_active) 
-            VALUES (?, ?, ?, ?, ?, ?, 1)
-        """
-        record_id = self._execute_insert(query, (student_id, module_id, week_number, attended_sessions, total_sessions, attendance_rate))
+        record_id = self.upsert({'student_id': student_id, 'module_id': module_id, 'week_number': week_number,
+                                 'attended_sessions': attended_sessions, 'total_sessions': total_sessions,
+                                 'attendance_rate': attendance_rate, 'is_active': 1}, self.upsert_columns)
         return self.get_attendance_record_by_id(record_id)
 
+    def bulk_create_attendance_records(self, rows: list[dict]) -> UpsertResult:
+        """
+        Creates or updates many attendance records with a single upsert statement.
+
+        The rows must already be validated (see `validate_bulk_rows()`). The
+        `attendance_rate` is calculated per row exactly as in `create_attendance_record()`.
+        Rows whose student, module and week already have a record update it, so
+        re-importing a file or ingesting in parallel never creates duplicates.
+        Nothing is committed; the caller commits the batch as one transaction.
+
+        Args:
+            rows (list[dict]): Validated rows with the keys of `bulk_schema`.
+
+        Returns:
+            UpsertResult: The IDs of the created or updated records, in the order of `rows`, and
+                          whether each record existed before (was updated rather than created).
+        """
+        records = [
+            {'student_id': row['student_id'], 'module_id': row['module_id'], 'week_number': row['week_number'],
+             'attended_sessions': row['attended_sessions'], 'total_sessions': row['total_sessions'],
+             'attendance_rate': row['attended_sessions'] / row['total_sessions'] if row['total_sessions'] > 0 else 0.0,
+             'is_active': 1}
+            for row in rows
+        ]
+        return self.upsert_many(records, self.upsert_columns)
+
     def update_attendance_record(self, record_id: int, student_id: int, module_id: int, week_number: int, attended_sessions: int, total_sessions: int) -> AttendanceRecord:
         """
         Updates an existing attendance record in the database.
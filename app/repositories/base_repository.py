@@ -5,12 +5,46 @@ This module defines the `BaseRepository` class, which provides a standardized
 interface for interacting with a specific database table. It encapsulates
 common CRUD (Create, Read, Update, Delete) operations and includes robust
 error handling and transaction management using SQLite.
+
+Every statement executed through `_execute_query`, `_execute_insert`,
+`_execute_insert_returning`, `_execute_update_delete`, `_execute_many`, `upsert` and `upsert_many` is timed and reported to `app/query_instrumentation.py`.
+Every write also invalidates the cached analysis results that read the table
+(see `app/analysis_cache.py`). Writes that violate a UNIQUE constraint raise
+`ConflictError`, which the admin routes answer with 409 Conflict.
 """
 
+import json
 import sqlite3
+import time
+from collections import namedtuple
+from app.analysis_cache import record_write
 from app.db_connection import get_db
+from app.query_instrumentation import record_query
+from app.utils.bulk import validate_rows
+from app.utils.pagination import encode_cursor, decode_cursor
 from flask import current_app # Import current_app for logging
 
+# Integer flag columns that models expose as booleans; projected rows are converted the same way.
+BOOLEAN_FIELDS = frozenset({'is_active', 'resolved', 'is_submitted', 'is_late'})
+
+# Result of `upsert_many()`: the record ID of each row (None for rows skipped by `DO NOTHING`)
+# and whether that record existed before the statement (i.e. was updated or skipped, not created).
+UpsertResult = namedtuple('UpsertResult', ['ids', 'existed'])
+
+class ConflictError(Exception):
+    """
+    Raised by the write helpers when a statement violates a UNIQUE constraint or index,
+    e.g. when a record is moved onto a natural key that an active record already has.
+
+    Attributes:
+        table_name (str): The table the statement wrote to.
+        columns (tuple[str]): The columns of the violated constraint.
+    """
+    def __init__(self, table_name, columns):
+        super().__init__(f"A {table_name} record with the same {', '.join(columns)} already exists.")
+        self.table_name = table_name
+        self.columns = columns
+
 class BaseRepository:
     """
     A base repository class providing common database operations for a specific table.
@@ -19,6 +53,28 @@ class BaseRepository:
     (e.g., `UserRepository`, `ModuleRepository`) to centralize database
     interaction logic, error handling, and transaction management.
     """
+    # Columns that define the stable order used by `get_page()`. The last column
+    # must be unique (normally the primary key) so that no two rows share a key.
+    page_key = ('id',)
+    # If True, `get_page()` returns the newest (highest key) rows first.
+    page_descending = False
+    # If True, `get_page()` returns dictionaries instead of `model_class` instances,
+    # matching repositories whose listing query joins in extra columns.
+    page_as_dicts = False
+    # Fields of the listing query that clients may select with `?fields=`
+    # (see `select_fields()`). None disables field selection for the repository.
+    list_fields = None
+    # Fields accepted by the bulk create endpoint (tuple of `BulkField`, see
+    # `app/utils/bulk.py`). None disables bulk creation for the repository.
+    bulk_schema = None
+    # Tables that writes through this repository also change, via triggers or
+    # follow-up statements; cached analysis results reading them are invalidated too.
+    side_effect_tables = ()
+    # Columns of the unique index that identifies a row by its content, used as the
+    # conflict target of `upsert()` and `upsert_many()`. None disables upserts.
+    natural_key = None
+    # WHERE clause of the natural key's index if it is partial, e.g. 'is_active = 1'.
+    natural_key_where = None
     def __init__(self, table_name, model_class):
         """
         Initializes the BaseRepository instance.
@@ -31,6 +87,13 @@ class BaseRepository:
         self.table_name = table_name
         self.model_class = model_class
 
+    def _raise_conflict(self, error):
+        """Re-raises a UNIQUE constraint violation as `ConflictError`; other errors are left to the caller."""
+        if isinstance(error, sqlite3.IntegrityError) and error.sqlite_errorname == 'SQLITE_CONSTRAINT_UNIQUE':
+            # The message reads "UNIQUE constraint failed: table.column, table.column".
+            columns = tuple(name.split('.')[-1] for name in str(error).split(': ', 1)[1].split(', '))
+            raise ConflictError(self.table_name, columns) from error
+
     def _execute_query(self, query, params=(), fetch_one=False, fetch_all_dicts=False):
         """
         Executes a SELECT query and returns the results, optionally mapping them to model instances.
@@ -53,9 +116,11 @@ class BaseRepository:
         """
         db = get_db()
         try:
+            started_at = time.perf_counter()
             cursor = db.execute(query, params)
             if fetch_one:
                 row = cursor.fetchone()
+                record_query(self.table_name, 'query', query, (time.perf_counter() - started_at) * 1000, 1 if row else 0)
                 if row:
                     # If only one column is selected and not explicitly asking for dict, return the scalar value.
                     if len(row) == 1 and not fetch_all_dicts:
@@ -65,6 +130,7 @@ class BaseRepository:
                 return None # No row found.
             else:
                 rows = cursor.fetchall()
+                record_query(self.table_name, 'query', query, (time.perf_counter() - started_at) * 1000, len(rows))
                 # Return as list of dicts or list of model instances.
                 return [dict(row) for row in rows] if fetch_all_dicts or self.model_class is None else [self.model_class.from_row(row) for row in rows]
         except sqlite3.Error as e:
@@ -73,6 +139,51 @@ class BaseRepository:
             # Re-raise as a generic exception for higher layers to handle.
             raise Exception(f"Database operation failed for {self.table_name}.")
 
+    def _iter_query(self, query, params=(), batch_size=500, as_dicts=False):
+        """
+        Executes a SELECT query and yields its rows incrementally.
+
+        Unlike `_execute_query`, which materializes the whole result with `fetchall()`,
+        rows are pulled from the cursor `batch_size` at a time with `fetchmany()` and
+        mapped one by one, so memory use stays flat regardless of the result size.
+        The statement is reported to the SQL instrumentation once the iteration ends
+        (or is abandoned), with the total time spent executing and fetching.
+
+        Args:
+            query (str): The SQL SELECT query string to execute.
+            params (tuple, optional): A tuple of parameters to bind to the query. Defaults to an empty tuple.
+            batch_size (int, optional): Number of rows fetched from SQLite per round trip. Defaults to 500.
+            as_dicts (bool, optional): If True, yields dictionaries instead of `model_class` instances.
+
+        Yields:
+            Any: One model instance (or dictionary) per row.
+
+        Raises:
+            Exception: If a `sqlite3.Error` occurs while executing or fetching,
+                       it's caught, logged, and re-raised as a generic Exception.
+        """
+        db = get_db()
+        as_dicts = as_dicts or self.model_class is None
+        elapsed = 0.0
+        row_count = 0
+        try:
+            started_at = time.perf_counter()
+            cursor = db.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                elapsed += time.perf_counter() - started_at
+                if not rows:
+                    break
+                for row in rows:
+                    row_count += 1
+                    yield dict(row) if as_dicts else self.model_class.from_row(row)
+                started_at = time.perf_counter() # Time spent in the consumer between batches is not DB time.
+        except sqlite3.Error as e:
+            current_app.logger.error(f"Database error in {self.table_name} repository (streamed query): {e}", exc_info=True)
+            raise Exception(f"Database operation failed for {self.table_name}.")
+        finally:
+            record_query(self.table_name, 'query', query, elapsed * 1000, row_count)
+
     def _execute_insert(self, query, params=()):
         """
         Executes an INSERT query and returns the ID of the newly inserted row.
@@ -88,14 +199,51 @@ class BaseRepository:
             int: The `lastrowid` (ID of the newly inserted row) if the insertion is successful.
 
         Raises:
+            ConflictError: If the statement violates a UNIQUE constraint or index.
             Exception: If a `sqlite3.Error` occurs during insertion,
                        the transaction is rolled back, the error is logged, and re-raised.
         """
         db = get_db()
         try:
+            started_at = time.perf_counter()
             cursor = db.execute(query, params)
+            record_query(self.table_name, 'insert', query, (time.perf_counter() - started_at) * 1000, cursor.rowcount)
+            record_write(self.table_name, *self.side_effect_tables)
             return cursor.lastrowid
         except sqlite3.Error as e:
+            self._raise_conflict(e)
+            current_app.logger.error(f"Database error in {self.table_name} repository (insert): {e}", exc_info=True)
+            raise Exception(f"Failed to insert into {self.table_name}.")
+
+    def _execute_insert_returning(self, query, params=()):
+        """
+        Executes an `INSERT ... RETURNING *` query and returns the inserted row.
+
+        Saves the `SELECT` by id that would otherwise follow `_execute_insert()` to
+        read back defaults and the generated id. Like the other write helpers it
+        does not commit.
+
+        Args:
+            query (str): The SQL INSERT query string, ending in `RETURNING *`.
+            params (tuple, optional): A tuple of parameters to bind to the query. Defaults to an empty tuple.
+
+        Returns:
+            Any: The inserted row as a model instance (or a dictionary if `model_class` is None).
+
+        Raises:
+            ConflictError: If the statement violates a UNIQUE constraint or index.
+            Exception: If a `sqlite3.Error` occurs during insertion,
+                       the error is logged and re-raised as a generic Exception.
+        """
+        db = get_db()
+        try:
+            started_at = time.perf_counter()
+            row = db.execute(query, params).fetchone()
+            record_query(self.table_name, 'insert', query, (time.perf_counter() - started_at) * 1000, 1)
+            record_write(self.table_name, *self.side_effect_tables)
+            return dict(row) if self.model_class is None else self.model_class.from_row(row)
+        except sqlite3.Error as e:
+            self._raise_conflict(e)
             current_app.logger.error(f"Database error in {self.table_name} repository (insert): {e}", exc_info=True)
             raise Exception(f"Failed to insert into {self.table_name}.")
 
@@ -114,17 +262,231 @@ class BaseRepository:
             bool: True if the operation was successful and affected at least one row, False otherwise.
 
         Raises:
+            ConflictError: If the statement violates a UNIQUE constraint or index.
             Exception: If a `sqlite3.Error` occurs during the operation,
                        the transaction is rolled back, the error is logged, and re-raised.
         """
         db = get_db()
         try:
+            started_at = time.perf_counter()
             cursor = db.execute(query, params)
+            record_query(self.table_name, 'update/delete', query, (time.perf_counter() - started_at) * 1000, cursor.rowcount)
+            record_write(self.table_name, *self.side_effect_tables)
             return cursor.rowcount > 0 # Indicates if any row was affected by the operation.
         except sqlite3.Error as e:
+            self._raise_conflict(e)
             current_app.logger.error(f"Database error in {self.table_name} repository (update/delete): {e}", exc_info=True)
             raise Exception(f"Failed to update/delete from {self.table_name}.")
 
+    def _json_insert(self, columns):
+        """Builds `INSERT INTO <table> (columns) SELECT ... FROM json_each(?)`, shared by `_execute_many()` and `upsert_many()`."""
+        # `json_extract` rather than `->>`, which needs SQLite 3.38; both return the same scalars.
+        extracts = ', '.join(f"json_extract(value, '$.{column}')" for column in columns)
+        return f"INSERT INTO {self.table_name} ({', '.join(columns)}) SELECT {extracts} FROM json_each(?)"
+
+    def _execute_many(self, rows):
+        """
+        Inserts many rows with a single `INSERT ... SELECT ... RETURNING id` statement.
+
+        The rows are bound as one JSON array and expanded with `json_each()`, so a
+        batch is one statement (and one instrumented query) whatever its size. Like
+        the other write helpers it does not commit; the caller commits the whole
+        batch at once.
+
+        The IDs come from `RETURNING id`. The statement assigns each new row a higher
+        ID than the one before it, so the returned IDs are sorted back into the order
+        of `rows` (SQLite does not promise to return them in insertion order).
+
+        Args:
+            rows (list[dict]): Column names and values of the rows to insert; all must have the same keys.
+
+        Returns:
+            list[int]: The IDs of the inserted rows, in the order of `rows`.
+
+        Raises:
+            ConflictError: If the statement violates a UNIQUE constraint or index.
+            Exception: If a `sqlite3.Error` occurs during insertion,
+                       the error is logged and re-raised as a generic Exception.
+        """
+        if not rows:
+            return []
+        query = f"{self._json_insert(list(rows[0]))} RETURNING id"
+        db = get_db()
+        try:
+            started_at = time.perf_counter()
+            returned = db.execute(query, (json.dumps(rows),)).fetchall()
+            record_query(self.table_name, 'insert', query, (time.perf_counter() - started_at) * 1000, len(returned))
+            record_write(self.table_name, *self.side_effect_tables)
+            return sorted(row[0] for row in returned)
+        except sqlite3.Error as e:
+            self._raise_conflict(e)
+            current_app.logger.error(f"Database error in {self.table_name} repository (bulk insert): {e}", exc_info=True)
+            raise Exception(f"Failed to bulk insert into {self.table_name}.")
+
+    def _upsert_clause(self, update_columns):
+        """Builds the `ON CONFLICT ... DO UPDATE/NOTHING` clause shared by `upsert()` and `upsert_many()`."""
+        if not self.natural_key:
+            raise ValueError(f"Upserts are not supported for {self.table_name}.")
+        target = f"({', '.join(self.natural_key)})" + (f" WHERE {self.natural_key_where}" if self.natural_key_where else '')
+        if not update_columns:
+            return f"ON CONFLICT {target} DO NOTHING"
+        return f"ON CONFLICT {target} DO UPDATE SET " + ', '.join(f"{column} = excluded.{column}" for column in update_columns)
+
+    def upsert(self, values, update_columns=()):
+        """
+        Inserts a row, or updates the row that already has its natural key, in one statement.
+
+        Runs `INSERT ... ON CONFLICT (natural_key) DO UPDATE ... RETURNING id`, so there
+        is no separate lookup and no window in which a concurrent writer can insert
+        the same key: the unique index behind `natural_key` decides. The update fires
+        the table's UPDATE triggers like any other update. Like the other write
+        helpers it does not commit.
+
+        Args:
+            values (dict): Column names and values of the row to insert.
+            update_columns (tuple[str], optional): Columns overwritten with the new values when the
+                                                   row exists. Defaults to none: the existing row is
+                                                   kept (`DO NOTHING`).
+
+        Returns:
+            int | None: The ID of the inserted or updated row, or None if the row existed and
+                        no `update_columns` were given.
+
+        Raises:
+            ValueError: If the repository defines no `natural_key`.
+            ConflictError: If the statement violates a UNIQUE constraint or index.
+            Exception: If a `sqlite3.Error` occurs during the statement,
+                       the error is logged and re-raised as a generic Exception.
+        """
+        columns = list(values)
+        query = (
+            f"INSERT INTO {self.table_name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"{self._upsert_clause(update_columns)} RETURNING id"
+        )
+        db = get_db()
+        try:
+            started_at = time.perf_counter()
+            rows = db.execute(query, [values[column] for column in columns]).fetchall()
+            record_query(self.table_name, 'upsert', query, (time.perf_counter() - started_at) * 1000, len(rows))
+            record_write(self.table_name, *self.side_effect_tables)
+            return rows[0][0] if rows else None
+        except sqlite3.Error as e:
+            self._raise_conflict(e)
+            current_app.logger.error(f"Database error in {self.table_name} repository (upsert): {e}", exc_info=True)
+            raise Exception(f"Failed to upsert into {self.table_name}.")
+
+    def upsert_many(self, rows, update_columns=()):
+        """
+        Upserts many rows with a single `INSERT ... SELECT ... ON CONFLICT` statement.
+
+        The rows are bound as one JSON array and expanded with `json_each()`, so a
+        batch is one statement whatever its size. Rows repeating a natural key within
+        the batch resolve to the same record, the later one winning with `update_columns`;
+        only the first of them counts as having created it. The returned IDs are matched
+        to the rows by their natural key. Records with an ID above the table's largest ID
+        before the statement were created by it; the write lock is taken before that ID
+        is read (with one extra query), so no other writer can add a row in between.
+        Nothing is committed.
+
+        Args:
+            rows (list[dict]): The rows to upsert; all must have the same keys, including `natural_key`.
+            update_columns (tuple[str], optional): Columns overwritten when a row exists. Defaults to
+                                                   none (`DO NOTHING`).
+
+        Returns:
+            UpsertResult: In the order of `rows`, `ids` holds the ID of each row's inserted or updated
+                          record (None for rows that existed when no `update_columns` were given),
+                          and `existed` whether the record existed before the statement.
+
+        Raises:
+            ValueError: If the repository defines no `natural_key`.
+            ConflictError: If the statement violates a UNIQUE constraint or index.
+            Exception: If a `sqlite3.Error` occurs during the statement,
+                       the error is logged and re-raised as a generic Exception.
+        """
+        if not rows:
+            return UpsertResult([], [])
+        # `WHERE true` keeps the parser from reading ON CONFLICT as a join constraint.
+        query = (
+            f"{self._json_insert(list(rows[0]))} WHERE true {self._upsert_clause(update_columns)} "
+            f"RETURNING id, {', '.join(self.natural_key)}"
+        )
+        db = get_db()
+        try:
+            if not db.in_transaction:
+                db.execute("BEGIN IMMEDIATE") # Holds the write lock from before the ID below is read.
+            last_id = self._execute_query(f"SELECT COALESCE(MAX(id), 0) FROM {self.table_name}", fetch_one=True)
+            started_at = time.perf_counter()
+            returned = db.execute(query, (json.dumps(rows),)).fetchall()
+            record_query(self.table_name, 'upsert', query, (time.perf_counter() - started_at) * 1000, len(returned))
+            record_write(self.table_name, *self.side_effect_tables)
+        except sqlite3.Error as e:
+            self._raise_conflict(e)
+            current_app.logger.error(f"Database error in {self.table_name} repository (bulk upsert): {e}", exc_info=True)
+            raise Exception(f"Failed to bulk upsert into {self.table_name}.")
+        by_key = {tuple(row[1:]): row[0] for row in returned}
+        ids, existed, seen = [], [], set()
+        for row in rows:
+            key = tuple(row[column] for column in self.natural_key)
+            ids.append(by_key.get(key))
+            # Only the first row of a repeated key can have created its record; later rows updated it.
+            existed.append(ids[-1] is None or ids[-1] <= last_id or key in seen)
+            seen.add(key)
+        return UpsertResult(ids, existed)
+
+    def validate_bulk_rows(self, rows):
+        """
+        Validates a bulk payload against the repository's `bulk_schema`.
+
+        Besides the per-field checks of `validate_rows()`, rows repeating the
+        `natural_key` of an earlier row are rejected, since both would write the
+        same record, and values of fields that reference another table are checked
+        for existence with one query per referenced table, instead of one lookup per row.
+
+        Args:
+            rows (list): The decoded JSON array.
+
+        Returns:
+            tuple: `(valid, errors)` as returned by `validate_rows()`, with repeated natural keys
+                   and rows referencing missing or inactive records moved to `errors`.
+
+        Raises:
+            ValueError: If the repository does not support bulk creation.
+            Exception: If a reference lookup fails (see `_execute_query()`).
+        """
+        if not self.bulk_schema:
+            raise ValueError(f"Bulk creation is not supported for {self.table_name}.")
+        valid, errors = validate_rows(rows, self.bulk_schema)
+        if self.natural_key:
+            first_rows, still_valid = {}, []
+            for index, row in valid:
+                key = tuple(row[column] for column in self.natural_key)
+                if key in first_rows:
+                    errors[index] = [f"Repeats the {', '.join(self.natural_key)} of row {first_rows[key]}."]
+                else:
+                    first_rows[key] = index
+                    still_valid.append((index, row))
+            valid = still_valid
+        for field in self.bulk_schema:
+            if not field.references:
+                continue
+            wanted = {row[field.name] for _, row in valid if row[field.name] is not None}
+            if not wanted:
+                continue
+            # json_each() binds the whole ID set as one parameter, avoiding SQLite's variable limit.
+            found = {r['id'] for r in self._execute_query(
+                f"SELECT id FROM {field.references} WHERE is_active = 1 AND id IN (SELECT value FROM json_each(?))",
+                (json.dumps(sorted(wanted)),), fetch_all_dicts=True
+            )}
+            still_valid = []
+            for index, row in valid:
+                if row[field.name] is not None and row[field.name] not in found:
+                    errors[index] = [f"'{field.name}' {row[field.name]} does not exist."]
+                else:
+                    still_valid.append((index, row))
+            valid = still_valid
+        return valid, errors
+
     def get_all(self, include_inactive=False):
         """
         Retrieves all records from the managed table.
@@ -141,6 +503,147 @@ class BaseRepository:
             query += " WHERE is_active = 1"
         return self._execute_query(query)
 
+    def _list_query(self):
+        """
+        Returns the query that lists the active records of this repository.
+
+        Repositories whose listing joins other tables override this method; it is
+        shared by their `get_all_*` method and by `get_page()`. The query must
+        select every `page_key` column by name and must not have an ORDER BY clause.
+
+        Returns:
+            tuple: The SQL string and its parameters.
+        """
+        return f"SELECT * FROM {self.table_name} WHERE is_active = 1", ()
+
+    def select_fields(self, fields):
+        """
+        Validates a client-requested field list against the repository's whitelist.
+
+        The `page_key` columns (normally just `id`) are always included so that
+        records stay identifiable and pages can be continued.
+
+        Args:
+            fields (str | list[str]): Comma-separated field names (as received in `?fields=`) or a list of names.
+
+        Returns:
+            list[str]: The fields to select, key columns first, without duplicates.
+
+        Raises:
+            ValueError: If projection is not supported by this repository, no field
+                        was given, or a field is not in `list_fields`.
+        """
+        if not self.list_fields:
+            raise ValueError(f"Field selection is not supported for {self.table_name}.")
+        if isinstance(fields, str):
+            fields = [field.strip() for field in fields.split(',')]
+        fields = [field for field in fields if field]
+        if not fields:
+            raise ValueError("'fields' must name at least one field.")
+        unknown = [field for field in fields if field not in self.list_fields]
+        if unknown:
+            raise ValueError(f"Unknown field(s) for {self.table_name}: {', '.join(unknown)}. "
+                             f"Allowed: {', '.join(self.list_fields)}.")
+        selected = list(self.page_key)
+        selected += [field for field in fields if field not in selected]
+        return selected
+
+    def _project(self, fields):
+        """
+        Builds the select list of the wrapped listing query.
+
+        Args:
+            fields (list[str] | None): Fields returned by `select_fields()`, or None for every column.
+
+        Returns:
+            str: `*` or a comma-separated list of `page.<field>` columns.
+        """
+        return ', '.join(f"page.{field}" for field in fields) if fields else '*'
+
+    def _projected_row(self, row):
+        """Converts a projected row into a dictionary, mapping boolean flags like `to_dict()` does."""
+        record = dict(row)
+        for field in BOOLEAN_FIELDS.intersection(record):
+            if record[field] is not None:
+                record[field] = bool(record[field])
+        return record
+
+    def iter_list(self, batch_size=500, fields=None):
+        """
+        Yields every active record of the listing query without materializing the list.
+
+        Produces the same records as the repository's `get_all_*` method (model
+        instances, or dictionaries if `page_as_dicts`), ordered by `page_key`.
+        With `fields`, only those columns are selected and plain dictionaries are yielded.
+
+        Args:
+            batch_size (int, optional): Number of rows fetched from SQLite per round trip. Defaults to 500.
+            fields (list[str], optional): Fields returned by `select_fields()`. Defaults to all fields.
+
+        Yields:
+            Any: One record at a time.
+        """
+        query, params = self._list_query()
+        direction = 'DESC' if self.page_descending else 'ASC'
+        order_by = ', '.join(f"page.{column} {direction}" for column in self.page_key)
+        rows = self._iter_query(f"SELECT {self._project(fields)} FROM ({query}) AS page ORDER BY {order_by}", params,
+                                batch_size=batch_size, as_dicts=self.page_as_dicts or bool(fields))
+        if fields:
+            rows = (self._projected_row(row) for row in rows)
+        yield from rows
+
+    def get_page(self, limit, after=None, fields=None):
+        """
+        Retrieves one page of active records using keyset (cursor) pagination.
+
+        The listing query is wrapped as `SELECT * FROM (<list query>) WHERE <key> > <cursor>
+        ORDER BY <key> LIMIT <limit + 1>`. SQLite flattens the subquery, so the key
+        condition becomes an index range seek and the cost of a page does not grow
+        with how far the client has paged, unlike `OFFSET`. Because of the same
+        flattening, selecting only `fields` means the other columns are never read.
+
+        Args:
+            limit (int): The maximum number of records to return.
+            after (str, optional): The `next_cursor` returned with the previous page.
+                                   Omit it to fetch the first page.
+            fields (list[str], optional): Fields returned by `select_fields()`. Defaults to all fields.
+
+        Returns:
+            tuple: A list of records (model instances, or dictionaries if `page_as_dicts`
+                   or `fields` is given) and the cursor of the next page, or None if this
+                   is the last page.
+
+        Raises:
+            ValueError: If `after` is not a valid cursor for this repository.
+        """
+        query, params = self._list_query()
+        key_columns = ', '.join(f"page.{column}" for column in self.page_key)
+        direction = 'DESC' if self.page_descending else 'ASC'
+        page_query = f"SELECT {self._project(fields)} FROM ({query}) AS page"
+        params = tuple(params)
+        if after is not None:
+            values = decode_cursor(after, len(self.page_key))
+            placeholders = ', '.join('?' for _ in self.page_key)
+            comparison = '<' if self.page_descending else '>'
+            if len(self.page_key) == 1:
+                page_query += f" WHERE {key_columns} {comparison} ?"
+            else:
+                page_query += f" WHERE ({key_columns}) {comparison} ({placeholders})"
+            params += tuple(values)
+        page_query += f" ORDER BY {', '.join(f'page.{column} {direction}' for column in self.page_key)} LIMIT ?"
+        params += (limit + 1,) # Fetch one extra row to find out whether another page exists.
+
+        rows = self._execute_query(page_query, params, fetch_all_dicts=True)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1][column] for column in self.page_key])
+        if fields:
+            rows = [self._projected_row(row) for row in rows]
+        elif not self.page_as_dicts and self.model_class is not None:
+            rows = [self.model_class.from_row(row) for row in rows]
+        return rows, next_cursor
+
     def get_by_id(self, item_id, include_inactive=False):
         """
         Retrieves a single record by its ID from the managed table.
@@ -0,0 +1,149 @@
+"""
+Detection Job Repository module for the stress-event and alert detection queue.
+
+This module defines the `DetectionJobRepository` class, which manages the
+`detection_jobs` table created by migration `0008_detection_jobs.sql`. Survey
+writes enqueue a job instead of running the detection queries inline, and the
+worker started by `flask worker` (see `utils/detection_worker.py`) claims the
+jobs in batches, runs the set-based checks of `SurveyResponseRepository` and
+completes them in the same transaction.
+
+Claims use a visibility timeout rather than a status column: claiming moves
+`available_at` to the end of the lease, so a job held by a worker that died is
+claimed again once the lease expires. Delivery is therefore at-least-once, and
+the detection inserts skip events and alerts that already exist.
+"""
+
+import json
+import time
+from .base_repository import BaseRepository
+
+class DetectionJobRepository(BaseRepository):
+    """
+    Repository for the detection job queue.
+
+    Inherits from `BaseRepository` for its query execution and error handling.
+    """
+    def __init__(self):
+        """
+        Initializes the DetectionJobRepository.
+
+        Sets the table name to 'detection_jobs' and `model_class` to None, as
+        results are returned as dictionaries.
+        """
+        super().__init__('detection_jobs', None)
+
+    def enqueue(self, survey_response_id: int) -> int:
+        """
+        Enqueues detection for a survey response.
+
+        Does not commit; the caller commits the job together with the survey
+        response, so a stored response always has its detection pending.
+
+        Args:
+            survey_response_id (int): The ID of the created or updated survey response.
+
+        Returns:
+            int: The ID of the new job.
+        """
+        now = time.time()
+        return self._execute_insert(
+            "INSERT INTO detection_jobs (survey_response_id, enqueued_at, available_at) VALUES (?, ?, ?)",
+            (survey_response_id, now, now)
+        )
+
+    def claim(self, worker_id: str, limit: int = 100, lease_seconds: float = 60.0) -> list[dict]:
+        """
+        Claims up to `limit` available jobs, oldest first, for `lease_seconds`.
+
+        The claim is a single `UPDATE ... RETURNING`, so concurrent workers never
+        claim the same job within a lease. Does not commit; the caller commits the
+        claim before processing so that other workers see it.
+
+        Args:
+            worker_id (str): Identifies the claiming worker.
+            limit (int, optional): Maximum number of jobs to claim. Defaults to 100.
+            lease_seconds (float, optional): Seconds before an unfinished job may be claimed again. Defaults to 60.
+
+        Returns:
+            list[dict]: The claimed jobs (`id`, `survey_response_id`, `enqueued_at`, `attempts`), oldest first.
+        """
+        now = time.time()
+        query = """
+            UPDATE detection_jobs SET available_at = :lease_end, claimed_by = :worker_id, attempts = attempts + 1
+            WHERE id IN (
+                SELECT id FROM detection_jobs WHERE available_at <= :now ORDER BY available_at, id LIMIT :limit
+            )
+            RETURNING id, survey_response_id, enqueued_at, attempts
+        """
+        rows = self._execute_query(query, {'now': now, 'lease_end': now + lease_seconds, 'worker_id': worker_id, 'limit': limit},
+                                   fetch_all_dicts=True)
+        return sorted(rows, key=lambda row: row['id']) # RETURNING gives no order guarantee.
+
+    def complete(self, job_ids: list[int], worker_id: str) -> bool:
+        """
+        Deletes finished jobs that are still leased by `worker_id`.
+
+        Does not commit; the caller commits in the same transaction as the
+        detection results. A job whose lease expired and was claimed by another
+        worker is left to that worker.
+
+        Args:
+            job_ids (list[int]): The IDs of the processed jobs.
+            worker_id (str): The worker that processed them.
+
+        Returns:
+            bool: True if any job was deleted, False otherwise.
+        """
+        query = "DELETE FROM detection_jobs WHERE id IN (SELECT value FROM json_each(?)) AND claimed_by = ?"
+        return self._execute_update_delete(query, (json.dumps(job_ids), worker_id))
+
+    def release(self, job_ids: list[int], worker_id: str, error: str, retry_delay: float = 30.0, max_attempts: int = 5) -> None:
+        """
+        Returns failed jobs to the queue after `retry_delay` seconds.
+
+        Jobs that have been attempted `max_attempts` times are parked instead
+        (`available_at` NULL) and keep `error` for inspection. Does not commit.
+
+        Args:
+            job_ids (list[int]): The IDs of the jobs whose processing failed.
+            worker_id (str): The worker that held them.
+            error (str): Description of the failure.
+            retry_delay (float, optional): Seconds before the jobs may be claimed again. Defaults to 30.
+            max_attempts (int, optional): Attempts after which a job is parked. Defaults to 5.
+        """
+        query = """
+            UPDATE detection_jobs
+            SET available_at = CASE WHEN attempts >= :max_attempts THEN NULL ELSE :retry_at END,
+                claimed_by = NULL, last_error = :error
+            WHERE id IN (SELECT value FROM json_each(:ids)) AND claimed_by = :worker_id
+        """
+        self._execute_update_delete(query, {'max_attempts': max_attempts, 'retry_at': time.time() + retry_delay,
+                                            'error': error, 'ids': json.dumps(job_ids), 'worker_id': worker_id})
+
+    def get_stats(self) -> dict:
+        """
+        Reports the depth and lag of the queue.
+
+        Returns:
+            dict: `pending` (jobs waiting or leased), `ready` (claimable now), `leased`
+                  (held by a worker whose lease has not expired), `failed` (parked after
+                  their last attempt), `oldest_enqueued_at` (Unix time of the oldest
+                  pending job, or None) and `lag_seconds` (its age, 0 when the queue is empty).
+        """
+        now = time.time()
+        query = """
+            SELECT COUNT(available_at) AS pending,
+                   COUNT(*) FILTER (WHERE available_at <= :now) AS ready,
+                   COUNT(*) FILTER (WHERE available_at > :now AND claimed_by IS NOT NULL) AS leased,
+                   COUNT(*) FILTER (WHERE available_at IS NULL) AS failed,
+                   MIN(enqueued_at) FILTER (WHERE available_at IS NOT NULL) AS oldest_enqueued_at
+            FROM detection_jobs
+        """
+        stats = self._execute_query(query, {'now': now}, fetch_one=True, fetch_all_dicts=True)
+        oldest = stats['oldest_enqueued_at']
+        stats['lag_seconds'] = round(max(now - oldest, 0.0), 3) if oldest is not None else 0.0
+        return stats
+
+# Instantiate the repository for use throughout the application.
+detection_job_repository = DetectionJobRepository()
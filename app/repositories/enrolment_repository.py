@@ -21,6 +21,10 @@ class EnrolmentRepository(BaseRepository):
     and error handling. Provides specific methods for querying and managing
     student enrolments.
     """
+    # Fields clients may select with `?fields=`.
+    list_fields = ('id', 'student_id', 'module_id', 'enrol_date', 'is_active', 'student_name', 'module_title')
+    page_as_dicts = True # Pages contain the joined student and module details, like get_all_*().
+
     def __init__(self):
         """
         Initializes the EnrolmentRepository.
@@ -29,14 +33,14 @@ class EnrolmentRepository(BaseRepository):
         """
         super().__init__('enrolments', Enrolment)
 
-    def get_all_enrolments(self) -> list[dict]:
+    def _list_query(self) -> tuple[str, tuple]:
         """
-        Retrieves all active enrolments from the database, including associated
-        student and module information for richer context.
+        Returns the query listing all active enrolments with their student and module details.
+
+        Shared by `get_all_enrolments()` and the paginated `get_page()`.
 
         Returns:
-            list[dict]: A list of dictionaries, where each dictionary represents
-                        an enrolment with joined student and module details.
+            tuple[str, tuple]: The SQL string and its parameters.
         """
         query = """
             SELECT e.id, e.student_id, e.module_id, e.enrol_date, e.is_active,
@@ -46,8 +50,20 @@ class EnrolmentRepository(BaseRepository):
             JOIN modules m ON e.module_id = m.id
             WHERE e.is_active = 1
         """
+        return query, ()
+
+    def get_all_enrolments(self) -> list[dict]:
+        """
+        Retrieves all active enrolments from the database, including associated
+        student and module information for richer context.
+
+        Returns:
+            list[dict]: A list of dictionaries, where each dictionary represents
+                        an enrolment with joined student and module details.
+        """
+        query, params = self._list_query()
         # _execute_query handles exceptions and returns results as dictionaries due to fetch_all_dicts=True.
-        return self._execute_query(query, fetch_all_dicts=True)
+        return self._execute_query(query, params, fetch_all_dicts=True)
 
     def get_enrolment_by_id(self, enrolment_id: int) -> Enrolment | None:
         """
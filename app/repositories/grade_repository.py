@@ -10,6 +10,7 @@ retrieving records with joined student and module information.
 import sqlite3
 from app.db_connection import get_db
 from app.models.grade import Grade
+from app.utils.bulk import BulkField
 from .base_repository import BaseRepository
 
 class GradeRepository(BaseRepository):
@@ -20,6 +21,19 @@ class GradeRepository(BaseRepository):
     and error handling. Provides specific methods for querying and managing
     student grades for various assessments.
     """
+    # Fields clients may select with `?fields=`.
+    list_fields = ('id', 'student_id', 'module_id', 'assessment_name', 'grade', 'is_active', 'student_name', 'module_title')
+    page_as_dicts = True # Pages contain the joined student and module details, like get_all_*().
+    # The metrics and histogram triggers of migrations 0005 and 0007 keep these in step with every write.
+    side_effect_tables = ('student_metrics', 'student_module_metrics', 'metric_histograms')
+    # Fields accepted by `POST /api/admin/grades/bulk`.
+    bulk_schema = (
+        BulkField('student_id', int, references='students'),
+        BulkField('module_id', int, references='modules'),
+        BulkField('assessment_name', str),
+        BulkField('grade', float, minimum=0, maximum=100),
+    )
+
     def __init__(self):
         """
         Initializes the GradeRepository.
@@ -28,14 +42,14 @@ class GradeRepository(BaseRepository):
         """
         super().__init__('grades', Grade)
 
-    def get_all_grades(self) -> list[dict]:
+    def _list_query(self) -> tuple[str, tuple]:
         """
-        Retrieves all active grades from the database, including associated
-        student and module information for richer context.
+        Returns the query listing all active grades with their student and module details.
+
+        Shared by `get_all_grades()` and the paginated `get_page()`.
 
         Returns:
-            list[dict]: A list of dictionaries, where each dictionary represents
-                        a grade with joined student and module details.
+            tuple[str, tuple]: The SQL string and its parameters.
         """
         query = """
             SELECT g.id, g.student_id, g.module_id, g.assessment_name, g.grade, g.is_active,
@@ -45,8 +59,20 @@ class GradeRepository(BaseRepository):
             JOIN modules m ON g.module_id = m.id
             WHERE g.is_active = 1
         """
+        return query, ()
+
+    def get_all_grades(self) -> list[dict]:
+        """
+        Retrieves all active grades from the database, including associated
+        student and module information for richer context.
+
+        Returns:
+            list[dict]: A list of dictionaries, where each dictionary represents
+                        a grade with joined student and module details.
+        """
+        query, params = self._list_query()
         # _execute_query handles exceptions and returns results as dictionaries due to fetch_all_dicts=True.
-        return self._execute_query(query, fetch_all_dicts=True)
+        return self._execute_query(query, params, fetch_all_dicts=True)
 
     def get_grade_by_id(self, grade_id: int) -> Grade | None:
         """
@@ -77,6 +103,22 @@ class GradeRepository(BaseRepository):
         grade_id = self._execute_insert(query, (student_id, module_id, assessment_name, grade))
         return self.get_grade_by_id(grade_id)
 
+    def bulk_create_grades(self, rows: list[dict]) -> list[int]:
+        """
+        Inserts many grade records with a single statement.
+
+        The rows must already be validated (see `validate_bulk_rows()`). Nothing is
+        committed; the caller commits the batch as one transaction.
+
+        Args:
+            rows (list[dict]): Validated rows with the keys of `bulk_schema`.
+
+        Returns:
+            list[int]: The IDs of the new grades, in the order of `rows`.
+        """
+        return self._execute_many([{'student_id': row['student_id'], 'module_id': row['module_id'], 'assessment_name': row['assessment_name'],
+                                    'grade': row['grade'], 'is_active': 1} for row in rows])
+
     def update_grade(self, grade_id: int, student_id: int, module_id: int, assessment_name: str, grade: float) -> Grade:
         """
         Updates an existing grade record in the database.
@@ -0,0 +1,101 @@
+"""
+Metric Histogram Repository module for the percentile sketches read model.
+
+This module defines the `MetricHistogramRepository` class, which maintains the
+`metric_histograms` table created by migration `0007_metric_histograms.sql`.
+The table is a sparse, fixed-resolution histogram (a mergeable quantile
+sketch) of attendance rate, grade and stress level for every cohort, module and
+week group, kept current by triggers, so percentiles and percentile ranks are
+read from a few hundred bins instead of sorting every student or record.
+
+`rebuild()` recomputes the table from the metrics read model and the base
+tables (used by `flask rebuild-metrics`), and `find_drift()` reports the groups
+whose stored bins no longer match a fresh aggregation. The percentiles
+themselves are read by `AnalysisRepository`.
+"""
+
+from .base_repository import BaseRepository
+
+# Bins per unit of the stored value: attendance (0-1) in half percentage points,
+# grades in half points and stress averages in hundredths.
+HISTOGRAM_SCALES = {'attendance': 200, 'grade': 2, 'stress': 100}
+
+def _average_buckets(table, scope, scope_id):
+    """Selects the bins of the per-student averages in `table` (one SELECT per metric)."""
+    return [
+        f"SELECT '{metric}' AS metric, '{scope}' AS scope, {scope_id} AS scope_id, "
+        f"CAST(m.{metric}_sum / m.{metric}_count * {scale} AS INTEGER) AS bucket "
+        f"FROM {table} m JOIN students s ON s.id = m.student_id WHERE s.is_active = 1 AND m.{metric}_count > 0"
+        for metric, scale in HISTOGRAM_SCALES.items()
+    ]
+
+# Aggregates the metrics tables and the base tables into the layout of `metric_histograms`.
+HISTOGRAM_AGGREGATE_QUERY = "SELECT metric, scope, scope_id, bucket, COUNT(*) AS count FROM (\n    " + "\n    UNION ALL ".join(
+    _average_buckets('student_metrics', 'cohort', '0') + _average_buckets('student_module_metrics', 'module', 'm.module_id') + [
+        f"SELECT 'stress', 'week', week_number, CAST(stress_level * {HISTOGRAM_SCALES['stress']} AS INTEGER) "
+        "FROM survey_responses WHERE is_active = 1",
+        f"SELECT 'attendance', 'week', week_number, CAST(attendance_rate * {HISTOGRAM_SCALES['attendance']} AS INTEGER) "
+        "FROM attendance_records WHERE is_active = 1 AND attendance_rate IS NOT NULL",
+    ]) + "\n)\nGROUP BY metric, scope, scope_id, bucket"
+
+# Statements that recompute the sketches from scratch. They read `student_metrics`,
+# so they must run after the metrics tables are rebuilt.
+REBUILD_STATEMENTS = (
+    "DELETE FROM metric_histograms",
+    f"INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count) {HISTOGRAM_AGGREGATE_QUERY}",
+)
+
+class MetricHistogramRepository(BaseRepository):
+    """
+    Repository for the percentile sketches read model.
+
+    Inherits from `BaseRepository` for its query execution and error handling.
+    """
+    def __init__(self):
+        """
+        Initializes the MetricHistogramRepository.
+
+        Sets the table name to 'metric_histograms' and `model_class` to None, as
+        results are returned as dictionaries.
+        """
+        super().__init__('metric_histograms', None)
+
+    def rebuild(self) -> int:
+        """
+        Recomputes `metric_histograms` from the metrics tables and the base tables.
+
+        Only needed to repair drift; the triggers keep the table current otherwise.
+        Does not commit; the caller commits so that readers never see the table empty.
+
+        Returns:
+            int: The number of occupied bins written.
+        """
+        for statement in REBUILD_STATEMENTS:
+            self._execute_update_delete(statement)
+        return self._execute_query("SELECT COUNT(*) FROM metric_histograms", fetch_one=True) or 0
+
+    def find_drift(self) -> list[tuple[str, str, int]]:
+        """
+        Lists the groups whose stored bins differ from a fresh aggregation.
+
+        Bins whose count dropped to zero are equivalent to missing bins.
+
+        Returns:
+            list[tuple[str, str, int]]: The `(metric, scope, scope_id)` groups with drifted bins, in ascending order.
+        """
+        query = f"""
+            WITH fresh AS ({HISTOGRAM_AGGREGATE_QUERY}),
+            stored AS (SELECT * FROM metric_histograms WHERE count != 0),
+            stale AS (SELECT metric, scope, scope_id, bucket, count FROM stored
+                      EXCEPT SELECT metric, scope, scope_id, bucket, count FROM fresh),
+            missing AS (SELECT metric, scope, scope_id, bucket, count FROM fresh
+                        EXCEPT SELECT metric, scope, scope_id, bucket, count FROM stored)
+            SELECT metric, scope, scope_id FROM stale
+            UNION SELECT metric, scope, scope_id FROM missing
+            ORDER BY metric, scope, scope_id
+        """
+        rows = self._execute_query(query, fetch_all_dicts=True)
+        return [(row['metric'], row['scope'], row['scope_id']) for row in rows]
+
+# Instantiate the repository for use throughout the application.
+metric_histogram_repository = MetricHistogramRepository()
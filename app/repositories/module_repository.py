@@ -20,6 +20,11 @@ class ModuleRepository(BaseRepository):
     and error handling. Provides specific methods for querying and managing
     academic modules.
     """
+    # Fields clients may select with `?fields=`.
+    list_fields = ('id', 'module_code', 'module_title', 'credit', 'academic_year', 'is_active')
+    # The rollups trigger of migration 0006 copies `academic_year` into the module's rollups.
+    side_effect_tables = ('module_week_rollups',)
+
     def __init__(self):
         """
         Initializes the ModuleRepository.
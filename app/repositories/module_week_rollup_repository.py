@@ -0,0 +1,110 @@
+"""
+Module Week Rollup Repository module for the per-module, per-week analytics read model.
+
+This module defines the `ModuleWeekRollupRepository` class, which maintains the
+`module_week_rollups` table created by migration `0006_module_week_rollups.sql`.
+The table holds the count, sum and sum of squares of stress level, hours slept
+and attendance rate per module and week, kept current by triggers on
+`survey_responses` and `attendance_records`, so module-week heatmaps and module
+trend lines read one row per module and week instead of every event row.
+
+`rebuild()` recomputes the table from the base tables (used by
+`flask rebuild-metrics`), and `find_drift()` reports the module-weeks whose
+stored rollups no longer match a fresh aggregation. The analytics themselves
+are read by `AnalysisRepository`.
+"""
+
+from .base_repository import BaseRepository
+
+ROLLUP_COLUMNS = ('stress_count', 'stress_sum', 'stress_sumsq', 'sleep_count', 'sleep_sum', 'sleep_sumsq',
+                  'attendance_count', 'attendance_sum', 'attendance_sumsq')
+
+# Aggregates the base tables into the column layout of `module_week_rollups`.
+ROLLUP_AGGREGATE_QUERY = f"""
+    SELECT r.module_id, r.week_number, m.academic_year, {', '.join(f'SUM({c}) AS {c}' for c in ROLLUP_COLUMNS)}
+    FROM (
+        SELECT module_id, week_number, COUNT(*) AS stress_count, TOTAL(stress_level) AS stress_sum,
+               TOTAL(stress_level * stress_level) AS stress_sumsq, COUNT(hours_slept) AS sleep_count,
+               TOTAL(hours_slept) AS sleep_sum, TOTAL(hours_slept * hours_slept) AS sleep_sumsq,
+               0 AS attendance_count, 0 AS attendance_sum, 0 AS attendance_sumsq
+        FROM survey_responses WHERE is_active = 1 AND module_id IS NOT NULL GROUP BY module_id, week_number
+        UNION ALL
+        SELECT module_id, week_number, 0, 0, 0, 0, 0, 0,
+               COUNT(attendance_rate), TOTAL(attendance_rate), TOTAL(attendance_rate * attendance_rate)
+        FROM attendance_records WHERE is_active = 1 AND attendance_rate IS NOT NULL GROUP BY module_id, week_number
+    ) r
+    JOIN modules m ON m.id = r.module_id
+    GROUP BY r.module_id, r.week_number
+"""
+
+# Statements that recompute the rollups from scratch.
+REBUILD_STATEMENTS = (
+    "DELETE FROM module_week_rollups",
+    f"INSERT INTO module_week_rollups (module_id, week_number, academic_year, {', '.join(ROLLUP_COLUMNS)}) {ROLLUP_AGGREGATE_QUERY}",
+)
+
+class ModuleWeekRollupRepository(BaseRepository):
+    """
+    Repository for the per-module, per-week rollups read model.
+
+    Inherits from `BaseRepository` for its query execution and error handling.
+    """
+    def __init__(self):
+        """
+        Initializes the ModuleWeekRollupRepository.
+
+        Sets the table name to 'module_week_rollups' and `model_class` to None, as
+        results are returned as dictionaries.
+        """
+        super().__init__('module_week_rollups', None)
+
+    def rebuild(self) -> int:
+        """
+        Recomputes `module_week_rollups` from the base tables.
+
+        Only needed to repair drift; the triggers keep the table current otherwise.
+        Does not commit; the caller commits so that readers never see the table empty.
+
+        Returns:
+            int: The number of module-week rows written.
+        """
+        for statement in REBUILD_STATEMENTS:
+            self._execute_update_delete(statement)
+        return self._execute_query("SELECT COUNT(*) FROM module_week_rollups", fetch_one=True) or 0
+
+    def find_drift(self, tolerance: float = 1e-6) -> list[tuple[int, int]]:
+        """
+        Lists the module-weeks whose stored rollups differ from a fresh aggregation.
+
+        Counts and the academic year must match exactly; sums may differ by `tolerance`
+        (relative to the magnitude of the sum, as sums of squares grow large), since
+        adding and subtracting floating-point values in a different order rounds differently.
+
+        Args:
+            tolerance (float, optional): Largest accepted relative difference of a sum. Defaults to 1e-6.
+
+        Returns:
+            list[tuple[int, int]]: The `(module_id, week_number)` pairs with drifted rollups, in ascending order.
+        """
+        differs = ' OR '.join(
+            f"COALESCE(s.{c}, 0) != COALESCE(f.{c}, 0)" if c.endswith('_count')
+            else f"ABS(COALESCE(s.{c}, 0) - COALESCE(f.{c}, 0)) > :tolerance * MAX(1, ABS(COALESCE(f.{c}, 0)))"
+            for c in ROLLUP_COLUMNS
+        )
+        # Rows whose counts all dropped to zero are equivalent to missing rows.
+        query = f"""
+            WITH fresh AS ({ROLLUP_AGGREGATE_QUERY}),
+            stored AS (SELECT * FROM module_week_rollups WHERE stress_count != 0 OR sleep_count != 0 OR attendance_count != 0),
+            keys AS (SELECT module_id, week_number FROM stored UNION SELECT module_id, week_number FROM fresh)
+            SELECT k.module_id, k.week_number
+            FROM keys k
+            LEFT JOIN stored s ON s.module_id = k.module_id AND s.week_number = k.week_number
+            LEFT JOIN fresh f ON f.module_id = k.module_id AND f.week_number = k.week_number
+            WHERE {differs} OR s.academic_year IS NOT f.academic_year
+            ORDER BY k.module_id, k.week_number
+        """
+        rows = self._execute_query(query, {'tolerance': tolerance}, fetch_all_dicts=True)
+        return [(row['module_id'], row['week_number']) for row in rows]
+
+# Instantiate the repository for use throughout the application.
+module_week_rollup_repository = ModuleWeekRollupRepository()
@@ -21,6 +21,9 @@ class StressEventRepository(BaseRepository):
     and error handling. Provides specific methods for querying and managing
     records of student stress events.
     """
+    # At most one stress event per survey response (migration 0010). Events without one are never in conflict.
+    natural_key = ('survey_response_id',)
+
     def __init__(self):
         """
         Initializes the StressEventRepository.
@@ -54,6 +57,10 @@ class StressEventRepository(BaseRepository):
         """
         Creates a new stress event record in the database.
 
+        An event for a survey response that already has one replaces that event's
+        details (and reactivates it) instead of adding a second one; the write is a
+        single upsert on `survey_response_id`.
+
         Args:
             student_id (int): The ID of the student experiencing the event.
             module_id (int | None): The ID of the module related to the event (can be None).
@@ -65,14 +72,13 @@ class StressEventRepository(BaseRepository):
             source (str): The source that identified the stress event (e.g., 'system', 'survey').
 
         Returns:
-            StressEvent: The newly created `StressEvent` object.
-        """
-        created_at = datetime.now(timezone.utc).isoformat() # Set creation timestamp.
-        query = """
-            INSERT INTO stress_events (student_id, module_id, survey_response_id, week_number, stress_level, cause_category, description, source, created_at, is_active) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+            StressEvent: The created (or updated) `StressEvent` object.
         """
-        event_id = self._execute_insert(query, (student_id, module_id, survey_response_id, week_number, stress_level, cause_category, description, source, created_at))
+        created_at = datetime.now(timezone.utc).isoformat() # Set creation timestamp; kept when an event is updated.
+        values = {'student_id': student_id, 'module_id': module_id, 'survey_response_id': survey_response_id, 'week_number': week_number,
+                  'stress_level': stress_level, 'cause_category': cause_category, 'description': description, 'source': source,
+                  'created_at': created_at, 'is_active': 1}
+        event_id = self.upsert(values, [column for column in values if column not in ('survey_response_id', 'created_at')])
         return self.get_stress_event_by_id(event_id)
 
     def update_stress_event(self, event_id: int, student_id: int, module_id: int | None, survey_response_id: int | None, week_number: int, stress_level: int, cause_category: str, description: str | None, source: str) -> StressEvent:
@@ -0,0 +1,137 @@
+"""
+Student Metrics Repository module for the incrementally maintained analytics read model.
+
+This module defines the `StudentMetricsRepository` class, which reads the
+`student_metrics` and `student_module_metrics` tables created by migration
+`0005_student_metrics.sql`. The tables hold running sums and counts of
+attendance rate, grade and stress level per student (and per student and
+module) and are kept current by triggers on the underlying tables, so analytics
+can read one row per student instead of aggregating every event row.
+
+`rebuild()` recomputes both tables from the base tables (used by
+`flask rebuild-metrics`), and `find_drift()` reports students whose stored
+metrics no longer match a fresh aggregation.
+"""
+
+from .base_repository import BaseRepository
+
+# Aggregates the base tables into the column layout of the metrics tables.
+# `{key}` is the grouping key: `student_id` or `student_id, module_id`.
+_AGGREGATE_QUERY = """
+    SELECT {key}, SUM(attendance_sum) AS attendance_sum, SUM(attendance_count) AS attendance_count,
+           SUM(grade_sum) AS grade_sum, SUM(grade_count) AS grade_count,
+           SUM(stress_sum) AS stress_sum, SUM(stress_count) AS stress_count
+    FROM (
+        SELECT {key}, TOTAL(attendance_rate) AS attendance_sum, COUNT(attendance_rate) AS attendance_count,
+               0 AS grade_sum, 0 AS grade_count, 0 AS stress_sum, 0 AS stress_count
+        FROM attendance_records WHERE is_active = 1 AND attendance_rate IS NOT NULL {module_filter} GROUP BY {key}
+        UNION ALL
+        SELECT {key}, 0, 0, TOTAL(grade), COUNT(grade), 0, 0
+        FROM grades WHERE is_active = 1 AND grade IS NOT NULL {module_filter} GROUP BY {key}
+        UNION ALL
+        SELECT {key}, 0, 0, 0, 0, TOTAL(stress_level), COUNT(stress_level)
+        FROM survey_responses WHERE is_active = 1 {module_filter} GROUP BY {key}
+    )
+    GROUP BY {key}
+"""
+STUDENT_AGGREGATE_QUERY = _AGGREGATE_QUERY.format(key='student_id', module_filter='')
+STUDENT_MODULE_AGGREGATE_QUERY = _AGGREGATE_QUERY.format(key='student_id, module_id', module_filter='AND module_id IS NOT NULL')
+
+METRIC_COLUMNS = ('attendance_sum', 'attendance_count', 'grade_sum', 'grade_count', 'stress_sum', 'stress_count')
+
+# Statements that recompute both metrics tables from scratch.
+REBUILD_STATEMENTS = (
+    "DELETE FROM student_metrics",
+    "DELETE FROM student_module_metrics",
+    f"INSERT INTO student_metrics (student_id, {', '.join(METRIC_COLUMNS)}) {STUDENT_AGGREGATE_QUERY}",
+    f"INSERT INTO student_module_metrics (student_id, module_id, {', '.join(METRIC_COLUMNS)}) {STUDENT_MODULE_AGGREGATE_QUERY}",
+)
+
+class StudentMetricsRepository(BaseRepository):
+    """
+    Repository for the per-student metrics read model.
+
+    Inherits from `BaseRepository` for its query execution and error handling.
+    Rows are returned as dictionaries with the averages already derived from
+    the stored sums and counts.
+    """
+    def __init__(self):
+        """
+        Initializes the StudentMetricsRepository.
+
+        Sets the table name to 'student_metrics' and `model_class` to None, as
+        results are returned as dictionaries.
+        """
+        super().__init__('student_metrics', None)
+
+    def get_student_metrics(self, student_id: int) -> dict | None:
+        """
+        Retrieves the metrics of a single student.
+
+        Args:
+            student_id (int): The unique identifier of the student.
+
+        Returns:
+            dict | None: `average_attendance` (0-1), `average_grade` and `average_stress`
+                         (each None when the student has no such records) plus the raw
+                         counts, or None if the student has no activity at all.
+        """
+        query = """
+            SELECT student_id, attendance_count, grade_count, stress_count,
+                   attendance_sum / NULLIF(attendance_count, 0) AS average_attendance,
+                   grade_sum / NULLIF(grade_count, 0) AS average_grade,
+                   stress_sum / NULLIF(stress_count, 0) AS average_stress
+            FROM student_metrics WHERE student_id = ?
+        """
+        return self._execute_query(query, (student_id,), fetch_one=True, fetch_all_dicts=True)
+
+    def rebuild(self) -> tuple[int, int]:
+        """
+        Recomputes `student_metrics` and `student_module_metrics` from the base tables.
+
+        Only needed to repair drift (e.g. after rows were changed with the triggers
+        dropped); the triggers keep the tables current otherwise. Does not commit;
+        the caller commits so that readers never see the tables empty.
+
+        Returns:
+            tuple[int, int]: The number of student rows and student-module rows written.
+        """
+        for statement in REBUILD_STATEMENTS:
+            self._execute_update_delete(statement)
+        students = self._execute_query("SELECT COUNT(*) FROM student_metrics", fetch_one=True)
+        student_modules = self._execute_query("SELECT COUNT(*) FROM student_module_metrics", fetch_one=True)
+        return students or 0, student_modules or 0
+
+    def find_drift(self, tolerance: float = 1e-6) -> list[int]:
+        """
+        Lists the students whose stored metrics differ from a fresh aggregation.
+
+        Counts must match exactly; sums may differ by `tolerance`, since adding and
+        subtracting floating-point values in a different order rounds differently.
+
+        Args:
+            tolerance (float, optional): Largest accepted absolute difference of a sum. Defaults to 1e-6.
+
+        Returns:
+            list[int]: The IDs of the students with drifted metrics, in ascending order.
+        """
+        differs = ' OR '.join(
+            f"COALESCE(m.{c}, 0) != COALESCE(f.{c}, 0)" if c.endswith('_count')
+            else f"ABS(COALESCE(m.{c}, 0) - COALESCE(f.{c}, 0)) > ?"
+            for c in METRIC_COLUMNS
+        )
+        query = f"""
+            WITH fresh AS ({STUDENT_AGGREGATE_QUERY}),
+            student_ids AS (SELECT student_id FROM student_metrics UNION SELECT student_id FROM fresh)
+            SELECT ids.student_id
+            FROM student_ids ids
+            LEFT JOIN student_metrics m ON m.student_id = ids.student_id
+            LEFT JOIN fresh f ON f.student_id = ids.student_id
+            WHERE {differs}
+            ORDER BY ids.student_id
+        """
+        rows = self._execute_query(query, (tolerance,) * 3, fetch_all_dicts=True)
+        return [row['student_id'] for row in rows]
+
+# Instantiate the repository for use throughout the application.
+student_metrics_repository = StudentMetricsRepository()
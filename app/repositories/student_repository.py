@@ -21,6 +21,11 @@ class StudentRepository(BaseRepository):
     and error handling. Provides specific methods for querying and managing
     student records.
     """
+    # Fields clients may select with `?fields=`.
+    list_fields = ('id', 'student_number', 'full_name', 'email', 'course_name', 'year_of_study', 'is_active')
+    # The histogram trigger of migration 0007 moves a student's averages in or out of the sketches with `is_active`.
+    side_effect_tables = ('metric_histograms',)
+
     def __init__(self):
         """
         Initializes the StudentRepository.
@@ -20,6 +20,10 @@ class SubmissionRecordRepository(BaseRepository):
     and error handling. Provides specific methods for querying and managing
     student assessment submission records.
     """
+    # Fields clients may select with `?fields=`.
+    list_fields = ('id', 'student_id', 'module_id', 'assessment_name', 'due_date', 'submitted_date', 'is_submitted', 'is_late', 'is_active', 'student_name', 'module_title')
+    page_as_dicts = True # Pages contain the joined student and module details, like get_all_*().
+
     def __init__(self):
         """
         Initializes the SubmissionRecordRepository.
@@ -28,14 +32,14 @@ class SubmissionRecordRepository(BaseRepository):
         """
         super().__init__('submission_records', SubmissionRecord)
 
-    def get_all_submission_records(self) -> list[dict]:
+    def _list_query(self) -> tuple[str, tuple]:
         """
-        Retrieves all active submission records from the database, including
-        associated student and module information for richer context.
+        Returns the query listing all active submission records with their student and module details.
+
+        Shared by `get_all_submission_records()` and the paginated `get_page()`.
 
         Returns:
-            list[dict]: A list of dictionaries, where each dictionary represents
-                        a submission record with joined student and module details.
+            tuple[str, tuple]: The SQL string and its parameters.
         """
         query = """
             SELECT sr.id, sr.student_id, sr.module_id, sr.assessment_name, sr.due_date, sr.submitted_date, sr.is_submitted, sr.is_late, sr.is_active,
@@ -45,8 +49,20 @@ class SubmissionRecordRepository(BaseRepository):
             JOIN modules m ON sr.module_id = m.id
             WHERE sr.is_active = 1
         """
+        return query, ()
+
+    def get_all_submission_records(self) -> list[dict]:
+        """
+        Retrieves all active submission records from the database, including
+        associated student and module information for richer context.
+
+        Returns:
+            list[dict]: A list of dictionaries, where each dictionary represents
+                        a submission record with joined student and module details.
+        """
+        query, params = self._list_query()
         # _execute_query handles exceptions and returns results as dictionaries due to fetch_all_dicts=True.
-        return self._execute_query(query, fetch_all_dicts=True)
+        return self._execute_query(query, params, fetch_all_dicts=True)
 
     def get_submission_record_by_id(self, record_id: int) -> SubmissionRecord | None:
         """
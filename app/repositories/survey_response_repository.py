@@ -4,17 +4,22 @@ Survey Response Repository module for managing student survey data.
 This module defines the `SurveyResponseRepository` class, which provides methods
 for interacting with the 'survey_responses' table in the database. It extends
 `BaseRepository` to handle CRUD operations for survey responses and includes
-logic to automatically check for and create stress events and alerts based
-on the submitted survey data.
+the set-based checks that create stress events and alerts from the submitted
+survey data. Single creates and updates enqueue the checks as detection jobs
+(see `DetectionJobRepository`), which `flask worker` runs off the request path.
 """
 
+import json
 import sqlite3
 from app.db_connection import get_db
+from app.analysis_cache import record_write
 from app.models.survey_response import SurveyResponse
 from app.models.stress_event import StressEvent # Imported for type hinting/context
 from app.models.alert import Alert # Imported for type hinting/context
 from datetime import datetime, timezone
+from app.utils.bulk import BulkField
 from .base_repository import BaseRepository
+from .detection_job_repository import detection_job_repository
 from flask import current_app # Import current_app for logging
 
 class SurveyResponseRepository(BaseRepository):
@@ -23,9 +28,25 @@ class SurveyResponseRepository(BaseRepository):
 
     Inherits from `BaseRepository` to leverage common CRUD functionality
     and error handling. Provides specific methods for querying and managing
-    student survey responses, and integrates logic for automatic stress
-    event and alert generation.
+    student survey responses, and the checks for automatic stress event and
+    alert generation.
     """
+    # Fields clients may select with `?fields=`.
+    list_fields = ('id', 'student_id', 'module_id', 'week_number', 'stress_level', 'hours_slept', 'mood_comment', 'created_at', 'student_name', 'module_title')
+    page_as_dicts = True # Pages contain the joined student and module details, like get_all_*().
+    # Written by the metrics, rollup and histogram triggers (migrations 0005-0007) and by the stress event and alert checks
+    # (inline for bulk inserts, through `detection_jobs` otherwise).
+    side_effect_tables = ('student_metrics', 'student_module_metrics', 'module_week_rollups', 'metric_histograms', 'stress_events', 'alerts')
+    # Fields accepted by `POST /api/admin/survey-responses/bulk`.
+    bulk_schema = (
+        BulkField('student_id', int, references='students'),
+        BulkField('module_id', int, required=False, references='modules'),
+        BulkField('week_number', int, minimum=1),
+        BulkField('stress_level', int, minimum=1, maximum=5),
+        BulkField('hours_slept', float, required=False, minimum=0, maximum=24),
+        BulkField('mood_comment', str, required=False),
+    )
+
     def __init__(self):
         """
         Initializes the SurveyResponseRepository.
@@ -34,14 +55,14 @@ class SurveyResponseRepository(BaseRepository):
         """
         super().__init__('survey_responses', SurveyResponse)
 
-    def get_all_survey_responses(self) -> list[dict]:
+    def _list_query(self) -> tuple[str, tuple]:
         """
-        Retrieves all active survey responses from the database, including
-        associated student and module information for richer context.
+        Returns the query listing all active survey responses with their student and module details.
+
+        Shared by `get_all_survey_responses()` and the paginated `get_page()`.
 
         Returns:
-            list[dict]: A list of dictionaries, where each dictionary represents
-                        a survey response with joined student and module details.
+            tuple[str, tuple]: The SQL string and its parameters.
         """
         query = """
             SELECT 
@@ -54,8 +75,20 @@ class SurveyResponseRepository(BaseRepository):
             LEFT JOIN modules m ON sr.module_id = m.id
             WHERE sr.is_active = 1
         """
+        return query, ()
+
+    def get_all_survey_responses(self) -> list[dict]:
+        """
+        Retrieves all active survey responses from the database, including
+        associated student and module information for richer context.
+
+        Returns:
+            list[dict]: A list of dictionaries, where each dictionary represents
+                        a survey response with joined student and module details.
+        """
+        query, params = self._list_query()
         # _execute_query handles exceptions and returns results as dictionaries due to fetch_all_dicts=True.
-        return self._execute_query(query, fetch_all_dicts=True)
+        return self._execute_query(query, params, fetch_all_dicts=True)
 
     def get_survey_response_by_id(self, response_id: int) -> SurveyResponse | None:
         """
@@ -69,12 +102,16 @@ class SurveyResponseRepository(BaseRepository):
         """
         return super().get_by_id(response_id)
 
-    def create_survey_response(self, student_id: int, module_id: int | None, week_number: int, stress_level: int, hours_slept: float, mood_comment: str | None) -> SurveyResponse:
+    def create_survey_response(self, student_id: int, module_id: int | None, week_number: int, stress_level: int, hours_slept: float, mood_comment: str | None,
+                               enqueue_detection: bool = True) -> SurveyResponse:
         """
         Creates a new survey response in the database.
 
-        After creation, it automatically triggers a check for stress events and alerts
-        based on the new response's stress level.
+        The check for stress events and alerts is not run here: a detection job is
+        enqueued in the same transaction and `flask worker` runs the check, so the
+        request only pays for two inserts. The response is read back with
+        `RETURNING *` rather than a second query. Nothing is committed; the caller
+        commits (see `app.admin.services.submit_survey_response`).
 
         Args:
             student_id (int): The ID of the student submitting the response.
@@ -83,6 +120,9 @@ class SurveyResponseRepository(BaseRepository):
             stress_level (int): The reported stress level (e.g., 1-5).
             hours_slept (float): The reported hours of sleep.
             mood_comment (str | None): Any comments on the mood.
+            enqueue_detection (bool, optional): Enqueue a detection job. Defaults to True; callers
+                                                that run `check_for_stress_events_and_alerts()`
+                                                in the same transaction pass False.
 
         Returns:
             SurveyResponse: The newly created `SurveyResponse` object.
@@ -91,20 +131,49 @@ class SurveyResponseRepository(BaseRepository):
         query = """
             INSERT INTO survey_responses (student_id, module_id, week_number, stress_level, hours_slept, mood_comment, created_at, is_active) 
             VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+            RETURNING *
+        """
+        response = self._execute_insert_returning(query, (student_id, module_id, week_number, stress_level, hours_slept, mood_comment, created_at))
+        if enqueue_detection:
+            detection_job_repository.enqueue(response.id) # Checked for stress events and alerts by the worker.
+        return response
+
+    def bulk_create_survey_responses(self, rows: list[dict], threshold: int = 4) -> tuple[list[int], int, int]:
+        """
+        Inserts many survey responses with a single statement and then runs
+        the stress-event and alert checks for the whole batch.
+
+        The rows must already be validated (see `validate_bulk_rows()`). The checks
+        run inline as two set-based statements over the new IDs (see
+        `check_for_stress_events_and_alerts()`), so their cost is paid once per
+        batch rather than per response. Nothing is committed; the caller commits
+        the batch as one transaction.
+
+        Args:
+            rows (list[dict]): Validated rows with the keys of `bulk_schema`.
+            threshold (int, optional): The stress level threshold (1-5) to trigger events/alerts. Defaults to 4.
+
+        Returns:
+            tuple[list[int], int, int]: The IDs of the new responses (in the order of `rows`),
+                                        the number of stress events created and the number of alerts created.
         """
-        response_id = self._execute_insert(query, (student_id, module_id, week_number, stress_level, hours_slept, mood_comment, created_at))
-        new_survey = self.get_survey_response_by_id(response_id)
-        if new_survey:
-            # Trigger the check for stress events and alerts.
-            self._check_for_stress_events_and_alerts(new_survey)
-        return new_survey
+        created_at = datetime.now(timezone.utc).isoformat()
+        ids = self._execute_many([
+            {'student_id': row['student_id'], 'module_id': row['module_id'], 'week_number': row['week_number'], 'stress_level': row['stress_level'],
+             'hours_slept': row['hours_slept'], 'mood_comment': row['mood_comment'], 'created_at': created_at, 'is_active': 1}
+            for row in rows
+        ])
+        if not ids:
+            return ids, 0, 0
+        stress_events, alerts = self.check_for_stress_events_and_alerts(ids, threshold)
+        return ids, stress_events, alerts
 
     def update_survey_response(self, response_id: int, student_id: int, module_id: int | None, week_number: int, stress_level: int, hours_slept: float, mood_comment: str | None) -> SurveyResponse:
         """
         Updates an existing survey response in the database.
 
-        After updating, it re-triggers a check for stress events and alerts
-        based on the modified response's stress level.
+        After updating, a detection job is enqueued so that the worker re-checks
+        the modified response for stress events and alerts. Nothing is committed.
 
         Args:
             response_id (int): The unique identifier of the survey response to update.
@@ -122,12 +191,9 @@ class SurveyResponseRepository(BaseRepository):
             UPDATE survey_responses SET student_id = ?, module_id = ?, week_number = ?, stress_level = ?, hours_slept = ?, mood_comment = ? 
             WHERE id = ?
         """
-        self._execute_update_delete(query, (student_id, module_id, week_number, stress_level, hours_slept, mood_comment, response_id))
-        updated_survey = self.get_survey_response_by_id(response_id)
-        if updated_survey:
-            # Trigger the check for stress events and alerts after update.
-            self._check_for_stress_events_and_alerts(updated_survey)
-        return updated_survey
+        if self._execute_update_delete(query, (student_id, module_id, week_number, stress_level, hours_slept, mood_comment, response_id)):
+            detection_job_repository.enqueue(response_id) # Re-checked for stress events and alerts by the worker.
+        return self.get_survey_response_by_id(response_id)
 
     def delete_survey_response(self, response_id: int) -> bool:
         """
@@ -141,72 +207,159 @@ class SurveyResponseRepository(BaseRepository):
         """
         return super().delete_logical(response_id)
 
-    def _check_for_stress_events_and_alerts(self, survey_response: SurveyResponse, threshold: int = 4):
+    def check_for_stress_events_and_alerts(self, response_ids: list[int], threshold: int = 4) -> tuple[int, int]:
         """
-        Private method to check for and create stress events and alerts based on a survey response.
+        Creates the stress events and alerts raised by a set of survey responses.
 
-        This method is called internally after a survey response is created or updated.
-        It performs two main checks:
-        1. If the current stress level is above a threshold, it creates a `StressEvent`.
-        2. If the student has reported high stress for two consecutive weeks, it creates an `Alert`.
+        Applies two rules with one `INSERT ... SELECT` each, so the cost does not
+        grow with one round of lookups per response:
+        1. Every given response at or above the threshold without a stress event gets one.
+        2. Every given response at or above the threshold whose student reported
+           high stress for the same module in the previous week raises an alert, unless
+           the student already has an active alert for that week. Several qualifying
+           responses for the same student and week raise a single alert. Previous-week
+           responses from the same set count, regardless of their order.
+
+        Both rules skip what already exists through `ON CONFLICT DO NOTHING` on the
+        unique natural keys of migration 0010 (one stress event per response, one
+        active alert per student and week) rather than a lookup before the insert,
+        so checking a response again (e.g. a detection job delivered twice), or two
+        workers checking it at once, creates nothing new. Inactive responses are
+        ignored. Nothing is committed; the caller commits.
 
         Args:
-            survey_response (SurveyResponse): The survey response object to check.
+            response_ids (list[int]): The IDs of the survey responses to check.
             threshold (int, optional): The stress level threshold (1-5) to trigger events/alerts. Defaults to 4.
-        
+
+        Returns:
+            tuple[int, int]: The number of stress events and alerts created.
+
         Raises:
             Exception: If a database error occurs during the check or creation of events/alerts.
         """
         db = get_db()
+        created_at = datetime.now(timezone.utc).isoformat()
+        ids = json.dumps(response_ids)
         try:
-            # 1. Check for StressEvent: If stress level is high, record a stress event.
-            if survey_response.stress_level >= threshold:
-                # Check if an event for this survey response already exists to prevent duplicates.
-                cursor = db.execute("SELECT id FROM stress_events WHERE survey_response_id = ?", (survey_response.id,))
-                existing_event = cursor.fetchone()
-                if not existing_event:
-                    stress_event_created_at = datetime.now(timezone.utc).isoformat()
-                    db.execute(
-                        "INSERT INTO stress_events (student_id, module_id, survey_response_id, week_number, stress_level, cause_category, description, source, created_at, is_active) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1)",
-                        (survey_response.student_id, survey_response.module_id, survey_response.id, survey_response.week_number, survey_response.stress_level, "system_detected", f"High stress reported (level {survey_response.stress_level}) in week {survey_response.week_number}.", "survey_response_system", stress_event_created_at)
-                    )
-                    db.commit()
-                    current_app.logger.info(f"Stress event created for student {survey_response.student_id} (level {survey_response.stress_level}).")
-
-            # 2. Check for Alerts: Identify consecutive high stress levels.
-            # Retrieve the survey response from the previous week for the same student and module.
             cursor = db.execute("""
-                SELECT week_number, stress_level FROM survey_responses
-                WHERE student_id = ? AND module_id = ? AND week_number = ? AND is_active = 1
-            """, (survey_response.student_id, survey_response.module_id, survey_response.week_number - 1))
-            previous_week_survey_row = cursor.fetchone()
-
-            # If both current and previous week's stress levels are above the threshold, create an alert.
-            if previous_week_survey_row and \
-               previous_week_survey_row['stress_level'] >= threshold and \
-               survey_response.stress_level >= threshold:
-                
-                # Check if an alert for this specific week already exists to prevent duplicates.
-                cursor = db.execute("SELECT id FROM alerts WHERE student_id = ? AND week_number = ? AND is_active = 1", (survey_response.student_id, survey_response.week_number))
-                existing_alert = cursor.fetchone()
-
-                if not existing_alert:
-                    alert_created_at = datetime.now(timezone.utc).isoformat()
-                    alert_reason = (
-                        f"Stress level >= {threshold} for two consecutive weeks "
-                        f"({survey_response.week_number - 1} and {survey_response.week_number}) "
-                        f"for student {survey_response.student_id} in module {survey_response.module_id}."
-                    )
-                    db.execute(
-                        "INSERT INTO alerts (student_id, module_id, week_number, reason, created_at, resolved, is_active) VALUES (?, ?, ?, ?, ?, 0, 1)",
-                        (survey_response.student_id, survey_response.module_id, survey_response.week_number, alert_reason, alert_created_at)
-                    )
-                    db.commit()
-                    current_app.logger.warning(f"Alert created for student {survey_response.student_id}: Consecutive high stress detected.")
+                INSERT INTO stress_events (student_id, module_id, survey_response_id, week_number, stress_level, cause_category, description, source, created_at, is_active)
+                SELECT sr.student_id, sr.module_id, sr.id, sr.week_number, sr.stress_level, 'system_detected',
+                       'High stress reported (level ' || sr.stress_level || ') in week ' || sr.week_number || '.',
+                       'survey_response_system', ?, 1
+                FROM survey_responses sr
+                WHERE sr.id IN (SELECT value FROM json_each(?)) AND sr.is_active = 1 AND sr.stress_level >= ?
+                ON CONFLICT (survey_response_id) DO NOTHING
+            """, (created_at, ids, threshold))
+            stress_events_created = cursor.rowcount
+
+            # The inner query picks the first qualifying response per student and week
+            # (SQLite takes bare columns from the MIN() row), so one set cannot raise duplicates.
+            cursor = db.execute("""
+                INSERT INTO alerts (student_id, module_id, week_number, reason, created_at, resolved, is_active)
+                SELECT student_id, module_id, week_number,
+                       'Stress level >= ' || ? || ' for two consecutive weeks (' || (week_number - 1) || ' and ' || week_number || ') '
+                       || 'for student ' || student_id || ' in module ' || module_id || '.',
+                       ?, 0, 1
+                FROM (
+                    SELECT MIN(sr.id) AS first_id, sr.student_id, sr.module_id, sr.week_number
+                    FROM survey_responses sr
+                    WHERE sr.id IN (SELECT value FROM json_each(?)) AND sr.is_active = 1 AND sr.stress_level >= ?
+                      AND EXISTS (
+                          SELECT 1 FROM survey_responses prev
+                          WHERE prev.student_id = sr.student_id AND prev.module_id = sr.module_id
+                            AND prev.week_number = sr.week_number - 1 AND prev.is_active = 1 AND prev.stress_level >= ?
+                      )
+                    GROUP BY sr.student_id, sr.week_number
+                )
+                WHERE true
+                ON CONFLICT (student_id, week_number) WHERE is_active = 1 DO NOTHING
+            """, (threshold, created_at, ids, threshold, threshold))
+            alerts_created = cursor.rowcount
+            if alerts_created:
+                current_app.logger.warning(f"{alerts_created} alert(s) created for consecutive high stress in {len(response_ids)} survey response(s).")
+            return stress_events_created, alerts_created
         except sqlite3.Error as e:
-            db.rollback() # Rollback changes if any database error occurs during this process.
-            current_app.logger.error(f"Database error in _check_for_stress_events_and_alerts: {e}", exc_info=True)
+            current_app.logger.error(f"Database error in check_for_stress_events_and_alerts: {e}", exc_info=True)
             raise Exception("Error checking for stress events and alerts.") # Re-raise for higher-level handling.
 
+    def evaluate_stress_history(self, from_week: int | None = None, to_week: int | None = None, threshold: int = 4) -> tuple[int, int]:
+        """
+        Re-evaluates the stress event and alert rules over whole weeks of survey history.
+
+        Used after backfills, imports with the triggers dropped and threshold changes,
+        where checking response by response (`check_for_stress_events_and_alerts()`)
+        would cost one previous-week lookup per response. Instead, `LAG()` over the
+        high-stress responses, partitioned by `(student_id, module_id)` and ordered
+        by week, finds every week that follows a high-stress week of the same module
+        in a single ordered pass over `idx_survey_responses_student_module_week`
+        (seconds for a term of 100,000 students). The rules and the de-duplication
+        are the same as for the per-response check, so re-running an evaluation, or
+        evaluating weeks the worker already checked, creates nothing new.
+
+        Nothing is committed; the caller commits.
+
+        Args:
+            from_week (int | None, optional): The first week whose events and alerts are evaluated.
+                                              Defaults to None (from the first week).
+            to_week (int | None, optional): The last week evaluated. Defaults to None (to the last week).
+            threshold (int, optional): The stress level threshold (1-5) to trigger events/alerts. Defaults to 4.
+
+        Returns:
+            tuple[int, int]: The number of stress events and alerts created.
+
+        Raises:
+            Exception: If a database error occurs during the evaluation.
+        """
+        db = get_db()
+        params = {'from_week': from_week, 'to_week': to_week, 'threshold': threshold,
+                  'created_at': datetime.now(timezone.utc).isoformat()}
+        in_range = "(:from_week IS NULL OR week_number >= :from_week) AND (:to_week IS NULL OR week_number <= :to_week)"
+        try:
+            cursor = db.execute(f"""
+                INSERT INTO stress_events (student_id, module_id, survey_response_id, week_number, stress_level, cause_category, description, source, created_at, is_active)
+                SELECT sr.student_id, sr.module_id, sr.id, sr.week_number, sr.stress_level, 'system_detected',
+                       'High stress reported (level ' || sr.stress_level || ') in week ' || sr.week_number || '.',
+                       'survey_response_system', :created_at, 1
+                FROM survey_responses sr
+                WHERE sr.is_active = 1 AND sr.stress_level >= :threshold AND {in_range.replace('week_number', 'sr.week_number')}
+                ON CONFLICT (survey_response_id) DO NOTHING
+            """, params)
+            stress_events_created = cursor.rowcount
+
+            # Only high-stress responses enter the window, so a response is part of a run when
+            # the previous high-stress response of its student and module is from the week
+            # before. Ordering by ID within a week makes the first response of each week the
+            # one that sees the previous week, so MIN(id) per student and week names the same
+            # module as the per-response check. The week before `from_week` is read so that a
+            # run starting there still raises its alert.
+            cursor = db.execute(f"""
+                INSERT INTO alerts (student_id, module_id, week_number, reason, created_at, resolved, is_active)
+                WITH runs AS (
+                    SELECT id, student_id, module_id, week_number,
+                           LAG(week_number) OVER (PARTITION BY student_id, module_id ORDER BY week_number, id) AS previous_week
+                    FROM survey_responses
+                    WHERE is_active = 1 AND module_id IS NOT NULL AND stress_level >= :threshold
+                      AND (:from_week IS NULL OR week_number >= :from_week - 1) AND (:to_week IS NULL OR week_number <= :to_week)
+                )
+                SELECT student_id, module_id, week_number,
+                       'Stress level >= ' || :threshold || ' for two consecutive weeks (' || (week_number - 1) || ' and ' || week_number || ') '
+                       || 'for student ' || student_id || ' in module ' || module_id || '.',
+                       :created_at, 0, 1
+                FROM (
+                    SELECT MIN(id), student_id, module_id, week_number
+                    FROM runs r
+                    WHERE previous_week = week_number - 1 AND {in_range}
+                    GROUP BY student_id, week_number
+                )
+                WHERE true
+                ON CONFLICT (student_id, week_number) WHERE is_active = 1 DO NOTHING
+            """, params)
+            alerts_created = cursor.rowcount
+            record_write('stress_events', 'alerts') # Not written through the survey write helpers.
+            return stress_events_created, alerts_created
+        except sqlite3.Error as e:
+            current_app.logger.error(f"Database error in evaluate_stress_history: {e}", exc_info=True)
+            raise Exception("Error evaluating stress events and alerts.") # Re-raise for higher-level handling.
+
 # Instantiate the repository for use throughout the application.
 survey_response_repository = SurveyResponseRepository()
@@ -22,6 +22,9 @@ class UserRepository(BaseRepository):
     and error handling. Provides specific methods for querying and managing
     user accounts.
     """
+    # Fields clients may select with `?fields=` (never the password hash).
+    list_fields = ('id', 'username', 'role', 'student_id', 'created_at', 'is_active')
+
     def __init__(self):
         """
         Initializes the UserRepository.
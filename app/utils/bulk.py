@@ -0,0 +1,88 @@
+"""
+Helpers for validating bulk (array) write payloads.
+
+A bulk payload is a JSON array of objects. Each repository that supports bulk
+creation declares a `bulk_schema`: a tuple of `BulkField`s describing the keys
+it accepts. `validate_rows()` checks every row against that schema and reports
+problems per row, so a client uploading thousands of records learns exactly
+which ones were rejected instead of receiving a single error for the batch.
+"""
+
+from collections import namedtuple
+
+BulkField = namedtuple('BulkField', ['name', 'type', 'required', 'minimum', 'maximum', 'references'],
+                       defaults=(True, None, None, None))
+BulkField.__doc__ = """
+Describes one key of a bulk row.
+
+Attributes:
+    name (str): The key in the JSON object (and the column it is stored in).
+    type (type): `int`, `float` or `str`. Integers are accepted for `float` fields.
+    required (bool): If False, the key may be missing or null. Defaults to True.
+    minimum (int | float | None): Smallest accepted value for numeric fields.
+    maximum (int | float | None): Largest accepted value for numeric fields.
+    references (str | None): Table whose active `id` the value must match (checked by the repository).
+"""
+
+def _check_value(field, value):
+    """
+    Validates a single value against its field description.
+
+    Args:
+        field (BulkField): The field description.
+        value: The value from the payload.
+
+    Returns:
+        str | None: An error message, or None if the value is valid.
+    """
+    if field.type is str:
+        if not isinstance(value, str) or not value.strip():
+            return f"'{field.name}' must be a non-empty string."
+        return None
+    # bool is a subclass of int but true/false is never a valid number here.
+    accepted = (int, float) if field.type is float else (int,)
+    if isinstance(value, bool) or not isinstance(value, accepted):
+        return f"'{field.name}' must be {'a number' if field.type is float else 'an integer'}."
+    if field.minimum is not None and value < field.minimum:
+        return f"'{field.name}' must be at least {field.minimum}."
+    if field.maximum is not None and value > field.maximum:
+        return f"'{field.name}' must be at most {field.maximum}."
+    return None
+
+def validate_rows(rows, schema):
+    """
+    Validates the shape and values of every row in a bulk payload.
+
+    Args:
+        rows (list): The decoded JSON array.
+        schema (tuple[BulkField]): The accepted fields.
+
+    Returns:
+        tuple: `(valid, errors)` where `valid` is a list of `(index, row)` pairs whose row
+               contains exactly the schema's keys (missing optional keys set to None), and
+               `errors` maps the index of each rejected row to a list of messages.
+    """
+    valid, errors = [], {}
+    known = {field.name for field in schema}
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors[index] = ['Row must be an object.']
+            continue
+        messages = [f"Unknown field '{key}'." for key in row if key not in known]
+        clean = {}
+        for field in schema:
+            value = row.get(field.name)
+            if value is None:
+                if field.required:
+                    messages.append(f"'{field.name}' is required.")
+                clean[field.name] = None
+                continue
+            message = _check_value(field, value)
+            if message:
+                messages.append(message)
+            clean[field.name] = value
+        if messages:
+            errors[index] = messages
+        else:
+            valid.append((index, clean))
+    return valid, errors
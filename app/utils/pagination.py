@@ -0,0 +1,73 @@
+"""
+Helpers for keyset (cursor) pagination.
+
+A cursor is the sort key of the last row of a page, serialized as JSON and
+base64url-encoded so that clients treat it as an opaque token. The next page is
+fetched with `WHERE key > cursor ORDER BY key LIMIT n`, which the database
+answers with an index seek regardless of how deep into the result set the
+client is, unlike `OFFSET`.
+"""
+
+import base64
+import binascii
+import json
+
+def encode_cursor(values):
+    """
+    Encodes the sort key of a row into an opaque cursor string.
+
+    Args:
+        values (list): The values of the page key columns, in key order.
+
+    Returns:
+        str: A URL-safe cursor string.
+    """
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, key_length):
+    """
+    Decodes a cursor produced by `encode_cursor()`.
+
+    Args:
+        cursor (str): The cursor received from the client.
+        key_length (int): The number of page key columns the cursor must contain.
+
+    Returns:
+        list: The key values encoded in the cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed or does not match the key length.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise ValueError("Invalid pagination cursor.") from e
+    if not isinstance(values, list) or len(values) != key_length:
+        raise ValueError("Invalid pagination cursor.")
+    return values
+
+def parse_page_args(args, default_limit=50, max_limit=500):
+    """
+    Reads and validates the `limit` and `after` query string parameters.
+
+    Args:
+        args (MultiDict): The request's query string arguments.
+        default_limit (int, optional): Page size used when `limit` is absent. Defaults to 50.
+        max_limit (int, optional): Largest page size a client may request. Defaults to 500.
+
+    Returns:
+        tuple: `(limit, after)` where `after` is the raw cursor string or None.
+
+    Raises:
+        ValueError: If `limit` is not an integer between 1 and `max_limit`.
+    """
+    limit = args.get('limit', default_limit)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError) as e:
+        raise ValueError("'limit' must be an integer.") from e
+    if not 1 <= limit <= max_limit:
+        raise ValueError(f"'limit' must be between 1 and {max_limit}.")
+    return limit, args.get('after') or None
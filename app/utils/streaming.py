@@ -0,0 +1,122 @@
+"""
+Helpers for streaming large JSON responses.
+
+`stream_json_array` turns an iterator of records into a chunked HTTP response
+whose body is a JSON array. Records are serialized one at a time as they are
+pulled from the repository (see `BaseRepository.iter_list`), so neither the
+rows, the model objects nor the encoded JSON are ever held in memory as a
+whole, and the first bytes reach the client as soon as the first rows are read.
+
+`stream_events` keeps a response open as a server-sent events stream that
+pushes whatever a polling function returns, e.g. the changes of the alert feed.
+"""
+
+import time
+from flask import Response, current_app, stream_with_context
+from app.db_connection import close_db
+
+def _serialize(record):
+    """Converts a model instance or dictionary into a JSON-serializable dictionary."""
+    return record.to_dict() if hasattr(record, 'to_dict') else record
+
+def stream_json_array(records, chunk_size=100):
+    """
+    Builds a streaming response that encodes `records` as a JSON array.
+
+    Encoded records are buffered into chunks of `chunk_size` so that each write
+    to the socket carries a reasonable amount of data. The request context stays
+    active while the body is generated, so the request's pooled connection (and
+    therefore the open cursor behind `records`) remains valid until the last chunk.
+
+    If the iterator fails part-way through, the error is logged and the body is
+    left unterminated so the client sees a truncated (invalid) document rather
+    than a silently shortened list; the status code has already been sent.
+
+    Args:
+        records (iterable): Model instances or dictionaries, typically a repository generator.
+        chunk_size (int, optional): Number of records encoded per chunk. Defaults to 100.
+
+    Returns:
+        Response: A `200 application/json` response with a streamed body.
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        buffer = ['[']
+        first = True
+        try:
+            for record in records:
+                if not first:
+                    buffer.append(',')
+                buffer.append(dumps(_serialize(record)))
+                first = False
+                if len(buffer) >= chunk_size * 2:
+                    yield ''.join(buffer)
+                    buffer = []
+        except Exception as e:
+            current_app.logger.error(f"Error while streaming JSON response: {e}", exc_info=True)
+            yield ''.join(buffer)
+            return
+        buffer.append(']')
+        yield ''.join(buffer)
+
+    return Response(stream_with_context(generate()), status=200, mimetype='application/json')
+
+def stream_events(poll, cursor, event, poll_interval=2.0, heartbeat_interval=15.0, max_seconds=300.0):
+    """
+    Builds a server-sent events (`text/event-stream`) response fed by polling.
+
+    `poll(cursor)` is called every `poll_interval` seconds and returns
+    `(data, cursor, has_more)`. Non-empty `data` is sent as one event whose `id`
+    is the new cursor, so a browser that reconnects resumes from it through the
+    `Last-Event-ID` header; everything that happened within one interval thus
+    reaches the client as a single event. When `has_more` is true the next poll
+    follows immediately, so a backlog is drained in bounded batches and the
+    memory held per connection never exceeds one batch.
+
+    The pooled database connection is returned after every poll, so an idle
+    stream does not hold one of the pool's few connections. A comment line is
+    sent after `heartbeat_interval` seconds without events to keep proxies from
+    closing the connection, and the stream ends after `max_seconds`, freeing its
+    worker; the client reconnects and continues from its last event id. If a poll
+    fails, the error is logged and the stream ends the same way.
+
+    Args:
+        poll (callable): Called with the current cursor; returns `(data, cursor, has_more)`.
+        cursor (str): The cursor the first poll starts from.
+        event (str): The event type of the pushed events.
+        poll_interval (float, optional): Seconds between polls. Defaults to 2.
+        heartbeat_interval (float, optional): Seconds of silence before a keep-alive comment. Defaults to 15.
+        max_seconds (float, optional): Seconds after which the stream is closed. Defaults to 300.
+
+    Returns:
+        Response: A `200 text/event-stream` response with a streamed body.
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        nonlocal cursor
+        started_at = last_sent_at = time.monotonic()
+        yield f"retry: {int(poll_interval * 1000)}\n\n" # Reconnection delay for the browser's EventSource.
+        while True:
+            try:
+                data, cursor, has_more = poll(cursor)
+            except Exception as e:
+                current_app.logger.error(f"Error while streaming events: {e}", exc_info=True)
+                return
+            finally:
+                close_db() # Hand the connection back to the pool while the stream waits.
+            now = time.monotonic()
+            if data:
+                yield f"id: {cursor}\nevent: {event}\ndata: {dumps(data)}\n\n"
+                last_sent_at = now
+            elif now - last_sent_at >= heartbeat_interval:
+                yield ": keep-alive\n\n"
+                last_sent_at = now
+            if now - started_at >= max_seconds:
+                return
+            if not has_more:
+                time.sleep(poll_interval)
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'} # Keep proxies from buffering the events.
+    return Response(stream_with_context(generate()), status=200, mimetype='text/event-stream', headers=headers)
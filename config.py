@@ -23,7 +23,73 @@ class Config:
     # Secret key for Flask-JWT-Extended to sign JWTs.
     # Retrieved from environment variable or defaults to a hardcoded string (for development).
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'super-secret-jwt-key'
-    
+
+    # Database connection pool settings (see app/db_connection.py).
+    # Maximum number of pooled SQLite connections kept open per application.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 5)
+    # Seconds a request waits for a free pooled connection before failing.
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT') or 10)
+    # Idle seconds after which a pooled connection is health-checked before reuse.
+    DB_POOL_PING_INTERVAL = float(os.environ.get('DB_POOL_PING_INTERVAL') or 30)
+    # Number of prepared statements cached per connection (sqlite3 defaults to 128).
+    DB_STATEMENT_CACHE_SIZE = int(os.environ.get('DB_STATEMENT_CACHE_SIZE') or 256)
+    # PRAGMAs applied once to every new pooled connection.
+    DB_PRAGMAS = {
+        'journal_mode': 'WAL', # Readers no longer block the writer (and vice versa).
+        'synchronous': 'NORMAL', # Safe with WAL and avoids an fsync on every commit.
+        'cache_size': -16000, # ~16 MB page cache per connection (negative values are KiB).
+        'temp_store': 'MEMORY', # Keep temporary B-trees for GROUP BY/ORDER BY in memory.
+    }
+
+    # SQL instrumentation settings (see app/query_instrumentation.py).
+    # Time every repository statement and add a Server-Timing header to responses.
+    QUERY_INSTRUMENTATION_ENABLED = (os.environ.get('QUERY_INSTRUMENTATION_ENABLED') or 'true').lower() in ('1', 'true', 'yes')
+    # Statements taking at least this many milliseconds are kept in the slow-query log.
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS') or 100)
+    # Number of most recent slow queries retained.
+    SLOW_QUERY_LOG_SIZE = int(os.environ.get('SLOW_QUERY_LOG_SIZE') or 100)
+
+    # Keyset pagination of list endpoints (`?limit=&after=`).
+    # Page size used when only `after` is given.
+    DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE') or 50)
+    # Largest `limit` a client may request.
+    MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE') or 500)
+    # Rows fetched per round trip when a list endpoint streams its response (`?stream=1`).
+    STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE') or 500)
+    # Largest number of rows accepted by one `POST /api/admin/<entity>/bulk` request.
+    BULK_MAX_ROWS = int(os.environ.get('BULK_MAX_ROWS') or 50000)
+    # Largest cohort returned by `GET /api/analysis/cohort-trends`.
+    COHORT_TRENDS_MAX_STUDENTS = int(os.environ.get('COHORT_TRENDS_MAX_STUDENTS') or 500)
+
+    # Analysis result cache (see app/analysis_cache.py).
+    # Cache analysis query results until a table they read is written.
+    ANALYSIS_CACHE_ENABLED = (os.environ.get('ANALYSIS_CACHE_ENABLED') or 'true').lower() in ('1', 'true', 'yes')
+    # Number of cached results kept; the least recently used is evicted first.
+    ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get('ANALYSIS_CACHE_MAX_ENTRIES') or 256)
+    # Seconds after which a cached result expires, bounding staleness from CLI writes by other processes
+    # (alerts written by `flask worker` invalidate cached results at once, see app/analysis_cache.py).
+    ANALYSIS_CACHE_TTL_SECONDS = float(os.environ.get('ANALYSIS_CACHE_TTL_SECONDS') or 300)
+
+    # Analysis engine (see app/analysis_engine.py).
+    # 'sql' runs the analysis queries in SQLite; 'numpy' computes them from an in-memory columnar snapshot (needs NumPy).
+    ANALYSIS_ENGINE = (os.environ.get('ANALYSIS_ENGINE') or 'sql').lower()
+    # Seconds after which the NumPy snapshot is reloaded in full, bounding staleness from writes by other processes.
+    ANALYSIS_ENGINE_MAX_AGE_SECONDS = float(os.environ.get('ANALYSIS_ENGINE_MAX_AGE_SECONDS') or 300)
+
+    # Alert feed and its server-sent events stream (`/api/admin/alerts/feed` and `/stream`).
+    # Largest number of change log entries read per poll; bounds the memory of every connection.
+    ALERT_FEED_BATCH_SIZE = int(os.environ.get('ALERT_FEED_BATCH_SIZE') or 200)
+    # Seconds between polls of a stream; changes made within one interval are sent as one event.
+    ALERT_STREAM_POLL_SECONDS = float(os.environ.get('ALERT_STREAM_POLL_SECONDS') or 2)
+    # Seconds of silence after which a stream sends a keep-alive comment.
+    ALERT_STREAM_HEARTBEAT_SECONDS = float(os.environ.get('ALERT_STREAM_HEARTBEAT_SECONDS') or 15)
+    # Seconds after which a stream is closed; clients reconnect with `Last-Event-ID` and lose nothing.
+    ALERT_STREAM_MAX_SECONDS = float(os.environ.get('ALERT_STREAM_MAX_SECONDS') or 300)
+
+    # Survey submission (see app/admin/services.py).
+    # Run the stress event and alert checks in the submitting request instead of enqueueing them for `flask worker`.
+    SURVEY_DETECTION_INLINE = (os.environ.get('SURVEY_DETECTION_INLINE') or 'false').lower() in ('1', 'true', 'yes')
+
     @staticmethod
     def init_app(app):
         """
@@ -14,11 +14,30 @@ export interface Alert {
   is_active?: boolean;
 }
 
+// A change of one alert since a feed cursor; `alert` is null once the alert is deleted
+export interface AlertChange {
+  alert_id: number;
+  change: 'created' | 'resolved' | 'updated' | 'deleted';
+  changed_at: string;
+  alert: Alert | null;
+}
+
+export interface AlertFeed {
+  changes: AlertChange[];
+  cursor: string;
+  has_more: boolean;
+}
+
 // API service functions
 export const getAlerts = () => {
   return apiClient.get<Alert[]>('/admin/alerts');
 };
 
+// Without `since`, returns no changes and the current cursor to poll from
+export const getAlertFeed = (since?: string) => {
+  return apiClient.get<AlertFeed>('/admin/alerts/feed', { params: since ? { since } : {} });
+};
+
 export const getAlertsByStudentId = (studentId: number) => {
   return apiClient.get<Alert[]>(`/admin/alerts/student/${studentId}`);
 };
@@ -1,4 +1,6 @@
 import apiClient from './index';
+import type { Alert } from './alertService';
+import type { Student } from './studentService';
 
 // Define interfaces for the data structures
 export interface DashboardSummary {
@@ -13,27 +15,164 @@ export interface GradeDistribution {
   data: number[];
 }
 
+export interface CorrelationPoint {
+  id: number;
+  name: string;
+  x: number;
+  y: number;
+}
+
+// Summary statistics of GET /analysis/stress-grade-correlation; `points` only with `points=sample|page`.
 export interface StressGradeCorrelation {
+  count: number;
+  pearson: number | null;
+  spearman: number | null;
+  regression: { slope: number; intercept: number; r_squared: number | null } | null;
+  density: { x_edges: number[]; y_edges: number[]; counts: number[][] };
+  points?: { mode: 'sample' | 'page'; total: number; data: CorrelationPoint[]; next_cursor?: string | null };
+}
+
+export interface CorrelationQuery {
+  points?: 'sample' | 'page';
+  limit?: number;
+  after?: string;
+}
+
+export interface RiskFactor {
+  value: number | null;
+  threshold: number;
+  at_risk: boolean;
+  score: number;
+}
+
+export interface HighRiskStudent {
+  id: number;
+  name: string;
+  reason: string;
+  reasons: string[];
+  severity: number;
+  factors: { attendance: RiskFactor; grade: RiskFactor; stress: RiskFactor };
+}
+
+export interface HighRiskQuery {
+  attendance_threshold?: number;
+  grade_threshold?: number;
+  stress_threshold?: number;
+  sort?: 'severity' | 'attendance' | 'grade' | 'stress' | 'name' | 'id';
+  limit?: number;
+}
+
+export interface LabelledData {
   labels: string[];
-  data: { x: number; y: number; name: string }[];
+  data: number[];
+}
+
+// Panels of GET /analysis/dashboard; each is the body of the endpoint of the same name.
+export interface DashboardBundle {
+  dashboard_summary?: DashboardSummary;
+  grade_distribution?: GradeDistribution;
+  stress_grade_correlation?: StressGradeCorrelation;
+  overall_attendance_rate?: { overall_attendance_rate: number };
+  submission_status_distribution?: LabelledData;
+  stress_by_module?: LabelledData;
+  high_risk_students?: HighRiskStudent[];
 }
 
+export type DashboardPanel = keyof DashboardBundle;
+
 export interface TrendData {
   labels: string[];
   data: number[];
 }
 
+export interface ModuleGrades {
+  module_id: number;
+  module_code: string | null;
+  module_title: string | null;
+  average_grade: number | null;
+  grades: { id: number; assessment_name: string; grade: number | null }[];
+}
+
+// Everything the student detail page shows, from GET /analysis/students/<id>/overview.
+export interface StudentOverview {
+  student: Student;
+  enrolments: { id: number; module_id: number; enrol_date: string | null; module_code: string; module_title: string }[];
+  stress_trend: TrendData;
+  attendance_trend: TrendData;
+  average_attendance: number;
+  grades_by_module: ModuleGrades[];
+  submissions: {
+    id: number;
+    module_id: number;
+    module_title: string | null;
+    assessment_name: string;
+    due_date: string | null;
+    submitted_date: string | null;
+    is_submitted: boolean;
+    is_late: boolean;
+  }[];
+  alerts: Alert[];
+}
+
+// Weekly series of a cohort from GET /analysis/cohort-trends: one row per student, one value per week.
+export interface CohortTrends {
+  weeks: number[];
+  students: { id: number; full_name: string }[];
+  stress: (number | null)[][];
+  attendance: (number | null)[][];
+}
+
+export interface CohortQuery {
+  student_ids?: number[];
+  course_name?: string;
+  module_id?: number;
+  year_of_study?: number;
+}
+
+// Percentiles read from the histogram sketches; without module_id or week, of the cohort's averages.
+export type PercentileMetric = 'attendance' | 'grade' | 'stress';
+
+export interface PercentileScope {
+  module_id?: number;
+  week?: number;
+}
+
+export interface MetricPercentiles {
+  metric: PercentileMetric;
+  scope: 'cohort' | 'module' | 'week';
+  scope_id: number;
+  count: number;
+  resolution: number;
+  percentiles: { percentile: number; value: number | null }[];
+}
+
+export interface StudentPercentiles {
+  student_id: number;
+  scope: 'cohort' | 'module' | 'week';
+  scope_id: number;
+  metrics: Record<PercentileMetric, { value: number; percentile: number; count: number } | null>;
+}
+
 // API service functions
 export const getDashboardSummary = () => {
   return apiClient.get<DashboardSummary>('/analysis/dashboard-summary');
 };
 
+// Fetches several panels in one round trip, computed from one consistent snapshot.
+export const getDashboard = (panels: DashboardPanel[]) => {
+  return apiClient.get<DashboardBundle>('/analysis/dashboard', { params: { panels: panels.join(',') } });
+};
+
 export const getGradeDistribution = () => {
   return apiClient.get<GradeDistribution>('/analysis/grade-distribution');
 };
 
-export const getStressGradeCorrelation = () => {
-  return apiClient.get<StressGradeCorrelation>('/analysis/stress-grade-correlation');
+export const getStressGradeCorrelation = (params: CorrelationQuery = {}) => {
+  return apiClient.get<StressGradeCorrelation>('/analysis/stress-grade-correlation', { params });
+};
+
+export const getHighRiskStudents = (params: HighRiskQuery = {}) => {
+  return apiClient.get<HighRiskStudent[]>('/analysis/high-risk-students', { params });
 };
 
 export const getStressTrendForStudent = (studentId: number) => {
@@ -47,3 +186,23 @@ export const getAttendanceTrendForStudent = (studentId: number) => {
 export const getAverageAttendanceForStudent = (studentId: number) => {
   return apiClient.get<{ average_attendance: number }>(`/analysis/students/${studentId}/average-attendance`);
 };
+
+// Fetches the profile, trends, grades, submissions and alerts of a student in one round trip.
+export const getStudentOverview = (studentId: number) => {
+  return apiClient.get<StudentOverview>(`/analysis/students/${studentId}/overview`);
+};
+
+// Fetches the stress and attendance series of many students in one round trip.
+export const getCohortTrends = ({ student_ids, ...filters }: CohortQuery) => {
+  const params = student_ids ? { ...filters, student_ids: student_ids.join(',') } : filters;
+  return apiClient.get<CohortTrends>('/analysis/cohort-trends', { params });
+};
+
+export const getMetricPercentiles = (metric: PercentileMetric, percentiles: number[] = [], scope: PercentileScope = {}) => {
+  const params = percentiles.length ? { ...scope, metric, percentiles: percentiles.join(',') } : { ...scope, metric };
+  return apiClient.get<MetricPercentiles>('/analysis/percentiles', { params });
+};
+
+export const getStudentPercentiles = (studentId: number, scope: PercentileScope = {}) => {
+  return apiClient.get<StudentPercentiles>(`/analysis/students/${studentId}/percentiles`, { params: scope });
+};
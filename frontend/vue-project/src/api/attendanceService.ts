@@ -15,7 +15,7 @@ export interface AttendanceRecord {
 
 // API service functions
 export const getAttendanceRecords = () => {
-  return apiClient.get<AttendanceRecord[]>('/admin/attendance-records');
+  return apiClient.get<AttendanceRecord[]>('/admin/attendance-records', { params: { stream: 1 } });
 };
 
 export const addAttendanceRecord = (record: Omit<AttendanceRecord, 'id' | 'student_name' | 'module_title' | 'attendance_rate'>) => {
@@ -12,7 +12,7 @@ export interface Enrolment {
 
 // API service functions
 export const getEnrolments = () => {
-  return apiClient.get<Enrolment[]>('/admin/enrolments');
+  return apiClient.get<Enrolment[]>('/admin/enrolments', { params: { stream: 1 } });
 };
 
 export const addEnrolment = (enrolment: Omit<Enrolment, 'id' | 'student_name' | 'module_title'>) => {
@@ -13,7 +13,7 @@ export interface Grade {
 
 // API service functions
 export const getGrades = () => {
-  return apiClient.get<Grade[]>('/admin/grades');
+  return apiClient.get<Grade[]>('/admin/grades', { params: { stream: 1 } });
 };
 
 export const addGrade = (grade: Omit<Grade, 'id' | 'student_name' | 'module_title'>) => {
@@ -9,10 +9,18 @@ export interface Module {
   is_active?: boolean; // Make is_active optional for new modules
 }
 
+// Minimal module shape used to populate dropdowns
+export type ModuleOption = Pick<Module, 'id' | 'module_code' | 'module_title'>;
+
 export const getModules = () => {
   return apiClient.get<Module[]>('/admin/modules');
 };
 
+// Fetches only the columns needed for a module dropdown
+export const getModuleOptions = () => {
+  return apiClient.get<ModuleOption[]>('/admin/modules', { params: { fields: 'id,module_code,module_title' } });
+};
+
 export const addModule = (moduleData: Omit<Module, 'id' | 'is_active'>) => {
   return apiClient.post<Module>('/admin/modules', moduleData);
 };
@@ -12,11 +12,19 @@ export interface Student {
   enrolments?: string[]; // Assuming enrolments are just module titles for display
 }
 
+// Minimal student shape used to populate dropdowns
+export type StudentOption = Pick<Student, 'id' | 'full_name' | 'student_number'>;
+
 // API service functions
 export const getStudents = () => {
   return apiClient.get<Student[]>('/admin/students');
 };
 
+// Fetches only the columns needed for a student dropdown
+export const getStudentOptions = () => {
+  return apiClient.get<StudentOption[]>('/admin/students', { params: { fields: 'id,full_name,student_number' } });
+};
+
 export const getStudentById = (id: number) => {
   return apiClient.get<Student>(`/analysis/students/${id}`);
 };
@@ -16,7 +16,7 @@ export interface SubmissionRecord {
 
 // API service functions
 export const getSubmissionRecords = () => {
-  return apiClient.get<SubmissionRecord[]>('/admin/submission-records');
+  return apiClient.get<SubmissionRecord[]>('/admin/submission-records', { params: { stream: 1 } });
 };
 
 export const addSubmissionRecord = (record: Omit<SubmissionRecord, 'id' | 'student_name' | 'module_title'>) => {
@@ -15,7 +15,7 @@ export interface SurveyResponse {
 
 // API service functions
 export const getSurveyResponses = () => {
-  return apiClient.get<SurveyResponse[]>('/admin/survey-responses');
+  return apiClient.get<SurveyResponse[]>('/admin/survey-responses', { params: { stream: 1 } });
 };
 
 export const addSurveyResponse = (response: Omit<SurveyResponse, 'id' | 'student_name' | 'module_title'>) => {
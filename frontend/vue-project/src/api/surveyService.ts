@@ -20,7 +20,7 @@ export const submitSurvey = (survey: SurveyResponse) => {
 
 // Potentially add other CRUD operations if needed for admin views
 export const getSurveyResponses = () => {
-  return apiClient.get<SurveyResponse[]>('/admin/survey-responses');
+  return apiClient.get<SurveyResponse[]>('/admin/survey-responses', { params: { stream: 1 } });
 };
 
 export const updateSurveyResponse = (id: number, survey: SurveyResponse) => {
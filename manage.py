@@ -2,11 +2,14 @@
 Management script for the Flask application.
 
 This script provides command-line interface (CLI) commands for common
-administrative tasks such as database initialization and data seeding.
+administrative tasks such as database initialization, schema migrations,
+data seeding, CSV imports, synthetic load datasets, analytics maintenance,
+the background detection worker and benchmarks.
 It integrates with Flask's CLI system.
 """
 
 import os
+import shutil
 import sys
 import click
 from flask import current_app
@@ -17,7 +20,19 @@ from flask import current_app
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 from app import create_app
+from app.admin.services import evaluate_alerts
+from app.db_connection import dispose_pool, get_db
+from app.repositories.student_metrics_repository import student_metrics_repository
+from app.repositories.module_week_rollup_repository import module_week_rollup_repository
+from app.repositories.metric_histogram_repository import metric_histogram_repository
+from app.repositories.detection_job_repository import detection_job_repository
+from utils.csv_import import import_csv, IMPORT_TARGETS, CsvImportError
+from utils.detection_worker import default_worker_id, run_worker
+from utils.generate_data import default_snapshot_path, generate_dataset
+from utils.migrate import apply_migrations, get_migration_status, MigrationError
+from utils.query_plans import collect_query_plans, format_report
 from utils.seed_data import seed_data
+from utils.submission_benchmark import run_submission_benchmark
 
 # Create a Flask application instance for the CLI commands.
 # The configuration is determined by the 'FLASK_CONFIG' environment variable,
@@ -30,7 +45,8 @@ def init_db_command():
     CLI command to initialize the database.
 
     This command performs the following actions:
-    1. Deletes any existing database file specified in the application configuration.
+    1. Closes any pooled connections and deletes the existing database file
+       specified in the application configuration.
     2. Calls the `seed_data()` function to create all necessary tables and
        populate them with initial demo data.
 
@@ -40,6 +56,8 @@ def init_db_command():
         db_path = current_app.config['DATABASE_PATH']
         
         try:
+            # Release pooled connections so none of them keeps the old file open.
+            dispose_pool(app)
             # Attempt to remove the existing database file to ensure a clean slate.
             if os.path.exists(db_path):
                 os.remove(db_path)
@@ -84,3 +102,323 @@ def seed_command():
             # Catch any other unexpected errors during the seeding process.
             click.echo(f"Error: An unexpected error occurred during database seeding. {e}", err=True)
             current_app.logger.error(f"Unexpected error during seed: {e}", exc_info=True)
+
+@app.cli.command("migrate")
+@click.option('--status', 'show_status', is_flag=True, help='List applied and pending migrations without applying anything.')
+@click.option('--target', type=int, default=None, help='Highest migration version to apply (defaults to all).')
+def migrate_command(show_status, target):
+    """
+    CLI command to bring the database schema up to date.
+
+    Applies every migration in `migrations/` that is not yet recorded in the
+    `schema_migrations` table, in version order. Existing data is preserved,
+    so this is the way to upgrade a production database; `init-db` is only
+    meant for creating a fresh development or testing database.
+    """
+    with app.app_context():
+        try:
+            db = get_db()
+            if show_status:
+                for migration in get_migration_status(db):
+                    state = f"applied {migration['applied_at']}" if migration['applied'] else 'pending'
+                    click.echo(f"{migration['name']}: {state}")
+                return
+
+            applied = apply_migrations(db, target=target)
+            for name in applied:
+                click.echo(f"Applied migration {name}")
+            click.echo(f"Database schema is up to date ({len(applied)} migration(s) applied).")
+        except ConnectionError as e:
+            # Handle errors specifically related to database connection.
+            click.echo(f"Error: Could not connect to the database during migration. {e}", err=True)
+            current_app.logger.error(f"Database connection error during migrate: {e}")
+        except MigrationError as e:
+            # A failing migration is rolled back; earlier migrations stay applied.
+            click.echo(f"Error: {e}", err=True)
+        except Exception as e:
+            # Catch any other unexpected errors during the migration process.
+            click.echo(f"Error: An unexpected error occurred during migration. {e}", err=True)
+            current_app.logger.error(f"Unexpected error during migrate: {e}", exc_info=True)
+
+@app.cli.command("query-plans")
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), default=None,
+              help='Write the report to this file instead of standard output.')
+def query_plans_command(output):
+    """
+    CLI command to report the query plan of every repository statement.
+
+    Runs the repository query catalog against an in-memory copy of the
+    configured (seeded) database and prints `EXPLAIN QUERY PLAN` for each
+    statement. The report is stable across runs so it can be committed and
+    diffed between releases. Exits with status 1 if any hot-path query plans
+    as a full table scan.
+    """
+    with app.app_context():
+        try:
+            plans = collect_query_plans()
+        except Exception as e:
+            click.echo(f"Error: Could not collect query plans. {e}", err=True)
+            current_app.logger.error(f"Unexpected error during query-plans: {e}", exc_info=True)
+            sys.exit(2)
+
+        report = format_report(plans)
+        if output:
+            with open(output, 'w', encoding='utf-8') as report_file:
+                report_file.write(report)
+            click.echo(f"Query plan report written to {output}")
+        else:
+            click.echo(report, nl=False)
+
+        violations = [entry for entry in plans if entry.violations]
+        for entry in violations:
+            click.echo(f"Full table scan on hot path {entry.case}: {'; '.join(entry.violations)}", err=True)
+        if violations:
+            sys.exit(1)
+
+@app.cli.command("import")
+@click.argument('entity', type=click.Choice(sorted(IMPORT_TARGETS)))
+@click.argument('csv_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', type=click.IntRange(min=1), default=5000, show_default=True,
+              help='Rows inserted and committed per transaction.')
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint of an earlier run and import from the first row.')
+@click.option('--defer-indexes', is_flag=True,
+              help="Drop the table's secondary indexes and triggers during the import and recreate them at the end.")
+@click.option('--column', 'columns', multiple=True, metavar='CSV_COLUMN=FIELD',
+              help='Map a CSV column to a field whose name it does not match (repeatable).')
+@click.option('--rejects', type=click.Path(dir_okay=False, writable=True), default=None,
+              help='Append rejected rows and their errors to this CSV file.')
+def import_command(entity, csv_file, batch_size, restart, defer_indexes, columns, rejects):
+    """
+    CLI command to import a CSV export into the database.
+
+    Streams CSV_FILE in batches of `--batch-size` rows; each batch is validated
+    against the entity's bulk schema, inserted with one prepared statement and
+    committed together with a checkpoint. If the import is interrupted, running
+    the same command again resumes after the last committed batch. Progress and
+    throughput (rows per second) are reported after every batch.
+    """
+    column_overrides = {}
+    for mapping in columns:
+        csv_column, _, field = mapping.partition('=')
+        if not field:
+            raise click.BadParameter(f"'{mapping}' is not of the form CSV_COLUMN=FIELD.", param_hint='--column')
+        column_overrides[csv_column] = field.strip()
+
+    def report_progress(rows_done, created, rejected, rows_per_second):
+        click.echo(f"{rows_done:,} rows processed ({created:,} created, {rejected:,} rejected) - {rows_per_second:,.0f} rows/s")
+
+    with app.app_context():
+        try:
+            result = import_csv(get_db(), entity, csv_file, batch_size=batch_size, restart=restart, defer=defer_indexes,
+                                column_overrides=column_overrides, rejects_path=rejects, progress=report_progress)
+        except CsvImportError as e:
+            click.echo(f"Error: {e}", err=True)
+            sys.exit(1)
+        except Exception as e:
+            # The failed batch was rolled back; the checkpoint still points at the last committed one.
+            click.echo(f"Error: Import failed. Committed batches are kept; run the same command again to resume. {e}", err=True)
+            current_app.logger.error(f"Unexpected error during import: {e}", exc_info=True)
+            sys.exit(1)
+
+        if not result.completed:
+            click.echo(f"{csv_file} was already imported ({result.skipped:,} rows). Use --restart to import it again.")
+            return
+        if result.skipped:
+            click.echo(f"Resumed after {result.skipped:,} previously imported rows.")
+        rate = result.rows_read / result.seconds if result.seconds else 0.0
+        click.echo(f"Imported {result.created:,} {entity} ({result.rejected:,} rejected) from {result.rows_read:,} rows "
+                   f"in {result.seconds:.1f}s ({rate:,.0f} rows/s).")
+
+@app.cli.command("generate")
+@click.option('--students', type=click.IntRange(min=1), default=1000, show_default=True, help='Number of students.')
+@click.option('--modules', type=click.IntRange(min=1), default=40, show_default=True, help='Number of modules.')
+@click.option('--weeks', type=click.IntRange(min=1), default=12, show_default=True, help='Number of term weeks.')
+@click.option('--seed', type=int, default=42, show_default=True, help='Random seed; the same parameters give the same data.')
+@click.option('--output', type=click.Path(dir_okay=False), default=None,
+              help='Snapshot file to write. Defaults to snapshots/students<N>_modules<M>_weeks<W>_seed<S>.sqlite.')
+@click.option('--force', is_flag=True, help='Regenerate the snapshot even if the output file already exists.')
+@click.option('--install', is_flag=True, help="Copy the snapshot over the configured application database.")
+def generate_command(students, modules, weeks, seed, output, force, install):
+    """
+    CLI command to build a synthetic load-testing dataset.
+
+    Writes a standalone SQLite snapshot with the schema and generated data for
+    the given parameters (see `utils/generate_data.py`). An existing snapshot
+    for the same output path is reused unless `--force` is given, so benchmark
+    datasets are built once and shared between runs. With `--install`, the
+    snapshot replaces the database configured for the current environment.
+    """
+    output = output or default_snapshot_path(students, modules, weeks, seed)
+
+    def report_progress(students_done, rows_written, rows_per_second):
+        click.echo(f"{students_done:,}/{students:,} students, {rows_written:,} rows - {rows_per_second:,.0f} rows/s")
+
+    with app.app_context():
+        if os.path.exists(output) and not force:
+            click.echo(f"Reusing existing snapshot {output} (use --force to regenerate).")
+        else:
+            try:
+                result = generate_dataset(output, students=students, modules=modules, weeks=weeks, seed=seed,
+                                          progress=report_progress)
+            except Exception as e:
+                click.echo(f"Error: Could not generate the dataset. {e}", err=True)
+                current_app.logger.error(f"Unexpected error during generate: {e}", exc_info=True)
+                sys.exit(1)
+            total = sum(result.rows.values())
+            for table, count in result.rows.items():
+                click.echo(f"  {table}: {count:,}")
+            click.echo(f"Wrote {total:,} rows to {output} in {result.seconds:.1f}s ({total / result.seconds:,.0f} rows/s).")
+
+        if install:
+            db_path = current_app.config['DATABASE_PATH']
+            # Release pooled connections and the old WAL files before the file is replaced.
+            dispose_pool(app)
+            for suffix in ('-wal', '-shm'):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+            shutil.copyfile(output, db_path)
+            click.echo(f"Installed {output} as {db_path}.")
+
+@app.cli.command("rebuild-metrics")
+@click.option('--check', is_flag=True, help='Only report drifted students and module-weeks; exit with status 1 if any drifted.')
+def rebuild_metrics_command(check):
+    """
+    CLI command to recompute the `student_metrics`, `module_week_rollups` and `metric_histograms` read models.
+
+    The read models are kept current by triggers, so this is only needed
+    after rows were written with the triggers dropped (e.g. an interrupted
+    `flask import --defer-indexes`) or edited outside the application. With
+    `--check`, nothing is changed and the drifted rows are listed instead.
+    """
+    with app.app_context():
+        try:
+            if check:
+                drifted = student_metrics_repository.find_drift()
+                drifted_weeks = module_week_rollup_repository.find_drift()
+                drifted_histograms = metric_histogram_repository.find_drift()
+                if drifted:
+                    shown = ', '.join(str(student_id) for student_id in drifted[:20])
+                    more = f" and {len(drifted) - 20} more" if len(drifted) > 20 else ''
+                    click.echo(f"Metrics of {len(drifted):,} student(s) drifted: {shown}{more}. Run 'flask rebuild-metrics'.", err=True)
+                if drifted_weeks:
+                    shown = ', '.join(f"module {module_id} week {week}" for module_id, week in drifted_weeks[:20])
+                    more = f" and {len(drifted_weeks) - 20} more" if len(drifted_weeks) > 20 else ''
+                    click.echo(f"Rollups of {len(drifted_weeks):,} module-week(s) drifted: {shown}{more}. Run 'flask rebuild-metrics'.", err=True)
+                if drifted_histograms:
+                    shown = ', '.join(f"{metric} {scope} {scope_id}" for metric, scope, scope_id in drifted_histograms[:20])
+                    more = f" and {len(drifted_histograms) - 20} more" if len(drifted_histograms) > 20 else ''
+                    click.echo(f"Histograms of {len(drifted_histograms):,} group(s) drifted: {shown}{more}. Run 'flask rebuild-metrics'.", err=True)
+                if drifted or drifted_weeks or drifted_histograms:
+                    sys.exit(1)
+                click.echo("Student metrics, module-week rollups and metric histograms match the base tables.")
+                return
+            students, student_modules = student_metrics_repository.rebuild()
+            module_weeks = module_week_rollup_repository.rebuild()
+            bins = metric_histogram_repository.rebuild() # Reads the rebuilt student metrics.
+            get_db().commit()
+            click.echo(f"Rebuilt metrics for {students:,} students ({student_modules:,} student-module rows), "
+                       f"{module_weeks:,} module-week rollups and {bins:,} histogram bins.")
+        except Exception as e:
+            get_db().rollback()
+            click.echo(f"Error: Could not rebuild the read models. {e}", err=True)
+            current_app.logger.error(f"Unexpected error during rebuild-metrics: {e}", exc_info=True)
+            sys.exit(1)
+
+@app.cli.command("evaluate-alerts")
+@click.option('--from-week', type=click.IntRange(min=1), default=None, help='First week to evaluate (defaults to the first week).')
+@click.option('--to-week', type=click.IntRange(min=1), default=None, help='Last week to evaluate (defaults to the last week).')
+@click.option('--threshold', type=click.IntRange(min=1, max=5), default=4, show_default=True,
+              help='Stress level that counts as high stress.')
+def evaluate_alerts_command(from_week, to_week, threshold):
+    """
+    CLI command to create the stress events and alerts missing from the survey history.
+
+    Applies the stress event and consecutive-week alert rules to every survey
+    response in the given weeks in one pass, e.g. after a backfill, an import
+    or a threshold change. Existing events and alerts are kept, so the command
+    can be run again safely.
+    """
+    with app.app_context():
+        try:
+            result = evaluate_alerts(from_week, to_week, threshold)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+        except Exception as e:
+            click.echo(f"Error: Could not evaluate alerts; nothing was changed. {e}", err=True)
+            current_app.logger.error(f"Unexpected error during evaluate-alerts: {e}", exc_info=True)
+            sys.exit(1)
+        click.echo(f"Created {result.stress_events:,} stress events and {result.alerts:,} alerts in {result.seconds:.1f}s.")
+
+@app.cli.command("benchmark-submissions")
+@click.option('--count', type=click.IntRange(min=1), default=200, show_default=True, help='Survey responses submitted.')
+@click.option('--inline', 'detect_inline', is_flag=True,
+              help='Run the stress checks in each submission instead of enqueueing detection jobs.')
+def benchmark_submissions_command(count, detect_inline):
+    """
+    CLI command to measure the cost of one survey submission.
+
+    Submits survey responses the way `POST /api/admin/survey-responses` does
+    and reports the statements and commits per submission and its latency.
+    The responses and everything they created are deleted afterwards. Run it
+    against a generated snapshot (`flask generate --install`).
+    """
+    with app.app_context():
+        try:
+            result = run_submission_benchmark(count, detect_inline)
+        except ValueError as e:
+            click.echo(f"Error: {e}", err=True)
+            sys.exit(1)
+        except Exception as e:
+            click.echo(f"Error: The benchmark failed. {e}", err=True)
+            current_app.logger.error(f"Unexpected error during benchmark-submissions: {e}", exc_info=True)
+            sys.exit(1)
+        mode = 'inline detection' if detect_inline else 'detection worker'
+        click.echo(f"{result.submissions:,} submissions ({mode}): {result.statements} statement(s) and {result.commits} commit(s) each, "
+                   f"p50 {result.p50_ms:.2f} ms, p95 {result.p95_ms:.2f} ms, max {result.max_ms:.2f} ms; "
+                   f"{result.stress_events:,} stress events and {result.alerts:,} alerts created and removed.")
+
+@app.cli.command("worker")
+@click.option('--batch-size', type=click.IntRange(min=1), default=100, show_default=True,
+              help='Detection jobs claimed and committed per transaction.')
+@click.option('--poll-interval', type=click.FloatRange(min=0), default=1.0, show_default=True,
+              help='Seconds to wait when no job is available.')
+@click.option('--lease', 'lease_seconds', type=click.FloatRange(min=1), default=60.0, show_default=True,
+              help='Seconds after which jobs claimed by a worker that stopped are claimed again.')
+@click.option('--max-attempts', type=click.IntRange(min=1), default=5, show_default=True,
+              help='Attempts after which a failing job is parked.')
+@click.option('--once', is_flag=True, help='Exit once the queue has no available jobs instead of polling.')
+@click.option('--stats', 'show_stats', is_flag=True, help='Print the depth and lag of the queue and exit.')
+def worker_command(batch_size, poll_interval, lease_seconds, max_attempts, once, show_stats):
+    """
+    CLI command to run the stress-event and alert detection worker.
+
+    Survey responses created or updated through the API enqueue a detection
+    job; the worker claims them in batches, creates the stress events and
+    alerts and deletes the jobs in one transaction. Several workers may run at
+    once. The queue depth and the lag of every batch are reported as it runs.
+    """
+    def report_batch(result):
+        failed = f", {result.failed:,} failed" if result.failed else ''
+        click.echo(f"{result.jobs:,} job(s) processed ({result.stress_events:,} stress events, {result.alerts:,} alerts{failed}) "
+                   f"- lag {result.lag_seconds:.1f}s")
+
+    with app.app_context():
+        if show_stats:
+            stats = detection_job_repository.get_stats()
+            click.echo(f"{stats['pending']:,} pending ({stats['ready']:,} ready, {stats['leased']:,} leased), "
+                       f"{stats['failed']:,} failed - lag {stats['lag_seconds']:.1f}s")
+            return
+        worker_id = default_worker_id()
+        click.echo(f"Detection worker {worker_id} started.")
+        try:
+            processed = run_worker(get_db(), worker_id, batch_size=batch_size, poll_interval=poll_interval, once=once,
+                                   on_batch=report_batch, lease_seconds=lease_seconds, max_attempts=max_attempts)
+            click.echo(f"Queue drained after {processed:,} job(s).")
+        except KeyboardInterrupt:
+            get_db().rollback() # Claimed but unfinished jobs are claimed again once their lease expires.
+            click.echo("Detection worker stopped.")
+        except Exception as e:
+            get_db().rollback()
+            click.echo(f"Error: The detection worker stopped. {e}", err=True)
+            current_app.logger.error(f"Unexpected error in the detection worker: {e}", exc_info=True)
+            sys.exit(1)
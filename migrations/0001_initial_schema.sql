@@ -0,0 +1,127 @@
+-- Baseline schema.
+--
+-- These are the tables originally created by utils/seed_data.py. Every
+-- statement uses IF NOT EXISTS so that databases created before the migration
+-- subsystem existed can be brought under version control without changes.
+
+CREATE TABLE IF NOT EXISTS students (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_number TEXT NOT NULL UNIQUE,
+    full_name TEXT NOT NULL,
+    email TEXT,
+    course_name TEXT,
+    year_of_study INTEGER,
+    is_active INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL,
+    role TEXT NOT NULL,
+    student_id INTEGER,
+    created_at TEXT,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS modules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    module_code TEXT NOT NULL UNIQUE,
+    module_title TEXT NOT NULL,
+    credit INTEGER,
+    academic_year TEXT,
+    is_active INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS enrolments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id INTEGER NOT NULL,
+    module_id INTEGER NOT NULL,
+    enrol_date TEXT,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
+    FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS attendance_records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id INTEGER NOT NULL,
+    module_id INTEGER NOT NULL,
+    week_number INTEGER NOT NULL,
+    attended_sessions INTEGER,
+    total_sessions INTEGER,
+    attendance_rate REAL,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
+    FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS submission_records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id INTEGER NOT NULL,
+    module_id INTEGER NOT NULL,
+    assessment_name TEXT NOT NULL,
+    due_date TEXT,
+    submitted_date TEXT,
+    is_submitted INTEGER NOT NULL DEFAULT 0,
+    is_late INTEGER NOT NULL DEFAULT 0,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
+    FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS survey_responses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id INTEGER NOT NULL,
+    module_id INTEGER,
+    week_number INTEGER NOT NULL,
+    stress_level INTEGER NOT NULL,
+    hours_slept REAL,
+    mood_comment TEXT,
+    created_at TEXT,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
+    FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS grades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id INTEGER NOT NULL,
+    module_id INTEGER NOT NULL,
+    assessment_name TEXT NOT NULL,
+    grade REAL,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
+    FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id INTEGER NOT NULL,
+    module_id INTEGER,
+    week_number INTEGER,
+    reason TEXT NOT NULL,
+    created_at TEXT,
+    resolved INTEGER NOT NULL DEFAULT 0,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
+    FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS stress_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id INTEGER NOT NULL,
+    module_id INTEGER,
+    survey_response_id INTEGER,
+    week_number INTEGER,
+    stress_level INTEGER NOT NULL,
+    cause_category TEXT NOT NULL,
+    description TEXT,
+    source TEXT NOT NULL,
+    created_at TEXT,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
+    FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE SET NULL,
+    FOREIGN KEY (survey_response_id) REFERENCES survey_responses(id) ON DELETE SET NULL
+);
@@ -0,0 +1,26 @@
+-- Composite and partial indexes for the per-student, per-week lookups.
+--
+-- The partial indexes only cover active rows, matching the `is_active = 1`
+-- predicate used by every read in the repositories, so logically deleted
+-- rows do not bloat them.
+
+-- AnalysisRepository.get_stress_trend_for_student.
+CREATE INDEX IF NOT EXISTS idx_survey_responses_student_week
+    ON survey_responses (student_id, week_number) WHERE is_active = 1;
+
+-- SurveyResponseRepository._check_for_stress_events_and_alerts (previous week lookup).
+CREATE INDEX IF NOT EXISTS idx_survey_responses_student_module_week
+    ON survey_responses (student_id, module_id, week_number) WHERE is_active = 1;
+
+-- AnalysisRepository.get_attendance_trend_for_student / get_average_attendance_for_student.
+CREATE INDEX IF NOT EXISTS idx_attendance_records_student_week
+    ON attendance_records (student_id, week_number) WHERE is_active = 1;
+
+-- AlertRepository.get_alerts_by_student_id, the alert de-duplication check and
+-- the latest-alert-per-student subquery in get_recent_alerts_per_student.
+CREATE INDEX IF NOT EXISTS idx_alerts_student_week
+    ON alerts (student_id, week_number);
+
+-- Stress event de-duplication by survey response.
+CREATE INDEX IF NOT EXISTS idx_stress_events_survey_response
+    ON stress_events (survey_response_id);
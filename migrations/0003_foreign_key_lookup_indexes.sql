@@ -0,0 +1,20 @@
+-- Indexes for the remaining per-student and per-module lookups.
+
+-- StudentRepository.get_student_enrolments.
+CREATE INDEX IF NOT EXISTS idx_enrolments_student
+    ON enrolments (student_id) WHERE is_active = 1;
+
+-- Per-student grade and submission lookups.
+CREATE INDEX IF NOT EXISTS idx_grades_student_module
+    ON grades (student_id, module_id) WHERE is_active = 1;
+
+CREATE INDEX IF NOT EXISTS idx_submission_records_student_module
+    ON submission_records (student_id, module_id) WHERE is_active = 1;
+
+-- AnalysisRepository.get_stress_level_by_module.
+CREATE INDEX IF NOT EXISTS idx_survey_responses_module
+    ON survey_responses (module_id) WHERE is_active = 1;
+
+-- Linking a user account back to its student record.
+CREATE INDEX IF NOT EXISTS idx_users_student
+    ON users (student_id);
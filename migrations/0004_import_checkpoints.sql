@@ -0,0 +1,15 @@
+-- Progress of `flask import` runs, so that an interrupted import can resume
+-- from the last committed batch instead of starting over. The row is updated in
+-- the same transaction as the batch it describes.
+CREATE TABLE IF NOT EXISTS import_checkpoints (
+    source TEXT PRIMARY KEY, -- "<entity>:<absolute file path>"
+    entity TEXT NOT NULL,
+    file_size INTEGER NOT NULL,
+    rows_done INTEGER NOT NULL DEFAULT 0, -- Data rows consumed (created + rejected).
+    rows_created INTEGER NOT NULL DEFAULT 0,
+    rows_rejected INTEGER NOT NULL DEFAULT 0,
+    deferred_indexes TEXT, -- JSON list of CREATE INDEX statements to restore when the import finishes.
+    started_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    completed_at TEXT
+);
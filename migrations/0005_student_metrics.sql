@@ -0,0 +1,192 @@
+-- Per-student and per-student-module running sums and counts of attendance
+-- rate, grade and stress level (a read model for the analytics endpoints).
+--
+-- The tables are kept up to date by the triggers below on every insert, update
+-- and delete of attendance_records, grades and survey_responses, including
+-- logical deletes (is_active set to 0), so they match the base tables however
+-- rows are written (repositories, bulk endpoints, seeding). Bulk loads that drop
+-- the triggers for speed (`flask import --defer-indexes`, `flask generate`)
+-- rebuild both tables once the triggers are restored.
+-- Averages are `<metric>_sum / <metric>_count`; a count of 0 means no data.
+-- NULL values and inactive rows are not counted, like AVG() over active rows.
+-- `flask rebuild-metrics` recomputes both tables from scratch.
+
+CREATE TABLE IF NOT EXISTS student_metrics (
+    student_id INTEGER PRIMARY KEY,
+    attendance_sum REAL NOT NULL DEFAULT 0,
+    attendance_count INTEGER NOT NULL DEFAULT 0,
+    grade_sum REAL NOT NULL DEFAULT 0,
+    grade_count INTEGER NOT NULL DEFAULT 0,
+    stress_sum REAL NOT NULL DEFAULT 0,
+    stress_count INTEGER NOT NULL DEFAULT 0
+);
+
+-- Survey responses without a module only count towards student_metrics.
+CREATE TABLE IF NOT EXISTS student_module_metrics (
+    student_id INTEGER NOT NULL,
+    module_id INTEGER NOT NULL,
+    attendance_sum REAL NOT NULL DEFAULT 0,
+    attendance_count INTEGER NOT NULL DEFAULT 0,
+    grade_sum REAL NOT NULL DEFAULT 0,
+    grade_count INTEGER NOT NULL DEFAULT 0,
+    stress_sum REAL NOT NULL DEFAULT 0,
+    stress_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (student_id, module_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_student_module_metrics_module
+    ON student_module_metrics (module_id);
+
+-- attendance_records.attendance_rate -> attendance_sum / attendance_count
+CREATE TRIGGER IF NOT EXISTS trg_attendance_records_metrics_insert AFTER INSERT ON attendance_records
+WHEN NEW.is_active = 1 AND NEW.attendance_rate IS NOT NULL
+BEGIN
+    INSERT INTO student_metrics (student_id, attendance_sum, attendance_count) VALUES (NEW.student_id, NEW.attendance_rate, 1)
+        ON CONFLICT (student_id) DO UPDATE SET attendance_sum = attendance_sum + excluded.attendance_sum, attendance_count = attendance_count + 1;
+    INSERT INTO student_module_metrics (student_id, module_id, attendance_sum, attendance_count)
+        SELECT NEW.student_id, NEW.module_id, NEW.attendance_rate, 1 WHERE NEW.module_id IS NOT NULL
+        ON CONFLICT (student_id, module_id) DO UPDATE SET attendance_sum = attendance_sum + excluded.attendance_sum, attendance_count = attendance_count + 1;
+END;
+
+-- An update (including a logical delete) removes the old row's contribution and adds the new one.
+CREATE TRIGGER IF NOT EXISTS trg_attendance_records_metrics_update_old AFTER UPDATE OF student_id, module_id, attendance_rate, is_active ON attendance_records
+WHEN OLD.is_active = 1 AND OLD.attendance_rate IS NOT NULL
+BEGIN
+    UPDATE student_metrics SET attendance_sum = attendance_sum - OLD.attendance_rate, attendance_count = attendance_count - 1
+        WHERE student_id = OLD.student_id;
+    UPDATE student_module_metrics SET attendance_sum = attendance_sum - OLD.attendance_rate, attendance_count = attendance_count - 1
+        WHERE student_id = OLD.student_id AND module_id = OLD.module_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_records_metrics_update_new AFTER UPDATE OF student_id, module_id, attendance_rate, is_active ON attendance_records
+WHEN NEW.is_active = 1 AND NEW.attendance_rate IS NOT NULL
+BEGIN
+    INSERT INTO student_metrics (student_id, attendance_sum, attendance_count) VALUES (NEW.student_id, NEW.attendance_rate, 1)
+        ON CONFLICT (student_id) DO UPDATE SET attendance_sum = attendance_sum + excluded.attendance_sum, attendance_count = attendance_count + 1;
+    INSERT INTO student_module_metrics (student_id, module_id, attendance_sum, attendance_count)
+        SELECT NEW.student_id, NEW.module_id, NEW.attendance_rate, 1 WHERE NEW.module_id IS NOT NULL
+        ON CONFLICT (student_id, module_id) DO UPDATE SET attendance_sum = attendance_sum + excluded.attendance_sum, attendance_count = attendance_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_records_metrics_delete AFTER DELETE ON attendance_records
+WHEN OLD.is_active = 1 AND OLD.attendance_rate IS NOT NULL
+BEGIN
+    UPDATE student_metrics SET attendance_sum = attendance_sum - OLD.attendance_rate, attendance_count = attendance_count - 1
+        WHERE student_id = OLD.student_id;
+    UPDATE student_module_metrics SET attendance_sum = attendance_sum - OLD.attendance_rate, attendance_count = attendance_count - 1
+        WHERE student_id = OLD.student_id AND module_id = OLD.module_id;
+END;
+
+-- grades.grade -> grade_sum / grade_count
+CREATE TRIGGER IF NOT EXISTS trg_grades_metrics_insert AFTER INSERT ON grades
+WHEN NEW.is_active = 1 AND NEW.grade IS NOT NULL
+BEGIN
+    INSERT INTO student_metrics (student_id, grade_sum, grade_count) VALUES (NEW.student_id, NEW.grade, 1)
+        ON CONFLICT (student_id) DO UPDATE SET grade_sum = grade_sum + excluded.grade_sum, grade_count = grade_count + 1;
+    INSERT INTO student_module_metrics (student_id, module_id, grade_sum, grade_count)
+        SELECT NEW.student_id, NEW.module_id, NEW.grade, 1 WHERE NEW.module_id IS NOT NULL
+        ON CONFLICT (student_id, module_id) DO UPDATE SET grade_sum = grade_sum + excluded.grade_sum, grade_count = grade_count + 1;
+END;
+
+-- An update (including a logical delete) removes the old row's contribution and adds the new one.
+CREATE TRIGGER IF NOT EXISTS trg_grades_metrics_update_old AFTER UPDATE OF student_id, module_id, grade, is_active ON grades
+WHEN OLD.is_active = 1 AND OLD.grade IS NOT NULL
+BEGIN
+    UPDATE student_metrics SET grade_sum = grade_sum - OLD.grade, grade_count = grade_count - 1
+        WHERE student_id = OLD.student_id;
+    UPDATE student_module_metrics SET grade_sum = grade_sum - OLD.grade, grade_count = grade_count - 1
+        WHERE student_id = OLD.student_id AND module_id = OLD.module_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_grades_metrics_update_new AFTER UPDATE OF student_id, module_id, grade, is_active ON grades
+WHEN NEW.is_active = 1 AND NEW.grade IS NOT NULL
+BEGIN
+    INSERT INTO student_metrics (student_id, grade_sum, grade_count) VALUES (NEW.student_id, NEW.grade, 1)
+        ON CONFLICT (student_id) DO UPDATE SET grade_sum = grade_sum + excluded.grade_sum, grade_count = grade_count + 1;
+    INSERT INTO student_module_metrics (student_id, module_id, grade_sum, grade_count)
+        SELECT NEW.student_id, NEW.module_id, NEW.grade, 1 WHERE NEW.module_id IS NOT NULL
+        ON CONFLICT (student_id, module_id) DO UPDATE SET grade_sum = grade_sum + excluded.grade_sum, grade_count = grade_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_grades_metrics_delete AFTER DELETE ON grades
+WHEN OLD.is_active = 1 AND OLD.grade IS NOT NULL
+BEGIN
+    UPDATE student_metrics SET grade_sum = grade_sum - OLD.grade, grade_count = grade_count - 1
+        WHERE student_id = OLD.student_id;
+    UPDATE student_module_metrics SET grade_sum = grade_sum - OLD.grade, grade_count = grade_count - 1
+        WHERE student_id = OLD.student_id AND module_id = OLD.module_id;
+END;
+
+-- survey_responses.stress_level -> stress_sum / stress_count
+CREATE TRIGGER IF NOT EXISTS trg_survey_responses_metrics_insert AFTER INSERT ON survey_responses
+WHEN NEW.is_active = 1 AND NEW.stress_level IS NOT NULL
+BEGIN
+    INSERT INTO student_metrics (student_id, stress_sum, stress_count) VALUES (NEW.student_id, NEW.stress_level, 1)
+        ON CONFLICT (student_id) DO UPDATE SET stress_sum = stress_sum + excluded.stress_sum, stress_count = stress_count + 1;
+    INSERT INTO student_module_metrics (student_id, module_id, stress_sum, stress_count)
+        SELECT NEW.student_id, NEW.module_id, NEW.stress_level, 1 WHERE NEW.module_id IS NOT NULL
+        ON CONFLICT (student_id, module_id) DO UPDATE SET stress_sum = stress_sum + excluded.stress_sum, stress_count = stress_count + 1;
+END;
+
+-- An update (including a logical delete) removes the old row's contribution and adds the new one.
+CREATE TRIGGER IF NOT EXISTS trg_survey_responses_metrics_update_old AFTER UPDATE OF student_id, module_id, stress_level, is_active ON survey_responses
+WHEN OLD.is_active = 1 AND OLD.stress_level IS NOT NULL
+BEGIN
+    UPDATE student_metrics SET stress_sum = stress_sum - OLD.stress_level, stress_count = stress_count - 1
+        WHERE student_id = OLD.student_id;
+    UPDATE student_module_metrics SET stress_sum = stress_sum - OLD.stress_level, stress_count = stress_count - 1
+        WHERE student_id = OLD.student_id AND module_id = OLD.module_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_survey_responses_metrics_update_new AFTER UPDATE OF student_id, module_id, stress_level, is_active ON survey_responses
+WHEN NEW.is_active = 1 AND NEW.stress_level IS NOT NULL
+BEGIN
+    INSERT INTO student_metrics (student_id, stress_sum, stress_count) VALUES (NEW.student_id, NEW.stress_level, 1)
+        ON CONFLICT (student_id) DO UPDATE SET stress_sum = stress_sum + excluded.stress_sum, stress_count = stress_count + 1;
+    INSERT INTO student_module_metrics (student_id, module_id, stress_sum, stress_count)
+        SELECT NEW.student_id, NEW.module_id, NEW.stress_level, 1 WHERE NEW.module_id IS NOT NULL
+        ON CONFLICT (student_id, module_id) DO UPDATE SET stress_sum = stress_sum + excluded.stress_sum, stress_count = stress_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_survey_responses_metrics_delete AFTER DELETE ON survey_responses
+WHEN OLD.is_active = 1 AND OLD.stress_level IS NOT NULL
+BEGIN
+    UPDATE student_metrics SET stress_sum = stress_sum - OLD.stress_level, stress_count = stress_count - 1
+        WHERE student_id = OLD.student_id;
+    UPDATE student_module_metrics SET stress_sum = stress_sum - OLD.stress_level, stress_count = stress_count - 1
+        WHERE student_id = OLD.student_id AND module_id = OLD.module_id;
+END;
+
+-- Backfill from the rows that existed before this migration.
+DELETE FROM student_metrics;
+DELETE FROM student_module_metrics;
+
+INSERT INTO student_metrics (student_id, attendance_sum, attendance_count, grade_sum, grade_count, stress_sum, stress_count)
+SELECT student_id, SUM(attendance_sum), SUM(attendance_count), SUM(grade_sum), SUM(grade_count), SUM(stress_sum), SUM(stress_count)
+FROM (
+    SELECT student_id, TOTAL(attendance_rate) AS attendance_sum, COUNT(attendance_rate) AS attendance_count,
+           0 AS grade_sum, 0 AS grade_count, 0 AS stress_sum, 0 AS stress_count
+    FROM attendance_records WHERE is_active = 1 AND attendance_rate IS NOT NULL GROUP BY student_id
+    UNION ALL
+    SELECT student_id, 0, 0, TOTAL(grade), COUNT(grade), 0, 0
+    FROM grades WHERE is_active = 1 AND grade IS NOT NULL GROUP BY student_id
+    UNION ALL
+    SELECT student_id, 0, 0, 0, 0, TOTAL(stress_level), COUNT(stress_level)
+    FROM survey_responses WHERE is_active = 1 GROUP BY student_id
+)
+GROUP BY student_id;
+
+INSERT INTO student_module_metrics (student_id, module_id, attendance_sum, attendance_count, grade_sum, grade_count, stress_sum, stress_count)
+SELECT student_id, module_id, SUM(attendance_sum), SUM(attendance_count), SUM(grade_sum), SUM(grade_count), SUM(stress_sum), SUM(stress_count)
+FROM (
+    SELECT student_id, module_id, TOTAL(attendance_rate) AS attendance_sum, COUNT(attendance_rate) AS attendance_count,
+           0 AS grade_sum, 0 AS grade_count, 0 AS stress_sum, 0 AS stress_count
+    FROM attendance_records WHERE is_active = 1 AND attendance_rate IS NOT NULL GROUP BY student_id, module_id
+    UNION ALL
+    SELECT student_id, module_id, 0, 0, TOTAL(grade), COUNT(grade), 0, 0
+    FROM grades WHERE is_active = 1 AND grade IS NOT NULL GROUP BY student_id, module_id
+    UNION ALL
+    SELECT student_id, module_id, 0, 0, 0, 0, TOTAL(stress_level), COUNT(stress_level)
+    FROM survey_responses WHERE is_active = 1 AND module_id IS NOT NULL GROUP BY student_id, module_id
+)
+GROUP BY student_id, module_id;
@@ -0,0 +1,151 @@
+-- Per-module, per-week rollups of stress level, hours slept and attendance
+-- rate (a read model for the module-week heatmap and module trend lines).
+--
+-- Each row holds the count, sum and sum of squares of every metric, so the
+-- mean (`sum / count`) and the population standard deviation
+-- (`sqrt(sumsq / count - mean^2)`) of any week, or of any range of weeks, can be
+-- derived without touching the event rows. `academic_year` is copied from the
+-- module so that a year can be read without a join; the modules trigger keeps
+-- it in sync.
+--
+-- Like `student_metrics` (0005), the rows are kept current by triggers on every
+-- insert, update and delete of survey_responses and attendance_records,
+-- including logical deletes. NULL values, inactive rows and surveys without a
+-- module are not counted. Bulk loads that drop the triggers rebuild the table
+-- once they are restored, and `flask rebuild-metrics` recomputes it from scratch.
+
+CREATE TABLE IF NOT EXISTS module_week_rollups (
+    module_id INTEGER NOT NULL,
+    week_number INTEGER NOT NULL,
+    academic_year TEXT,
+    stress_count INTEGER NOT NULL DEFAULT 0,
+    stress_sum REAL NOT NULL DEFAULT 0,
+    stress_sumsq REAL NOT NULL DEFAULT 0,
+    sleep_count INTEGER NOT NULL DEFAULT 0,
+    sleep_sum REAL NOT NULL DEFAULT 0,
+    sleep_sumsq REAL NOT NULL DEFAULT 0,
+    attendance_count INTEGER NOT NULL DEFAULT 0,
+    attendance_sum REAL NOT NULL DEFAULT 0,
+    attendance_sumsq REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (module_id, week_number)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_module_week_rollups_year
+    ON module_week_rollups (academic_year, module_id);
+
+-- survey_responses.stress_level and hours_slept -> stress_* and sleep_*
+CREATE TRIGGER IF NOT EXISTS trg_survey_responses_rollups_insert AFTER INSERT ON survey_responses
+WHEN NEW.is_active = 1 AND NEW.module_id IS NOT NULL
+BEGIN
+    INSERT INTO module_week_rollups (module_id, week_number, academic_year, stress_count, stress_sum, stress_sumsq,
+                                     sleep_count, sleep_sum, sleep_sumsq)
+        SELECT NEW.module_id, NEW.week_number, m.academic_year, 1, NEW.stress_level, NEW.stress_level * NEW.stress_level,
+               NEW.hours_slept IS NOT NULL, COALESCE(NEW.hours_slept, 0), COALESCE(NEW.hours_slept * NEW.hours_slept, 0)
+        FROM modules m WHERE m.id = NEW.module_id
+        ON CONFLICT (module_id, week_number) DO UPDATE SET
+            stress_count = stress_count + 1, stress_sum = stress_sum + excluded.stress_sum, stress_sumsq = stress_sumsq + excluded.stress_sumsq,
+            sleep_count = sleep_count + excluded.sleep_count, sleep_sum = sleep_sum + excluded.sleep_sum, sleep_sumsq = sleep_sumsq + excluded.sleep_sumsq;
+END;
+
+-- An update (including a logical delete) removes the old row's contribution and adds the new one.
+CREATE TRIGGER IF NOT EXISTS trg_survey_responses_rollups_update_old AFTER UPDATE OF module_id, week_number, stress_level, hours_slept, is_active ON survey_responses
+WHEN OLD.is_active = 1 AND OLD.module_id IS NOT NULL
+BEGIN
+    UPDATE module_week_rollups SET
+        stress_count = stress_count - 1, stress_sum = stress_sum - OLD.stress_level, stress_sumsq = stress_sumsq - OLD.stress_level * OLD.stress_level,
+        sleep_count = sleep_count - (OLD.hours_slept IS NOT NULL), sleep_sum = sleep_sum - COALESCE(OLD.hours_slept, 0),
+        sleep_sumsq = sleep_sumsq - COALESCE(OLD.hours_slept * OLD.hours_slept, 0)
+        WHERE module_id = OLD.module_id AND week_number = OLD.week_number;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_survey_responses_rollups_update_new AFTER UPDATE OF module_id, week_number, stress_level, hours_slept, is_active ON survey_responses
+WHEN NEW.is_active = 1 AND NEW.module_id IS NOT NULL
+BEGIN
+    INSERT INTO module_week_rollups (module_id, week_number, academic_year, stress_count, stress_sum, stress_sumsq,
+                                     sleep_count, sleep_sum, sleep_sumsq)
+        SELECT NEW.module_id, NEW.week_number, m.academic_year, 1, NEW.stress_level, NEW.stress_level * NEW.stress_level,
+               NEW.hours_slept IS NOT NULL, COALESCE(NEW.hours_slept, 0), COALESCE(NEW.hours_slept * NEW.hours_slept, 0)
+        FROM modules m WHERE m.id = NEW.module_id
+        ON CONFLICT (module_id, week_number) DO UPDATE SET
+            stress_count = stress_count + 1, stress_sum = stress_sum + excluded.stress_sum, stress_sumsq = stress_sumsq + excluded.stress_sumsq,
+            sleep_count = sleep_count + excluded.sleep_count, sleep_sum = sleep_sum + excluded.sleep_sum, sleep_sumsq = sleep_sumsq + excluded.sleep_sumsq;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_survey_responses_rollups_delete AFTER DELETE ON survey_responses
+WHEN OLD.is_active = 1 AND OLD.module_id IS NOT NULL
+BEGIN
+    UPDATE module_week_rollups SET
+        stress_count = stress_count - 1, stress_sum = stress_sum - OLD.stress_level, stress_sumsq = stress_sumsq - OLD.stress_level * OLD.stress_level,
+        sleep_count = sleep_count - (OLD.hours_slept IS NOT NULL), sleep_sum = sleep_sum - COALESCE(OLD.hours_slept, 0),
+        sleep_sumsq = sleep_sumsq - COALESCE(OLD.hours_slept * OLD.hours_slept, 0)
+        WHERE module_id = OLD.module_id AND week_number = OLD.week_number;
+END;
+
+-- attendance_records.attendance_rate -> attendance_*
+CREATE TRIGGER IF NOT EXISTS trg_attendance_records_rollups_insert AFTER INSERT ON attendance_records
+WHEN NEW.is_active = 1 AND NEW.attendance_rate IS NOT NULL
+BEGIN
+    INSERT INTO module_week_rollups (module_id, week_number, academic_year, attendance_count, attendance_sum, attendance_sumsq)
+        SELECT NEW.module_id, NEW.week_number, m.academic_year, 1, NEW.attendance_rate, NEW.attendance_rate * NEW.attendance_rate
+        FROM modules m WHERE m.id = NEW.module_id
+        ON CONFLICT (module_id, week_number) DO UPDATE SET
+            attendance_count = attendance_count + 1, attendance_sum = attendance_sum + excluded.attendance_sum,
+            attendance_sumsq = attendance_sumsq + excluded.attendance_sumsq;
+END;
+
+-- An update (including a logical delete) removes the old row's contribution and adds the new one.
+CREATE TRIGGER IF NOT EXISTS trg_attendance_records_rollups_update_old AFTER UPDATE OF module_id, week_number, attendance_rate, is_active ON attendance_records
+WHEN OLD.is_active = 1 AND OLD.attendance_rate IS NOT NULL
+BEGIN
+    UPDATE module_week_rollups SET
+        attendance_count = attendance_count - 1, attendance_sum = attendance_sum - OLD.attendance_rate,
+        attendance_sumsq = attendance_sumsq - OLD.attendance_rate * OLD.attendance_rate
+        WHERE module_id = OLD.module_id AND week_number = OLD.week_number;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_records_rollups_update_new AFTER UPDATE OF module_id, week_number, attendance_rate, is_active ON attendance_records
+WHEN NEW.is_active = 1 AND NEW.attendance_rate IS NOT NULL
+BEGIN
+    INSERT INTO module_week_rollups (module_id, week_number, academic_year, attendance_count, attendance_sum, attendance_sumsq)
+        SELECT NEW.module_id, NEW.week_number, m.academic_year, 1, NEW.attendance_rate, NEW.attendance_rate * NEW.attendance_rate
+        FROM modules m WHERE m.id = NEW.module_id
+        ON CONFLICT (module_id, week_number) DO UPDATE SET
+            attendance_count = attendance_count + 1, attendance_sum = attendance_sum + excluded.attendance_sum,
+            attendance_sumsq = attendance_sumsq + excluded.attendance_sumsq;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_records_rollups_delete AFTER DELETE ON attendance_records
+WHEN OLD.is_active = 1 AND OLD.attendance_rate IS NOT NULL
+BEGIN
+    UPDATE module_week_rollups SET
+        attendance_count = attendance_count - 1, attendance_sum = attendance_sum - OLD.attendance_rate,
+        attendance_sumsq = attendance_sumsq - OLD.attendance_rate * OLD.attendance_rate
+        WHERE module_id = OLD.module_id AND week_number = OLD.week_number;
+END;
+
+-- modules.academic_year -> module_week_rollups.academic_year
+CREATE TRIGGER IF NOT EXISTS trg_modules_rollups_academic_year AFTER UPDATE OF academic_year ON modules
+BEGIN
+    UPDATE module_week_rollups SET academic_year = NEW.academic_year WHERE module_id = NEW.id;
+END;
+
+-- Backfill from the rows that existed before this migration.
+DELETE FROM module_week_rollups;
+
+INSERT INTO module_week_rollups (module_id, week_number, academic_year, stress_count, stress_sum, stress_sumsq,
+                                 sleep_count, sleep_sum, sleep_sumsq, attendance_count, attendance_sum, attendance_sumsq)
+SELECT r.module_id, r.week_number, m.academic_year, SUM(stress_count), SUM(stress_sum), SUM(stress_sumsq),
+       SUM(sleep_count), SUM(sleep_sum), SUM(sleep_sumsq), SUM(attendance_count), SUM(attendance_sum), SUM(attendance_sumsq)
+FROM (
+    SELECT module_id, week_number, COUNT(*) AS stress_count, TOTAL(stress_level) AS stress_sum,
+           TOTAL(stress_level * stress_level) AS stress_sumsq, COUNT(hours_slept) AS sleep_count,
+           TOTAL(hours_slept) AS sleep_sum, TOTAL(hours_slept * hours_slept) AS sleep_sumsq,
+           0 AS attendance_count, 0 AS attendance_sum, 0 AS attendance_sumsq
+    FROM survey_responses WHERE is_active = 1 AND module_id IS NOT NULL GROUP BY module_id, week_number
+    UNION ALL
+    SELECT module_id, week_number, 0, 0, 0, 0, 0, 0,
+           COUNT(attendance_rate), TOTAL(attendance_rate), TOTAL(attendance_rate * attendance_rate)
+    FROM attendance_records WHERE is_active = 1 AND attendance_rate IS NOT NULL GROUP BY module_id, week_number
+) r
+JOIN modules m ON m.id = r.module_id
+GROUP BY r.module_id, r.week_number;
@@ -0,0 +1,261 @@
+-- Histogram sketches of attendance rate, grade and stress level, per cohort,
+-- module and week (a read model for the percentile endpoints).
+--
+-- Each row counts the values of one metric that fall into one bin of a group.
+-- Bins have a fixed width per metric (bucket = CAST(value * scale AS INTEGER)):
+-- attendance 0.005 (half a percentage point, scale 200), grade 0.5 (scale 2) and
+-- stress 0.01 (scale 100). Only occupied bins are stored, so a group has at
+-- most a few hundred rows however many values it counts; sketches of several
+-- groups are merged by adding up the counts of equal buckets. Any percentile,
+-- and the percentile rank of any value, is read from the bins of one group, to
+-- within one bin width.
+--
+-- The groups (`scope`, `scope_id`) are:
+--   'cohort', 0          - the average of every active student (student_metrics);
+--   'module', module_id  - the average in the module of every active student
+--                          (student_module_metrics);
+--   'week', week_number  - every active survey response and attendance record of
+--                          the week (grades have no week).
+-- Student averages are counted by triggers on the metrics tables (whose own
+-- triggers follow every write, see 0005) and on students.is_active; weekly values
+-- by triggers on survey_responses and attendance_records. Bulk loads that drop
+-- the triggers rebuild the table once they are restored, and
+-- `flask rebuild-metrics` recomputes it from scratch.
+
+CREATE TABLE IF NOT EXISTS metric_histograms (
+    metric TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    scope_id INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (metric, scope, scope_id, bucket)
+) WITHOUT ROWID;
+
+-- student_metrics averages -> cohort sketches (active students only)
+CREATE TRIGGER IF NOT EXISTS trg_student_metrics_histograms_insert AFTER INSERT ON student_metrics
+WHEN EXISTS (SELECT 1 FROM students WHERE id = NEW.student_id AND is_active = 1)
+BEGIN
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        SELECT 'attendance', 'cohort', 0, CAST(NEW.attendance_sum / NEW.attendance_count * 200 AS INTEGER), 1 WHERE NEW.attendance_count > 0
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        SELECT 'grade', 'cohort', 0, CAST(NEW.grade_sum / NEW.grade_count * 2 AS INTEGER), 1 WHERE NEW.grade_count > 0
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        SELECT 'stress', 'cohort', 0, CAST(NEW.stress_sum / NEW.stress_count * 100 AS INTEGER), 1 WHERE NEW.stress_count > 0
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+END;
+
+-- An update of a metric moves the student from the bin of the old average to the bin of the new one.
+CREATE TRIGGER IF NOT EXISTS trg_student_metrics_histograms_attendance AFTER UPDATE OF attendance_sum, attendance_count ON student_metrics
+WHEN EXISTS (SELECT 1 FROM students WHERE id = NEW.student_id AND is_active = 1)
+BEGIN
+    UPDATE metric_histograms SET count = count - 1
+        WHERE metric = 'attendance' AND scope = 'cohort' AND scope_id = 0 AND bucket = CAST(OLD.attendance_sum / OLD.attendance_count * 200 AS INTEGER) AND OLD.attendance_count > 0;
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        SELECT 'attendance', 'cohort', 0, CAST(NEW.attendance_sum / NEW.attendance_count * 200 AS INTEGER), 1 WHERE NEW.attendance_count > 0
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_student_metrics_histograms_grade AFTER UPDATE OF grade_sum, grade_count ON student_metrics
+WHEN EXISTS (SELECT 1 FROM students WHERE id = NEW.student_id AND is_active = 1)
+BEGIN
+    UPDATE metric_histograms SET count = count - 1
+        WHERE metric = 'grade' AND scope = 'cohort' AND scope_id = 0 AND bucket = CAST(OLD.grade_sum / OLD.grade_count * 2 AS INTEGER) AND OLD.grade_count > 0;
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        SELECT 'grade', 'cohort', 0, CAST(NEW.grade_sum / NEW.grade_count * 2 AS INTEGER), 1 WHERE NEW.grade_count > 0
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_student_metrics_histograms_stress AFTER UPDATE OF stress_sum, stress_count ON student_metrics
+WHEN EXISTS (SELECT 1 FROM students WHERE id = NEW.student_id AND is_active = 1)
+BEGIN
+    UPDATE metric_histograms SET count = count - 1
+        WHERE metric = 'stress' AND scope = 'cohort' AND scope_id = 0 AND bucket = CAST(OLD.stress_sum / OLD.stress_count * 100 AS INTEGER) AND OLD.stress_count > 0;
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        SELECT 'stress', 'cohort', 0, CAST(NEW.stress_sum / NEW.stress_count * 100 AS INTEGER), 1 WHERE NEW.stress_count > 0
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_student_metrics_histograms_delete AFTER DELETE ON student_metrics
+WHEN EXISTS (SELECT 1 FROM students WHERE id = OLD.student_id AND is_active = 1)
+BEGIN
+    UPDATE metric_histograms SET count = count - 1
+        WHERE metric = 'attendance' AND scope = 'cohort' AND scope_id = 0 AND bucket = CAST(OLD.attendance_sum / OLD.attendance_count * 200 AS INTEGER) AND OLD.attendance_count > 0;
+    UPDATE metric_histograms SET count = count - 1
+        WHERE metric = 'grade' AND scope = 'cohort' AND scope_id = 0 AND bucket = CAST(OLD.grade_sum / OLD.grade_count * 2 AS INTEGER) AND OLD.grade_count > 0;
+    UPDATE metric_histograms SET count = count - 1
+        WHERE metric = 'stress' AND scope = 'cohort' AND scope_id = 0 AND bucket = CAST(OLD.stress_sum / OLD.stress_count * 100 AS INTEGER) AND OLD.stress_count > 0;
+END;
+
+-- student_module_metrics averages -> module sketches (active students only)
+CREATE TRIGGER IF NOT EXISTS trg_student_module_metrics_histograms_insert AFTER INSERT ON student_module_metrics
+WHEN EXISTS (SELECT 1 FROM students WHERE id = NEW.student_id AND is_active = 1)
+BEGIN
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        SELECT 'attendance', 'module', NEW.module_id, CAST(NEW.attendance_sum / NEW.attendance_count * 200 AS INTEGER), 1 WHERE NEW.attendance_count > 0
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        SELECT 'grade', 'module', NEW.module_id, CAST(NEW.grade_sum / NEW.grade_count * 2 AS INTEGER), 1 WHERE NEW.grade_count > 0
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        SELECT 'stress', 'module', NEW.module_id, CAST(NEW.stress_sum / NEW.stress_count * 100 AS INTEGER), 1 WHERE NEW.stress_count > 0
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_student_module_metrics_histograms_attendance AFTER UPDATE OF attendance_sum, attendance_count ON student_module_metrics
+WHEN EXISTS (SELECT 1 FROM students WHERE id = NEW.student_id AND is_active = 1)
+BEGIN
+    UPDATE metric_histograms SET count = count - 1
+        WHERE metric = 'attendance' AND scope = 'module' AND scope_id = OLD.module_id AND bucket = CAST(OLD.attendance_sum / OLD.attendance_count * 200 AS INTEGER) AND OLD.attendance_count > 0;
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        SELECT 'attendance', 'module', NEW.module_id, CAST(NEW.attendance_sum / NEW.attendance_count * 200 AS INTEGER), 1 WHERE NEW.attendance_count > 0
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_student_module_metrics_histograms_grade AFTER UPDATE OF grade_sum, grade_count ON student_module_metrics
+WHEN EXISTS (SELECT 1 FROM students WHERE id = NEW.student_id AND is_active = 1)
+BEGIN
+    UPDATE metric_histograms SET count = count - 1
+        WHERE metric = 'grade' AND scope = 'module' AND scope_id = OLD.module_id AND bucket = CAST(OLD.grade_sum / OLD.grade_count * 2 AS INTEGER) AND OLD.grade_count > 0;
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        SELECT 'grade', 'module', NEW.module_id, CAST(NEW.grade_sum / NEW.grade_count * 2 AS INTEGER), 1 WHERE NEW.grade_count > 0
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_student_module_metrics_histograms_stress AFTER UPDATE OF stress_sum, stress_count ON student_module_metrics
+WHEN EXISTS (SELECT 1 FROM students WHERE id = NEW.student_id AND is_active = 1)
+BEGIN
+    UPDATE metric_histograms SET count = count - 1
+        WHERE metric = 'stress' AND scope = 'module' AND scope_id = OLD.module_id AND bucket = CAST(OLD.stress_sum / OLD.stress_count * 100 AS INTEGER) AND OLD.stress_count > 0;
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        SELECT 'stress', 'module', NEW.module_id, CAST(NEW.stress_sum / NEW.stress_count * 100 AS INTEGER), 1 WHERE NEW.stress_count > 0
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_student_module_metrics_histograms_delete AFTER DELETE ON student_module_metrics
+WHEN EXISTS (SELECT 1 FROM students WHERE id = OLD.student_id AND is_active = 1)
+BEGIN
+    UPDATE metric_histograms SET count = count - 1
+        WHERE metric = 'attendance' AND scope = 'module' AND scope_id = OLD.module_id AND bucket = CAST(OLD.attendance_sum / OLD.attendance_count * 200 AS INTEGER) AND OLD.attendance_count > 0;
+    UPDATE metric_histograms SET count = count - 1
+        WHERE metric = 'grade' AND scope = 'module' AND scope_id = OLD.module_id AND bucket = CAST(OLD.grade_sum / OLD.grade_count * 2 AS INTEGER) AND OLD.grade_count > 0;
+    UPDATE metric_histograms SET count = count - 1
+        WHERE metric = 'stress' AND scope = 'module' AND scope_id = OLD.module_id AND bucket = CAST(OLD.stress_sum / OLD.stress_count * 100 AS INTEGER) AND OLD.stress_count > 0;
+END;
+
+-- Deactivating a student removes their averages from the cohort and module sketches; reactivating adds them back.
+CREATE TRIGGER IF NOT EXISTS trg_students_histograms_is_active AFTER UPDATE OF is_active ON students
+WHEN (OLD.is_active = 1) != (NEW.is_active = 1)
+BEGIN
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        SELECT 'attendance', 'cohort', 0, CAST(m.attendance_sum / m.attendance_count * 200 AS INTEGER), IIF(NEW.is_active = 1, 1, -1)
+        FROM student_metrics m WHERE m.student_id = NEW.id AND m.attendance_count > 0
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        SELECT 'grade', 'cohort', 0, CAST(m.grade_sum / m.grade_count * 2 AS INTEGER), IIF(NEW.is_active = 1, 1, -1)
+        FROM student_metrics m WHERE m.student_id = NEW.id AND m.grade_count > 0
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        SELECT 'stress', 'cohort', 0, CAST(m.stress_sum / m.stress_count * 100 AS INTEGER), IIF(NEW.is_active = 1, 1, -1)
+        FROM student_metrics m WHERE m.student_id = NEW.id AND m.stress_count > 0
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        SELECT 'attendance', 'module', m.module_id, CAST(m.attendance_sum / m.attendance_count * 200 AS INTEGER), IIF(NEW.is_active = 1, 1, -1)
+        FROM student_module_metrics m WHERE m.student_id = NEW.id AND m.attendance_count > 0
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        SELECT 'grade', 'module', m.module_id, CAST(m.grade_sum / m.grade_count * 2 AS INTEGER), IIF(NEW.is_active = 1, 1, -1)
+        FROM student_module_metrics m WHERE m.student_id = NEW.id AND m.grade_count > 0
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        SELECT 'stress', 'module', m.module_id, CAST(m.stress_sum / m.stress_count * 100 AS INTEGER), IIF(NEW.is_active = 1, 1, -1)
+        FROM student_module_metrics m WHERE m.student_id = NEW.id AND m.stress_count > 0
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+END;
+
+-- survey_responses.stress_level -> week sketches
+CREATE TRIGGER IF NOT EXISTS trg_survey_responses_histograms_insert AFTER INSERT ON survey_responses
+WHEN NEW.is_active = 1
+BEGIN
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        VALUES ('stress', 'week', NEW.week_number, CAST(NEW.stress_level * 100 AS INTEGER), 1)
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_survey_responses_histograms_update_old AFTER UPDATE OF week_number, stress_level, is_active ON survey_responses
+WHEN OLD.is_active = 1
+BEGIN
+    UPDATE metric_histograms SET count = count - 1
+        WHERE metric = 'stress' AND scope = 'week' AND scope_id = OLD.week_number AND bucket = CAST(OLD.stress_level * 100 AS INTEGER);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_survey_responses_histograms_update_new AFTER UPDATE OF week_number, stress_level, is_active ON survey_responses
+WHEN NEW.is_active = 1
+BEGIN
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        VALUES ('stress', 'week', NEW.week_number, CAST(NEW.stress_level * 100 AS INTEGER), 1)
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_survey_responses_histograms_delete AFTER DELETE ON survey_responses
+WHEN OLD.is_active = 1
+BEGIN
+    UPDATE metric_histograms SET count = count - 1
+        WHERE metric = 'stress' AND scope = 'week' AND scope_id = OLD.week_number AND bucket = CAST(OLD.stress_level * 100 AS INTEGER);
+END;
+
+-- attendance_records.attendance_rate -> week sketches
+CREATE TRIGGER IF NOT EXISTS trg_attendance_records_histograms_insert AFTER INSERT ON attendance_records
+WHEN NEW.is_active = 1 AND NEW.attendance_rate IS NOT NULL
+BEGIN
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        VALUES ('attendance', 'week', NEW.week_number, CAST(NEW.attendance_rate * 200 AS INTEGER), 1)
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_records_histograms_update_old AFTER UPDATE OF week_number, attendance_rate, is_active ON attendance_records
+WHEN OLD.is_active = 1 AND OLD.attendance_rate IS NOT NULL
+BEGIN
+    UPDATE metric_histograms SET count = count - 1
+        WHERE metric = 'attendance' AND scope = 'week' AND scope_id = OLD.week_number AND bucket = CAST(OLD.attendance_rate * 200 AS INTEGER);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_records_histograms_update_new AFTER UPDATE OF week_number, attendance_rate, is_active ON attendance_records
+WHEN NEW.is_active = 1 AND NEW.attendance_rate IS NOT NULL
+BEGIN
+    INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+        VALUES ('attendance', 'week', NEW.week_number, CAST(NEW.attendance_rate * 200 AS INTEGER), 1)
+        ON CONFLICT (metric, scope, scope_id, bucket) DO UPDATE SET count = count + excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_attendance_records_histograms_delete AFTER DELETE ON attendance_records
+WHEN OLD.is_active = 1 AND OLD.attendance_rate IS NOT NULL
+BEGIN
+    UPDATE metric_histograms SET count = count - 1
+        WHERE metric = 'attendance' AND scope = 'week' AND scope_id = OLD.week_number AND bucket = CAST(OLD.attendance_rate * 200 AS INTEGER);
+END;
+
+-- Backfill from the rows that existed before this migration.
+DELETE FROM metric_histograms;
+
+INSERT INTO metric_histograms (metric, scope, scope_id, bucket, count)
+SELECT metric, scope, scope_id, bucket, COUNT(*) AS count FROM (
+    SELECT 'attendance' AS metric, 'cohort' AS scope, 0 AS scope_id, CAST(m.attendance_sum / m.attendance_count * 200 AS INTEGER) AS bucket
+        FROM student_metrics m JOIN students s ON s.id = m.student_id WHERE s.is_active = 1 AND m.attendance_count > 0
+    UNION ALL SELECT 'grade' AS metric, 'cohort' AS scope, 0 AS scope_id, CAST(m.grade_sum / m.grade_count * 2 AS INTEGER) AS bucket
+        FROM student_metrics m JOIN students s ON s.id = m.student_id WHERE s.is_active = 1 AND m.grade_count > 0
+    UNION ALL SELECT 'stress' AS metric, 'cohort' AS scope, 0 AS scope_id, CAST(m.stress_sum / m.stress_count * 100 AS INTEGER) AS bucket
+        FROM student_metrics m JOIN students s ON s.id = m.student_id WHERE s.is_active = 1 AND m.stress_count > 0
+    UNION ALL SELECT 'attendance' AS metric, 'module' AS scope, m.module_id AS scope_id, CAST(m.attendance_sum / m.attendance_count * 200 AS INTEGER) AS bucket
+        FROM student_module_metrics m JOIN students s ON s.id = m.student_id WHERE s.is_active = 1 AND m.attendance_count > 0
+    UNION ALL SELECT 'grade' AS metric, 'module' AS scope, m.module_id AS scope_id, CAST(m.grade_sum / m.grade_count * 2 AS INTEGER) AS bucket
+        FROM student_module_metrics m JOIN students s ON s.id = m.student_id WHERE s.is_active = 1 AND m.grade_count > 0
+    UNION ALL SELECT 'stress' AS metric, 'module' AS scope, m.module_id AS scope_id, CAST(m.stress_sum / m.stress_count * 100 AS INTEGER) AS bucket
+        FROM student_module_metrics m JOIN students s ON s.id = m.student_id WHERE s.is_active = 1 AND m.stress_count > 0
+    UNION ALL SELECT 'stress', 'week', week_number, CAST(stress_level * 100 AS INTEGER)
+        FROM survey_responses WHERE is_active = 1
+    UNION ALL SELECT 'attendance', 'week', week_number, CAST(attendance_rate * 200 AS INTEGER)
+        FROM attendance_records WHERE is_active = 1 AND attendance_rate IS NOT NULL
+)
+GROUP BY metric, scope, scope_id, bucket;
@@ -0,0 +1,28 @@
+-- Durable queue of stress-event and alert detection jobs.
+--
+-- Creating or updating a survey response enqueues one job in the same
+-- transaction as the response, and `flask worker` drains the queue in batches,
+-- so the survey POST no longer waits for the detection queries and inserts.
+--
+-- Jobs are claimed with a visibility timeout: a worker moves `available_at`
+-- past the end of its lease, and a job is only deleted in the transaction that
+-- created its stress events and alerts. A worker that dies mid-batch therefore
+-- loses nothing; its jobs become available again once the lease expires
+-- (at-least-once delivery), and the detection inserts are idempotent. Jobs that
+-- failed `max_attempts` times keep their row with `available_at` NULL, so they
+-- are never claimed again but remain visible with their last error.
+--
+-- Times are Unix timestamps (seconds, REAL) so that lag and lease arithmetic
+-- needs no date parsing.
+CREATE TABLE IF NOT EXISTS detection_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    survey_response_id INTEGER NOT NULL REFERENCES survey_responses(id),
+    enqueued_at REAL NOT NULL,
+    available_at REAL, -- Earliest time the job may be claimed; NULL once it has failed for good.
+    attempts INTEGER NOT NULL DEFAULT 0,
+    claimed_by TEXT, -- Worker holding the current lease.
+    last_error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_detection_jobs_available
+    ON detection_jobs (available_at, id);
@@ -0,0 +1,43 @@
+-- Change log of the alerts table, read by the alert feed
+-- (`GET /api/admin/alerts/feed?since=<cursor>`) and its server-sent events
+-- stream, so that clients fetch only what changed since their last cursor
+-- instead of reloading every alert.
+--
+-- The triggers below append one row whenever an active alert is created,
+-- resolved, edited or deleted (logically or for good); a reactivated alert
+-- counts as created. The log only records which alert changed and how; the
+-- feed joins the alert's current state. The cursor is the `id` of the last row
+-- a client has seen; AUTOINCREMENT guarantees that ids are never reused.
+
+CREATE TABLE IF NOT EXISTS alert_changes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    alert_id INTEGER NOT NULL,
+    change TEXT NOT NULL CHECK (change IN ('created', 'resolved', 'updated', 'deleted')),
+    changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_alerts_changes_insert AFTER INSERT ON alerts
+WHEN NEW.is_active = 1
+BEGIN
+    INSERT INTO alert_changes (alert_id, change) VALUES (NEW.id, 'created');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_alerts_changes_update AFTER UPDATE ON alerts
+WHEN OLD.is_active = 1 OR NEW.is_active = 1
+BEGIN
+    INSERT INTO alert_changes (alert_id, change)
+    SELECT NEW.id, CASE
+        WHEN NEW.is_active = 0 THEN 'deleted'
+        WHEN OLD.is_active = 0 THEN 'created'
+        WHEN NEW.resolved = 1 AND OLD.resolved = 0 THEN 'resolved'
+        ELSE 'updated'
+    END
+    WHERE NEW.is_active IS NOT OLD.is_active OR NEW.resolved IS NOT OLD.resolved OR NEW.student_id IS NOT OLD.student_id
+       OR NEW.module_id IS NOT OLD.module_id OR NEW.week_number IS NOT OLD.week_number OR NEW.reason IS NOT OLD.reason;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_alerts_changes_delete AFTER DELETE ON alerts
+WHEN OLD.is_active = 1
+BEGIN
+    INSERT INTO alert_changes (alert_id, change) VALUES (OLD.id, 'deleted');
+END;
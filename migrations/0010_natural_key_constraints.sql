@@ -0,0 +1,38 @@
+-- Unique natural keys for the rows that must exist at most once, so that
+-- duplicates are impossible even when several writers insert concurrently.
+-- Repositories write these tables with `INSERT ... ON CONFLICT` against the
+-- indexes below (see `BaseRepository.upsert`) instead of looking for an
+-- existing row first.
+--
+-- Duplicates left behind by earlier check-then-insert races are resolved
+-- before each index is created: the first stress event of a survey response
+-- and the first active alert of a student and week are kept; of several
+-- active attendance records for a student, module and week the latest is kept.
+-- Alerts and attendance records are deactivated rather than deleted, so their
+-- change log and the read models maintained by triggers stay consistent.
+
+-- One stress event per survey response (replaces the plain lookup index).
+DELETE FROM stress_events
+WHERE survey_response_id IS NOT NULL
+  AND id NOT IN (SELECT MIN(id) FROM stress_events WHERE survey_response_id IS NOT NULL GROUP BY survey_response_id);
+
+DROP INDEX IF EXISTS idx_stress_events_survey_response;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_stress_events_survey_response
+    ON stress_events (survey_response_id);
+
+-- One active alert per student and week.
+UPDATE alerts SET is_active = 0
+WHERE is_active = 1
+  AND id NOT IN (SELECT MIN(id) FROM alerts WHERE is_active = 1 GROUP BY student_id, week_number);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_alerts_student_week
+    ON alerts (student_id, week_number) WHERE is_active = 1;
+
+-- One active attendance record per student, module and week.
+UPDATE attendance_records SET is_active = 0
+WHERE is_active = 1
+  AND id NOT IN (SELECT MAX(id) FROM attendance_records WHERE is_active = 1 GROUP BY student_id, module_id, week_number);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_attendance_records_student_module_week
+    ON attendance_records (student_id, module_id, week_number) WHERE is_active = 1;
@@ -1,5 +1,6 @@
 import pytest
 from app import create_app
+from app.analysis_cache import get_analysis_cache
 
 @pytest.fixture(scope='module')
 def app():
@@ -43,3 +44,12 @@ def init_database(runner):
     assert 'Database initialized and seeded successfully.' in result.output
     
     yield # The tests will run after this point
+
+@pytest.fixture(autouse=True)
+def clear_analysis_cache(app):
+    """
+    Starts every test with an empty analysis cache, so that results cached by one
+    test (or computed from data it wrote with raw SQL) are never served to another.
+    """
+    get_analysis_cache().clear()
+    yield
@@ -2,6 +2,7 @@ import pytest
 from app.repositories.student_repository import student_repository
 from app.repositories.module_repository import module_repository
 from app.repositories.alert_repository import alert_repository
+from app.repositories.base_repository import ConflictError
 
 @pytest.fixture(scope="module")
 def sample_student():
@@ -45,3 +46,56 @@ def test_mark_alert_resolved(sample_student, sample_module):
     
     resolved_alert = alert_repository.get_alert_by_id(alert.id)
     assert resolved_alert.resolved is True
+
+def test_changes_are_logged_and_coalesced(sample_student, sample_module):
+    """The feed returns one entry per changed alert with its latest change and current state."""
+    since = alert_repository.get_change_cursor()
+    assert alert_repository.get_changes(10, since) == ([], since, False)
+
+    first = alert_repository.create_alert(sample_student.id, sample_module.id, 7, "Feed alert")
+    second = alert_repository.create_alert(sample_student.id, sample_module.id, 8, "Feed alert")
+    alert_repository.mark_alert_resolved(first.id)
+    alert_repository.delete_alert(second.id)
+    alert_repository.delete_alert(second.id) # Already deleted: nothing more is logged.
+
+    changes, cursor, has_more = alert_repository.get_changes(10, since)
+    assert [(c['alert_id'], c['change']) for c in changes] == [(first.id, 'resolved'), (second.id, 'deleted')]
+    assert changes[0]['alert']['resolved'] == 1 and changes[0]['alert']['student_name'] == 'Alert Test Student'
+    assert changes[1]['alert'] is None
+    assert has_more is False
+    assert alert_repository.get_changes(10, cursor) == ([], cursor, False)
+
+    # A smaller batch stops part-way and reports that more changes are pending.
+    changes, partial, has_more = alert_repository.get_changes(2, since)
+    assert [(c['alert_id'], c['change']) for c in changes] == [(first.id, 'created'), (second.id, 'created')]
+    assert has_more is True
+    assert [c['change'] for c in alert_repository.get_changes(10, partial)[0]] == ['resolved', 'deleted']
+
+def test_invalid_change_cursor_is_rejected(app):
+    with pytest.raises(ValueError):
+        alert_repository.get_changes(10, 'not-a-cursor')
+    with pytest.raises(ValueError):
+        alert_repository.get_changes(10, 'WyJhIl0') # ["a"]
+
+def test_create_alert_is_idempotent_per_student_and_week(sample_student, sample_module):
+    """Tests that a second alert for the same student and week returns the existing one unchanged."""
+    first = alert_repository.create_alert(sample_student.id, sample_module.id, 9, "First alert")
+    again = alert_repository.create_alert(sample_student.id, None, 9, "Second alert")
+    assert again.id == first.id and again.reason == "First alert"
+
+    alert_repository.delete_alert(first.id)
+    assert alert_repository.create_alert(sample_student.id, None, 9, "After deletion").id != first.id
+
+def test_reactivating_or_moving_an_alert_onto_an_occupied_week_conflicts(sample_student, sample_module):
+    """Tests that writes violating the one-active-alert-per-week index raise ConflictError with its columns."""
+    retired = alert_repository.create_alert(sample_student.id, sample_module.id, 12, "Retired alert")
+    alert_repository.delete_alert(retired.id)
+    alert_repository.create_alert(sample_student.id, sample_module.id, 12, "Active alert")
+    other = alert_repository.create_alert(sample_student.id, sample_module.id, 13, "Other week")
+
+    with pytest.raises(ConflictError) as reactivated:
+        alert_repository._execute_update_delete("UPDATE alerts SET is_active = 1 WHERE id = ?", (retired.id,))
+    with pytest.raises(ConflictError) as moved:
+        alert_repository._execute_update_delete("UPDATE alerts SET week_number = 12 WHERE id = ?", (other.id,))
+    assert reactivated.value.columns == moved.value.columns == ('student_id', 'week_number')
+    assert alert_repository.get_alert_by_id(other.id).week_number == 13
@@ -8,11 +8,14 @@ that interact with a seeded database.
 """
 
 import pytest
+import statistics
 from app.repositories.analysis_repository import analysis_repository
 from app.repositories.student_repository import student_repository
 from app.repositories.module_repository import module_repository
 from app.repositories.grade_repository import grade_repository
 from app.repositories.survey_response_repository import survey_response_repository
+from app.repositories.attendance_record_repository import attendance_record_repository
+from app.utils.pagination import encode_cursor
 
 # --- Unit Tests: Mocking the _execute_query method ---
 
@@ -21,13 +24,11 @@ def test_get_high_risk_students_low_attendance(mocker):
     Unit test to verify `get_high_risk_students` correctly identifies
     a high-risk student due to low attendance.
 
-    Mocks the underlying `_execute_query` calls to simulate database responses.
+    Mocks the underlying `_execute_query` call to simulate the database response.
     """
-    # Simulate database responses for low attendance, no low grades, no high stress.
-    mocker.patch.object(analysis_repository, '_execute_query', side_effect=[
-        [{'id': 1, 'full_name': 'John Doe', 'avg_attendance': 60}], # Low attendance query result
-        [], # Low grades query result
-        []  # High stress query result
+    # Simulate the per-student metrics row: low attendance, no low grades, no high stress.
+    mocker.patch.object(analysis_repository, '_execute_query', return_value=[
+        {'id': 1, 'full_name': 'John Doe', 'avg_attendance': 60, 'avg_grade': 65, 'avg_stress': 2}
     ])
     high_risk_students = analysis_repository.get_high_risk_students(attendance_threshold=70)
     assert len(high_risk_students) == 1
@@ -39,13 +40,11 @@ def test_get_high_risk_students_multiple_reasons(mocker):
     Unit test to verify `get_high_risk_students` correctly identifies
     a high-risk student with multiple risk factors (low attendance and low grades).
 
-    Mocks the underlying `_execute_query` calls to simulate database responses.
+    Mocks the underlying `_execute_query` call to simulate the database response.
     """
-    # Simulate database responses for low attendance, low grades, no high stress.
-    mocker.patch.object(analysis_repository, '_execute_query', side_effect=[
-        [{'id': 2, 'full_name': 'Jane Smith', 'avg_attendance': 50}], # Low attendance query result
-        [{'id': 2, 'full_name': 'Jane Smith', 'avg_grade': 35}],     # Low grades query result
-        [] # High stress query result
+    # Simulate the per-student metrics row: low attendance, low grades, no high stress.
+    mocker.patch.object(analysis_repository, '_execute_query', return_value=[
+        {'id': 2, 'full_name': 'Jane Smith', 'avg_attendance': 50, 'avg_grade': 35, 'avg_stress': None}
     ])
     high_risk_students = analysis_repository.get_high_risk_students(attendance_threshold=70, grade_threshold=40)
     assert len(high_risk_students) == 1
@@ -58,7 +57,7 @@ def test_get_high_risk_students_no_risk(mocker):
     Unit test to verify `get_high_risk_students` returns an empty list
     when no students meet the high-risk criteria.
 
-    Mocks the underlying `_execute_query` calls to simulate empty database responses.
+    Mocks the underlying `_execute_query` call to simulate an empty database response.
     """
     # Simulate empty database responses for all risk queries.
     mocker.patch.object(analysis_repository, '_execute_query', return_value=[])
@@ -98,14 +97,89 @@ def test_get_stress_grade_correlation_integration():
     grade_repository.create_grade(student.id, module.id, "Exam", 75) # Good grade
 
     correlation_data = analysis_repository.get_stress_grade_correlation()
-    assert 'labels' in correlation_data
-    assert 'data' in correlation_data
-    assert isinstance(correlation_data['data'], list)
-    
-    # Verify that the newly created student's data is present in the correlation results.
-    student_in_data = any(d['name'] == 'Corr Student' for d in correlation_data['data'])
+    assert correlation_data['count'] > 0
+    assert 'points' not in correlation_data # Points are opt-in.
+    assert sum(map(sum, correlation_data['density']['counts'])) == correlation_data['count']
+
+    # Verify that the newly created student's data is present in the correlation points.
+    correlation_data = analysis_repository.get_stress_grade_correlation(points='page', limit=correlation_data['count'])
+    student_in_data = any(d['name'] == 'Corr Student' for d in correlation_data['points']['data'])
     assert student_in_data
 
+def average_ranks(values):
+    """Ranks `values` from 1, giving tied values the average of their ranks."""
+    return [sum(v < value for v in values) + (sum(v == value for v in values) + 1) / 2 for value in values]
+
+def test_stress_grade_correlation_statistics():
+    """
+    Tests the statistics of `get_stress_grade_correlation` against the standard library.
+
+    Verifies Pearson's r, Spearman's rho (Pearson's r of the tie-averaged ranks)
+    and the regression line over all students with a stress and grade average.
+    """
+    rows = [row for row in analysis_repository._get_student_averages()
+            if row['average_stress'] is not None and row['average_grade'] is not None]
+    xs, ys = [row['average_stress'] for row in rows], [row['average_grade'] for row in rows]
+    result = analysis_repository.get_stress_grade_correlation()
+
+    assert result['count'] == len(rows)
+    assert result['pearson'] == pytest.approx(statistics.correlation(xs, ys))
+    assert result['spearman'] == pytest.approx(statistics.correlation(average_ranks(xs), average_ranks(ys)))
+    slope, intercept = statistics.linear_regression(xs, ys)
+    assert result['regression']['slope'] == pytest.approx(slope)
+    assert result['regression']['intercept'] == pytest.approx(intercept)
+    assert result['regression']['r_squared'] == pytest.approx(result['pearson'] ** 2)
+
+def test_correlation_statistics_are_one_aggregate(app):
+    """The statistics and density come from one grouped query over `student_metrics`, not from the student list."""
+    from app.analysis_cache import bypass_analysis_cache
+    from app.query_instrumentation import record_statements
+    with bypass_analysis_cache(), record_statements() as recorder:
+        analysis_repository.get_stress_grade_correlation()
+    assert len(recorder.statements) == 1
+
+def test_correlation_helpers(app):
+    """Tests density bins at and beyond the edges, and undefined coefficients."""
+    from app.db_connection import get_db
+    edges = analysis_repository.CORRELATION_STRESS_EDGES
+    bins = get_db().execute(f"WITH v(x) AS (VALUES (0.5), (1.0), (1.49), (1.5), (4.99), (5.0), (6.0)) "
+                            f"SELECT {analysis_repository._density_bin_sql('x', edges)} FROM v").fetchall()
+    assert [row[0] for row in bins] == [0, 0, 0, 1, 7, 7, 7]
+
+    def cell(x_bin, y_bin, x, y, rank_x, rank_y):
+        return {'x_bin': x_bin, 'y_bin': y_bin, 'n': 1, 'sx': x, 'sy': y, 'sxx': x * x, 'syy': y * y, 'sxy': x * y,
+                'rx': rank_x, 'ry': rank_y, 'rxx': rank_x ** 2, 'ryy': rank_y ** 2, 'rxy': rank_x * rank_y,
+                'min_x': x, 'max_x': x, 'min_y': y, 'max_y': y}
+    # Two students with the same average stress: no coefficient or regression line is defined.
+    result = analysis_repository._stress_grade_correlation_from([cell(2, 5, 2.0, 50.0, 1.5, 1), cell(2, 7, 2.0, 70.0, 1.5, 2)])
+    assert (result['count'], result['pearson'], result['spearman'], result['regression']) == (2, None, None, None)
+    assert result['density']['counts'][2][5] == 1 and result['density']['counts'][2][7] == 1
+
+    empty = analysis_repository._stress_grade_correlation_from([])
+    assert (empty['count'], empty['pearson'], empty['regression']) == (0, None, None)
+    assert sum(map(sum, empty['density']['counts'])) == 0
+
+def test_correlation_points_are_opt_in_and_paginated():
+    """Tests the sample and page point modes of `get_stress_grade_correlation`, and their validation."""
+    total = analysis_repository.get_stress_grade_correlation()['count']
+    sample = analysis_repository.get_stress_grade_correlation(points='sample', limit=3)['points']
+    assert sample['mode'] == 'sample' and sample['total'] == total and len(sample['data']) == min(3, total)
+    assert analysis_repository.get_stress_grade_correlation(points='sample', limit=3)['points'] == sample # Deterministic.
+
+    ids, after = [], None
+    while True:
+        page = analysis_repository.get_stress_grade_correlation(points='page', limit=2, after=after)['points']
+        ids += [point['id'] for point in page['data']]
+        after = page['next_cursor']
+        if after is None:
+            break
+    assert len(ids) == total and ids == sorted(ids)
+
+    for options in ({'points': 'all'}, {'points': 'page', 'limit': 0}, {'after': encode_cursor([1])},
+                    {'points': 'page', 'after': 'not-a-cursor'}, {'points': 'page', 'after': encode_cursor(['x'])}):
+        with pytest.raises(ValueError):
+            analysis_repository.get_stress_grade_correlation(**options)
+
 def test_get_grade_distribution_integration():
     """
     Integration test for `get_grade_distribution`.
@@ -132,3 +206,76 @@ def test_get_grade_distribution_integration():
     # Assert that the counts for our new students are reflected (at least 1 in each band).
     assert distribution['data'][fail_index] >= 1
     assert distribution['data'][distinction_index] >= 1
+
+def test_get_high_risk_students_single_query_scores(mocker):
+    """
+    Unit test to verify `get_high_risk_students` issues a single query and
+    builds per-factor values, reasons and the severity from its row.
+    """
+    query = mocker.patch.object(analysis_repository, '_execute_query', return_value=[
+        {'id': 3, 'full_name': 'Sam Lee', 'avg_attendance': 35.0, 'avg_grade': 55.0, 'avg_stress': 5.0,
+         'attendance_score': 0.5, 'grade_score': 0.0, 'stress_score': 1.0, 'severity': 1.5}
+    ])
+    students = analysis_repository.get_high_risk_students(sort='severity', limit=5)
+    assert query.call_count == 1
+    assert query.call_args.args[1]['limit'] == 5
+    student = students[0]
+    assert student['reasons'] == ["Low attendance (<70%)", "High average stress (>=4)"]
+    assert student['reason'] == "Low attendance (<70%), High average stress (>3)"
+    assert student['severity'] == 1.5
+    assert student['factors']['grade'] == {'value': 55.0, 'threshold': 40, 'at_risk': False, 'score': 0.0}
+
+def test_get_high_risk_students_scores_zero_at_each_threshold():
+    """
+    Integration test to verify a student exactly at every threshold scores 0 on each
+    factor (only stress counts as breached, at or above its threshold), and that an
+    average of 5 at a threshold of 5 scores 1.
+    """
+    student = student_repository.create_student('S_RISK_EDGE', 'Edge Student', 'edge@test.com', 'MSc Edge', 1)
+    module = module_repository.create_module('EDGE101', 'Thresholds', 10, '2025')
+    attendance_record_repository.create_attendance_record(student.id, module.id, 1, 1, 2) # 50%
+    grade_repository.create_grade(student.id, module.id, "Exam", 40)
+    survey_response_repository.create_survey_response(student.id, module.id, 1, 4, 7, None)
+
+    students = analysis_repository.get_high_risk_students(attendance_threshold=50, grade_threshold=40, stress_threshold=4)
+    entry = next(s for s in students if s['id'] == student.id)
+    assert entry['reasons'] == ["High average stress (>=4)"]
+    assert {name: factor['score'] for name, factor in entry['factors'].items()} == {'attendance': 0.0, 'grade': 0.0, 'stress': 0.0}
+    assert entry['severity'] == 0.0
+
+    stressed = student_repository.create_student('S_RISK_MAX', 'Max Stress Student', 'max.stress@test.com', 'MSc Edge', 1)
+    survey_response_repository.create_survey_response(stressed.id, module.id, 1, 5, 7, None)
+    entry = next(s for s in analysis_repository.get_high_risk_students(stress_threshold=5) if s['id'] == stressed.id)
+    assert entry['factors']['stress'] == {'value': 5.0, 'threshold': 5, 'at_risk': True, 'score': 1.0}
+
+def test_get_high_risk_students_rejects_invalid_options():
+    """Unit test to verify invalid thresholds, sort keys and limits raise ValueError."""
+    for options in ({'stress_threshold': 0}, {'grade_threshold': -1}, {'sort': 'age'}, {'limit': 0}):
+        with pytest.raises(ValueError):
+            analysis_repository.get_high_risk_students(**options)
+
+def test_get_dashboard_reads_one_snapshot(mocker):
+    """
+    Integration test for `get_dashboard`.
+
+    Verifies that the panels are read in one read transaction that is closed
+    afterwards, and that every panel is a single aggregate over a read model:
+    the bundle issues one statement per panel plus the `BEGIN` of its snapshot
+    and the cache's read of the persisted `alerts` version.
+    """
+    from app.db_connection import get_db
+    from app.query_instrumentation import record_statements
+    get_db().commit() # Earlier tests leave uncommitted writes; the bundle would join their transaction.
+    seen_in_transaction = []
+    original = analysis_repository.get_stress_level_by_module
+    def recording_stress_by_module():
+        seen_in_transaction.append(get_db().in_transaction)
+        return original()
+    mocker.patch.object(analysis_repository, 'get_stress_level_by_module', recording_stress_by_module)
+
+    with record_statements() as recorder:
+        bundle = analysis_repository.get_dashboard(('grade_distribution', 'stress_grade_correlation', 'stress_by_module'))
+    assert set(bundle) == {'grade_distribution', 'stress_grade_correlation', 'stress_by_module'}
+    assert len(recorder.statements) == 2 + 3
+    assert seen_in_transaction == [True]
+    assert not get_db().in_transaction
@@ -1,4 +1,6 @@
 import pytest
+import sqlite3
+from app.db_connection import get_db
 from app.repositories.student_repository import student_repository
 from app.repositories.module_repository import module_repository
 from app.repositories.attendance_record_repository import attendance_record_repository
@@ -31,3 +33,34 @@ def test_create_and_get_attendance_record(sample_student, sample_module):
     
     fetched_record = attendance_record_repository.get_attendance_record_by_id(new_record.id)
     assert fetched_record.attendance_rate == 0.5
+
+def test_recording_a_week_again_updates_the_record(sample_student, sample_module):
+    """Tests that the natural key (student, module, week) makes creation an idempotent upsert."""
+    first = attendance_record_repository.create_attendance_record(sample_student.id, sample_module.id, 4, 1, 2)
+    again = attendance_record_repository.create_attendance_record(sample_student.id, sample_module.id, 4, 2, 2)
+    assert again.id == first.id
+    assert (again.attended_sessions, again.attendance_rate) == (2, 1.0)
+
+    # A logically deleted record does not block recording the week anew.
+    attendance_record_repository.delete_attendance_record(first.id)
+    replacement = attendance_record_repository.create_attendance_record(sample_student.id, sample_module.id, 4, 0, 2)
+    assert replacement.id != first.id
+
+def test_bulk_create_upserts_by_natural_key(sample_student, sample_module):
+    """Tests that one bulk statement updates existing weeks and collapses repeats within the batch."""
+    existing = attendance_record_repository.create_attendance_record(sample_student.id, sample_module.id, 5, 0, 2)
+    rows = [{'student_id': sample_student.id, 'module_id': sample_module.id, 'week_number': week, 'attended_sessions': attended, 'total_sessions': 2}
+            for week, attended in [(5, 2), (6, 1), (6, 2)]]
+    ids, existed = attendance_record_repository.bulk_create_attendance_records(rows)
+    assert existed == [True, False, True] # The repeat updated the record the row before it created.
+    assert ids[0] == existing.id
+    assert ids[1] == ids[2] != existing.id
+    assert attendance_record_repository.get_attendance_record_by_id(existing.id).attendance_rate == 1.0
+    assert attendance_record_repository.get_attendance_record_by_id(ids[1]).attended_sessions == 2 # The later row wins.
+
+def test_duplicate_weeks_are_rejected_by_the_database(sample_student, sample_module):
+    """Tests that the unique index stops duplicates from writers that bypass the repository."""
+    attendance_record_repository.create_attendance_record(sample_student.id, sample_module.id, 7, 1, 2)
+    with pytest.raises(sqlite3.IntegrityError):
+        get_db().execute("INSERT INTO attendance_records (student_id, module_id, week_number, attended_sessions, total_sessions, attendance_rate, is_active) "
+                         "VALUES (?, ?, 7, 2, 2, 1.0, 1)", (sample_student.id, sample_module.id))
@@ -123,3 +123,11 @@ def test_delete_hard(app):
         # Verify it's completely gone
         result = repo._execute_query("SELECT id FROM users WHERE id = ?", (user_id,), fetch_one=True)
         assert result is None
+
+def test_upsert_requires_a_natural_key(app):
+    """
+    Tests that upserts are refused for repositories without a natural key.
+    """
+    repo = BaseRepository('users', None)
+    with pytest.raises(ValueError):
+        repo.upsert({'username': 'nobody'})
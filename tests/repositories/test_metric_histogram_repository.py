@@ -0,0 +1,90 @@
+import pytest
+from app.db_connection import get_db
+from app.repositories.student_repository import student_repository
+from app.repositories.module_repository import module_repository
+from app.repositories.grade_repository import grade_repository
+from app.repositories.attendance_record_repository import attendance_record_repository
+from app.repositories.survey_response_repository import survey_response_repository
+from app.repositories.metric_histogram_repository import metric_histogram_repository
+
+@pytest.fixture(scope="module")
+def sample_student():
+    """Fixture to create a student for histogram tests."""
+    return student_repository.create_student(
+        student_number='S_HISTOGRAM_TEST',
+        full_name='Histogram Test Student',
+        email='histogram.test@example.com',
+        course_name='MSc Histogram Testing',
+        year_of_study=1
+    )
+
+@pytest.fixture(scope="module")
+def sample_module():
+    """Fixture to create a module without any activity for histogram tests."""
+    return module_repository.create_module(
+        module_code='HISTO101',
+        module_title='Histogram Testing',
+        credit=15,
+        academic_year='2025/2026'
+    )
+
+def bins(metric, scope, scope_id):
+    rows = get_db().execute(
+        "SELECT bucket, count FROM metric_histograms WHERE metric = ? AND scope = ? AND scope_id = ? AND count != 0 ORDER BY bucket",
+        (metric, scope, scope_id)
+    ).fetchall()
+    return {row['bucket']: row['count'] for row in rows}
+
+def test_seeded_histograms_match_base_tables(app):
+    """The migration backfill and the triggers agree with a fresh aggregation."""
+    assert metric_histogram_repository.find_drift() == []
+
+def test_averages_move_between_bins(sample_student, sample_module):
+    """Tests that a student's average leaves its old bin and enters the new one as grades are written."""
+    first = grade_repository.create_grade(sample_student.id, sample_module.id, 'Histogram Exam', 60)
+    assert bins('grade', 'module', sample_module.id) == {120: 1}
+
+    grade_repository.create_grade(sample_student.id, sample_module.id, 'Histogram Essay', 75)
+    assert bins('grade', 'module', sample_module.id) == {135: 1} # Average 67.5.
+
+    grade_repository.update_grade(first.id, sample_student.id, sample_module.id, 'Histogram Exam', 64)
+    assert bins('grade', 'module', sample_module.id) == {139: 1} # Average 69.5.
+    assert metric_histogram_repository.find_drift() == []
+
+def test_weekly_records_are_counted_individually(sample_student, sample_module):
+    """Tests the week sketches, which count every survey response and attendance record."""
+    week = 77
+    survey = survey_response_repository.create_survey_response(sample_student.id, sample_module.id, week, 4, 6.0, None)
+    survey_response_repository.create_survey_response(sample_student.id, None, week, 2, None, None)
+    attendance_record_repository.create_attendance_record(sample_student.id, sample_module.id, week, 3, 4)
+    assert bins('stress', 'week', week) == {200: 1, 400: 1}
+    assert bins('attendance', 'week', week) == {150: 1} # 75% in half-point bins.
+
+    survey_response_repository.delete_logical(survey.id)
+    assert bins('stress', 'week', week) == {200: 1}
+    assert metric_histogram_repository.find_drift() == []
+
+def test_deactivated_students_leave_the_sketches(sample_student, sample_module):
+    """Tests that deactivating a student removes their averages and reactivating adds them back."""
+    cohort_before = sum(bins('grade', 'cohort', 0).values())
+    student_repository.delete_logical(sample_student.id)
+    assert bins('grade', 'module', sample_module.id) == {}
+    assert sum(bins('grade', 'cohort', 0).values()) == cohort_before - 1
+    assert metric_histogram_repository.find_drift() == []
+
+    get_db().execute("UPDATE students SET is_active = 1 WHERE id = ?", (sample_student.id,))
+    assert bins('grade', 'module', sample_module.id) == {139: 1}
+    assert metric_histogram_repository.find_drift() == []
+
+def test_rebuild_repairs_drift(sample_module):
+    db = get_db()
+    db.execute("UPDATE metric_histograms SET count = count + 1 WHERE metric = 'grade' AND scope = 'module' AND scope_id = ?",
+               (sample_module.id,))
+    db.execute("DELETE FROM metric_histograms WHERE metric = 'stress' AND scope = 'cohort'")
+    assert metric_histogram_repository.find_drift() == [('grade', 'module', sample_module.id), ('stress', 'cohort', 0)]
+
+    rows = metric_histogram_repository.rebuild()
+    db.commit()
+    assert rows == db.execute("SELECT COUNT(*) FROM metric_histograms").fetchone()[0] > 0
+    assert metric_histogram_repository.find_drift() == []
+    assert bins('grade', 'module', sample_module.id) == {139: 1}
@@ -0,0 +1,83 @@
+import math
+import pytest
+from app.db_connection import get_db
+from app.repositories.student_repository import student_repository
+from app.repositories.module_repository import module_repository
+from app.repositories.attendance_record_repository import attendance_record_repository
+from app.repositories.survey_response_repository import survey_response_repository
+from app.repositories.module_week_rollup_repository import module_week_rollup_repository
+
+@pytest.fixture(scope="module")
+def sample_student():
+    """Fixture to create a student for rollup tests."""
+    return student_repository.create_student(
+        student_number='S_ROLLUP_TEST',
+        full_name='Rollup Test Student',
+        email='rollup.test@example.com',
+        course_name='MSc Rollup Testing',
+        year_of_study=1
+    )
+
+@pytest.fixture(scope="module")
+def sample_module():
+    """Fixture to create a module without any activity for rollup tests."""
+    return module_repository.create_module(
+        module_code='ROLLUP101',
+        module_title='Rollup Testing',
+        credit=15,
+        academic_year='2025/2026'
+    )
+
+def rollup(module_id, week_number):
+    return get_db().execute(
+        "SELECT * FROM module_week_rollups WHERE module_id = ? AND week_number = ?", (module_id, week_number)
+    ).fetchone()
+
+def test_seeded_rollups_match_base_tables(app):
+    """The migration backfill and the triggers agree with a fresh aggregation."""
+    assert module_week_rollup_repository.find_drift() == []
+
+def test_rollups_follow_inserts_updates_and_deletes(sample_student, sample_module):
+    """Tests that the triggers keep counts, sums and sums of squares current through the whole row lifecycle."""
+    first = survey_response_repository.create_survey_response(sample_student.id, sample_module.id, 1, 2, 7.0, None)
+    survey_response_repository.create_survey_response(sample_student.id, sample_module.id, 1, 4, None, None)
+    attendance_record_repository.create_attendance_record(sample_student.id, sample_module.id, 1, 3, 4)
+    row = rollup(sample_module.id, 1)
+    assert (row['stress_count'], row['stress_sum'], row['stress_sumsq']) == (2, 6.0, 20.0)
+    assert (row['sleep_count'], row['sleep_sum'], row['sleep_sumsq']) == (1, 7.0, 49.0) # NULL hours are not counted.
+    assert (row['attendance_count'], row['attendance_sum']) == (1, pytest.approx(0.75))
+    assert row['academic_year'] == '2025/2026'
+
+    # Moving a survey to another week moves its contribution.
+    survey_response_repository.update_survey_response(first.id, sample_student.id, sample_module.id, 2, 5, 6.0, None)
+    assert (rollup(sample_module.id, 1)['stress_count'], rollup(sample_module.id, 1)['sleep_count']) == (1, 0)
+    assert (rollup(sample_module.id, 2)['stress_sum'], rollup(sample_module.id, 2)['sleep_sumsq']) == (5.0, 36.0)
+
+    survey_response_repository.delete_logical(first.id)
+    assert rollup(sample_module.id, 2)['stress_count'] == 0
+    assert module_week_rollup_repository.find_drift() == []
+
+def test_surveys_without_a_module_are_not_rolled_up(sample_student):
+    before = get_db().execute("SELECT TOTAL(stress_count) FROM module_week_rollups").fetchone()[0]
+    survey_response_repository.create_survey_response(sample_student.id, None, 9, 3, 8.0, None)
+    assert get_db().execute("SELECT TOTAL(stress_count) FROM module_week_rollups").fetchone()[0] == before
+
+def test_academic_year_follows_the_module(sample_module):
+    module_repository.update_module(sample_module.id, 'ROLLUP101', 'Rollup Testing', 15, '2026/2027')
+    assert rollup(sample_module.id, 1)['academic_year'] == '2026/2027'
+    assert module_week_rollup_repository.find_drift() == []
+
+def test_rebuild_repairs_drift(sample_module):
+    db = get_db()
+    db.execute("UPDATE module_week_rollups SET stress_sum = stress_sum + 10 WHERE module_id = ? AND week_number = 1", (sample_module.id,))
+    db.execute("DELETE FROM module_week_rollups WHERE module_id = (SELECT MIN(module_id) FROM module_week_rollups WHERE module_id != ?)",
+               (sample_module.id,))
+    drifted = module_week_rollup_repository.find_drift()
+    assert (sample_module.id, 1) in drifted and len(drifted) > 1
+
+    rows = module_week_rollup_repository.rebuild()
+    db.commit()
+    assert rows == db.execute("SELECT COUNT(*) FROM module_week_rollups").fetchone()[0] > 0
+    assert module_week_rollup_repository.find_drift() == []
+    row = rollup(sample_module.id, 1)
+    assert math.isclose(row['stress_sum'], 4.0)
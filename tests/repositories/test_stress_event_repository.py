@@ -2,6 +2,7 @@ import pytest
 from app.repositories.student_repository import student_repository
 from app.repositories.module_repository import module_repository
 from app.repositories.stress_event_repository import stress_event_repository
+from app.repositories.survey_response_repository import survey_response_repository
 
 @pytest.fixture(scope="module")
 def sample_student():
@@ -81,3 +82,14 @@ def test_update_stress_event(sample_student, sample_module):
     # Verify by fetching again
     fetched_event = stress_event_repository.get_stress_event_by_id(event_to_update.id)
     assert fetched_event.description == "Updated description"
+
+def test_one_event_per_survey_response(sample_student, sample_module):
+    """
+    Tests that creating an event for a survey response that has one updates it instead of adding another.
+    """
+    response = survey_response_repository.create_survey_response(sample_student.id, sample_module.id, 10, 5, 6.0, None)
+    first = stress_event_repository.create_stress_event(sample_student.id, sample_module.id, response.id, 10, 5, "academic", None, "manual")
+    stress_event_repository.delete_stress_event(first.id)
+    again = stress_event_repository.create_stress_event(sample_student.id, sample_module.id, response.id, 10, 4, "personal", "Updated", "manual")
+    assert again.id == first.id # Reactivated with the new details.
+    assert (again.stress_level, again.cause_category, again.created_at) == (4, "personal", first.created_at)
@@ -0,0 +1,96 @@
+import pytest
+from app.db_connection import get_db
+from app.repositories.student_repository import student_repository
+from app.repositories.module_repository import module_repository
+from app.repositories.grade_repository import grade_repository
+from app.repositories.attendance_record_repository import attendance_record_repository
+from app.repositories.survey_response_repository import survey_response_repository
+from app.repositories.student_metrics_repository import student_metrics_repository
+
+@pytest.fixture(scope="module")
+def sample_student():
+    """Fixture to create a student without any activity for metrics tests."""
+    return student_repository.create_student(
+        student_number='S_METRICS_TEST',
+        full_name='Metrics Test Student',
+        email='metrics.test@example.com',
+        course_name='MSc Metrics Testing',
+        year_of_study=1
+    )
+
+@pytest.fixture(scope="module")
+def sample_module():
+    """Fixture to create a sample module for metrics tests."""
+    return module_repository.create_module(
+        module_code='METRICS101',
+        module_title='Metrics Testing',
+        credit=15,
+        academic_year='2025/2026'
+    )
+
+def module_metrics(student_id, module_id):
+    return get_db().execute(
+        "SELECT * FROM student_module_metrics WHERE student_id = ? AND module_id = ?", (student_id, module_id)
+    ).fetchone()
+
+def test_seeded_metrics_match_base_tables(app):
+    """The migration backfill and the triggers agree with a fresh aggregation."""
+    assert student_metrics_repository.find_drift() == []
+
+def test_metrics_follow_inserts_updates_and_deletes(sample_student, sample_module):
+    """Tests that the triggers keep the averages current through the whole row lifecycle."""
+    assert student_metrics_repository.get_student_metrics(sample_student.id) is None
+
+    first = grade_repository.create_grade(sample_student.id, sample_module.id, 'Metrics Essay', 60.0)
+    second = grade_repository.create_grade(sample_student.id, sample_module.id, 'Metrics Exam', 80.0)
+    attendance_record_repository.create_attendance_record(sample_student.id, sample_module.id, 1, 3, 4)
+    survey_response_repository.create_survey_response(sample_student.id, sample_module.id, 1, 2, 7.0, None)
+    survey_response_repository.create_survey_response(sample_student.id, None, 2, 4, 6.0, None)
+    metrics = student_metrics_repository.get_student_metrics(sample_student.id)
+    assert metrics['average_grade'] == pytest.approx(70.0)
+    assert metrics['average_attendance'] == pytest.approx(0.75)
+    assert metrics['average_stress'] == pytest.approx(3.0)
+    # The survey without a module only counts towards the student totals.
+    assert module_metrics(sample_student.id, sample_module.id)['stress_count'] == 1
+
+    grade_repository.update_grade(first.id, sample_student.id, sample_module.id, 'Metrics Essay', 90.0)
+    assert student_metrics_repository.get_student_metrics(sample_student.id)['average_grade'] == pytest.approx(85.0)
+
+    grade_repository.delete_logical(second.id)
+    metrics = student_metrics_repository.get_student_metrics(sample_student.id)
+    assert (metrics['grade_count'], metrics['average_grade']) == (1, pytest.approx(90.0))
+
+    grade_repository.delete_hard(first.id)
+    metrics = student_metrics_repository.get_student_metrics(sample_student.id)
+    assert metrics['grade_count'] == 0 and metrics['average_grade'] is None
+    assert student_metrics_repository.find_drift() == []
+
+def test_moving_a_row_to_another_student_moves_its_metrics(sample_student, sample_module):
+    other = student_repository.create_student('S_METRICS_OTHER', 'Metrics Other Student', 'metrics.other@example.com', 'MSc Metrics Testing', 1)
+    grade = grade_repository.create_grade(sample_student.id, sample_module.id, 'Metrics Moved', 50.0)
+    before = student_metrics_repository.get_student_metrics(sample_student.id)['grade_count']
+
+    grade_repository.update_grade(grade.id, other.id, sample_module.id, 'Metrics Moved', 50.0)
+    assert student_metrics_repository.get_student_metrics(sample_student.id)['grade_count'] == before - 1
+    assert student_metrics_repository.get_student_metrics(other.id)['average_grade'] == pytest.approx(50.0)
+    assert module_metrics(other.id, sample_module.id)['grade_count'] == 1
+
+def test_bulk_inserts_are_counted(sample_student, sample_module):
+    rows = [{'student_id': sample_student.id, 'module_id': sample_module.id, 'assessment_name': f'Metrics Bulk {i}', 'grade': 40.0 + i}
+            for i in range(10)]
+    before = student_metrics_repository.get_student_metrics(sample_student.id)['grade_count']
+    grade_repository.bulk_create_grades(rows)
+    assert student_metrics_repository.get_student_metrics(sample_student.id)['grade_count'] == before + 10
+    assert student_metrics_repository.find_drift() == []
+
+def test_rebuild_repairs_drift(sample_student):
+    db = get_db()
+    db.execute("UPDATE student_metrics SET grade_sum = grade_sum + 100, stress_count = 0 WHERE student_id = ?", (sample_student.id,))
+    db.execute("DELETE FROM student_module_metrics WHERE student_id = ?", (sample_student.id,))
+    assert student_metrics_repository.find_drift() == [sample_student.id]
+
+    students, student_modules = student_metrics_repository.rebuild()
+    db.commit()
+    assert students == db.execute("SELECT COUNT(DISTINCT student_id) FROM student_metrics").fetchone()[0] > 0
+    assert student_modules > 0
+    assert student_metrics_repository.find_drift() == []
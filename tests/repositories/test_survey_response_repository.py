@@ -1,6 +1,6 @@
 import pytest
+from app.db_connection import get_db
 from app.repositories.survey_response_repository import survey_response_repository
-from app.models.survey_response import SurveyResponse
 from app.repositories.student_repository import student_repository
 from app.repositories.module_repository import module_repository
 
@@ -20,40 +20,30 @@ def test_create_and_get_survey_response(sample_student, sample_module):
     fetched_response = survey_response_repository.get_survey_response_by_id(new_response.id)
     assert fetched_response.stress_level == 5
 
-# --- Unit Tests for Business Logic ---
-def test_check_for_stress_event_creation(mocker):
-    mock_db = mocker.patch('app.repositories.survey_response_repository.get_db')
-    mock_cursor = mock_db.return_value.execute
-    mock_cursor.return_value.fetchone.return_value = None
-    high_stress_survey = SurveyResponse(id=1, student_id=1, module_id=1, week_number=5, stress_level=5)
-    survey_response_repository._check_for_stress_events_and_alerts(high_stress_survey, threshold=4)
-    insert_call_args = mock_cursor.call_args_list[1][0][0]
-    assert "INSERT INTO stress_events" in insert_call_args
-    assert mock_db.return_value.commit.call_count == 1
+# --- Stress Event and Alert Detection ---
+def test_create_enqueues_detection_instead_of_checking_inline(sample_student, sample_module):
+    db = get_db()
+    new_response = survey_response_repository.create_survey_response(sample_student.id, sample_module.id, 6, 5, 5.0, None)
+    job = db.execute("SELECT survey_response_id, available_at FROM detection_jobs WHERE survey_response_id = ?", (new_response.id,)).fetchone()
+    assert job is not None and job['available_at'] is not None
+    assert db.execute("SELECT COUNT(*) FROM stress_events WHERE survey_response_id = ?", (new_response.id,)).fetchone()[0] == 0
 
-def test_check_for_alert_creation(mocker):
-    mock_db = mocker.patch('app.repositories.survey_response_repository.get_db')
-    mock_cursor = mock_db.return_value.execute
-    mock_cursor.return_value.fetchone.side_effect = [
-        None,
-        {'week_number': 4, 'stress_level': 4},
-        None
-    ]
-    current_high_stress_survey = SurveyResponse(id=2, student_id=1, module_id=1, week_number=5, stress_level=4)
-    survey_response_repository._check_for_stress_events_and_alerts(current_high_stress_survey, threshold=4)
-    # The call order is: SELECT stress_event, INSERT stress_event, SELECT previous_survey, SELECT alert, INSERT alert
-    assert "INSERT INTO alerts" in mock_cursor.call_args_list[4][0][0]
-    assert mock_db.return_value.commit.call_count == 2
+def test_check_creates_events_and_alerts_once(sample_student, sample_module):
+    db = get_db()
+    first = survey_response_repository.create_survey_response(sample_student.id, sample_module.id, 10, 4, 6.0, None)
+    second = survey_response_repository.create_survey_response(sample_student.id, sample_module.id, 11, 5, 5.0, None)
+    low = survey_response_repository.create_survey_response(sample_student.id, sample_module.id, 12, 2, 8.0, None)
+    ids = [first.id, second.id, low.id]
+    assert survey_response_repository.check_for_stress_events_and_alerts(ids) == (2, 1)
+    alert = db.execute("SELECT reason FROM alerts WHERE student_id = ? AND week_number = 11", (sample_student.id,)).fetchone()
+    assert alert['reason'] == (f"Stress level >= 4 for two consecutive weeks (10 and 11) "
+                               f"for student {sample_student.id} in module {sample_module.id}.")
 
-def test_no_event_or_alert_on_low_stress(mocker):
-    mock_db = mocker.patch('app.repositories.survey_response_repository.get_db')
-    mock_execute = mock_db.return_value.execute
-    # Simulate finding a low-stress survey from the previous week
-    mock_execute.return_value.fetchone.return_value = {'week_number': 5, 'stress_level': 2}
-    
-    low_stress_survey = SurveyResponse(id=3, student_id=1, module_id=1, week_number=6, stress_level=3)
-    survey_response_repository._check_for_stress_events_and_alerts(low_stress_survey, threshold=4)
-    
-    for call in mock_execute.call_args_list:
-        assert "INSERT" not in call[0][0]
-    assert mock_db.return_value.commit.call_count == 0
+    # Checking the same responses again (e.g. a job delivered twice) creates nothing.
+    assert survey_response_repository.check_for_stress_events_and_alerts(ids) == (0, 0)
+
+def test_check_ignores_low_stress_and_inactive_responses(sample_student, sample_module):
+    low = survey_response_repository.create_survey_response(sample_student.id, sample_module.id, 20, 3, 7.0, None)
+    deleted = survey_response_repository.create_survey_response(sample_student.id, sample_module.id, 21, 5, 4.0, None)
+    survey_response_repository.delete_survey_response(deleted.id)
+    assert survey_response_repository.check_for_stress_events_and_alerts([low.id, deleted.id]) == (0, 0)
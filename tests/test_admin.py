@@ -271,6 +271,24 @@ def test_attendance_record_endpoints(client, admin_token, sample_student, sample
     response = client.delete(f'/api/admin/attendance-records/{record_id}', headers=headers)
     assert response.status_code == 200
 
+def test_attendance_record_update_onto_an_occupied_week_conflicts(client, admin_token, sample_student, sample_module):
+    """
+    Tests that moving an attendance record onto the student, module and week of another
+    active record is rejected with 409 and the conflicting key, and changes nothing.
+    """
+    headers = {'Authorization': f'Bearer {admin_token}', 'Content-Type': 'application/json'}
+    ids = []
+    for week in (2, 3):
+        record = {'student_id': sample_student['id'], 'module_id': sample_module['id'], 'week_number': week, 'attended_sessions': 2, 'total_sessions': 2}
+        response = client.post('/api/admin/attendance-records', data=json.dumps(record), headers=headers)
+        ids.append(json.loads(response.data)['id'])
+
+    response = client.put(f'/api/admin/attendance-records/{ids[1]}', data=json.dumps({'week_number': 2}), headers=headers)
+    assert response.status_code == 409
+    assert json.loads(response.data)['conflict'] == {'student_id': sample_student['id'], 'module_id': sample_module['id'], 'week_number': 2}
+    response = client.get(f'/api/admin/attendance-records/{ids[1]}', headers=headers)
+    assert json.loads(response.data)['week_number'] == 3
+
 def test_submission_record_endpoints(client, admin_token, sample_student, sample_module):
     """
     Tests the full CRUD lifecycle for submission record endpoints.
@@ -0,0 +1,83 @@
+"""
+Tests for the administrative service layer in `app/admin/services.py`.
+
+Covers `evaluate_alerts`, which re-evaluates the stress event and alert rules
+over a range of weeks with one window-function pass, and checks that it agrees
+with the per-response check run by the detection worker.
+"""
+
+import pytest
+from app.admin.services import evaluate_alerts
+from app.db_connection import get_db
+from app.repositories.module_repository import module_repository
+from app.repositories.student_repository import student_repository
+from app.repositories.survey_response_repository import survey_response_repository
+
+@pytest.fixture(scope="module")
+def sample_student():
+    """Fixture to create a student for alert evaluation tests."""
+    return student_repository.create_student('S_EVALUATE_TEST', 'Evaluate Test Student', 'evaluate.test@example.com', 'MSc Evaluation', 1)
+
+@pytest.fixture(scope="module")
+def sample_modules():
+    """Fixture to create two modules for alert evaluation tests."""
+    return [module_repository.create_module(f'EVAL10{i}', f'Evaluation {i}', 15, '2025/2026') for i in (1, 2)]
+
+def backfill(student, module, levels_by_week):
+    """Inserts survey responses the way an import does: without running the detection check."""
+    ids = [survey_response_repository.create_survey_response(student.id, module.id, week, level, 7.0, None).id
+           for week, level in levels_by_week]
+    db = get_db()
+    db.execute("DELETE FROM detection_jobs")
+    db.commit()
+    return ids
+
+def alerts_of(student):
+    rows = get_db().execute("SELECT module_id, week_number FROM alerts WHERE student_id = ? ORDER BY week_number", (student.id,)).fetchall()
+    return [(row['module_id'], row['week_number']) for row in rows]
+
+def test_seeded_history_has_no_missing_alerts(app):
+    """The seeded events and alerts follow the same rules, so nothing is missing."""
+    assert evaluate_alerts()[:2] == (0, 0)
+
+def test_runs_are_found_in_one_pass(sample_student, sample_modules):
+    first, second = sample_modules
+    # Week 41: a low and a high response; 42-43: a run in the first module; 45 follows a gap.
+    backfill(sample_student, first, [(41, 2), (41, 4), (42, 5), (43, 4), (45, 5)])
+    # Week 43 also follows a high week in the second module; the first qualifying response names the module.
+    backfill(sample_student, second, [(42, 4), (43, 5), (44, 2)])
+
+    result = evaluate_alerts(from_week=42, to_week=45)
+    assert (result.stress_events, result.alerts) == (5, 2)
+    assert alerts_of(sample_student) == [(first.id, 42), (first.id, 43)]
+    reason = get_db().execute("SELECT reason FROM alerts WHERE student_id = ? AND week_number = 42", (sample_student.id,)).fetchone()[0]
+    assert reason == f"Stress level >= 4 for two consecutive weeks (41 and 42) for student {sample_student.id} in module {first.id}."
+
+    # Week 41 lies outside the range, so its event is still missing; everything else exists.
+    assert evaluate_alerts(from_week=42, to_week=45)[:2] == (0, 0)
+    assert evaluate_alerts()[:2] == (1, 0)
+
+def test_matches_the_per_response_check(sample_student, sample_modules):
+    """Evaluating history creates what the worker's check would have created response by response."""
+    _, second = sample_modules
+    ids = backfill(sample_student, second, [(50, 4), (51, 4), (52, 3), (53, 5), (54, 5), (54, 4)])
+    db = get_db()
+    expected = survey_response_repository.check_for_stress_events_and_alerts(ids)
+    created = db.execute("SELECT module_id, week_number FROM alerts WHERE student_id = ? AND week_number >= 50 ORDER BY week_number",
+                         (sample_student.id,)).fetchall()
+    db.rollback()
+
+    result = evaluate_alerts(from_week=50)
+    assert (result.stress_events, result.alerts) == expected == (5, 2)
+    assert alerts_of(sample_student)[-2:] == [(row['module_id'], row['week_number']) for row in created]
+
+def test_lower_threshold_adds_events_and_alerts(sample_student, sample_modules):
+    result = evaluate_alerts(from_week=50, to_week=53, threshold=3)
+    assert (result.stress_events, result.alerts) == (1, 2) # Week 52 (level 3) starts and continues runs.
+    assert [week for _, week in alerts_of(sample_student)][-4:] == [51, 52, 53, 54]
+
+def test_invalid_arguments_are_rejected(app):
+    with pytest.raises(ValueError):
+        evaluate_alerts(threshold=6)
+    with pytest.raises(ValueError):
+        evaluate_alerts(from_week=5, to_week=4)
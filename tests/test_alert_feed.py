@@ -0,0 +1,94 @@
+"""
+Tests for the incremental alert feed.
+
+Covers the `alert_changes` log kept by the triggers of migration
+`0009_alert_changes.sql`, the `/api/admin/alerts/feed` polling endpoint and the
+`/api/admin/alerts/stream` server-sent events stream.
+"""
+
+import json
+import pytest
+from app.db_connection import get_db
+from app.repositories.alert_repository import alert_repository
+from app.repositories.module_repository import module_repository
+from app.repositories.student_repository import student_repository
+
+@pytest.fixture(scope="module")
+def sample_student():
+    """Fixture to create a student for alert feed tests."""
+    return student_repository.create_student('S_FEED_TEST', 'Feed Test Student', 'feed.test@example.com', 'MSc Feed Testing', 1)
+
+@pytest.fixture(scope="module")
+def sample_module():
+    """Fixture to create a module for alert feed tests."""
+    return module_repository.create_module('FEED101', 'Feed Testing', 15, '2025/2026')
+
+def login(client, username, password):
+    credentials = {'username': username, 'password': password, 'context': 'staff'}
+    response = client.post('/api/auth/login', data=json.dumps(credentials), content_type='application/json')
+    return {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+def create_alert(student, module, week):
+    alert = alert_repository.create_alert(student.id, module.id, week, f"Feed alert for week {week}")
+    get_db().commit()
+    return alert
+
+def read_events(response):
+    """Parses a server-sent events body into `(id, event, data)` tuples, skipping comments and `retry`."""
+    events = []
+    for frame in response.get_data(as_text=True).split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in frame.splitlines() if line and not line.startswith((':', 'retry')))
+        if fields:
+            events.append((fields['id'], fields['event'], json.loads(fields['data'])))
+    return events
+
+def test_feed_returns_changes_since_the_cursor(client, sample_student, sample_module):
+    headers = login(client, 'wellbeing_officer', 'password')
+    start = client.get('/api/admin/alerts/feed', headers=headers).get_json()
+    assert (start['changes'], start['has_more']) == ([], False)
+
+    alert = create_alert(sample_student, sample_module, 3)
+    client.put(f'/api/admin/alerts/{alert.id}/resolve', headers=headers)
+    other = create_alert(sample_student, sample_module, 4)
+    client.delete(f'/api/admin/alerts/{other.id}', headers=headers)
+
+    feed = client.get(f"/api/admin/alerts/feed?since={start['cursor']}", headers=headers).get_json()
+    assert [(c['alert_id'], c['change']) for c in feed['changes']] == [(alert.id, 'resolved'), (other.id, 'deleted')]
+    assert feed['changes'][0]['alert']['module_title'] == 'Feed Testing'
+    assert client.get(f"/api/admin/alerts/feed?since={feed['cursor']}", headers=headers).get_json()['changes'] == []
+
+    paged = client.get(f"/api/admin/alerts/feed?since={start['cursor']}&limit=1", headers=headers).get_json()
+    assert [c['change'] for c in paged['changes']] == ['created'] and paged['has_more'] is True
+
+def test_feed_rejects_invalid_requests(client):
+    headers = login(client, 'admin', 'admin')
+    assert client.get('/api/admin/alerts/feed?since=bogus', headers=headers).status_code == 400
+    assert client.get('/api/admin/alerts/feed?since=WzBd&limit=0', headers=headers).status_code == 400
+    assert client.get('/api/admin/alerts/stream?since=bogus', headers=headers).status_code == 400
+    assert client.get('/api/admin/alerts/feed').status_code == 401
+
+def test_stream_pushes_coalesced_changes(app, client, sample_student, sample_module):
+    headers = login(client, 'wellbeing_officer', 'password')
+    since = client.get('/api/admin/alerts/feed', headers=headers).get_json()['cursor']
+    alert = create_alert(sample_student, sample_module, 5)
+    alert_repository.mark_alert_resolved(alert.id)
+    get_db().commit()
+    app.config.update(ALERT_FEED_BATCH_SIZE=1, ALERT_STREAM_POLL_SECONDS=0.01, ALERT_STREAM_MAX_SECONDS=0.05)
+    try:
+        response = client.get(f'/api/admin/alerts/stream?since={since}', headers=headers)
+        assert response.status_code == 200 and response.mimetype == 'text/event-stream'
+        events = read_events(response)
+        # A batch of one entry per poll: the created and the resolved change arrive as two events.
+        assert [(event, [c['change'] for c in data]) for _, event, data in events] == [('alerts', ['created']), ('alerts', ['resolved'])]
+
+        app.config.update(ALERT_FEED_BATCH_SIZE=200)
+        events = read_events(client.get('/api/admin/alerts/stream', headers={**headers, 'Last-Event-ID': since}))
+        assert [[c['change'] for c in data] for _, _, data in events] == [['resolved']] # Coalesced into one event.
+        assert client.get(f'/api/admin/alerts/feed?since={events[0][0]}', headers=headers).get_json()['changes'] == []
+    finally:
+        app.config.update(ALERT_FEED_BATCH_SIZE=200, ALERT_STREAM_POLL_SECONDS=2, ALERT_STREAM_MAX_SECONDS=300)
+
+def test_feed_requires_alert_role(client):
+    headers = login(client, 'course_director', 'password')
+    assert client.get('/api/admin/alerts/feed', headers=headers).status_code == 403
+    assert client.get('/api/admin/alerts/stream', headers=headers).status_code == 403
@@ -109,8 +109,20 @@ def test_get_stress_grade_correlation(client, admin_token):
     headers = {'Authorization': f'Bearer {admin_token}'}
     response = client.get('/api/analysis/stress-grade-correlation', headers=headers)
     assert response.status_code == 200
-    assert 'labels' in json.loads(response.data)
-    assert 'data' in json.loads(response.data)
+    data = json.loads(response.data)
+    assert {'count', 'pearson', 'spearman', 'regression', 'density'} <= set(data)
+    assert 'points' not in data
+
+    response = client.get('/api/analysis/stress-grade-correlation?points=page&limit=2', headers=headers)
+    assert response.status_code == 200
+    page = json.loads(response.data)['points']
+    assert len(page['data']) == min(2, data['count']) and {'id', 'name', 'x', 'y'} == set(page['data'][0])
+    response = client.get(f"/api/analysis/stress-grade-correlation?points=page&limit=2&after={page['next_cursor']}", headers=headers)
+    assert json.loads(response.data)['points']['data'][0]['id'] > page['data'][-1]['id']
+
+    for query in ('points=all', 'points=sample&limit=0', 'after=abc', 'points=page&after=abc'):
+        response = client.get(f'/api/analysis/stress-grade-correlation?{query}', headers=headers)
+        assert response.status_code == 400
 
 def test_get_dashboard_summary(client, admin_token):
     """
@@ -167,3 +179,287 @@ def test_get_stress_by_module(client, admin_token):
     assert response.status_code == 200
     assert 'labels' in json.loads(response.data)
     assert 'data' in json.loads(response.data)
+
+def test_high_risk_students_accepts_thresholds_sort_and_limit(client, admin_token):
+    """
+    Tests threshold, sort and limit parameters of GET /api/analysis/high-risk-students.
+    Verifies structured factors, severity ordering and that looser thresholds flag more students.
+    """
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    strict = json.loads(client.get('/api/analysis/high-risk-students?attendance_threshold=101', headers=headers).data)
+    assert 'between 0 and 100' in strict['message']
+
+    default = json.loads(client.get('/api/analysis/high-risk-students', headers=headers).data)
+    loose = json.loads(client.get(
+        '/api/analysis/high-risk-students?attendance_threshold=95&grade_threshold=70&stress_threshold=3&sort=severity',
+        headers=headers).data)
+    assert len(loose) >= len(default) and loose
+    severities = [student['severity'] for student in loose]
+    assert severities == sorted(severities, reverse=True)
+    first = loose[0]
+    assert set(first['factors']) == {'attendance', 'grade', 'stress'}
+    assert first['factors']['grade']['threshold'] == 70
+    assert len(first['reasons']) == sum(f['at_risk'] for f in first['factors'].values()) > 0
+    assert first['severity'] == pytest.approx(sum(f['score'] for f in first['factors'].values()), abs=0.01)
+
+    limited = json.loads(client.get(
+        '/api/analysis/high-risk-students?attendance_threshold=95&grade_threshold=70&stress_threshold=3&sort=severity&limit=2',
+        headers=headers).data)
+    assert [s['id'] for s in limited] == [s['id'] for s in loose[:2]]
+
+    for query in ('limit=0', 'limit=abc', 'sort=age', 'stress_threshold=6'):
+        response = client.get(f'/api/analysis/high-risk-students?{query}', headers=headers)
+        assert response.status_code == 400
+
+def test_dashboard_bundle_matches_individual_endpoints(client, admin_token):
+    """
+    Tests the GET /api/analysis/dashboard endpoint.
+    Verifies that each panel equals the response of its individual endpoint.
+    """
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    response = client.get('/api/analysis/dashboard', headers=headers)
+    assert response.status_code == 200
+    bundle = json.loads(response.data)
+    assert set(bundle) == {'dashboard_summary', 'grade_distribution', 'stress_grade_correlation', 'overall_attendance_rate',
+                           'submission_status_distribution', 'stress_by_module', 'high_risk_students'}
+    for panel in ('dashboard-summary', 'grade-distribution', 'stress-grade-correlation', 'overall-attendance-rate',
+                  'submission-status-distribution', 'stress-by-module'):
+        individual = json.loads(client.get(f'/api/analysis/{panel}', headers=headers).data)
+        assert bundle[panel.replace('-', '_')] == individual
+    by_severity = json.loads(client.get('/api/analysis/high-risk-students?sort=severity', headers=headers).data)
+    assert bundle['high_risk_students'] == by_severity
+
+def test_dashboard_bundle_selects_panels(client, admin_token):
+    """
+    Tests the `panels` parameter of GET /api/analysis/dashboard.
+    Verifies that only the requested panels are computed and unknown panels are rejected.
+    """
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    response = client.get('/api/analysis/dashboard?panels=stress-by-module,dashboard_summary', headers=headers)
+    assert response.status_code == 200
+    assert set(json.loads(response.data)) == {'dashboard_summary', 'stress_by_module'}
+
+    response = client.get('/api/analysis/dashboard?panels=summary,weather', headers=headers)
+    assert response.status_code == 400
+    assert 'summary, weather' in json.loads(response.data)['message']
+
+def test_student_overview_matches_individual_endpoints(client, admin_token):
+    """
+    Tests the GET /api/analysis/students/<id>/overview endpoint.
+    Verifies that the bundled sections equal the individual endpoints and that it is read with a fixed number of queries.
+    """
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    students = json.loads(client.get('/api/analysis/students?fields=id', headers=headers).data)
+    for student_id in (students[0]['id'], students[-1]['id']):
+        response = client.get(f'/api/analysis/students/{student_id}/overview', headers=headers)
+        assert response.status_code == 200
+        overview = json.loads(response.data)
+        assert set(overview) == {'student', 'enrolments', 'stress_trend', 'attendance_trend', 'average_attendance',
+                                 'grades_by_module', 'submissions', 'alerts'}
+        assert 'desc="6 queries"' in response.headers['Server-Timing']
+
+        detail = json.loads(client.get(f'/api/analysis/students/{student_id}', headers=headers).data)
+        assert overview['student']['full_name'] == detail['full_name']
+        assert sorted(e['module_title'] for e in overview['enrolments']) == sorted(detail['enrolments'])
+        for section in ('stress-trend', 'attendance-trend'):
+            individual = json.loads(client.get(f'/api/analysis/students/{student_id}/{section}', headers=headers).data)
+            assert overview[section.replace('-', '_')] == individual
+        average = json.loads(client.get(f'/api/analysis/students/{student_id}/average-attendance', headers=headers).data)
+        assert overview['average_attendance'] == average['average_attendance']
+        alerts = json.loads(client.get(f'/api/admin/alerts/student/{student_id}', headers=headers).data)
+        assert overview['alerts'] == alerts
+        for module in overview['grades_by_module']:
+            marks = [g['grade'] for g in module['grades'] if g['grade'] is not None]
+            assert module['average_grade'] == (round(sum(marks) / len(marks), 2) if marks else None)
+
+    # A repeated request is served from the analysis cache.
+    response = client.get(f'/api/analysis/students/{student_id}/overview', headers=headers)
+    assert 'desc="0 queries"' in response.headers['Server-Timing']
+
+def test_student_overview_of_nonexistent_student(client, admin_token):
+    """
+    Tests GET /api/analysis/students/<id>/overview for an unknown student.
+    Verifies that it returns 404 Not Found.
+    """
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    response = client.get('/api/analysis/students/99999/overview', headers=headers)
+    assert response.status_code == 404
+
+def test_cohort_trends_match_per_student_trends(client, admin_token):
+    """
+    Tests the GET /api/analysis/cohort-trends endpoint.
+    Verifies that every row of the matrices equals the student's individual trend endpoints.
+    """
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    students = json.loads(client.get('/api/analysis/students?fields=id', headers=headers).data)
+    ids = [s['id'] for s in students[:5]]
+    response = client.get(f"/api/analysis/cohort-trends?student_ids={','.join(map(str, ids))}", headers=headers)
+    assert response.status_code == 200
+    assert 'desc="3 queries"' in response.headers['Server-Timing']
+    cohort = json.loads(response.data)
+    assert [s['id'] for s in cohort['students']] == ids
+    for i, student_id in enumerate(ids):
+        for name, endpoint in (('stress', 'stress-trend'), ('attendance', 'attendance-trend')):
+            individual = json.loads(client.get(f'/api/analysis/students/{student_id}/{endpoint}', headers=headers).data)
+            row = cohort[name][i]
+            assert [f"Week {w}" for w, v in zip(cohort['weeks'], row) if v is not None] == individual['labels']
+            assert [v for v in row if v is not None] == individual['data']
+
+def test_cohort_trends_filters(client, admin_token):
+    """
+    Tests the course, year and module selectors of GET /api/analysis/cohort-trends and their validation.
+    """
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    student = json.loads(client.get('/api/analysis/students', headers=headers).data)[0]
+    response = client.get('/api/analysis/cohort-trends', headers=headers,
+                          query_string={'course_name': student['course_name'], 'year_of_study': student['year_of_study']})
+    assert response.status_code == 200
+    cohort = json.loads(response.data)
+    assert student['id'] in [s['id'] for s in cohort['students']]
+    assert len(cohort['stress']) == len(cohort['attendance']) == len(cohort['students'])
+    assert all(len(row) == len(cohort['weeks']) for row in cohort['stress'] + cohort['attendance'])
+
+    enrolled = json.loads(client.get(f"/api/analysis/students/{student['id']}/overview", headers=headers).data)['enrolments']
+    if enrolled:
+        response = client.get(f"/api/analysis/cohort-trends?module_id={enrolled[0]['module_id']}", headers=headers)
+        assert student['id'] in [s['id'] for s in json.loads(response.data)['students']]
+
+    assert client.get('/api/analysis/cohort-trends', headers=headers).status_code == 400
+    assert client.get('/api/analysis/cohort-trends?student_ids=1,x', headers=headers).status_code == 400
+
+def test_cohort_trends_rejects_oversized_cohorts(app, client, admin_token):
+    """
+    Tests that GET /api/analysis/cohort-trends returns 400 when the cohort exceeds COHORT_TRENDS_MAX_STUDENTS.
+    """
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    ids = [s['id'] for s in json.loads(client.get('/api/analysis/students?fields=id', headers=headers).data)[:3]]
+    app.config['COHORT_TRENDS_MAX_STUDENTS'] = 2
+    try:
+        response = client.get(f"/api/analysis/cohort-trends?student_ids={','.join(map(str, ids))}", headers=headers)
+    finally:
+        app.config['COHORT_TRENDS_MAX_STUDENTS'] = 500
+    assert response.status_code == 400
+    assert 'more than 2 students' in json.loads(response.data)['message']
+
+def test_module_week_heatmap_matches_raw_rows(app, client, admin_token):
+    """
+    Tests the GET /api/analysis/module-week-heatmap endpoint.
+    Verifies that every cell equals the weekly average of the module's raw rows.
+    """
+    from app.db_connection import get_db
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    for metric, column, table, scale in (('stress', 'stress_level', 'survey_responses', 1),
+                                         ('attendance', 'attendance_rate', 'attendance_records', 100),
+                                         ('sleep', 'hours_slept', 'survey_responses', 1)):
+        response = client.get(f'/api/analysis/module-week-heatmap?metric={metric}', headers=headers)
+        assert response.status_code == 200
+        assert 'desc="1 queries"' in response.headers['Server-Timing']
+        heatmap = json.loads(response.data)
+        assert heatmap['modules'] and len(heatmap['data']) == len(heatmap['counts']) == len(heatmap['modules'])
+        expected = {(row[0], row[1]): (round(row[2] * scale, 2), row[3]) for row in get_db().execute(f"""
+            SELECT module_id, week_number, AVG({column}), COUNT({column}) FROM {table}
+            WHERE is_active = 1 AND module_id IN (SELECT id FROM modules WHERE is_active = 1) AND {column} IS NOT NULL
+            GROUP BY module_id, week_number
+        """)}
+        actual = {(module['id'], week): (mean, count)
+                  for module, means, counts in zip(heatmap['modules'], heatmap['data'], heatmap['counts'])
+                  for week, mean, count in zip(heatmap['weeks'], means, counts) if count}
+        assert actual.keys() == expected.keys()
+        for key, (mean, count) in expected.items():
+            assert actual[key][1] == count and actual[key][0] == pytest.approx(mean, abs=0.011)
+
+    year = heatmap['modules'][0]['academic_year']
+    filtered = json.loads(client.get(f'/api/analysis/module-week-heatmap?academic_year={year}', headers=headers).data)
+    assert {module['academic_year'] for module in filtered['modules']} == {year}
+    assert client.get('/api/analysis/module-week-heatmap?metric=mood', headers=headers).status_code == 400
+
+def test_module_weekly_trends(client, admin_token):
+    """
+    Tests the GET /api/analysis/modules/<id>/weekly-trends endpoint.
+    Verifies the shape of the series, that they agree with the heatmap, and the 404 for unknown modules.
+    """
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    heatmap = json.loads(client.get('/api/analysis/module-week-heatmap', headers=headers).data)
+    module = heatmap['modules'][0]
+    response = client.get(f"/api/analysis/modules/{module['id']}/weekly-trends", headers=headers)
+    assert response.status_code == 200
+    trends = json.loads(response.data)
+    assert trends['module']['module_code'] == module['module_code']
+    for metric in ('stress', 'attendance', 'sleep'):
+        assert all(len(trends[metric][key]) == len(trends['weeks']) for key in ('mean', 'stddev', 'count'))
+        assert all(s is None or s >= 0 for s in trends[metric]['stddev'])
+    by_week = dict(zip(trends['weeks'], trends['stress']['mean']))
+    for week, mean in zip(heatmap['weeks'], heatmap['data'][0]):
+        if mean is not None:
+            assert by_week[week] == mean
+
+    assert client.get('/api/analysis/modules/99999/weekly-trends', headers=headers).status_code == 404
+
+def test_metric_percentiles_match_sorted_values(app, client, admin_token):
+    """
+    Tests the GET /api/analysis/percentiles endpoint.
+    Verifies that sketch percentiles equal the nearest-rank value of the sorted values, at bin resolution.
+    """
+    from app.db_connection import get_db
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    db = get_db()
+    cases = [
+        ('grade', '', 2, [row[0] for row in db.execute(
+            "SELECT sm.grade_sum / sm.grade_count FROM student_metrics sm JOIN students s ON s.id = sm.student_id "
+            "WHERE s.is_active = 1 AND sm.grade_count > 0")]),
+        ('stress', '&week=3', 100, [row[0] for row in db.execute(
+            "SELECT stress_level FROM survey_responses WHERE is_active = 1 AND week_number = 3")]),
+    ]
+    for metric, scope, scale, values in cases:
+        values = sorted(values)
+        response = client.get(f'/api/analysis/percentiles?metric={metric}&percentiles=0,10,50,90,100{scope}', headers=headers)
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['count'] == len(values) > 0
+        for entry in data['percentiles']:
+            rank = max(1, -(-int(entry['percentile']) * len(values) // 100))
+            assert entry['value'] == int(values[rank - 1] * scale) / scale
+
+    for query in ('metric=mood', 'metric=grade&week=3', 'metric=grade&module_id=1&week=3',
+                  'metric=grade&percentiles=101', 'metric=grade&percentiles=abc', 'metric=grade&week=x'):
+        assert client.get(f'/api/analysis/percentiles?{query}', headers=headers).status_code == 400
+
+def test_grade_distribution_matches_student_averages(app):
+    """Tests that the bands counted from the grade sketch equal banding every student's average."""
+    from app.repositories.analysis_repository import analysis_repository
+    expected = [0] * 5
+    for row in analysis_repository._get_student_averages():
+        if row['average_grade'] is not None:
+            expected[sum(row['average_grade'] >= bound for bound in (40, 50, 60, 70))] += 1
+    assert analysis_repository.get_grade_distribution()['data'] == expected
+
+def test_student_percentiles(app, client, admin_token):
+    """
+    Tests the GET /api/analysis/students/<id>/percentiles endpoint.
+    Verifies the cohort rank against a full ranking, the module scope and the 404 and 400 responses.
+    """
+    from app.db_connection import get_db
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    rows = get_db().execute(
+        "SELECT sm.student_id, sm.stress_sum / sm.stress_count AS stress FROM student_metrics sm "
+        "JOIN students s ON s.id = sm.student_id WHERE s.is_active = 1 AND sm.stress_count > 0 ORDER BY sm.student_id"
+    ).fetchall()
+    student_id, value = rows[0]
+    response = client.get(f'/api/analysis/students/{student_id}/percentiles', headers=headers)
+    assert response.status_code == 200
+    ranks = json.loads(response.data)
+    bucket = int(value * 100)
+    below = sum(1 for row in rows if int(row['stress'] * 100) < bucket)
+    same = sum(1 for row in rows if int(row['stress'] * 100) == bucket)
+    assert ranks['scope'] == 'cohort'
+    assert ranks['metrics']['stress'] == {'value': round(value, 2), 'count': len(rows),
+                                          'percentile': round((below + same / 2) / len(rows) * 100, 1)}
+
+    module_id = get_db().execute("SELECT module_id FROM student_module_metrics WHERE student_id = ? AND stress_count > 0",
+                                 (student_id,)).fetchone()[0]
+    by_module = json.loads(client.get(f'/api/analysis/students/{student_id}/percentiles?module_id={module_id}',
+                                      headers=headers).data)
+    assert by_module['scope'] == 'module' and 0 < by_module['metrics']['stress']['percentile'] <= 100
+
+    assert client.get('/api/analysis/students/99999/percentiles', headers=headers).status_code == 404
+    assert client.get(f'/api/analysis/students/{student_id}/percentiles?module_id=1&week=2', headers=headers).status_code == 400
@@ -0,0 +1,163 @@
+"""
+Tests for the analysis result cache in `app/analysis_cache.py`.
+
+Covers hits, write-driven invalidation through the `BaseRepository` write
+helpers, LRU and TTL eviction, coalescing of concurrent misses and the
+admin-only `/api/admin/debug/analysis-cache` endpoint.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import pytest
+from app.analysis_cache import AnalysisCache, get_analysis_cache
+from app.db_connection import get_db
+from app.repositories.analysis_repository import analysis_repository
+from app.repositories.grade_repository import grade_repository
+from app.repositories.module_repository import module_repository
+
+def login(client, username, password):
+    """Logs in a staff user and returns the authorization header."""
+    credentials = {'username': username, 'password': password, 'context': 'staff'}
+    response = client.post('/api/auth/login', data=json.dumps(credentials), content_type='application/json')
+    return {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+@pytest.fixture
+def admin_headers(client):
+    return login(client, 'admin', 'admin')
+
+@pytest.fixture
+def cache(app):
+    cache = get_analysis_cache()
+    cache.clear()
+    return cache
+
+def query_count(response):
+    """Reads the number of SQL statements from the `Server-Timing` header."""
+    header = response.headers['Server-Timing']
+    return int(header.split('desc="')[1].split(' ')[0])
+
+def test_repeated_requests_are_served_from_cache(client, admin_headers, cache):
+    first = client.get('/api/analysis/grade-distribution', headers=admin_headers)
+    second = client.get('/api/analysis/grade-distribution', headers=admin_headers)
+    assert first.status_code == second.status_code == 200
+    assert first.get_json() == second.get_json()
+    assert query_count(first) > 0 and query_count(second) == 0
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 1)
+
+def test_positional_and_keyword_arguments_share_an_entry(cache):
+    analysis_repository.get_high_risk_students(60)
+    analysis_repository.get_high_risk_students(attendance_threshold=60, sort='id')
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 1)
+
+def test_writes_invalidate_only_dependent_results(client, admin_headers, cache):
+    client.get('/api/analysis/grade-distribution', headers=admin_headers)
+    client.get('/api/analysis/submission-status-distribution', headers=admin_headers)
+    before = client.get('/api/analysis/grade-distribution', headers=admin_headers).get_json()
+
+    # A new grade changes the student metrics the grade distribution reads.
+    student_id = get_db().execute("SELECT id FROM students WHERE is_active = 1 ORDER BY id LIMIT 1").fetchone()[0]
+    module = module_repository.create_module('CACHE101', 'Cache Testing', 15, '2025/2026')
+    for i in range(5):
+        grade_repository.create_grade(student_id, module.id, f'Cache Exam {i}', 0.0)
+    get_db().commit()
+
+    response = client.get('/api/analysis/grade-distribution', headers=admin_headers)
+    assert query_count(response) > 0
+    assert response.get_json() != before
+    # Submissions were not written, so that result is still cached.
+    assert query_count(client.get('/api/analysis/submission-status-distribution', headers=admin_headers)) == 0
+    assert cache.stats()['stale'] == 1
+
+def test_alerts_written_by_another_process_invalidate_results(app, client, admin_headers, cache):
+    """Alerts committed by the detection worker's own connection are seen at once, without waiting for the TTL."""
+    get_db().commit()
+    before = client.get('/api/analysis/dashboard-summary', headers=admin_headers).get_json()
+    assert query_count(client.get('/api/analysis/dashboard-summary', headers=admin_headers)) == 0
+
+    # Write like `flask worker`: a separate connection that never touches this process's version counters.
+    versions = cache.stats()['table_versions']
+    worker = sqlite3.connect(app.config['DATABASE_PATH'])
+    student_id = worker.execute("SELECT id FROM students WHERE is_active = 1 ORDER BY id LIMIT 1").fetchone()[0]
+    worker.execute("INSERT INTO alerts (student_id, week_number, reason, created_at, resolved, is_active) "
+                   "VALUES (?, 99, 'Written by the worker', '2025-01-01T00:00:00+00:00', 0, 1)", (student_id,))
+    worker.commit()
+    worker.close()
+    assert cache.stats()['table_versions'] == versions
+
+    after = client.get('/api/analysis/dashboard-summary', headers=admin_headers).get_json()
+    assert after['pending_alerts_count'] == before['pending_alerts_count'] + 1
+    assert cache.stats()['stale'] == 1
+
+def test_request_writes_are_bumped_again_when_the_request_ends(client, admin_headers, cache):
+    version = lambda: cache.stats()['table_versions'].get('modules', 0)
+    before = version()
+    response = client.post('/api/admin/modules', headers=admin_headers, data=json.dumps({
+        'module_code': 'CACHE202', 'module_title': 'Cache Requests', 'credit': 15, 'academic_year': '2025/2026'
+    }), content_type='application/json')
+    assert response.status_code == 201
+    assert version() == before + 2 # Once by the insert and once after the commit.
+
+def test_lru_and_ttl_eviction():
+    cache = AnalysisCache(max_entries=2, ttl_seconds=0.05)
+    calls = []
+    compute = lambda key: cache.get_or_compute(key, ('t',), lambda: calls.append(key) or key)
+    compute('a'); compute('b'); compute('a'); compute('c') # 'b' is the least recently used.
+    compute('a'); compute('b')
+    assert calls == ['a', 'b', 'c', 'b']
+    assert cache.stats()['evictions'] == 2
+
+    time.sleep(0.06)
+    compute('b')
+    assert calls[-1] == 'b' and cache.stats()['expired'] == 1
+
+def test_failed_computations_are_not_cached():
+    cache = AnalysisCache()
+    with pytest.raises(ValueError):
+        cache.get_or_compute('k', (), lambda: (_ for _ in ()).throw(ValueError('bad')))
+    assert cache.get_or_compute('k', (), lambda: 42) == 42
+
+def test_concurrent_misses_are_coalesced():
+    cache = AnalysisCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'value'
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('k', ('t',), slow))) for _ in range(4)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ['value'] * 4 and len(calls) == 1
+
+def test_disabled_cache_always_queries(app, cache):
+    app.config['ANALYSIS_CACHE_ENABLED'] = False
+    try:
+        analysis_repository.get_overall_attendance_rate()
+        analysis_repository.get_overall_attendance_rate()
+    finally:
+        app.config['ANALYSIS_CACHE_ENABLED'] = True
+    assert cache.stats()['misses'] == 0
+
+def test_cache_stats_endpoint(client, admin_headers, cache):
+    client.get('/api/analysis/dashboard-summary', headers=admin_headers)
+    client.get('/api/analysis/dashboard-summary', headers=admin_headers)
+    stats = client.get('/api/admin/debug/analysis-cache', headers=admin_headers).get_json()
+    assert stats['hits'] == 1 and stats['misses'] == 1 and stats['hit_ratio'] == 0.5
+    assert stats['entries'] == 1
+
+    assert client.delete('/api/admin/debug/analysis-cache', headers=admin_headers).status_code == 200
+    assert get_analysis_cache().stats()['entries'] == 0
+
+    officer = login(client, 'wellbeing_officer', 'password')
+    assert client.get('/api/admin/debug/analysis-cache', headers=officer).status_code == 403
@@ -0,0 +1,139 @@
+"""
+Tests for the optional NumPy analysis engine in `app/analysis_engine.py`.
+
+Every engine method is compared with the SQL implementation on the seeded test
+database; the tests are skipped when NumPy is not installed.
+"""
+
+import logging
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from app import analysis_engine
+from app.analysis_cache import bypass_analysis_cache, get_analysis_cache
+from app.analysis_engine import NumpyAnalysisEngine, get_analysis_engine
+from app.db_connection import get_db
+from app.repositories.analysis_repository import analysis_repository
+from app.repositories.grade_repository import grade_repository
+from app.repositories.module_repository import module_repository
+from app.repositories.survey_response_repository import survey_response_repository
+
+def assert_matches(actual, expected):
+    """Compares nested results, allowing floats to differ in the last bits."""
+    if isinstance(expected, float):
+        assert actual == pytest.approx(expected, rel=1e-9, abs=1e-9)
+    elif isinstance(expected, dict):
+        assert set(actual) == set(expected)
+        for key in expected:
+            assert_matches(actual[key], expected[key])
+    elif isinstance(expected, list):
+        assert len(actual) == len(expected)
+        for item, expected_item in zip(actual, expected):
+            assert_matches(item, expected_item)
+    else:
+        assert actual == expected
+
+@pytest.fixture
+def engine(app):
+    """A fresh engine; the result cache is disabled so that the SQL results are computed each time."""
+    app.config['ANALYSIS_CACHE_ENABLED'] = False
+    yield NumpyAnalysisEngine(get_analysis_cache())
+    app.config['ANALYSIS_CACHE_ENABLED'] = True
+
+@pytest.fixture
+def student_ids(app):
+    return [row[0] for row in get_db().execute("SELECT id FROM students ORDER BY id")]
+
+def test_student_trends_match_sql(engine, student_ids):
+    for student_id in student_ids + [-1]:
+        for method in ('get_stress_trend_for_student', 'get_attendance_trend_for_student', 'get_average_attendance_for_student'):
+            assert_matches(getattr(engine, method)(student_id), getattr(analysis_repository, method)(student_id))
+
+@pytest.mark.parametrize('method', ['get_grade_distribution', 'get_stress_grade_correlation',
+                                    'get_overall_attendance_rate', 'get_submission_status_distribution'])
+def test_cohort_results_match_sql(engine, method):
+    assert_matches(getattr(engine, method)(), getattr(analysis_repository, method)())
+
+@pytest.mark.parametrize('options', [{'points': 'sample', 'limit': 7}, {'points': 'page', 'limit': 5}])
+def test_correlation_points_match_sql(engine, options):
+    actual = engine.get_stress_grade_correlation(**options)
+    assert_matches(actual, analysis_repository.get_stress_grade_correlation(**options))
+    if options['points'] == 'page':
+        after = actual['points']['next_cursor']
+        assert_matches(engine.get_stress_grade_correlation(after=after, **options),
+                       analysis_repository.get_stress_grade_correlation(after=after, **options))
+
+def test_stress_by_module_matches_sql(engine):
+    actual, expected = engine.get_stress_level_by_module(), analysis_repository.get_stress_level_by_module()
+    # Modules with the same average may be listed in either order.
+    assert_matches(dict(zip(actual['labels'], actual['data'])), dict(zip(expected['labels'], expected['data'])))
+    assert actual['data'] == sorted(actual['data'], reverse=True)
+
+@pytest.mark.parametrize('sort', sorted(analysis_repository.HIGH_RISK_SORTS))
+def test_high_risk_students_match_sql_for_every_sort(engine, sort):
+    assert_matches(engine.get_high_risk_students(sort=sort), analysis_repository.get_high_risk_students(sort=sort))
+
+@pytest.mark.parametrize('options', [
+    {'attendance_threshold': 90, 'grade_threshold': 60, 'stress_threshold': 3},
+    {'attendance_threshold': 0, 'grade_threshold': 0, 'stress_threshold': 5},
+    {'attendance_threshold': 100, 'grade_threshold': 100, 'stress_threshold': 1, 'sort': 'severity', 'limit': 3},
+])
+def test_high_risk_thresholds_match_sql(engine, options):
+    assert_matches(engine.get_high_risk_students(**options), analysis_repository.get_high_risk_students(**options))
+
+def test_high_risk_options_are_validated(engine):
+    with pytest.raises(ValueError):
+        engine.get_high_risk_students(stress_threshold=6)
+    with pytest.raises(ValueError):
+        engine.get_high_risk_students(sort='unknown')
+
+def test_only_written_tables_are_reloaded(engine):
+    engine.get_grade_distribution()
+    loads = engine.stats()['table_loads']
+    assert loads == {'attendance_records': 1, 'grades': 1, 'students': 1, 'survey_responses': 1}
+
+    student_id = get_db().execute("SELECT id FROM students WHERE is_active = 1 ORDER BY id LIMIT 1").fetchone()[0]
+    module = module_repository.create_module('ENGINE101', 'Engine Testing', 15, '2025/2026')
+    grade_repository.create_grade(student_id, module.id, 'Engine Exam', 12.5)
+    assert_matches(engine.get_grade_distribution(), analysis_repository.get_grade_distribution())
+    assert engine.stats()['table_loads'] == dict(loads, grades=2)
+
+    survey_response_repository.create_survey_response(student_id, module.id, 1, 5, 4.0, None)
+    assert_matches(engine.get_stress_level_by_module(), analysis_repository.get_stress_level_by_module())
+    assert engine.stats()['table_loads']['survey_responses'] == 2
+    get_db().commit()
+
+def test_snapshot_is_reloaded_after_max_age(app):
+    engine = NumpyAnalysisEngine(get_analysis_cache(), max_age_seconds=0)
+    engine.get_overall_attendance_rate()
+    engine.get_overall_attendance_rate()
+    assert engine.stats()['table_loads'] == {'attendance_records': 2}
+
+def test_repository_dispatches_to_engine_when_selected(app):
+    app.config['ANALYSIS_ENGINE'] = 'numpy'
+    app.extensions.pop('analysis_engine', None)
+    try:
+        with bypass_analysis_cache(): # Bypassed calls read the connection's snapshot with SQL.
+            expected = analysis_repository.get_submission_status_distribution()
+        assert get_analysis_engine().stats()['table_loads'] == {}
+        assert analysis_repository.get_submission_status_distribution() == expected
+        assert get_analysis_engine().stats()['table_loads'] == {'submission_records': 1}
+    finally:
+        app.config['ANALYSIS_ENGINE'] = 'sql'
+        app.extensions.pop('analysis_engine', None)
+    assert get_analysis_engine() is None
+
+def test_missing_numpy_falls_back_to_sql(app, monkeypatch, caplog):
+    monkeypatch.setattr(analysis_engine, 'np', None)
+    app.config['ANALYSIS_ENGINE'] = 'numpy'
+    app.extensions.pop('analysis_engine', None)
+    try:
+        with caplog.at_level(logging.WARNING):
+            assert get_analysis_engine() is None
+            assert get_analysis_engine() is None
+        assert len([r for r in caplog.records if 'NumPy is not installed' in r.getMessage()]) == 1
+        assert analysis_repository.get_overall_attendance_rate() >= 0
+    finally:
+        app.config['ANALYSIS_ENGINE'] = 'sql'
+        app.extensions.pop('analysis_engine', None)
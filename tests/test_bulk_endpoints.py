@@ -0,0 +1,162 @@
+"""
+Tests for the bulk create endpoints (`POST /api/admin/<entity>/bulk`).
+
+Covers payload validation in `app/utils/bulk.py`, the single-statement insert and
+ID assignment in `BaseRepository._execute_many`, per-row results, and the
+set-based stress-event and alert checks for survey batches.
+"""
+
+import json
+import pytest
+from app.db_connection import get_db
+from app.repositories.grade_repository import grade_repository
+from app.utils.bulk import BulkField, validate_rows
+
+@pytest.fixture(scope='module')
+def admin_headers(client):
+    credentials = {'username': 'admin', 'password': 'admin', 'context': 'staff'}
+    response = client.post('/api/auth/login', data=json.dumps(credentials), content_type='application/json')
+    return {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+@pytest.fixture(scope='module')
+def ids(app):
+    """An active student and module to reference, plus a week no seeded data uses."""
+    db = get_db()
+    student_id = db.execute("SELECT id FROM students WHERE is_active = 1 ORDER BY id LIMIT 1").fetchone()[0]
+    module_id = db.execute("SELECT id FROM modules WHERE is_active = 1 ORDER BY id LIMIT 1").fetchone()[0]
+    week = db.execute("SELECT MAX(week_number) FROM survey_responses").fetchone()[0] + 10
+    return student_id, module_id, week
+
+def post_bulk(client, headers, endpoint, rows):
+    return client.post(f'/api/admin/{endpoint}/bulk', data=json.dumps(rows), content_type='application/json', headers=headers)
+
+def test_validate_rows_reports_every_problem_per_row():
+    schema = (BulkField('student_id', int), BulkField('grade', float, minimum=0, maximum=100), BulkField('note', str, required=False))
+    valid, errors = validate_rows([
+        {'student_id': 1, 'grade': 55},
+        {'student_id': True, 'grade': 101, 'extra': 1},
+        'not an object',
+        {'grade': 10.5, 'note': None},
+    ], schema)
+    assert valid == [(0, {'student_id': 1, 'grade': 55, 'note': None})]
+    assert len(errors[1]) == 3 # Boolean ID, grade out of range, unknown key.
+    assert errors[2] == ['Row must be an object.']
+    assert errors[3] == ["'student_id' is required."]
+
+def test_bulk_grades_are_created_in_one_batch(client, admin_headers, ids):
+    student_id, module_id, _ = ids
+    rows = [{'student_id': student_id, 'module_id': module_id, 'assessment_name': f'Bulk Quiz {i}', 'grade': 50 + i} for i in range(25)]
+    response = post_bulk(client, admin_headers, 'grades', rows)
+    assert response.status_code == 201
+    data = json.loads(response.data)
+    assert data['created'] == 25 and data['failed'] == 0
+    assert [r['index'] for r in data['results']] == list(range(25))
+
+    # The reported IDs belong to the rows at the same index.
+    for result, row in zip(data['results'], rows):
+        stored = get_db().execute("SELECT assessment_name, grade FROM grades WHERE id = ?", (result['id'],)).fetchone()
+        assert (stored['assessment_name'], stored['grade']) == (row['assessment_name'], row['grade'])
+
+def test_bulk_attendance_reports_invalid_rows_and_creates_the_rest(client, admin_headers, ids):
+    student_id, module_id, week = ids
+    rows = [
+        {'student_id': student_id, 'module_id': module_id, 'week_number': week, 'attended_sessions': 1, 'total_sessions': 2},
+        {'student_id': 999999, 'module_id': module_id, 'week_number': week, 'attended_sessions': 1, 'total_sessions': 2},
+        {'student_id': student_id, 'module_id': module_id, 'week_number': 0, 'attended_sessions': 1, 'total_sessions': 2},
+    ]
+    response = post_bulk(client, admin_headers, 'attendance-records', rows)
+    assert response.status_code == 207
+    data = json.loads(response.data)
+    assert data['created'] == 1 and data['failed'] == 2
+    assert [r['status'] for r in data['results']] == ['created', 'error', 'error']
+    assert 'does not exist' in data['results'][1]['errors'][0]
+
+    rate = get_db().execute("SELECT attendance_rate FROM attendance_records WHERE id = ?", (data['results'][0]['id'],)).fetchone()[0]
+    assert rate == 0.5
+
+def test_bulk_attendance_reports_updated_weeks(client, admin_headers, ids):
+    student_id, module_id, week = ids
+    rows = [
+        {'student_id': student_id, 'module_id': module_id, 'week_number': week, 'attended_sessions': 2, 'total_sessions': 2},
+        {'student_id': student_id, 'module_id': module_id, 'week_number': week + 1, 'attended_sessions': 0, 'total_sessions': 2},
+    ]
+    response = post_bulk(client, admin_headers, 'attendance-records', rows)
+    assert response.status_code == 201
+    data = json.loads(response.data)
+    assert (data['created'], data['updated'], data['failed']) == (1, 1, 0)
+    assert [r['status'] for r in data['results']] == ['updated', 'created']
+    rate = get_db().execute("SELECT attendance_rate FROM attendance_records WHERE id = ?", (data['results'][0]['id'],)).fetchone()[0]
+    assert rate == 1.0
+
+def test_bulk_attendance_rejects_weeks_repeated_in_the_batch(client, admin_headers, ids):
+    student_id, module_id, week = ids
+    rows = [{'student_id': student_id, 'module_id': module_id, 'week_number': week + 2, 'attended_sessions': attended, 'total_sessions': 2}
+            for attended in (1, 2)]
+    response = post_bulk(client, admin_headers, 'attendance-records', rows)
+    assert response.status_code == 207
+    data = json.loads(response.data)
+    assert (data['created'], data['updated'], data['failed']) == (1, 0, 1)
+    assert data['results'][1] == {'index': 1, 'status': 'error', 'errors': ['Repeats the student_id, module_id, week_number of row 0.']}
+
+def test_reference_lookups_are_instrumented(mocker, ids):
+    student_id, module_id, _ = ids
+    recorded = mocker.patch('app.repositories.base_repository.record_query')
+    valid, errors = grade_repository.validate_bulk_rows([
+        {'student_id': student_id, 'module_id': module_id, 'assessment_name': 'Exam', 'grade': 50},
+        {'student_id': student_id, 'module_id': -1, 'assessment_name': 'Exam', 'grade': 50},
+    ])
+    assert [index for index, _ in valid] == [0] and errors == {1: ["'module_id' -1 does not exist."]}
+    # One lookup per referenced table, each reported to the SQL instrumentation.
+    assert [call.args[2].split()[3] for call in recorded.call_args_list] == ['students', 'modules']
+
+def test_bulk_request_with_no_valid_rows_is_rejected(client, admin_headers):
+    response = post_bulk(client, admin_headers, 'grades', [{'grade': 10}])
+    assert response.status_code == 400
+    assert json.loads(response.data)['created'] == 0
+
+@pytest.mark.parametrize('payload', [{}, [], 'rows'])
+def test_bulk_payload_must_be_a_non_empty_array(client, admin_headers, payload):
+    assert post_bulk(client, admin_headers, 'grades', payload).status_code == 400
+
+def test_bulk_row_limit(app, client, admin_headers, ids):
+    student_id, module_id, _ = ids
+    app.config['BULK_MAX_ROWS'] = 2
+    try:
+        rows = [{'student_id': student_id, 'module_id': module_id, 'assessment_name': 'Limit', 'grade': 1}] * 3
+        response = post_bulk(client, admin_headers, 'grades', rows)
+    finally:
+        app.config['BULK_MAX_ROWS'] = 50000
+    assert response.status_code == 400
+
+def test_bulk_survey_responses_raise_events_and_alerts_as_a_set(client, admin_headers, ids):
+    """High stress in consecutive weeks raises one alert per student and week, whatever the payload order."""
+    student_id, module_id, week = ids
+    rows = [
+        {'student_id': student_id, 'module_id': module_id, 'week_number': week + 1, 'stress_level': 5},
+        {'student_id': student_id, 'module_id': module_id, 'week_number': week, 'stress_level': 4, 'hours_slept': 6.5},
+        {'student_id': student_id, 'module_id': module_id, 'week_number': week + 1, 'stress_level': 4},
+        {'student_id': student_id, 'module_id': None, 'week_number': week + 2, 'stress_level': 2, 'mood_comment': 'ok'},
+    ]
+    response = post_bulk(client, admin_headers, 'survey-responses', rows)
+    assert response.status_code == 201
+    data = json.loads(response.data)
+    assert data['stress_events_created'] == 3
+    assert data['alerts_created'] == 1
+
+    db = get_db()
+    alert = db.execute("SELECT week_number, reason FROM alerts WHERE student_id = ? AND week_number = ?", (student_id, week + 1)).fetchall()
+    assert len(alert) == 1
+    assert alert[0]['reason'] == (f"Stress level >= 4 for two consecutive weeks ({week} and {week + 1}) "
+                                  f"for student {student_id} in module {module_id}.")
+    event = db.execute("SELECT description FROM stress_events WHERE survey_response_id = ?", (data['results'][0]['id'],)).fetchone()
+    assert event['description'] == f"High stress reported (level 5) in week {week + 1}."
+
+    # A second batch for the same week does not raise a duplicate alert.
+    response = post_bulk(client, admin_headers, 'survey-responses', rows[:1])
+    assert json.loads(response.data)['alerts_created'] == 0
+
+def test_bulk_endpoints_require_role(client):
+    credentials = {'username': 'course_director', 'password': 'password', 'context': 'staff'}
+    response = client.post('/api/auth/login', data=json.dumps(credentials), content_type='application/json')
+    headers = {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+    assert post_bulk(client, headers, 'survey-responses', [{'student_id': 1, 'week_number': 1, 'stress_level': 1}]).status_code == 403
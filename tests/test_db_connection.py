@@ -0,0 +1,150 @@
+"""
+Tests for the pooled database connection management in `app/db_connection.py`.
+
+These tests exercise the `ConnectionPool` directly against a temporary
+SQLite file, plus its integration with `get_db()`/`close_db()` and the
+admin pool statistics endpoint.
+"""
+
+import json
+import sqlite3
+import threading
+import pytest
+from flask import Flask
+from app.db_connection import ConnectionPool, dispose_pool, get_db, get_pool, close_db, init_app
+
+@pytest.fixture
+def pool(tmp_path, app):
+    """Creates a small pool bound to a throwaway database file."""
+    pool = ConnectionPool(str(tmp_path / 'pool.sqlite'), size=2, timeout=0.2,
+                          pragmas={'journal_mode': 'WAL'}, ping_interval=0)
+    yield pool
+    pool.dispose()
+
+def test_connections_are_reused_and_configured(pool):
+    """
+    A checked-in connection is handed out again instead of opening a new one,
+    and every connection is configured once with the pool's settings.
+    """
+    conn = pool.checkout()
+    assert conn.row_factory is sqlite3.Row
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    pool.checkin(conn)
+
+    again = pool.checkout()
+    assert again is conn
+    pool.checkin(again)
+
+    stats = pool.stats()
+    assert stats['created'] == 1
+    assert stats['checkouts'] == 2
+    assert stats['in_use'] == 0
+    assert stats['idle'] == 1
+
+def test_pool_is_bounded_and_times_out(pool):
+    """Checking out more connections than the pool size fails after the timeout."""
+    first, second = pool.checkout(), pool.checkout()
+    with pytest.raises(ConnectionError, match="Timed out"):
+        pool.checkout()
+    assert pool.stats()['timeouts'] == 1
+    pool.checkin(first)
+    pool.checkin(second)
+
+def test_waiting_thread_receives_returned_connection(pool):
+    """A caller blocked on a full pool is woken up when a connection is checked in."""
+    pool.timeout = 2
+    held = [pool.checkout(), pool.checkout()]
+    received = []
+
+    def worker():
+        conn = pool.checkout()
+        received.append(conn)
+        pool.checkin(conn)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    pool.checkin(held.pop())
+    thread.join(timeout=2)
+    pool.checkin(held.pop())
+
+    assert len(received) == 1
+    assert pool.stats()['waits'] == 1
+    assert pool.stats()['created'] == 2
+
+def test_checkin_rolls_back_open_transaction(pool):
+    """Uncommitted work is discarded when a connection goes back to the pool."""
+    conn = pool.checkout()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    assert conn.in_transaction
+    pool.checkin(conn)
+
+    conn = pool.checkout()
+    assert not conn.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    pool.checkin(conn)
+
+def test_unhealthy_connection_is_replaced(pool):
+    """A connection that fails its health check is discarded and replaced on checkout."""
+    conn = pool.checkout()
+    pool.checkin(conn)
+    conn.close() # Simulate a connection that broke while idle.
+
+    replacement = pool.checkout()
+    assert replacement is not conn
+    assert replacement.execute("SELECT 1").fetchone()[0] == 1
+    pool.checkin(replacement)
+    assert pool.stats()['health_check_failures'] == 1
+
+def test_get_db_checks_out_once_per_context(app):
+    """`get_db()` reuses one pooled connection per context and `close_db()` returns it."""
+    with app.app_context():
+        in_use_before = get_pool().stats()['in_use']
+        with app.app_context():
+            db = get_db()
+            assert get_db() is db
+            assert get_pool().stats()['in_use'] == in_use_before + 1
+        assert get_pool().stats()['in_use'] == in_use_before
+
+def test_foreign_connection_is_closed_on_checkin(pool, tmp_path):
+    """A connection the pool does not own is closed instead of leaking."""
+    foreign = sqlite3.connect(str(tmp_path / 'foreign.sqlite'))
+    pool.checkin(foreign)
+    with pytest.raises(sqlite3.ProgrammingError):
+        foreign.execute("SELECT 1")
+    assert pool.stats()['in_use'] == 0
+
+def test_close_db_after_dispose_closes_connection(app):
+    """After `dispose_pool()` the request's connection is closed and no new pool is created."""
+    with app.app_context():
+        db = get_db()
+        dispose_pool()
+        close_db()
+        assert 'db_pool' not in app.extensions
+        with pytest.raises(sqlite3.ProgrammingError):
+            db.execute("SELECT 1")
+
+def test_old_sqlite_library_is_rejected_at_startup(monkeypatch):
+    """An SQLite library without RETURNING fails when the app is created, not on its first write."""
+    monkeypatch.setattr(sqlite3, 'sqlite_version_info', (3, 31, 1))
+    with pytest.raises(RuntimeError, match='3.35.0'):
+        init_app(Flask(__name__))
+
+def test_pool_stats_endpoint_requires_admin(client):
+    """The pool statistics endpoint is available to admins only."""
+    credentials = {'username': 'admin', 'password': 'admin', 'context': 'staff'}
+    response = client.post('/api/auth/login', data=json.dumps(credentials), content_type='application/json')
+    token = json.loads(response.data)['access_token']
+
+    response = client.get('/api/admin/debug/pool', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['pool']['size'] >= 1
+    assert 'checked' in data['health_check']
+
+    credentials = {'username': 'course_director', 'password': 'password', 'context': 'staff'}
+    response = client.post('/api/auth/login', data=json.dumps(credentials), content_type='application/json')
+    token = json.loads(response.data)['access_token']
+    response = client.get('/api/admin/debug/pool', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 403
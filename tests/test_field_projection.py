@@ -0,0 +1,89 @@
+"""
+Tests for sparse field selection (`?fields=`).
+
+Covers the whitelist validation in `BaseRepository.select_fields`, the projected
+listing queries behind `iter_list`/`get_page`, and the `fields` parameter of the
+admin list endpoints and the analysis student list.
+"""
+
+import json
+import pytest
+from app.repositories.grade_repository import grade_repository
+from app.repositories.student_repository import student_repository
+from app.repositories.submission_record_repository import submission_record_repository
+from app.repositories.user_repository import user_repository
+
+@pytest.fixture(scope='module')
+def admin_headers(client):
+    credentials = {'username': 'admin', 'password': 'admin', 'context': 'staff'}
+    response = client.post('/api/auth/login', data=json.dumps(credentials), content_type='application/json')
+    return {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+def test_select_fields_always_includes_the_page_key():
+    """The key column is prepended (once) so rows stay identifiable and pageable."""
+    assert student_repository.select_fields('full_name, student_number') == ['id', 'full_name', 'student_number']
+    assert student_repository.select_fields(['full_name', 'id']) == ['id', 'full_name']
+
+@pytest.mark.parametrize('fields', ['', ' , ', 'full_name,nope', 'full_name;DROP TABLE students'])
+def test_select_fields_rejects_unknown_or_empty_fields(fields):
+    with pytest.raises(ValueError):
+        student_repository.select_fields(fields)
+
+def test_password_hash_is_not_selectable():
+    """Fields outside the whitelist can never be requested, even if the column exists."""
+    with pytest.raises(ValueError):
+        user_repository.select_fields('username,password_hash')
+
+def test_projected_rows_contain_only_the_requested_fields(app):
+    """Only the requested columns are read, and the values match the full listing."""
+    fields = grade_repository.select_fields('student_name,grade')
+    projected = list(grade_repository.iter_list(fields=fields))
+    full = {g['id']: g for g in grade_repository.get_all_grades()}
+    assert len(projected) == len(full)
+    for row in projected:
+        assert set(row) == {'id', 'student_name', 'grade'}
+        assert row['grade'] == full[row['id']]['grade']
+        assert row['student_name'] == full[row['id']]['student_name']
+
+def test_projected_boolean_fields_are_converted(app):
+    fields = submission_record_repository.select_fields('is_submitted,is_late')
+    rows, _ = submission_record_repository.get_page(10, fields=fields)
+    assert rows
+    assert all(isinstance(row['is_submitted'], bool) and isinstance(row['is_late'], bool) for row in rows)
+
+def test_list_endpoint_returns_requested_fields(client, admin_headers):
+    response = client.get('/api/admin/students?fields=full_name,student_number', headers=admin_headers)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data
+    assert all(set(s) == {'id', 'full_name', 'student_number'} for s in data)
+
+def test_list_endpoint_combines_fields_with_pagination(client, admin_headers):
+    response = client.get('/api/admin/grades?fields=grade&limit=5', headers=admin_headers)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert len(data['items']) == 5
+    assert all(set(g) == {'id', 'grade'} for g in data['items'])
+
+    next_page = client.get(f"/api/admin/grades?fields=grade&limit=5&after={data['next_cursor']}", headers=admin_headers)
+    assert json.loads(next_page.data)['items'][0]['id'] > data['items'][-1]['id']
+
+def test_list_endpoint_combines_fields_with_streaming(client, admin_headers):
+    response = client.get('/api/admin/modules?fields=module_code&stream=1', headers=admin_headers)
+    assert response.status_code == 200
+    data = json.loads(response.get_data(as_text=True))
+    assert data
+    assert all(set(m) == {'id', 'module_code'} for m in data)
+
+def test_list_endpoint_rejects_unknown_fields(client, admin_headers):
+    response = client.get('/api/admin/users?fields=username,password_hash', headers=admin_headers)
+    assert response.status_code == 400
+    assert 'password_hash' in json.loads(response.data)['message']
+
+def test_analysis_students_supports_fields(client, admin_headers):
+    response = client.get('/api/analysis/students?fields=full_name', headers=admin_headers)
+    assert response.status_code == 200
+    assert all(set(s) == {'id', 'full_name'} for s in json.loads(response.data))
+
+    response = client.get('/api/analysis/students?fields=email,secret', headers=admin_headers)
+    assert response.status_code == 400
@@ -0,0 +1,86 @@
+"""
+Tests for keyset (cursor) pagination.
+
+Covers the cursor helpers in `app/utils/pagination.py`, `BaseRepository.get_page`
+and the `?limit=&after=` support of the admin list endpoints.
+"""
+
+import json
+import pytest
+from app.utils.pagination import encode_cursor, decode_cursor, parse_page_args
+from app.repositories.alert_repository import alert_repository
+from app.repositories.grade_repository import grade_repository
+from app.repositories.student_repository import student_repository
+
+@pytest.fixture(scope='module')
+def admin_headers(client):
+    credentials = {'username': 'admin', 'password': 'admin', 'context': 'staff'}
+    response = client.post('/api/auth/login', data=json.dumps(credentials), content_type='application/json')
+    return {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+def test_cursor_round_trip():
+    """Cursors are opaque URL-safe strings that decode back to the key values."""
+    cursor = encode_cursor([42])
+    assert '=' not in cursor and '/' not in cursor
+    assert decode_cursor(cursor, 1) == [42]
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor!', encode_cursor([1, 2]), 'eyJpZCI6MX0'])  # The last is base64 of {"id":1}.
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 1)
+
+@pytest.mark.parametrize('limit', ['0', '-1', 'ten', '100000'])
+def test_invalid_limits_are_rejected(limit):
+    with pytest.raises(ValueError):
+        parse_page_args({'limit': limit}, 50, 500)
+
+def test_pages_cover_every_record_once(app):
+    """Walking all pages returns exactly the rows of `get_all_*`, in key order."""
+    seen, cursor = [], None
+    while True:
+        page, cursor = grade_repository.get_page(40, cursor)
+        assert len(page) <= 40
+        seen.extend(row['id'] for row in page)
+        if cursor is None:
+            break
+    assert seen == sorted(row['id'] for row in grade_repository.get_all_grades())
+    assert 'student_name' in page[0] # Pages carry the same joined columns as get_all_grades().
+
+def test_descending_pages_and_model_pages(app):
+    """Alerts page newest first; repositories without joins page model instances."""
+    first, cursor = alert_repository.get_page(5)
+    second, _ = alert_repository.get_page(5, cursor)
+    ids = [row['id'] for row in first + second]
+    assert ids == sorted(ids, reverse=True)
+
+    students, cursor = student_repository.get_page(3)
+    assert [s.id for s in students] == [1, 2, 3]
+    assert decode_cursor(cursor, 1) == [3]
+
+def test_list_endpoint_paginates(client, admin_headers):
+    """`?limit=` switches a list endpoint to `{items, next_cursor}` pages."""
+    response = client.get('/api/admin/grades?limit=25', headers=admin_headers)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert len(data['items']) == 25
+    assert data['next_cursor']
+
+    response = client.get(f"/api/admin/grades?limit=25&after={data['next_cursor']}", headers=admin_headers)
+    next_page = json.loads(response.data)
+    assert next_page['items'][0]['id'] > data['items'][-1]['id']
+
+    response = client.get('/api/admin/students?limit=500', headers=admin_headers)
+    data = json.loads(response.data)
+    assert data['next_cursor'] is None # Everything fit on one page.
+    assert len(data['items']) == len(student_repository.get_all_students())
+
+def test_list_endpoint_without_pagination_is_unchanged(client, admin_headers):
+    """Without `limit`/`after` the endpoint still returns the complete JSON array."""
+    response = client.get('/api/admin/modules', headers=admin_headers)
+    assert response.status_code == 200
+    assert isinstance(json.loads(response.data), list)
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=abc', 'after=garbage'])
+def test_list_endpoint_rejects_bad_parameters(client, admin_headers, query):
+    response = client.get(f'/api/admin/enrolments?{query}', headers=admin_headers)
+    assert response.status_code == 400
@@ -0,0 +1,107 @@
+"""
+Tests for the SQL instrumentation in `app/query_instrumentation.py`.
+
+Covers per-statement recording from `BaseRepository`, the `Server-Timing`
+response header, the per-endpoint aggregates and slow-query log, the
+admin-only `/api/admin/debug/queries` endpoint and `record_statements()`.
+"""
+
+import json
+import pytest
+from flask import g
+from app.db_connection import get_db
+from app.query_instrumentation import get_query_log, record_statements
+from app.repositories.base_repository import BaseRepository
+
+def login(client, username, password):
+    """Logs in a staff user and returns the authorization header."""
+    credentials = {'username': username, 'password': password, 'context': 'staff'}
+    response = client.post('/api/auth/login', data=json.dumps(credentials), content_type='application/json')
+    return {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+@pytest.fixture
+def admin_headers(client):
+    return login(client, 'admin', 'admin')
+
+def test_repository_statements_are_recorded_per_request(app):
+    """Each repository statement is recorded with its kind, row count and duration."""
+    with app.test_request_context('/'):
+        app.preprocess_request()
+        repo = BaseRepository('users', None)
+        repo._execute_query("SELECT id FROM users LIMIT 2")
+        repo._execute_query("SELECT id FROM users WHERE id = -1", fetch_one=True)
+
+        from flask import g
+        stats = g.query_stats
+        assert [s['rows'] for s in stats] == [2, 0]
+        assert all(s['kind'] == 'query' and s['repository'] == 'users' for s in stats)
+        assert all(s['duration_ms'] >= 0 for s in stats)
+        assert stats[0]['sql'] == 'SELECT id FROM users LIMIT 2'
+
+def test_server_timing_header(client, admin_headers):
+    """Responses carry the request's query count and database time in `Server-Timing`."""
+    response = client.get('/api/analysis/dashboard-summary', headers=admin_headers)
+    assert response.status_code == 200
+    header = response.headers['Server-Timing']
+    assert header.startswith('db;dur=')
+    assert 'desc="4 queries"' in header # One COUNT per dashboard metric.
+    assert 'app;dur=' in header
+
+def test_query_stats_endpoint_reports_endpoints_and_slow_queries(app, client, admin_headers):
+    """The debug endpoint aggregates per-endpoint counts and keeps statements over the threshold."""
+    query_log = get_query_log()
+    query_log.reset()
+    previous_threshold = query_log.slow_threshold_ms
+    query_log.slow_threshold_ms = 0 # Treat every statement as slow.
+    app.config['ANALYSIS_CACHE_ENABLED'] = False # Both requests must run their queries.
+    try:
+        client.get('/api/analysis/dashboard-summary', headers=admin_headers)
+        client.get('/api/analysis/dashboard-summary', headers=admin_headers)
+    finally:
+        query_log.slow_threshold_ms = previous_threshold
+        app.config['ANALYSIS_CACHE_ENABLED'] = True
+
+    response = client.get('/api/admin/debug/queries', headers=admin_headers)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    summary = next(e for e in data['endpoints'] if e['endpoint'] == 'analysis.get_dashboard_summary')
+    assert summary['requests'] == 2
+    assert summary['queries'] == 8
+    assert summary['avg_queries'] == 4
+    assert len(data['slow_queries']) == 8
+    assert data['slow_queries'][0]['endpoint'] == 'analysis.get_dashboard_summary'
+    assert 'params' not in data['slow_queries'][0] # Bound values are never logged.
+
+    response = client.delete('/api/admin/debug/queries', headers=admin_headers)
+    assert response.status_code == 200
+    assert get_query_log().snapshot()['slow_queries'] == []
+
+def test_query_stats_endpoint_requires_admin(client):
+    """Only admins can read the query statistics."""
+    headers = login(client, 'course_director', 'password')
+    response = client.get('/api/admin/debug/queries', headers=headers)
+    assert response.status_code == 403
+
+def test_instrumentation_can_be_disabled(app, client, admin_headers):
+    """With `QUERY_INSTRUMENTATION_ENABLED` off, no header is added."""
+    app.config['QUERY_INSTRUMENTATION_ENABLED'] = False
+    try:
+        response = client.get('/api/analysis/dashboard-summary', headers=admin_headers)
+    finally:
+        app.config['QUERY_INSTRUMENTATION_ENABLED'] = True
+    assert response.status_code == 200
+    assert 'Server-Timing' not in response.headers
+
+def test_record_statements_records_statements_and_commits(app):
+    """Statements and commits issued through `get_db()` inside the block are recorded; the connection is restored."""
+    with app.test_request_context('/'):
+        conn = get_db()
+        with record_statements() as recorder:
+            db = get_db()
+            BaseRepository('users', None)._execute_query("SELECT id FROM users LIMIT 1")
+            db.executemany("UPDATE users SET username = username WHERE id = ?", [(-1,), (-2,)])
+            db.commit()
+        assert [sql for sql, _ in recorder.statements] == ["SELECT id FROM users LIMIT 1", "UPDATE users SET username = username WHERE id = ?"]
+        assert recorder.statements[1][1] == (-1,) # The first parameter set of an executemany().
+        assert recorder.commits == 1
+        assert g.db is conn
@@ -0,0 +1,61 @@
+"""
+Query-plan regression tests for the repository layer.
+
+These tests run the repository query catalog from `utils/query_plans.py`
+against the seeded test database and fail if a hot-path statement plans as a
+full table scan instead of an index search.
+"""
+
+import pytest
+from utils.query_plans import (
+    collect_query_plans, explain, find_full_scans, format_report, build_query_catalog
+)
+
+@pytest.fixture(scope='module')
+def plans(app):
+    """Collects the plans of every catalogued repository statement once per module."""
+    return collect_query_plans()
+
+def test_hot_path_queries_use_indexes(plans):
+    """No statement issued by a hot-path repository call scans a whole table."""
+    violations = {f"{entry.case}: {entry.sql}": entry.violations for entry in plans if entry.violations}
+    assert violations == {}
+
+def test_every_catalog_entry_issues_statements(plans):
+    """Each catalog entry produced at least one planned statement, so none is silently skipped."""
+    planned_cases = {entry.case for entry in plans}
+    assert planned_cases == {case.name for case in build_query_catalog()}
+
+def test_alert_check_lookups_are_covered(plans):
+    """The worker's consecutive-stress alert check plans its previous-week lookup with an index."""
+    statements = [entry for entry in plans if entry.case == 'detection_worker.process_batch']
+    plan_text = '\n'.join(line for entry in statements for line in entry.plan)
+    assert 'idx_survey_responses_student_module_week' in plan_text
+    assert 'idx_detection_jobs_available' in plan_text
+    # De-duplication is no longer a lookup but a conflict on the natural-key indexes.
+    sql = '\n'.join(entry.sql for entry in statements)
+    assert 'ON CONFLICT (survey_response_id) DO NOTHING' in sql
+    assert 'ON CONFLICT (student_id, week_number) WHERE is_active = 1 DO NOTHING' in sql
+
+def test_full_scans_are_detected(app):
+    """`find_full_scans` flags table scans but not scans of materialized subqueries or virtual tables."""
+    from app.db_connection import get_db
+    db = get_db()
+    plan = explain(db, "SELECT * FROM alerts WHERE reason = ?", ('x',))
+    assert find_full_scans(plan) == ['SCAN alerts']
+
+    plan = explain(db, """
+        SELECT s.id FROM students s
+        JOIN (SELECT student_id, MAX(week_number) AS w FROM alerts GROUP BY student_id) latest
+          ON latest.student_id = s.id
+    """)
+    assert all('latest' not in line for line in find_full_scans(plan))
+
+    plan = explain(db, "SELECT s.id FROM json_each(?) ids JOIN students s ON s.id = ids.value", ('[1, 2]',))
+    assert find_full_scans(plan) == [] # The virtual table reads the bound parameter.
+
+def test_report_is_stable(plans):
+    """The report contains no run-dependent values, so identical plans render identically."""
+    report = format_report(plans)
+    assert report == format_report(collect_query_plans())
+    assert report.rstrip().endswith('0 hot-path full scan(s).')
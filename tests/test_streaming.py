@@ -0,0 +1,95 @@
+"""
+Tests for streamed list responses.
+
+Covers `BaseRepository.iter_list`/`_iter_query`, the JSON array streaming helper
+in `app/utils/streaming.py` and the `?stream=1` mode of the admin list endpoints.
+"""
+
+import json
+import types
+import pytest
+from flask import g
+from app.utils.streaming import stream_events, stream_json_array
+from app.repositories.grade_repository import grade_repository
+from app.repositories.student_repository import student_repository
+
+@pytest.fixture(scope='module')
+def admin_headers(client):
+    credentials = {'username': 'admin', 'password': 'admin', 'context': 'staff'}
+    response = client.post('/api/auth/login', data=json.dumps(credentials), content_type='application/json')
+    return {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+def test_iter_list_matches_get_all(app):
+    """Streaming yields the same records as the materialized listing, in key order."""
+    records = grade_repository.iter_list(batch_size=7) # Several fetchmany() round trips.
+    assert isinstance(records, types.GeneratorType)
+    streamed = list(records)
+    assert streamed == sorted(grade_repository.get_all_grades(), key=lambda row: row['id'])
+
+    students = list(student_repository.iter_list())
+    assert [s.id for s in students] == [s.id for s in student_repository.get_all_students()]
+
+def test_iter_list_is_lazy_and_instrumented(app):
+    """Rows are only fetched as they are consumed, and the statement is recorded when iteration ends."""
+    with app.test_request_context('/'):
+        app.preprocess_request()
+        records = grade_repository.iter_list(batch_size=5)
+        first = next(records)
+        assert first['id'] == 1
+        assert g.query_stats == [] # Nothing recorded while the cursor is still open.
+        records.close() # Abandon the iteration early, as a disconnected client would.
+        assert g.query_stats[0]['rows'] == 1
+        assert g.query_stats[0]['kind'] == 'query'
+
+def test_stream_json_array_encodes_records(app):
+    """The streamed body is a valid JSON array, including the empty case."""
+    with app.test_request_context('/'):
+        response = stream_json_array(iter([]))
+        assert ''.join(response.response) == '[]'
+
+        response = stream_json_array(({'id': i} for i in range(250)), chunk_size=100)
+        chunks = list(response.response)
+        assert len(chunks) > 1 # Sent incrementally rather than as one body.
+        assert json.loads(''.join(chunks)) == [{'id': i} for i in range(250)]
+
+def test_stream_json_array_truncates_on_error(app):
+    """A failure mid-stream leaves the document unterminated instead of looking complete."""
+    def failing():
+        yield {'id': 1}
+        raise Exception("boom")
+
+    with app.test_request_context('/'):
+        body = ''.join(stream_json_array(failing()).response)
+    with pytest.raises(ValueError):
+        json.loads(body)
+
+def test_list_endpoint_streams(client, admin_headers):
+    """`?stream=1` returns the same JSON array as the buffered response, as a streamed body."""
+    buffered = client.get('/api/admin/survey-responses', headers=admin_headers)
+    streamed = client.get('/api/admin/survey-responses?stream=1', headers=admin_headers)
+    assert streamed.status_code == 200
+    assert streamed.is_streamed
+    assert streamed.mimetype == 'application/json'
+    assert sorted(json.loads(streamed.data), key=lambda r: r['id']) == sorted(json.loads(buffered.data), key=lambda r: r['id'])
+
+    streamed = client.get('/api/admin/users?stream=1', headers=admin_headers)
+    assert all('password_hash' not in user for user in json.loads(streamed.data))
+
+def test_stream_events_sends_events_and_heartbeats(app):
+    """Polled data becomes events carrying the cursor as id; silence produces keep-alive comments."""
+    polls = iter([(['a'], '1', True), ([], '1', False), ([], '1', False)])
+    with app.test_request_context('/'):
+        response = stream_events(lambda cursor: next(polls), '0', 'changes',
+                                 poll_interval=0.01, heartbeat_interval=0, max_seconds=0.015)
+        assert response.mimetype == 'text/event-stream'
+        frames = list(response.response)
+    assert frames[0] == 'retry: 10\n\n'
+    assert frames[1] == 'id: 1\nevent: changes\ndata: ["a"]\n\n'
+    assert frames[2] == ': keep-alive\n\n'
+
+def test_stream_events_ends_on_error(app):
+    def failing(cursor):
+        raise Exception("boom")
+
+    with app.test_request_context('/'):
+        assert list(stream_events(failing, '0', 'changes').response) == ['retry: 2000\n\n']
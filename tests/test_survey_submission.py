@@ -0,0 +1,91 @@
+"""
+Tests for the single-transaction survey submission path.
+
+Covers `submit_survey_response` in `app/admin/services.py`, which stores a
+response with its detection job (or runs the stress checks inline) in one
+transaction, the statement counts reported by `POST /api/admin/survey-responses`
+and the `SURVEY_DETECTION_INLINE` setting.
+"""
+
+import json
+import pytest
+from app.admin.services import submit_survey_response
+from app.db_connection import get_db
+from app.repositories.module_repository import module_repository
+from app.repositories.student_repository import student_repository
+from app.repositories.survey_response_repository import survey_response_repository
+
+@pytest.fixture(scope="module")
+def sample_student():
+    """Fixture to create a student for submission tests."""
+    return student_repository.create_student('S_SUBMIT_TEST', 'Submission Test Student', 'submit.test@example.com', 'MSc Submission Testing', 1)
+
+@pytest.fixture(scope="module")
+def sample_module():
+    """Fixture to create a module for submission tests."""
+    return module_repository.create_module('SUBMIT101', 'Submission Testing', 15, '2025/2026')
+
+@pytest.fixture
+def inline_detection(app):
+    """Runs the stress checks inside the submitting request for one test."""
+    app.config['SURVEY_DETECTION_INLINE'] = True
+    yield
+    app.config['SURVEY_DETECTION_INLINE'] = False
+
+def login(client, username, password):
+    credentials = {'username': username, 'password': password, 'context': 'staff'}
+    response = client.post('/api/auth/login', data=json.dumps(credentials), content_type='application/json')
+    return {'Authorization': f"Bearer {json.loads(response.data)['access_token']}", 'Content-Type': 'application/json'}
+
+def jobs_for(response_id):
+    return get_db().execute("SELECT COUNT(*) FROM detection_jobs WHERE survey_response_id = ?", (response_id,)).fetchone()[0]
+
+def test_submission_enqueues_detection_in_one_commit(sample_student, sample_module):
+    submission = submit_survey_response(sample_student.id, sample_module.id, 1, 5, 6.5, 'Busy week', detect_inline=False)
+    # The response and its detection job; the response is returned by the insert itself.
+    assert (submission.statements, submission.commits) == (2, 1)
+    assert (submission.stress_events, submission.alerts) == (0, 0)
+    assert submission.response.stress_level == 5 and submission.response.mood_comment == 'Busy week'
+    assert survey_response_repository.get_survey_response_by_id(submission.response.id).created_at == submission.response.created_at
+    assert jobs_for(submission.response.id) == 1
+
+def test_inline_submission_creates_the_alert_in_one_commit(sample_student, sample_module):
+    first = submit_survey_response(sample_student.id, sample_module.id, 10, 4, 6.0, None, detect_inline=True)
+    assert (first.statements, first.commits, first.stress_events, first.alerts) == (3, 1, 1, 0)
+    second = submit_survey_response(sample_student.id, sample_module.id, 11, 5, 5.0, None, detect_inline=True)
+    assert (second.statements, second.commits, second.stress_events, second.alerts) == (3, 1, 1, 1)
+    assert jobs_for(second.response.id) == 0
+    alert = get_db().execute("SELECT module_id FROM alerts WHERE student_id = ? AND week_number = 11 AND is_active = 1",
+                             (sample_student.id,)).fetchone()
+    assert alert['module_id'] == sample_module.id
+
+    # A second response in the same week adds its stress event but not a second alert.
+    third = submit_survey_response(sample_student.id, sample_module.id, 11, 4, 5.0, None, detect_inline=True)
+    assert (third.stress_events, third.alerts) == (1, 0)
+
+def test_failed_submission_leaves_nothing_behind(sample_student):
+    count = get_db().execute("SELECT COUNT(*) FROM survey_responses").fetchone()[0]
+    with pytest.raises(Exception):
+        submit_survey_response(sample_student.id, None, 12, None, 6.0, None, detect_inline=False) # stress_level is NOT NULL.
+    assert get_db().execute("SELECT COUNT(*) FROM survey_responses").fetchone()[0] == count
+
+def test_endpoint_reports_statement_counts(client, sample_student, sample_module):
+    headers = login(client, 'wellbeing_officer', 'password')
+    survey = {'student_id': sample_student.id, 'module_id': sample_module.id, 'week_number': 20,
+              'stress_level': 3, 'hours_slept': 7.0, 'mood_comment': 'Fine'}
+    response = client.post('/api/admin/survey-responses', data=json.dumps(survey), headers=headers)
+    assert response.status_code == 201
+    body = response.get_json()
+    assert (body['statements'], body['commits']) == (2, 1)
+    assert 'alerts_created' not in body
+    assert jobs_for(body['id']) == 1
+
+def test_endpoint_runs_detection_inline_when_configured(client, sample_student, sample_module, inline_detection):
+    headers = login(client, 'wellbeing_officer', 'password')
+    for week, expected_alerts in ((30, 0), (31, 1)):
+        survey = {'student_id': sample_student.id, 'module_id': sample_module.id, 'week_number': week,
+                  'stress_level': 5, 'hours_slept': 4.0, 'mood_comment': None}
+        body = client.post('/api/admin/survey-responses', data=json.dumps(survey), headers=headers).get_json()
+        assert (body['statements'], body['commits']) == (3, 1)
+        assert (body['stress_events_created'], body['alerts_created']) == (1, expected_alerts)
+        assert jobs_for(body['id']) == 0
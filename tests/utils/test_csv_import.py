@@ -0,0 +1,136 @@
+"""
+Tests for the CSV importer in utils.csv_import.
+
+Imports small generated files into the seeded test database and checks column
+mapping, code lookups, rejected rows, deferred indexes and triggers and resuming
+from the checkpoint after a failed batch.
+"""
+
+import csv
+import pytest
+from app.db_connection import get_db
+from app.repositories.grade_repository import grade_repository
+from app.repositories.metric_histogram_repository import metric_histogram_repository
+from app.repositories.student_metrics_repository import student_metrics_repository
+from utils.csv_import import import_csv, build_column_map, CsvImportError
+
+@pytest.fixture(scope='module')
+def codes(app):
+    """Student numbers and module codes of the seeded data."""
+    db = get_db()
+    students = [row[0] for row in db.execute("SELECT student_number FROM students WHERE is_active = 1 ORDER BY id LIMIT 5")]
+    modules = [row[0] for row in db.execute("SELECT module_code FROM modules WHERE is_active = 1 ORDER BY id LIMIT 3")]
+    return students, modules
+
+def write_csv(path, header, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+def grade_rows(codes, count, prefix):
+    students, modules = codes
+    return [[students[i % len(students)], modules[i % len(modules)], f'{prefix} {i}', str(40 + i % 60)] for i in range(count)]
+
+def count_grades(prefix):
+    return get_db().execute("SELECT COUNT(*) FROM grades WHERE assessment_name LIKE ?", (f'{prefix} %',)).fetchone()[0]
+
+def test_column_map_matches_headers_and_requires_fields():
+    schema = grade_repository.bulk_schema
+    column_map = build_column_map(['Student Number', 'module-id', 'Assessment', 'Grade', 'Notes'], schema, {'Assessment': 'assessment_name'})
+    assert column_map == {'Student Number': 'student_number', 'module-id': 'module_id', 'Assessment': 'assessment_name', 'Grade': 'grade'}
+    with pytest.raises(CsvImportError):
+        build_column_map(['student_id', 'module_id', 'grade'], schema)
+
+def test_import_resolves_codes_and_reports_rejects(app, codes, tmp_path):
+    rows = grade_rows(codes, 120, 'Import Quiz')
+    rows.append(['NO-SUCH-STUDENT', codes[1][0], 'Import Quiz bad', '50'])
+    rows.append([codes[0][0], codes[1][0], 'Import Quiz bad', 'A+'])
+    path = write_csv(tmp_path / 'grades.csv', ['student_number', 'module_code', 'assessment_name', 'grade'], rows)
+    rejects = tmp_path / 'rejects.csv'
+    progress = []
+
+    result = import_csv(get_db(), 'grades', path, batch_size=50, rejects_path=str(rejects),
+                        progress=lambda *args: progress.append(args))
+    assert (result.rows_read, result.created, result.rejected, result.completed) == (122, 120, 2, True)
+    assert [p[0] for p in progress] == [50, 100, 122]
+    assert count_grades('Import Quiz') == 120
+
+    with open(rejects, newline='', encoding='utf-8') as rejects_file:
+        rejected = list(csv.DictReader(rejects_file))
+    assert [r['line'] for r in rejected] == ['122', '123']
+    assert "Unknown student_number 'NO-SUCH-STUDENT'" in rejected[0]['errors']
+    assert "'grade' must be a number" in rejected[1]['errors']
+
+    # A completed file is not imported twice.
+    again = import_csv(get_db(), 'grades', path)
+    assert not again.completed and again.skipped == 122
+    assert count_grades('Import Quiz') == 120
+
+def test_failed_import_resumes_from_checkpoint_and_restores_indexes(app, codes, tmp_path, monkeypatch):
+    db = get_db()
+    path = write_csv(tmp_path / 'resume.csv', ['student_number', 'module_code', 'assessment_name', 'grade'], grade_rows(codes, 100, 'Resume Quiz'))
+    indexes = lambda: {r[0] for r in db.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'grades' AND sql IS NOT NULL")}
+    triggers = lambda: {r[0] for r in db.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'grades'")}
+    original_indexes, original_triggers = indexes(), triggers()
+    assert original_indexes and original_triggers
+
+    calls = []
+    original = grade_repository.bulk_create_grades
+    def failing_bulk_create(rows):
+        calls.append(len(rows))
+        if len(calls) == 3:
+            raise Exception('disk full')
+        return original(rows)
+    monkeypatch.setattr(grade_repository, 'bulk_create_grades', failing_bulk_create)
+
+    with pytest.raises(Exception, match='disk full'):
+        import_csv(db, 'grades', path, batch_size=30, defer=True)
+    assert count_grades('Resume Quiz') == 60 # Two committed batches; the failed one was rolled back.
+    assert indexes() == triggers() == set() # Still deferred while the import is unfinished.
+    assert student_metrics_repository.find_drift() # The imported grades are not counted yet.
+
+    monkeypatch.setattr(grade_repository, 'bulk_create_grades', original)
+    result = import_csv(db, 'grades', path, batch_size=30, defer=True)
+    assert (result.skipped, result.rows_read, result.created) == (60, 40, 40)
+    assert count_grades('Resume Quiz') == 100
+    assert indexes() == original_indexes
+    assert triggers() == original_triggers
+    assert student_metrics_repository.find_drift() == [] # Rebuilt once the triggers were restored.
+    assert metric_histogram_repository.find_drift() == []
+
+def test_changed_file_requires_restart(app, codes, tmp_path, monkeypatch):
+    path = write_csv(tmp_path / 'changed.csv', ['student_number', 'module_code', 'assessment_name', 'grade'], grade_rows(codes, 10, 'Changed Quiz'))
+    monkeypatch.setattr(grade_repository, 'bulk_create_grades', lambda rows: (_ for _ in ()).throw(Exception('boom')))
+    with pytest.raises(Exception, match='boom'):
+        import_csv(get_db(), 'grades', path, batch_size=5)
+    monkeypatch.undo()
+
+    write_csv(path, ['student_number', 'module_code', 'assessment_name', 'grade'], grade_rows(codes, 20, 'Changed Quiz'))
+    with pytest.raises(CsvImportError):
+        import_csv(get_db(), 'grades', path)
+    result = import_csv(get_db(), 'grades', path, restart=True)
+    assert result.created == 20 and result.skipped == 0
+
+def test_deferred_attendance_import_keeps_natural_key(app, codes, tmp_path):
+    """Unique indexes survive `defer=True`, so a re-imported file updates its rows instead of duplicating them."""
+    db = get_db()
+    students, modules = codes
+    header = ['student_number', 'module_code', 'week_number', 'attended_sessions', 'total_sessions']
+    rows = [[student, modules[0], str(week), '1', '2'] for student in students for week in (41, 42)]
+    import_csv(db, 'attendance-records', write_csv(tmp_path / 'attendance.csv', header, rows), defer=True)
+    assert 'uq_attendance_records_student_module_week' in {
+        r[0] for r in db.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'attendance_records'")
+    }
+
+    rows = [row[:3] + ['2', '2'] for row in rows]
+    import_csv(db, 'attendance-records', write_csv(tmp_path / 'attendance-again.csv', header, rows), defer=True)
+    counts = db.execute("SELECT COUNT(*), TOTAL(attended_sessions) FROM attendance_records WHERE week_number IN (41, 42) AND is_active = 1").fetchone()
+    assert tuple(counts) == (len(rows), 2.0 * len(rows))
+    assert student_metrics_repository.find_drift() == []
+
+def test_unknown_entity_is_rejected(app, tmp_path):
+    path = write_csv(tmp_path / 'x.csv', ['a'], [['1']])
+    with pytest.raises(CsvImportError):
+        import_csv(get_db(), 'users', path)
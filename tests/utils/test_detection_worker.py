@@ -0,0 +1,112 @@
+"""
+Tests for the detection job queue and the worker in `utils/detection_worker.py`.
+
+Covers batch processing, redelivery after an expired lease, retries and parking
+of failing jobs, the queue statistics and the admin-only
+`/api/admin/debug/detection-queue` endpoint.
+"""
+
+import json
+import pytest
+from app.db_connection import get_db
+from app.repositories.detection_job_repository import detection_job_repository
+from app.repositories.module_repository import module_repository
+from app.repositories.student_repository import student_repository
+from app.repositories.survey_response_repository import survey_response_repository
+from utils.detection_worker import process_batch, run_worker
+
+@pytest.fixture(scope="module")
+def sample_student():
+    """Fixture to create a student for detection tests."""
+    return student_repository.create_student('S_DETECT_TEST', 'Detection Test Student', 'detect.test@example.com', 'MSc Detection Testing', 1)
+
+@pytest.fixture(scope="module")
+def sample_module():
+    """Fixture to create a module for detection tests."""
+    return module_repository.create_module('DETECT101', 'Detection Testing', 15, '2025/2026')
+
+@pytest.fixture
+def db(app):
+    """Starts every test with an empty queue."""
+    db = get_db()
+    db.execute("DELETE FROM detection_jobs")
+    db.commit()
+    return db
+
+def submit(student, module, week, stress_level):
+    response = survey_response_repository.create_survey_response(student.id, module.id, week, stress_level, 6.0, None)
+    get_db().commit()
+    return response
+
+def test_worker_creates_events_and_alerts_and_empties_the_queue(db, sample_student, sample_module):
+    first = submit(sample_student, sample_module, 30, 5)
+    submit(sample_student, sample_module, 31, 4)
+    survey_response_repository.update_survey_response(first.id, sample_student.id, sample_module.id, 30, 5, 6.0, 'updated')
+    db.commit()
+    assert detection_job_repository.get_stats()['pending'] == 3
+
+    result = process_batch(db, 'worker-a', batch_size=10)
+    assert (result.jobs, result.stress_events, result.alerts, result.failed) == (3, 2, 1, 0)
+    assert result.lag_seconds >= 0
+    assert db.execute("SELECT COUNT(*) FROM detection_jobs").fetchone()[0] == 0
+    assert db.execute("SELECT COUNT(*) FROM alerts WHERE student_id = ? AND week_number = 31", (sample_student.id,)).fetchone()[0] == 1
+
+    assert process_batch(db, 'worker-a').jobs == 0
+
+def test_expired_leases_are_redelivered_without_duplicates(db, sample_student, sample_module):
+    response = submit(sample_student, sample_module, 40, 5)
+    jobs = detection_job_repository.claim('worker-a', lease_seconds=60)
+    db.commit()
+    assert [job['survey_response_id'] for job in jobs] == [response.id]
+    assert detection_job_repository.claim('worker-b') == [] # Leased by worker-a.
+    assert detection_job_repository.get_stats()['leased'] == 1
+
+    # worker-a stops without finishing; once its lease has expired worker-b takes over.
+    db.execute("UPDATE detection_jobs SET available_at = available_at - 120")
+    db.commit()
+    result = process_batch(db, 'worker-b')
+    assert (result.jobs, result.stress_events) == (1, 1)
+
+    # A late completion by worker-a and a second delivery change nothing.
+    assert detection_job_repository.complete([jobs[0]['id']], 'worker-a') is False
+    assert survey_response_repository.check_for_stress_events_and_alerts([response.id]) == (0, 0)
+    assert db.execute("SELECT COUNT(*) FROM stress_events WHERE survey_response_id = ?", (response.id,)).fetchone()[0] == 1
+
+def test_failing_jobs_are_retried_then_parked(db, sample_student, sample_module, mocker):
+    response = submit(sample_student, sample_module, 50, 5)
+    mocker.patch.object(survey_response_repository, 'check_for_stress_events_and_alerts', side_effect=Exception('boom'))
+
+    result = process_batch(db, 'worker-a', retry_delay=0, max_attempts=2)
+    assert (result.jobs, result.failed) == (1, 1)
+    job = db.execute("SELECT attempts, available_at, claimed_by, last_error FROM detection_jobs").fetchone()
+    assert (job['attempts'], job['claimed_by'], job['last_error']) == (1, None, 'boom')
+    assert job['available_at'] is not None
+
+    process_batch(db, 'worker-a', retry_delay=0, max_attempts=2)
+    stats = detection_job_repository.get_stats()
+    assert (stats['pending'], stats['failed']) == (0, 1)
+    assert process_batch(db, 'worker-a').jobs == 0 # Parked jobs are never claimed again.
+    assert db.execute("SELECT COUNT(*) FROM stress_events WHERE survey_response_id = ?", (response.id,)).fetchone()[0] == 0
+
+def test_run_worker_drains_in_batches(db, sample_student, sample_module):
+    for week in range(60, 65):
+        submit(sample_student, sample_module, week, 3)
+    batches = []
+    assert run_worker(db, 'worker-a', batch_size=2, once=True, on_batch=batches.append) == 5
+    assert [batch.jobs for batch in batches] == [2, 2, 1]
+    assert detection_job_repository.get_stats() == {'pending': 0, 'ready': 0, 'leased': 0, 'failed': 0,
+                                                    'oldest_enqueued_at': None, 'lag_seconds': 0.0}
+
+def test_queue_endpoint_requires_admin(db, client, sample_student, sample_module):
+    submit(sample_student, sample_module, 80, 2)
+
+    def login(username, password):
+        credentials = {'username': username, 'password': password, 'context': 'staff'}
+        response = client.post('/api/auth/login', data=json.dumps(credentials), content_type='application/json')
+        return {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+    response = client.get('/api/admin/debug/detection-queue', headers=login('admin', 'admin'))
+    assert response.status_code == 200
+    stats = response.get_json()
+    assert stats['pending'] == 1 and stats['lag_seconds'] >= 0
+    assert client.get('/api/admin/debug/detection-queue', headers=login('wellbeing_officer', 'password')).status_code == 403
@@ -0,0 +1,105 @@
+"""
+Tests for the synthetic dataset generator in utils.generate_data.
+
+Small datasets are generated into temporary snapshot files; the shared test
+database is not touched.
+"""
+
+import sqlite3
+import pytest
+from utils.generate_data import generate_dataset
+
+@pytest.fixture(scope='module')
+def snapshot(app, tmp_path_factory):
+    """A small generated dataset and its connection."""
+    path = str(tmp_path_factory.mktemp('generate') / 'snapshot.sqlite')
+    result = generate_dataset(path, students=60, modules=8, weeks=6, seed=7, chunk_size=25)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    yield result, conn
+    conn.close()
+
+def test_row_counts_follow_the_parameters(snapshot):
+    result, conn = snapshot
+    rows = result.rows
+    assert rows['students'] == 60
+    assert rows['modules'] == 8
+    assert rows['users'] == 63 # One account per student plus the three staff accounts.
+    assert 60 * 3 <= rows['enrolments'] <= 60 * 5
+    assert rows['attendance_records'] == rows['survey_responses'] == rows['enrolments'] * 6
+    assert rows['grades'] == rows['submission_records'] == rows['enrolments'] * 2
+    for table, count in rows.items():
+        assert conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == count
+
+def test_snapshot_is_fully_migrated_with_indexes(snapshot):
+    _, conn = snapshot
+    versions = [row[0] for row in conn.execute("SELECT version FROM schema_migrations ORDER BY version")]
+    assert versions[0] == 1 and len(versions) >= 4
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")}
+    assert {'idx_survey_responses_student_week', 'idx_attendance_records_student_week', 'idx_grades_student_module'} <= indexes
+    triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert 'trg_grades_metrics_insert' in triggers
+    # The metrics skipped by the dropped triggers were computed once at the end.
+    assert conn.execute("SELECT SUM(grade_count) FROM student_metrics").fetchone()[0] == \
+        conn.execute("SELECT COUNT(*) FROM grades").fetchone()[0]
+    assert conn.execute("SELECT SUM(count) FROM metric_histograms WHERE metric = 'stress' AND scope = 'week'").fetchone()[0] == \
+        conn.execute("SELECT COUNT(*) FROM survey_responses").fetchone()[0]
+
+def test_related_rows_are_consistent(snapshot):
+    _, conn = snapshot
+    # Every stress event points at a high-stress survey of the same student, module and week.
+    mismatched = conn.execute("""
+        SELECT COUNT(*) FROM stress_events se JOIN survey_responses sr ON sr.id = se.survey_response_id
+        WHERE sr.stress_level < 4 OR sr.student_id != se.student_id OR sr.module_id != se.module_id OR sr.week_number != se.week_number
+    """).fetchone()[0]
+    assert mismatched == 0
+    assert conn.execute("SELECT COUNT(*) FROM stress_events").fetchone()[0] == \
+        conn.execute("SELECT COUNT(*) FROM survey_responses WHERE stress_level >= 4").fetchone()[0]
+    # Every alert follows two consecutive high-stress weeks.
+    unexplained = conn.execute("""
+        SELECT COUNT(*) FROM alerts a WHERE NOT EXISTS (
+            SELECT 1 FROM survey_responses cur JOIN survey_responses prev
+              ON prev.student_id = cur.student_id AND prev.module_id = cur.module_id AND prev.week_number = cur.week_number - 1
+            WHERE cur.student_id = a.student_id AND cur.module_id = a.module_id AND cur.week_number = a.week_number
+              AND cur.stress_level >= 4 AND prev.stress_level >= 4)
+    """).fetchone()[0]
+    assert unexplained == 0
+    # Attendance and surveys only exist for enrolled modules.
+    assert conn.execute("""
+        SELECT COUNT(*) FROM attendance_records ar
+        WHERE NOT EXISTS (SELECT 1 FROM enrolments e WHERE e.student_id = ar.student_id AND e.module_id = ar.module_id)
+    """).fetchone()[0] == 0
+
+def test_correlations_are_preserved(snapshot):
+    """Low attendance goes with higher stress and less sleep; late submissions lose marks."""
+    _, conn = snapshot
+    by_rate = {row['attendance_rate']: row for row in conn.execute("""
+        SELECT ar.attendance_rate, AVG(sr.stress_level) AS stress, AVG(sr.hours_slept) AS sleep
+        FROM attendance_records ar JOIN survey_responses sr
+          ON sr.student_id = ar.student_id AND sr.module_id = ar.module_id AND sr.week_number = ar.week_number
+        GROUP BY ar.attendance_rate
+    """)}
+    assert by_rate[0.0]['stress'] > by_rate[1.0]['stress']
+    assert by_rate[0.0]['sleep'] < by_rate[1.0]['sleep']
+
+    grades = {row['status']: row['grade'] for row in conn.execute("""
+        SELECT CASE WHEN s.is_submitted = 0 THEN 'missing' WHEN s.is_late = 1 THEN 'late' ELSE 'on_time' END AS status,
+               AVG(g.grade) AS grade
+        FROM submission_records s JOIN grades g
+          ON g.student_id = s.student_id AND g.module_id = s.module_id AND g.assessment_name = s.assessment_name
+        GROUP BY status
+    """)}
+    assert grades['on_time'] > grades['late'] > grades['missing']
+
+def test_same_seed_gives_same_data(app, tmp_path):
+    first = generate_dataset(str(tmp_path / 'a.sqlite'), students=5, modules=4, weeks=3, seed=3)
+    second = generate_dataset(str(tmp_path / 'b.sqlite'), students=5, modules=4, weeks=3, seed=3)
+    dump = lambda path: sqlite3.connect(path).execute(
+        "SELECT student_id, module_id, week_number, stress_level, hours_slept, created_at FROM survey_responses ORDER BY id").fetchall()
+    assert first.rows == second.rows
+    assert dump(first.path) == dump(second.path)
+
+def test_invalid_parameters_leave_no_file(app, tmp_path):
+    with pytest.raises(ValueError):
+        generate_dataset(str(tmp_path / 'bad.sqlite'), students=0)
+    assert not (tmp_path / 'bad.sqlite').exists()
@@ -0,0 +1,93 @@
+"""
+Unit tests for the schema migration runner in utils.migrate.
+
+The migrations are applied to throwaway SQLite files so that the shared,
+seeded test database is left untouched.
+"""
+
+import sqlite3
+import pytest
+from utils.migrate import (
+    apply_migrations, discover_migrations, get_migration_status, split_statements, MigrationError
+)
+
+@pytest.fixture
+def db(tmp_path):
+    """Provides a connection to an empty, temporary database."""
+    conn = sqlite3.connect(str(tmp_path / 'migrate.sqlite'))
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
+
+def index_names(db):
+    """Returns the names of all explicitly created indexes."""
+    return {row['name'] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")}
+
+def test_fresh_database_is_fully_migrated(db):
+    """Applying the migrations to an empty database creates every table and index once."""
+    applied = apply_migrations(db)
+    assert applied == [name for _, name, _ in discover_migrations()]
+    assert applied[0] == '0001_initial_schema'
+
+    tables = {row['name'] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'students', 'survey_responses', 'attendance_records', 'alerts', 'schema_migrations'} <= tables
+    assert {'idx_survey_responses_student_week', 'idx_attendance_records_student_week',
+            'idx_alerts_student_week'} <= index_names(db)
+
+    # Running again is a no-op.
+    assert apply_migrations(db) == []
+    assert all(migration['applied'] for migration in get_migration_status(db))
+
+def test_existing_database_is_upgraded_without_data_loss(db):
+    """A database created before migrations existed keeps its rows and gains the indexes."""
+    apply_migrations(db, target=1) # Only the baseline tables, as created by the old seed script.
+    db.execute("DELETE FROM schema_migrations") # Pre-migration databases have no version records.
+    db.execute("INSERT INTO students (student_number, full_name) VALUES ('S1', 'Test Student')")
+    db.commit()
+    assert 'idx_survey_responses_student_week' not in index_names(db)
+
+    apply_migrations(db)
+
+    assert db.execute("SELECT COUNT(*) FROM students").fetchone()[0] == 1
+    assert 'idx_survey_responses_student_week' in index_names(db)
+    plan = db.execute(
+        "EXPLAIN QUERY PLAN SELECT week_number, AVG(stress_level) FROM survey_responses "
+        "WHERE student_id = ? AND is_active = 1 GROUP BY week_number", (1,)
+    ).fetchall()
+    assert any('idx_survey_responses_student_week' in row['detail'] for row in plan)
+
+def test_failed_migration_is_rolled_back(db, tmp_path):
+    """A migration that fails leaves no partial changes and no version record."""
+    migrations_dir = tmp_path / 'migrations'
+    migrations_dir.mkdir()
+    (migrations_dir / '0001_create.sql').write_text("CREATE TABLE things (id INTEGER PRIMARY KEY);\n")
+    (migrations_dir / '0002_broken.sql').write_text(
+        "CREATE INDEX idx_things ON things (id);\nCREATE INDEX idx_missing ON missing_table (id);\n"
+    )
+
+    with pytest.raises(MigrationError, match='0002_broken'):
+        apply_migrations(db, migrations_dir=str(migrations_dir))
+
+    status = {m['name']: m['applied'] for m in get_migration_status(db, migrations_dir=str(migrations_dir))}
+    assert status == {'0001_create': True, '0002_broken': False}
+    assert 'idx_things' not in index_names(db)
+
+def test_duplicate_versions_are_rejected(tmp_path):
+    """Two migration files with the same version number are an error."""
+    (tmp_path / '0001_a.sql').write_text("SELECT 1;")
+    (tmp_path / '0001_b.sql').write_text("SELECT 1;")
+    with pytest.raises(MigrationError, match='Duplicate'):
+        discover_migrations(str(tmp_path))
+
+def test_split_statements_keeps_trigger_bodies_intact():
+    """Semicolons inside trigger bodies and string literals do not split statements."""
+    sql = """
+        -- A comment.
+        CREATE TABLE t (x TEXT);
+        CREATE TRIGGER tr AFTER INSERT ON t BEGIN
+            UPDATE t SET x = 'a;b' WHERE rowid = NEW.rowid;
+        END;
+    """
+    statements = split_statements(sql)
+    assert len(statements) == 2
+    assert statements[1].startswith('CREATE TRIGGER') and statements[1].endswith('END;')
@@ -0,0 +1,23 @@
+"""
+Tests for the survey submission benchmark in `utils/submission_benchmark.py`.
+"""
+
+from app.db_connection import get_db
+from utils.submission_benchmark import run_submission_benchmark
+
+TABLES = ('survey_responses', 'stress_events', 'alerts', 'detection_jobs')
+
+def row_counts():
+    db = get_db()
+    return [db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in TABLES]
+
+def test_benchmark_reports_counts_and_cleans_up(app):
+    before = row_counts()
+    result = run_submission_benchmark(count=10, pairs=5)
+    assert (result.submissions, result.statements, result.commits) == (10, 2, 1)
+    assert 0 < result.p50_ms <= result.p95_ms <= result.max_ms
+
+    inline = run_submission_benchmark(count=10, detect_inline=True, pairs=5)
+    assert (inline.statements, inline.commits, inline.stress_events) == (3, 1, 10)
+    assert inline.alerts > 0 # Every pair's second week follows a high-stress week.
+    assert row_counts() == before
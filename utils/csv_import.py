@@ -0,0 +1,361 @@
+"""
+High-throughput CSV import for registry exports.
+
+`import_csv()` loads a CSV file into one of the tables that support bulk creation
+(see `bulk_schema` on the repositories and `app/utils/bulk.py`). It is driven by
+the `flask import <entity> <file.csv>` command in `manage.py`.
+
+The file is read as a stream and processed in batches:
+
+1. Each CSV row is mapped onto the repository's `bulk_schema`. Header names are
+   matched case-insensitively (spaces and hyphens count as underscores), extra
+   columns are ignored, and `student_number`/`module_code` columns are resolved
+   to `student_id`/`module_id` from an in-memory lookup, since registry exports
+   identify students and modules by their codes rather than database IDs.
+2. The batch is validated with `validate_bulk_rows()` and the valid rows are
+   inserted with the repository's `bulk_create_<entity>()` method, i.e. a single
+   statement per batch: an `executemany()`, or for tables with a natural key
+   (attendance) an upsert that updates rows already present. Survey batches
+   therefore also run the set-based stress-event and alert checks.
+3. The batch and the updated row of `import_checkpoints` are committed together.
+   If the import stops for any reason, running it again resumes after the last
+   committed batch; rows are never inserted twice.
+
+With `defer=True`, the target table's secondary indexes and triggers are dropped
+for the duration of the import and recreated once at the end, which is much
+cheaper than maintaining them row by row. Indexes the import itself reads from
+(e.g. the previous-week lookup of the survey alert check) are kept. The triggers
+maintain the `student_metrics`, `module_week_rollups` and `metric_histograms` read
+models, so they are rebuilt from the base tables after they are restored. The
+dropped definitions are stored in the checkpoint, so an interrupted import
+restores them when it is resumed; until then the metrics lag behind the imported
+rows (`flask rebuild-metrics --check` reports this).
+"""
+
+import contextlib
+import csv
+import json
+import os
+import time
+from collections import namedtuple
+from datetime import datetime
+from app.analysis_cache import record_write
+from app.repositories.attendance_record_repository import attendance_record_repository
+from app.repositories.grade_repository import grade_repository
+from app.repositories.metric_histogram_repository import REBUILD_STATEMENTS as HISTOGRAM_REBUILD_STATEMENTS
+from app.repositories.module_week_rollup_repository import REBUILD_STATEMENTS as ROLLUP_REBUILD_STATEMENTS
+from app.repositories.student_metrics_repository import REBUILD_STATEMENTS as METRICS_REBUILD_STATEMENTS
+from app.repositories.survey_response_repository import survey_response_repository
+
+# Registry exports identify students and modules by code. A column in this map is
+# resolved to the ID column it names: lookup column -> (ID field, table, code column).
+LOOKUP_COLUMNS = {
+    'student_number': ('student_id', 'students', 'student_number'),
+    'module_code': ('module_id', 'modules', 'module_code'),
+}
+
+ImportTarget = namedtuple('ImportTarget', ['repository', 'keep_indexes'])
+ImportResult = namedtuple('ImportResult', ['rows_read', 'created', 'rejected', 'skipped', 'seconds', 'completed'])
+
+# Entities that can be imported, keyed by the name used on the command line.
+IMPORT_TARGETS = {
+    'grades': ImportTarget(grade_repository, ()),
+    'attendance-records': ImportTarget(attendance_record_repository, ()),
+    # The alert check looks up each student's previous week through this index.
+    'survey-responses': ImportTarget(survey_response_repository, ('idx_survey_responses_student_module_week',)),
+}
+
+class CsvImportError(Exception):
+    """Raised when an import cannot start or continue (bad file, changed file, unknown entity)."""
+
+def normalize_header(name):
+    """Normalizes a CSV header so that `Student ID`, `student-id` and `student_id` match."""
+    return name.strip().lower().replace(' ', '_').replace('-', '_')
+
+def build_column_map(headers, schema, overrides=None):
+    """
+    Maps CSV columns onto schema fields.
+
+    Args:
+        headers (list[str]): The CSV header row.
+        schema (tuple[BulkField]): The repository's `bulk_schema`.
+        overrides (dict, optional): Explicit `{csv column: field}` mappings, taking precedence.
+
+    Returns:
+        dict: `{csv column: field or lookup column}` for every column that is used.
+
+    Raises:
+        CsvImportError: If an override names an unknown field, or a required field has no column.
+    """
+    fields = {field.name for field in schema}
+    overrides = {normalize_header(k): v for k, v in (overrides or {}).items()}
+    column_map = {}
+    for header in headers:
+        target = overrides.get(normalize_header(header), normalize_header(header))
+        if target in fields or (target in LOOKUP_COLUMNS and LOOKUP_COLUMNS[target][0] in fields):
+            column_map[header] = target
+        elif normalize_header(header) in overrides:
+            raise CsvImportError(f"Column '{header}' is mapped to unknown field '{target}'.")
+    mapped = set(column_map.values()) | {LOOKUP_COLUMNS[c][0] for c in column_map.values() if c in LOOKUP_COLUMNS}
+    missing = [field.name for field in schema if field.required and field.name not in mapped]
+    if missing:
+        raise CsvImportError(f"No column for required field(s): {', '.join(missing)}.")
+    return column_map
+
+def load_lookups(db, column_map):
+    """
+    Loads the code -> ID maps for the lookup columns used by the file.
+
+    Args:
+        db (sqlite3.Connection): The database connection.
+        column_map (dict): The result of `build_column_map()`.
+
+    Returns:
+        dict: `{lookup column: {code: id}}`.
+    """
+    lookups = {}
+    for column in set(column_map.values()) & set(LOOKUP_COLUMNS):
+        _, table, code_column = LOOKUP_COLUMNS[column]
+        lookups[column] = {row[0]: row[1] for row in db.execute(f"SELECT {code_column}, id FROM {table} WHERE is_active = 1")}
+    return lookups
+
+def convert_row(raw, column_map, schema, lookups):
+    """
+    Converts one CSV row (all strings) into a payload row for `validate_bulk_rows()`.
+
+    Empty cells become None. Values that cannot be converted to the field's type are
+    kept as strings so that validation reports them with the usual message.
+
+    Args:
+        raw (dict): The row as returned by `csv.DictReader`.
+        column_map (dict): The result of `build_column_map()`.
+        schema (tuple[BulkField]): The repository's `bulk_schema`.
+        lookups (dict): The result of `load_lookups()`.
+
+    Returns:
+        tuple: `(row, errors)`; `errors` lists codes that could not be resolved.
+    """
+    types = {field.name: field.type for field in schema}
+    row, errors = {}, []
+    for column, target in column_map.items():
+        value = (raw.get(column) or '').strip()
+        if target in LOOKUP_COLUMNS:
+            id_field = LOOKUP_COLUMNS[target][0]
+            if value and id_field not in row:
+                if value in lookups[target]:
+                    row[id_field] = lookups[target][value]
+                else:
+                    errors.append(f"Unknown {target} '{value}'.")
+            continue
+        if value == '':
+            row.setdefault(target, None) # Never overwrite an ID resolved from a lookup column.
+        elif types[target] is str:
+            row[target] = value
+        else:
+            try:
+                row[target] = types[target](value)
+            except ValueError:
+                row[target] = value
+    return row, errors
+
+def get_checkpoint(db, source):
+    """Returns the `import_checkpoints` row for a source, or None."""
+    return db.execute("SELECT * FROM import_checkpoints WHERE source = ?", (source,)).fetchone()
+
+def defer_indexes(db, table, keep=()):
+    """
+    Drops the secondary indexes of a table and returns their definitions.
+
+    Only explicitly created, non-unique indexes are dropped. The implicit indexes
+    behind PRIMARY KEY and UNIQUE constraints cannot be, and explicit unique
+    indexes (migration 0010) are kept as well: they enforce the natural keys that
+    the upserts of the import name as their conflict targets.
+
+    Args:
+        db (sqlite3.Connection): The database connection.
+        table (str): The table being imported into.
+        keep (tuple[str], optional): Index names to leave in place.
+
+    Returns:
+        list[str]: The `CREATE INDEX` statements of the dropped indexes.
+    """
+    indexes = db.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+    ).fetchall()
+    dropped = []
+    for name, sql in indexes:
+        if name in keep or sql.startswith('CREATE UNIQUE INDEX'):
+            continue
+        db.execute(f"DROP INDEX {name}")
+        dropped.append(sql)
+    return dropped
+
+def defer_triggers(db, table):
+    """
+    Drops the triggers of a table and returns their definitions.
+
+    Args:
+        db (sqlite3.Connection): The database connection.
+        table (str): The table being imported into.
+
+    Returns:
+        list[str]: The `CREATE TRIGGER` statements of the dropped triggers.
+    """
+    triggers = db.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table,)).fetchall()
+    for name, _ in triggers:
+        db.execute(f"DROP TRIGGER {name}")
+    return [sql for _, sql in triggers]
+
+def restore_deferred(db, statements):
+    """
+    Recreates indexes and triggers dropped by `defer_indexes()` and `defer_triggers()`.
+
+    If any trigger is among them, the read models the triggers maintain are rebuilt,
+    since rows written while they were dropped were not counted.
+    """
+    rebuild = False
+    for sql in statements:
+        for create in ('CREATE INDEX', 'CREATE TRIGGER'):
+            if sql.startswith(create):
+                sql = sql.replace(create, f'{create} IF NOT EXISTS', 1)
+                rebuild = rebuild or create == 'CREATE TRIGGER'
+        db.execute(sql)
+    if rebuild:
+        # The sketches read the rebuilt metrics, so they are rebuilt last.
+        for statement in METRICS_REBUILD_STATEMENTS + ROLLUP_REBUILD_STATEMENTS + HISTOGRAM_REBUILD_STATEMENTS:
+            db.execute(statement)
+
+def import_csv(db, entity, path, batch_size=5000, restart=False, defer=False, column_overrides=None,
+               rejects_path=None, progress=None):
+    """
+    Imports a CSV file into the table of `entity` in resumable, batched transactions.
+
+    Args:
+        db (sqlite3.Connection): The database connection (normally `get_db()`).
+        entity (str): A key of `IMPORT_TARGETS`.
+        path (str): The CSV file to import. The first row must be a header.
+        batch_size (int, optional): Rows inserted and committed per transaction. Defaults to 5000.
+        restart (bool, optional): Ignore an existing checkpoint and import from the first row.
+        defer (bool, optional): Drop the table's secondary indexes and triggers during the import and recreate
+                                them at the end.
+        column_overrides (dict, optional): Explicit `{csv column: field}` mappings.
+        rejects_path (str, optional): Append rejected rows (line number, errors, original values) to this CSV file.
+        progress (callable, optional): Called after every batch with `(rows_done, created, rejected, rows_per_second)`.
+
+    Returns:
+        ImportResult: Counts for this run, `skipped` being the rows already imported by earlier runs.
+                      `completed` is False if the checkpoint said the file was already fully imported.
+
+    Raises:
+        CsvImportError: If the entity is unknown, the file does not match its checkpoint, or its columns
+                        do not cover the required fields.
+        Exception: If a batch fails to insert. The batch is rolled back and the checkpoint still points
+                   at the last committed batch.
+    """
+    if entity not in IMPORT_TARGETS:
+        raise CsvImportError(f"Cannot import '{entity}'. Choose one of: {', '.join(IMPORT_TARGETS)}.")
+    repository, keep_indexes = IMPORT_TARGETS[entity]
+    schema = repository.bulk_schema
+    bulk_create = getattr(repository, f'bulk_create_{entity.replace("-", "_")}')
+    path = os.path.abspath(path)
+    source = f"{entity}:{path}"
+    file_size = os.path.getsize(path)
+    now = datetime.now().isoformat()
+
+    checkpoint = get_checkpoint(db, source)
+    if checkpoint and not restart:
+        if checkpoint['completed_at']:
+            return ImportResult(0, 0, 0, checkpoint['rows_done'], 0.0, False)
+        if checkpoint['file_size'] != file_size:
+            raise CsvImportError(f"{path} changed since the interrupted import started; use --restart to import it from the beginning.")
+        skip = checkpoint['rows_done']
+        deferred = json.loads(checkpoint['deferred_indexes'] or '[]')
+    else:
+        if checkpoint and checkpoint['deferred_indexes']:
+            # An interrupted run dropped indexes and triggers; put them back before its checkpoint is replaced.
+            restore_deferred(db, json.loads(checkpoint['deferred_indexes']))
+        skip = 0
+        deferred = []
+        db.execute(
+            "INSERT OR REPLACE INTO import_checkpoints (source, entity, file_size, rows_done, rows_created, rows_rejected, "
+            "deferred_indexes, started_at, updated_at, completed_at) VALUES (?, ?, ?, 0, 0, 0, NULL, ?, ?, NULL)",
+            (source, entity, file_size, now, now)
+        )
+        db.commit()
+    if defer and not deferred:
+        deferred = defer_indexes(db, repository.table_name, keep_indexes) + defer_triggers(db, repository.table_name)
+        db.execute("UPDATE import_checkpoints SET deferred_indexes = ? WHERE source = ?", (json.dumps(deferred), source))
+        db.commit()
+
+    rows_read = created = rejected = 0
+    started_at = time.perf_counter()
+    with open(path, newline='', encoding='utf-8-sig') as csv_file, contextlib.ExitStack() as stack:
+        reader = csv.DictReader(csv_file)
+        if not reader.fieldnames:
+            raise CsvImportError(f"{path} is empty.")
+        column_map = build_column_map(reader.fieldnames, schema, column_overrides)
+        lookups = load_lookups(db, column_map)
+        rejects = None
+        if rejects_path:
+            rejects_file = stack.enter_context(open(rejects_path, 'a', newline='', encoding='utf-8'))
+            rejects = csv.writer(rejects_file)
+            if rejects_file.tell() == 0:
+                rejects.writerow(['line', 'errors'] + reader.fieldnames)
+
+        for _ in range(skip):
+            if next(reader, None) is None:
+                break
+
+        while True:
+            batch = []
+            for raw in reader:
+                batch.append((reader.line_num, raw))
+                if len(batch) >= batch_size:
+                    break
+            if not batch:
+                break
+
+            payload, errors = [], {}
+            for position, (_, raw) in enumerate(batch):
+                row, lookup_errors = convert_row(raw, column_map, schema, lookups)
+                if lookup_errors:
+                    errors[position] = lookup_errors
+                    row = None # Keeps positions aligned; rejected below without being validated.
+                payload.append(row)
+            valid, invalid = repository.validate_bulk_rows([row if row is not None else {} for row in payload])
+            valid = [(position, row) for position, row in valid if position not in errors]
+            for position, messages in invalid.items():
+                errors.setdefault(position, messages)
+
+            try:
+                if valid:
+                    bulk_create([row for _, row in valid])
+                db.execute(
+                    "UPDATE import_checkpoints SET rows_done = rows_done + ?, rows_created = rows_created + ?, "
+                    "rows_rejected = rows_rejected + ?, updated_at = ? WHERE source = ?",
+                    (len(batch), len(valid), len(errors), datetime.now().isoformat(), source)
+                )
+                db.commit() # The batch and its checkpoint become durable together.
+            except Exception:
+                db.rollback()
+                raise
+
+            for position in sorted(errors if rejects else ()):
+                line, raw = batch[position]
+                rejects.writerow([line, ' '.join(errors[position])] + [raw.get(name, '') for name in reader.fieldnames])
+            rows_read += len(batch)
+            created += len(valid)
+            rejected += len(errors)
+            if progress:
+                elapsed = time.perf_counter() - started_at
+                progress(skip + rows_read, created, rejected, rows_read / elapsed if elapsed else 0.0)
+
+    if deferred:
+        restore_deferred(db, deferred)
+        record_write(repository.table_name, *repository.side_effect_tables)
+    db.execute(
+        "UPDATE import_checkpoints SET deferred_indexes = NULL, completed_at = ?, updated_at = ? WHERE source = ?",
+        (datetime.now().isoformat(), datetime.now().isoformat(), source)
+    )
+    db.commit()
+    return ImportResult(rows_read, created, rejected, skip, time.perf_counter() - started_at, True)
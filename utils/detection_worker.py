@@ -0,0 +1,108 @@
+"""
+Background worker for stress-event and alert detection.
+
+Creating or updating a survey response enqueues a detection job (see
+`DetectionJobRepository`) instead of checking for stress events and alerts
+inside the request. This worker, started with `flask worker`, drains the queue:
+
+1. `process_batch()` claims up to `batch_size` jobs with a lease and commits the
+   claim, so concurrent workers take disjoint batches.
+2. The claimed survey responses are checked together with the set-based
+   `SurveyResponseRepository.check_for_stress_events_and_alerts()`, and the jobs
+   are deleted in the same transaction as the events and alerts they created.
+3. If the check fails, the transaction is rolled back and the jobs are released
+   for a retry after `retry_delay` seconds; after `max_attempts` attempts they
+   are parked with their last error.
+
+A worker that dies between 1 and 2 leaves its jobs leased; they are claimed
+again once the lease expires. Jobs are thus delivered at least once, and the
+check never creates an event or alert twice.
+
+The worker writes from its own process, which the analysis cache's in-process
+version counters cannot see. Its alerts still invalidate the web processes'
+cached results at once: every alert change is appended to `alert_changes` by
+a trigger, and the cache compares that log's last ID before serving a result
+that reads `alerts` (see `PERSISTED_VERSIONS` in `app/analysis_cache.py`).
+"""
+
+import os
+import socket
+import time
+from collections import namedtuple
+from flask import current_app
+from app.repositories.detection_job_repository import detection_job_repository
+from app.repositories.survey_response_repository import survey_response_repository
+
+BatchResult = namedtuple('BatchResult', ['jobs', 'stress_events', 'alerts', 'failed', 'lag_seconds'])
+
+def default_worker_id():
+    """Identifies this worker process as `<host>:<pid>`."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def process_batch(db, worker_id, batch_size=100, lease_seconds=60.0, retry_delay=30.0, max_attempts=5):
+    """
+    Claims and processes one batch of detection jobs.
+
+    Args:
+        db (sqlite3.Connection): The connection the repositories use (`get_db()`).
+        worker_id (str): Identifies this worker in the job leases.
+        batch_size (int, optional): Maximum number of jobs to claim. Defaults to 100.
+        lease_seconds (float, optional): Seconds before unfinished jobs may be claimed again. Defaults to 60.
+        retry_delay (float, optional): Seconds before failed jobs are retried. Defaults to 30.
+        max_attempts (int, optional): Attempts after which a failing job is parked. Defaults to 5.
+
+    Returns:
+        BatchResult: The number of jobs claimed, stress events and alerts created and jobs
+                     that failed, and the age in seconds of the oldest claimed job (0 if none).
+    """
+    jobs = detection_job_repository.claim(worker_id, batch_size, lease_seconds)
+    db.commit() # Publish the leases before the (longer) detection transaction.
+    if not jobs:
+        return BatchResult(0, 0, 0, 0, 0.0)
+    job_ids = [job['id'] for job in jobs]
+    lag_seconds = max(time.time() - min(job['enqueued_at'] for job in jobs), 0.0)
+
+    try:
+        # A response updated several times before the worker ran has several jobs; it is checked once.
+        response_ids = sorted({job['survey_response_id'] for job in jobs})
+        stress_events, alerts = survey_response_repository.check_for_stress_events_and_alerts(response_ids)
+        detection_job_repository.complete(job_ids, worker_id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        current_app.logger.error(f"Detection batch of {len(job_ids)} job(s) failed: {e}", exc_info=True)
+        detection_job_repository.release(job_ids, worker_id, str(e), retry_delay, max_attempts)
+        db.commit()
+        return BatchResult(len(jobs), 0, 0, len(jobs), lag_seconds)
+    return BatchResult(len(jobs), stress_events, alerts, 0, lag_seconds)
+
+def run_worker(db, worker_id=None, batch_size=100, poll_interval=1.0, once=False, on_batch=None, **options):
+    """
+    Processes detection jobs until stopped, or until the queue is empty with `once`.
+
+    Full batches are followed immediately by the next one; otherwise the worker
+    sleeps `poll_interval` seconds before polling again.
+
+    Args:
+        db (sqlite3.Connection): The connection the repositories use (`get_db()`).
+        worker_id (str, optional): Identifies this worker in the job leases. Defaults to `default_worker_id()`.
+        batch_size (int, optional): Maximum number of jobs per batch. Defaults to 100.
+        poll_interval (float, optional): Seconds to wait when the queue has no available jobs. Defaults to 1.
+        once (bool, optional): Return once no job is available instead of polling. Defaults to False.
+        on_batch (callable, optional): Called with the `BatchResult` of every non-empty batch.
+        **options: `lease_seconds`, `retry_delay` and `max_attempts`, passed to `process_batch()`.
+
+    Returns:
+        int: The number of jobs processed (including failed ones) before returning.
+    """
+    worker_id = worker_id or default_worker_id()
+    processed = 0
+    while True:
+        result = process_batch(db, worker_id, batch_size, **options)
+        processed += result.jobs
+        if result.jobs and on_batch:
+            on_batch(result)
+        if result.jobs < batch_size:
+            if once:
+                return processed
+            time.sleep(poll_interval)
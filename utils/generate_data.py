@@ -0,0 +1,283 @@
+"""
+Synthetic dataset generator for load testing and benchmarks.
+
+`seed_data()` builds the small, fixed demo database used in development and
+tests. `generate_dataset()` builds datasets of any size with the same shape and
+the same correlations, written to a standalone SQLite snapshot file that can be
+reused across benchmark runs and installed as the application database with
+`flask generate --install`.
+
+The data follows the rules of the demo seeder:
+- Stress levels rise and sleep falls as a student's weekly attendance drops.
+- Assignments are mostly submitted on time; late submissions lose marks and
+  missing ones score low. Students who attend less submit less and later.
+- Surveys at stress level 4 or above record a stress event, and two such weeks
+  in a row for the same module raise an alert.
+
+It is built for speed rather than being a copy of the seeder:
+- The snapshot is a brand-new file, so it is written with journaling and fsync
+  disabled and moved into place only once complete.
+- Row IDs are assigned by the generator, so related rows (enrolments, stress
+  events) are produced in the same pass without reading anything back.
+- Rows are inserted with `executemany()` per table in chunks of students, with
+  the secondary indexes and the metrics triggers dropped until the end (see
+  `utils/csv_import.py`); `student_metrics` is then computed in one pass.
+- Password hashing is deliberately slow, so one hash is computed for all
+  student accounts (they share the demo password) instead of one per student.
+"""
+
+import os
+import random
+import sqlite3
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from werkzeug.security import generate_password_hash
+from utils.csv_import import defer_indexes, defer_triggers, restore_deferred
+from utils.migrate import apply_migrations
+
+GenerateResult = namedtuple('GenerateResult', ['path', 'rows', 'seconds'])
+
+# Tables filled by the generator, in insertion order.
+GENERATED_TABLES = ('users', 'modules', 'students', 'enrolments', 'attendance_records', 'survey_responses',
+                    'stress_events', 'alerts', 'submission_records', 'grades')
+
+INSERT_STATEMENTS = {
+    'users': "INSERT INTO users (id, username, password_hash, role, student_id, created_at, is_active) VALUES (?, ?, ?, ?, ?, ?, 1)",
+    'modules': "INSERT INTO modules (id, module_code, module_title, credit, academic_year, is_active) VALUES (?, ?, ?, 15, '2025/2026', 1)",
+    'students': "INSERT INTO students (id, student_number, full_name, email, course_name, year_of_study, is_active) VALUES (?, ?, ?, ?, ?, ?, 1)",
+    'enrolments': "INSERT INTO enrolments (id, student_id, module_id, enrol_date, is_active) VALUES (?, ?, ?, ?, 1)",
+    'attendance_records': "INSERT INTO attendance_records (id, student_id, module_id, week_number, attended_sessions, total_sessions, attendance_rate, is_active) VALUES (?, ?, ?, ?, ?, ?, ?, 1)",
+    'survey_responses': "INSERT INTO survey_responses (id, student_id, module_id, week_number, stress_level, hours_slept, mood_comment, created_at, is_active) VALUES (?, ?, ?, ?, ?, ?, NULL, ?, 1)",
+    'stress_events': "INSERT INTO stress_events (id, student_id, module_id, survey_response_id, week_number, stress_level, cause_category, description, source, created_at, is_active) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'survey_response_system', ?, 1)",
+    'alerts': "INSERT INTO alerts (id, student_id, module_id, week_number, reason, created_at, resolved, is_active) VALUES (?, ?, ?, ?, ?, ?, 0, 1)",
+    'submission_records': "INSERT INTO submission_records (id, student_id, module_id, assessment_name, due_date, submitted_date, is_submitted, is_late, is_active) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)",
+    'grades': "INSERT INTO grades (id, student_id, module_id, assessment_name, grade, is_active) VALUES (?, ?, ?, ?, ?, 1)",
+}
+
+MODULE_TITLES = [
+    "Introduction to Programming", "Data Structures and Algorithms", "Database Systems",
+    "Machine Learning Fundamentals", "Deep Learning Basics", "Data Visualisation",
+    "Software Engineering", "AI Ethics and Society",
+]
+COURSE_OPTIONS = ["MSc Applied AI", "MSc Data Science", "MSc Cyber Security"]
+TERM_START_DATE = date(2025, 2, 3)
+SESSIONS_PER_WEEK = 2
+HIGH_STRESS = 4
+
+def default_snapshot_path(students, modules, weeks, seed):
+    """Returns the default snapshot file name for a set of generator parameters."""
+    return os.path.join('snapshots', f'students{students}_modules{modules}_weeks{weeks}_seed{seed}.sqlite')
+
+def _clamp(value, low, high):
+    return low if value < low else high if value > high else value
+
+class _DatasetBuilder:
+    """
+    Produces the rows of a dataset chunk by chunk and inserts them into a snapshot connection.
+
+    Keeps the running ID counters per table so that rows can reference each other
+    without being read back from the database.
+    """
+    def __init__(self, conn, students, modules, weeks, seed):
+        self.conn = conn
+        self.students = students
+        self.modules = modules
+        self.weeks = weeks
+        self.rng = random.Random(seed)
+        self.next_id = {table: 1 for table in GENERATED_TABLES}
+        self.counts = {table: 0 for table in GENERATED_TABLES}
+        self.student_hash = generate_password_hash("password")
+        # Assignments are due a third and two thirds of the way through the term.
+        self.assessments = [
+            ("Assignment 1", TERM_START_DATE + timedelta(weeks=max(1, round(weeks / 3)) - 1)),
+            ("Assignment 2", TERM_START_DATE + timedelta(weeks=max(1, round(weeks * 2 / 3)) - 1)),
+        ]
+
+    def _ids(self, table, count):
+        """Reserves `count` consecutive IDs for a table and returns the first one."""
+        first = self.next_id[table]
+        self.next_id[table] += count
+        return first
+
+    def insert(self, table, rows):
+        """Inserts a list of parameter tuples with one `executemany()` call."""
+        if rows:
+            self.conn.executemany(INSERT_STATEMENTS[table], rows)
+            self.counts[table] += len(rows)
+
+    def build_reference_data(self):
+        """Inserts the staff accounts (same credentials as the demo seeder) and the modules."""
+        registration_start = TERM_START_DATE - timedelta(days=70)
+        staff_hash = self.student_hash # Course director and wellbeing officer share the demo password.
+        staff = [("admin", generate_password_hash("admin"), "admin"),
+                 ("course_director", staff_hash, "course_director"),
+                 ("wellbeing_officer", staff_hash, "wellbeing_officer")]
+        self.insert('users', [
+            (self._ids('users', 1), username, password_hash, role, None,
+             (registration_start - timedelta(days=self.rng.randint(1, 30))).isoformat())
+            for username, password_hash, role in staff
+        ])
+        width = max(3, len(str(self.modules)))
+        self.insert('modules', [
+            (self._ids('modules', 1), f"MOD{i:0{width}d}",
+             MODULE_TITLES[(i - 1) % len(MODULE_TITLES)] + (f" {(i - 1) // len(MODULE_TITLES) + 1}" if i > len(MODULE_TITLES) else ''))
+            for i in range(1, self.modules + 1)
+        ])
+
+    def build_students(self, first, last):
+        """
+        Generates and inserts students `first`..`last` (1-based) with all their activity.
+
+        The per-week loop runs once for every attendance record and survey, so it
+        avoids the slower `random` helpers (`randint`, `choice`) and datetime arithmetic
+        in favour of `random()` and preformatted timestamps.
+
+        Args:
+            first (int): Number of the first student of the chunk.
+            last (int): Number of the last student of the chunk.
+        """
+        rng = self.rng
+        gauss, random_, randint = rng.gauss, rng.random, rng.randint
+        weeks = range(1, self.weeks + 1)
+        width = max(4, len(str(self.students)))
+        registration_end = TERM_START_DATE - timedelta(days=10)
+        week_starts = {w: datetime.combine(TERM_START_DATE + timedelta(weeks=w - 1), datetime.min.time()) for w in weeks}
+        week_prefixes = {w: week_starts[w].strftime('%Y-%m-%dT') for w in weeks}
+        rows = {table: [] for table in GENERATED_TABLES}
+        attendance_rows, survey_rows = rows['attendance_records'], rows['survey_responses']
+        event_rows, alert_rows = rows['stress_events'], rows['alerts']
+        attendance_id = self.next_id['attendance_records']
+        survey_id = self.next_id['survey_responses']
+
+        for number in range(first, last + 1):
+            student_id = self._ids('students', 1)
+            alert_weeks = set() # A student has at most one active alert per week (migration 0010).
+            email = f"student{number}@example.com"
+            created_at = datetime.combine(registration_end, datetime.min.time()) - timedelta(seconds=randint(0, 60 * 86400))
+            rows['students'].append((student_id, f"S{number:0{width}d}", f"Student {number}", email,
+                                     COURSE_OPTIONS[randint(0, len(COURSE_OPTIONS) - 1)], randint(1, 2)))
+            rows['users'].append((self._ids('users', 1), email, self.student_hash, "student", student_id, created_at.isoformat()))
+
+            # Engagement drives attendance, and through it stress, sleep and submission behaviour.
+            engagement = rng.betavariate(5, 2)
+            enrol_date = (created_at + timedelta(days=randint(1, 7))).isoformat()
+            for module_id in rng.sample(range(1, self.modules + 1), min(self.modules, randint(3, 5))):
+                rows['enrolments'].append((self._ids('enrolments', 1), student_id, module_id, enrol_date))
+
+                previous_high = False
+                for w in weeks:
+                    attended = (random_() < engagement) + (random_() < engagement)
+                    rate = attended / SESSIONS_PER_WEEK
+                    attendance_rows.append((attendance_id, student_id, module_id, w, attended, SESSIONS_PER_WEEK, rate))
+                    attendance_id += 1
+
+                    minute_of_day = 9 * 60 + int(random_() * 14 * 60) # Between 09:00 and 22:59.
+                    stress = int(round(_clamp(gauss(3 + (1 - rate) * 2, 0.8), 1, 5)))
+                    hours_slept = _clamp(gauss(7 + rate, 1.0), 3.0, 10.0)
+                    survey_rows.append((survey_id, student_id, module_id, w, stress, hours_slept,
+                                        f"{week_prefixes[w]}{minute_of_day // 60:02d}:{minute_of_day % 60:02d}:00"))
+
+                    high = stress >= HIGH_STRESS
+                    if high:
+                        survey_time = week_starts[w] + timedelta(minutes=minute_of_day)
+                        event_time = survey_time + timedelta(minutes=5 + int(random_() * 116))
+                        event_rows.append((self._ids('stress_events', 1), student_id, module_id, survey_id, w, stress,
+                                           "academic" if random_() < 0.5 else "personal",
+                                           f"High stress reported (level {stress}).", event_time.isoformat()))
+                        if previous_high:
+                            alert_time = survey_time + timedelta(hours=1 + int(random_() * 5))
+                            reason = (f"Stress level >= {HIGH_STRESS} for two consecutive weeks ({w - 1} and {w}) "
+                                      f"in module_id={module_id} for student_id={student_id}.")
+                            if w not in alert_weeks:
+                                alert_weeks.add(w)
+                                alert_rows.append((self._ids('alerts', 1), student_id, module_id, w, reason, alert_time.isoformat()))
+                    previous_high = high
+                    survey_id += 1
+
+                for name, due_date in self.assessments:
+                    submitted_date = None
+                    is_late = 0
+                    is_submitted = 1 if random_() < 0.8 + 0.15 * engagement else 0
+                    if is_submitted:
+                        delta_days = -randint(0, 2) if random_() < 0.6 + 0.3 * engagement else randint(1, 5)
+                        submitted_on = due_date + timedelta(days=delta_days)
+                        submitted_date = datetime.combine(submitted_on, datetime.min.time()).replace(hour=randint(9, 17)).isoformat()
+                        is_late = 1 if submitted_on > due_date else 0
+                    grade = rng.uniform(40.0, 95.0) if is_submitted else rng.uniform(0, 35)
+                    if is_late: # Penalty for late submission.
+                        grade = max(0.0, grade - rng.uniform(5, 15))
+                    rows['submission_records'].append((self._ids('submission_records', 1), student_id, module_id, name,
+                                                       due_date.isoformat(), submitted_date, is_submitted, is_late))
+                    rows['grades'].append((self._ids('grades', 1), student_id, module_id, name, grade))
+
+        self.next_id['attendance_records'] = attendance_id
+        self.next_id['survey_responses'] = survey_id
+        for table in GENERATED_TABLES:
+            self.insert(table, rows[table])
+
+def generate_dataset(path, students=1000, modules=40, weeks=12, seed=42, chunk_size=1000, progress=None):
+    """
+    Generates a synthetic dataset into a new SQLite snapshot file.
+
+    The snapshot has the full, migrated schema (including `schema_migrations`), so it
+    can be installed as the application database or upgraded with `flask migrate`.
+    The same parameters and seed always produce the same data.
+
+    Args:
+        path (str): Where to write the snapshot. An existing file is replaced.
+        students (int, optional): Number of students (each with a linked user account). Defaults to 1000.
+        modules (int, optional): Number of modules; each student enrols in 3-5 of them. Defaults to 40.
+        weeks (int, optional): Number of term weeks with attendance and survey records. Defaults to 12.
+        seed (int, optional): Random seed. Defaults to 42.
+        chunk_size (int, optional): Students generated and inserted per round. Defaults to 1000.
+        progress (callable, optional): Called after every chunk with `(students_done, rows_written, rows_per_second)`.
+
+    Returns:
+        GenerateResult: The snapshot path, the row count per table and the elapsed seconds.
+
+    Raises:
+        ValueError: If a parameter is out of range.
+        sqlite3.Error: If building the snapshot fails; no partial file is left at `path`.
+    """
+    if students < 1 or modules < 1 or weeks < 1 or chunk_size < 1:
+        raise ValueError("students, modules, weeks and chunk_size must all be at least 1.")
+    started_at = time.perf_counter()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.partial"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    conn = sqlite3.connect(temp_path)
+    try:
+        # A half-written snapshot is discarded anyway, so skip the rollback journal and fsyncs.
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA cache_size = -64000")
+        apply_migrations(conn)
+        deferred = []
+        for table in GENERATED_TABLES:
+            deferred += defer_indexes(conn, table) + defer_triggers(conn, table)
+
+        builder = _DatasetBuilder(conn, students, modules, weeks, seed)
+        builder.build_reference_data()
+        for first in range(1, students + 1, chunk_size):
+            last = min(students, first + chunk_size - 1)
+            builder.build_students(first, last)
+            if progress:
+                elapsed = time.perf_counter() - started_at
+                written = sum(builder.counts.values())
+                progress(last, written, written / elapsed if elapsed else 0.0)
+
+        restore_deferred(conn, deferred)
+        conn.commit()
+        conn.execute("ANALYZE") # Give the query planner statistics for the generated distribution.
+        conn.commit()
+    except BaseException:
+        conn.close()
+        os.remove(temp_path)
+        raise
+    conn.close()
+    os.replace(temp_path, path)
+    return GenerateResult(path, dict(builder.counts), time.perf_counter() - started_at)
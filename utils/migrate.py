@@ -0,0 +1,174 @@
+"""
+Versioned, forward-only schema migrations.
+
+Schema changes live as numbered `.sql` files in the top-level `migrations/`
+directory (e.g. `0002_student_week_indexes.sql`). Each file is applied at most
+once, in version order, inside its own transaction, and is recorded in the
+`schema_migrations` table together with the time it was applied. This allows
+existing databases to pick up new tables and indexes with `flask migrate`
+instead of being rebuilt with the destructive `flask init-db`.
+
+Migrations are never edited or removed once released; a change to an earlier
+migration is expressed as a new migration with a higher version number.
+"""
+
+import os
+import re
+import sqlite3
+from datetime import datetime
+from flask import current_app
+
+# Default location of the migration files, relative to the project root.
+MIGRATIONS_DIR = os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), 'migrations')
+
+# Migration files must be named `<version>_<description>.sql`, e.g. `0001_initial_schema.sql`.
+MIGRATION_FILENAME_PATTERN = re.compile(r'^(\d+)_([A-Za-z0-9_]+)\.sql$')
+
+class MigrationError(Exception):
+    """Raised when the migration files are invalid or a migration fails to apply."""
+
+def discover_migrations(migrations_dir=None):
+    """
+    Lists the migration files available on disk, ordered by version.
+
+    Args:
+        migrations_dir (str, optional): Directory containing the `.sql` files.
+                                        Defaults to `MIGRATIONS_DIR`.
+
+    Returns:
+        list: A list of `(version, name, path)` tuples sorted by version.
+
+    Raises:
+        MigrationError: If two files share the same version number.
+    """
+    migrations_dir = migrations_dir or MIGRATIONS_DIR
+    migrations = {}
+    for filename in sorted(os.listdir(migrations_dir)):
+        match = MIGRATION_FILENAME_PATTERN.match(filename)
+        if not match:
+            continue # Ignore READMEs and other non-migration files.
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(
+                f"Duplicate migration version {version}: {migrations[version][1]} and {filename}."
+            )
+        migrations[version] = (version, filename[:-len('.sql')], os.path.join(migrations_dir, filename))
+    return [migrations[version] for version in sorted(migrations)]
+
+def split_statements(sql):
+    """
+    Splits a migration script into individual SQL statements.
+
+    `sqlite3.complete_statement` is used to find statement boundaries so that
+    semicolons inside string literals or `CREATE TRIGGER ... BEGIN ... END;`
+    bodies do not split a statement in two.
+
+    Args:
+        sql (str): The contents of a migration file.
+
+    Returns:
+        list: The statements in the order they appear in the script.
+    """
+    statements = []
+    buffer = ''
+    for line in sql.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statement = buffer.strip()
+            # Skip fragments that only contain comments.
+            if any(part.strip() and not part.strip().startswith('--') for part in statement.splitlines()):
+                statements.append(statement)
+            buffer = ''
+    if buffer.strip() and any(part.strip() and not part.strip().startswith('--') for part in buffer.splitlines()):
+        raise MigrationError(f"Incomplete SQL statement at end of migration: {buffer.strip()[:80]}")
+    return statements
+
+def ensure_migrations_table(db):
+    """
+    Creates the `schema_migrations` version table if it does not exist yet.
+
+    Args:
+        db (sqlite3.Connection): The database connection.
+    """
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """)
+    db.commit()
+
+def get_applied_versions(db):
+    """
+    Returns the versions already recorded in `schema_migrations`.
+
+    Args:
+        db (sqlite3.Connection): The database connection.
+
+    Returns:
+        set: The applied migration version numbers.
+    """
+    ensure_migrations_table(db)
+    return {row[0] for row in db.execute("SELECT version FROM schema_migrations").fetchall()}
+
+def get_migration_status(db, migrations_dir=None):
+    """
+    Reports which migrations have been applied and which are pending.
+
+    Args:
+        db (sqlite3.Connection): The database connection.
+        migrations_dir (str, optional): Directory containing the `.sql` files.
+
+    Returns:
+        list: One dict per migration with `version`, `name`, `applied` and `applied_at` keys.
+    """
+    ensure_migrations_table(db)
+    applied = {row['version']: row['applied_at'] for row in db.execute("SELECT version, applied_at FROM schema_migrations").fetchall()}
+    return [
+        {'version': version, 'name': name, 'applied': version in applied, 'applied_at': applied.get(version)}
+        for version, name, _ in discover_migrations(migrations_dir)
+    ]
+
+def apply_migrations(db, migrations_dir=None, target=None):
+    """
+    Applies every pending migration in version order.
+
+    Each migration runs in its own transaction together with the insert into
+    `schema_migrations`, so a failing migration leaves neither partial schema
+    changes nor a version record behind, and earlier migrations stay applied.
+
+    Args:
+        db (sqlite3.Connection): The database connection.
+        migrations_dir (str, optional): Directory containing the `.sql` files.
+        target (int, optional): Highest version to apply. Defaults to all migrations.
+
+    Returns:
+        list: The names of the migrations applied by this call, in order.
+
+    Raises:
+        MigrationError: If a migration fails to apply.
+    """
+    applied_versions = get_applied_versions(db)
+    applied_now = []
+    for version, name, path in discover_migrations(migrations_dir):
+        if version in applied_versions or (target is not None and version > target):
+            continue
+        with open(path, encoding='utf-8') as migration_file:
+            statements = split_statements(migration_file.read())
+        try:
+            db.execute("BEGIN")
+            for statement in statements:
+                db.execute(statement)
+            db.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                (version, name, datetime.now().isoformat())
+            )
+            db.commit()
+        except sqlite3.Error as e:
+            db.rollback() # Leave the database exactly as it was before this migration.
+            current_app.logger.error(f"Migration {name} failed: {e}", exc_info=True)
+            raise MigrationError(f"Migration {name} failed: {e}") from e
+        current_app.logger.info(f"Applied migration {name}.")
+        applied_now.append(name)
+    return applied_now
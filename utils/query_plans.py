@@ -0,0 +1,280 @@
+"""
+Query-plan regression harness for the repository layer.
+
+This module runs a catalog of repository calls (`build_query_catalog()`)
+against a private in-memory copy of the application's database, records every
+SQL statement the repositories issue, and runs `EXPLAIN QUERY PLAN` on each of
+them. The result can be rendered as a stable, plain-text report suitable for
+diffing between releases (`flask query-plans`), and statements belonging to
+hot-path calls are checked for full table scans so that a change which turns an
+indexed `SEARCH` into a `SCAN` fails the test suite instead of surfacing as a
+slow dashboard in production.
+
+Cohort-wide analytics and unfiltered listings are included in the report but
+are not checked, since scanning every row is inherent to what they compute.
+"""
+
+import re
+import sqlite3
+from collections import namedtuple
+from app.analysis_cache import bypass_analysis_cache
+from app.db_connection import get_db
+from app.query_instrumentation import record_statements
+from app.repositories.alert_repository import alert_repository
+from app.repositories.analysis_repository import analysis_repository
+from app.repositories.attendance_record_repository import attendance_record_repository
+from app.repositories.enrolment_repository import enrolment_repository
+from app.repositories.grade_repository import grade_repository
+from app.repositories.module_repository import module_repository
+from app.repositories.stress_event_repository import stress_event_repository
+from app.repositories.student_repository import student_repository
+from app.repositories.submission_record_repository import submission_record_repository
+from app.repositories.survey_response_repository import survey_response_repository
+from app.repositories.user_repository import user_repository
+from app.utils.pagination import encode_cursor
+from utils.detection_worker import process_batch
+
+# A single entry of the catalog: `call(samples)` exercises one repository method.
+QueryCase = namedtuple('QueryCase', ['name', 'hot', 'call'])
+
+# The plan of one statement issued by a catalog entry, plus the offending plan lines (if any).
+QueryPlan = namedtuple('QueryPlan', ['case', 'hot', 'sql', 'plan', 'violations'])
+
+# Matches plan lines that read every row of a table or intermediate result.
+_SCAN_PATTERN = re.compile(r'^SCAN (\S+)')
+# Matches plan lines that introduce a named subquery or CTE, which may legitimately be scanned.
+_SUBQUERY_PATTERN = re.compile(r'^(?:MATERIALIZE|CO-ROUTINE) (\S+)')
+
+def normalize_sql(sql):
+    """
+    Collapses whitespace so that the same statement always renders identically.
+
+    Args:
+        sql (str): A SQL statement.
+
+    Returns:
+        str: The statement on a single line.
+    """
+    return ' '.join(sql.split())
+
+def explain(conn, sql, params=()):
+    """
+    Runs `EXPLAIN QUERY PLAN` for a statement and renders the plan as indented lines.
+
+    Args:
+        conn (sqlite3.Connection): The connection to plan against.
+        sql (str): The statement to explain.
+        params (tuple, optional): Parameters bound to the statement.
+
+    Returns:
+        list[str]: One line per plan node, indented two spaces per nesting level.
+    """
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    depth = {0: -1}
+    lines = []
+    for node_id, parent_id, _, detail in rows:
+        depth[node_id] = depth.get(parent_id, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return lines
+
+def find_full_scans(plan):
+    """
+    Returns the plan lines that scan a whole table.
+
+    Scans of materialized subqueries, CTEs and co-routines are ignored, as are
+    `SCAN CONSTANT ROW` lines; they read intermediate results rather than tables.
+    So are scans of virtual tables such as `json_each(?)`, which read a bound parameter.
+
+    Args:
+        plan (list[str]): Plan lines as returned by `explain()`.
+
+    Returns:
+        list[str]: The offending lines, stripped of indentation.
+    """
+    subqueries = set()
+    for line in plan:
+        match = _SUBQUERY_PATTERN.match(line.strip())
+        if match:
+            subqueries.add(match.group(1))
+    violations = []
+    for line in plan:
+        match = _SCAN_PATTERN.match(line.strip())
+        if (match and match.group(1) not in subqueries and match.group(1) != 'CONSTANT' and not match.group(1).startswith('(')
+                and 'VIRTUAL TABLE' not in line):
+            violations.append(line.strip())
+    return violations
+
+def _load_samples(conn):
+    """
+    Picks representative keys from the database to call the repository methods with.
+
+    Returns:
+        dict: Sample identifiers used by the catalog entries.
+    """
+    def first(query):
+        row = conn.execute(query).fetchone()
+        return row[0] if row else None
+
+    return {
+        'student_id': first("SELECT student_id FROM survey_responses WHERE is_active = 1 ORDER BY id LIMIT 1"),
+        'student_number': first("SELECT student_number FROM students WHERE is_active = 1 ORDER BY id LIMIT 1"),
+        'module_id': first("SELECT id FROM modules WHERE is_active = 1 ORDER BY id LIMIT 1"),
+        'username': first("SELECT username FROM users ORDER BY id LIMIT 1"),
+        'user_id': first("SELECT id FROM users ORDER BY id LIMIT 1"),
+        'alert_id': first("SELECT id FROM alerts ORDER BY id LIMIT 1"),
+        'survey_response_id': first("SELECT id FROM survey_responses ORDER BY id LIMIT 1"),
+        'attendance_record_id': first("SELECT id FROM attendance_records ORDER BY id LIMIT 1"),
+        'grade_id': first("SELECT id FROM grades ORDER BY id LIMIT 1"),
+        'enrolment_id': first("SELECT id FROM enrolments ORDER BY id LIMIT 1"),
+        'submission_record_id': first("SELECT id FROM submission_records ORDER BY id LIMIT 1"),
+        'stress_event_id': first("SELECT id FROM stress_events ORDER BY id LIMIT 1"),
+    }
+
+def _submit_consecutive_high_stress(samples):
+    """Creates two consecutive high-stress surveys, which enqueue their detection jobs."""
+    for week in (90, 91):
+        survey_response_repository.create_survey_response(samples['student_id'], samples['module_id'], week, 5, 5.0, None)
+
+def _detect_consecutive_high_stress(samples):
+    """Submits two consecutive high-stress surveys and runs the worker so that every branch of the alert check runs."""
+    _submit_consecutive_high_stress(samples)
+    process_batch(get_db(), 'query-plans')
+
+def build_query_catalog():
+    """
+    Lists the repository calls whose statements are planned.
+
+    Entries marked hot are on request paths that look up a bounded set of rows
+    (by id, student or username) and must therefore be served by an index.
+    New repository methods should be added here so that their plans are tracked.
+
+    Returns:
+        list[QueryCase]: The catalog, in report order.
+    """
+    return [
+        # Per-student and per-record lookups: must use an index.
+        QueryCase('analysis.get_stress_trend_for_student', True, lambda x: analysis_repository.get_stress_trend_for_student(x['student_id'])),
+        QueryCase('analysis.get_attendance_trend_for_student', True, lambda x: analysis_repository.get_attendance_trend_for_student(x['student_id'])),
+        QueryCase('analysis.get_average_attendance_for_student', True, lambda x: analysis_repository.get_average_attendance_for_student(x['student_id'])),
+        QueryCase('alert.get_alerts_by_student_id', True, lambda x: alert_repository.get_alerts_by_student_id(x['student_id'])),
+        QueryCase('alert.get_alert_by_id', True, lambda x: alert_repository.get_alert_by_id(x['alert_id'])),
+        QueryCase('alert.mark_alert_resolved', True, lambda x: alert_repository.mark_alert_resolved(x['alert_id'])),
+        QueryCase('alert.get_change_cursor', True, lambda x: alert_repository.get_change_cursor()),
+        QueryCase('alert.get_changes', True, lambda x: alert_repository.get_changes(200, encode_cursor([0]))),
+        QueryCase('alert.create_alert', True, lambda x: alert_repository.create_alert(x['student_id'], x['module_id'], 1, 'Query plan alert')),
+        QueryCase('attendance_record.create_attendance_record', True, lambda x: attendance_record_repository.create_attendance_record(x['student_id'], x['module_id'], 1, 2, 2)),
+        QueryCase('stress_event.create_stress_event', True, lambda x: stress_event_repository.create_stress_event(
+            x['student_id'], x['module_id'], x['survey_response_id'], 1, 4, 'academic', None, 'query_plans')),
+        QueryCase('student.get_student_by_id', True, lambda x: student_repository.get_student_by_id(x['student_id'])),
+        QueryCase('student.get_student_by_student_number', True, lambda x: student_repository.get_student_by_student_number(x['student_number'])),
+        QueryCase('student.get_student_enrolments', True, lambda x: student_repository.get_student_enrolments(x['student_id'])),
+        QueryCase('user.get_user_by_id', True, lambda x: user_repository.get_user_by_id(x['user_id'])),
+        QueryCase('user.get_user_by_username', True, lambda x: user_repository.get_user_by_username(x['username'])),
+        QueryCase('module.get_module_by_id', True, lambda x: module_repository.get_module_by_id(x['module_id'])),
+        QueryCase('survey_response.get_survey_response_by_id', True, lambda x: survey_response_repository.get_survey_response_by_id(x['survey_response_id'])),
+        QueryCase('survey_response.create_survey_response', True, _submit_consecutive_high_stress),
+        QueryCase('detection_worker.process_batch', True, _detect_consecutive_high_stress),
+        QueryCase('attendance_record.get_attendance_record_by_id', True, lambda x: attendance_record_repository.get_attendance_record_by_id(x['attendance_record_id'])),
+        QueryCase('grade.get_grade_by_id', True, lambda x: grade_repository.get_grade_by_id(x['grade_id'])),
+        QueryCase('enrolment.get_enrolment_by_id', True, lambda x: enrolment_repository.get_enrolment_by_id(x['enrolment_id'])),
+        QueryCase('submission_record.get_submission_record_by_id', True, lambda x: submission_record_repository.get_submission_record_by_id(x['submission_record_id'])),
+        QueryCase('stress_event.get_stress_event_by_id', True, lambda x: stress_event_repository.get_stress_event_by_id(x['stress_event_id'])),
+
+        # Keyset pagination: a page after a cursor must seek, not scan.
+        QueryCase('alert.get_page', True, lambda x: alert_repository.get_page(20, encode_cursor([x['alert_id'] + 20]))),
+        QueryCase('grade.get_page', True, lambda x: grade_repository.get_page(20, encode_cursor([x['grade_id']]))),
+        QueryCase('attendance_record.get_page', True, lambda x: attendance_record_repository.get_page(20, encode_cursor([x['attendance_record_id']]))),
+        QueryCase('survey_response.get_page', True, lambda x: survey_response_repository.get_page(20, encode_cursor([x['survey_response_id']]))),
+        QueryCase('submission_record.get_page', True, lambda x: submission_record_repository.get_page(20, encode_cursor([x['submission_record_id']]))),
+        QueryCase('enrolment.get_page', True, lambda x: enrolment_repository.get_page(20, encode_cursor([x['enrolment_id']]))),
+        QueryCase('student.get_page', True, lambda x: student_repository.get_page(20, encode_cursor([x['student_id']]))),
+        QueryCase('module.get_page', True, lambda x: module_repository.get_page(20, encode_cursor([x['module_id']]))),
+        QueryCase('user.get_page', True, lambda x: user_repository.get_page(20, encode_cursor([x['user_id']]))),
+        QueryCase('analysis.get_module_weekly_trends', True, lambda x: analysis_repository.get_module_weekly_trends(x['module_id'])),
+        QueryCase('analysis.get_metric_percentiles', True, lambda x: analysis_repository.get_metric_percentiles('grade', module_id=x['module_id'])),
+        QueryCase('analysis.get_student_percentiles', True, lambda x: analysis_repository.get_student_percentiles(x['student_id'])),
+        QueryCase('analysis.get_student_percentiles.week', True, lambda x: analysis_repository.get_student_percentiles(x['student_id'], week=1)),
+
+        # Cohort-wide analytics and full listings: reported, not checked.
+        QueryCase('analysis.get_dashboard_summary', False, lambda x: analysis_repository.get_dashboard_summary()),
+        QueryCase('analysis.get_grade_distribution', False, lambda x: analysis_repository.get_grade_distribution()),
+        QueryCase('analysis.get_stress_grade_correlation', False, lambda x: analysis_repository.get_stress_grade_correlation()),
+        QueryCase('analysis.get_overall_attendance_rate', False, lambda x: analysis_repository.get_overall_attendance_rate()),
+        QueryCase('analysis.get_submission_status_distribution', False, lambda x: analysis_repository.get_submission_status_distribution()),
+        QueryCase('analysis.get_high_risk_students', False, lambda x: analysis_repository.get_high_risk_students()),
+        QueryCase('analysis.get_stress_level_by_module', False, lambda x: analysis_repository.get_stress_level_by_module()),
+        QueryCase('analysis.get_module_week_heatmap', False, lambda x: analysis_repository.get_module_week_heatmap()),
+        QueryCase('alert.get_all_alerts', False, lambda x: alert_repository.get_all_alerts()),
+        QueryCase('alert.get_recent_alerts_per_student', False, lambda x: alert_repository.get_recent_alerts_per_student()),
+        QueryCase('student.get_all_students', False, lambda x: student_repository.get_all_students()),
+        QueryCase('user.get_all_users', False, lambda x: user_repository.get_all_users()),
+        QueryCase('module.get_all_modules', False, lambda x: module_repository.get_all_modules()),
+        QueryCase('survey_response.get_all_survey_responses', False, lambda x: survey_response_repository.get_all_survey_responses()),
+        QueryCase('attendance_record.get_all_attendance_records', False, lambda x: attendance_record_repository.get_all_attendance_records()),
+        QueryCase('grade.get_all_grades', False, lambda x: grade_repository.get_all_grades()),
+        QueryCase('enrolment.get_all_enrolments', False, lambda x: enrolment_repository.get_all_enrolments()),
+        QueryCase('submission_record.get_all_submission_records', False, lambda x: submission_record_repository.get_all_submission_records()),
+        QueryCase('stress_event.get_all_stress_events', False, lambda x: stress_event_repository.get_all_stress_events()),
+        QueryCase('survey_response.evaluate_stress_history', False, lambda x: survey_response_repository.evaluate_stress_history()),
+    ]
+
+def collect_query_plans(catalog=None):
+    """
+    Runs the catalog against a copy of the current database and plans every statement.
+
+    The application database is copied into memory first, so write paths in the
+    catalog never modify real data. Must be called inside an application context.
+
+    Args:
+        catalog (list[QueryCase], optional): The calls to run. Defaults to `build_query_catalog()`.
+
+    Returns:
+        list[QueryPlan]: One entry per distinct statement per catalog entry, in catalog order.
+    """
+    catalog = build_query_catalog() if catalog is None else catalog
+    snapshot = sqlite3.connect(':memory:', detect_types=sqlite3.PARSE_DECLTYPES)
+    snapshot.row_factory = sqlite3.Row
+    try:
+        get_db().backup(snapshot)
+        samples = _load_samples(snapshot)
+        plans = []
+        for case in catalog:
+            # Cached analysis results would skip the statements, or come from the real database.
+            with record_statements(snapshot) as recorder, bypass_analysis_cache():
+                case.call(samples)
+            seen = set()
+            for sql, params in recorder.statements:
+                normalized = normalize_sql(sql)
+                if normalized in seen or not normalized.upper().startswith(('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')):
+                    continue # Only plan each DML statement once per case.
+                seen.add(normalized)
+                plan = explain(snapshot, sql, params)
+                plans.append(QueryPlan(case.name, case.hot, normalized, plan, find_full_scans(plan) if case.hot else []))
+        return plans
+    finally:
+        snapshot.close()
+
+def format_report(plans):
+    """
+    Renders query plans as a stable plain-text report.
+
+    The report contains no timings, row counts or bound values, so two reports
+    generated from different releases differ only where a statement or its plan changed.
+
+    Args:
+        plans (list[QueryPlan]): The plans returned by `collect_query_plans()`.
+
+    Returns:
+        str: The report.
+    """
+    lines = []
+    for entry in plans:
+        flag = 'hot' if entry.hot else 'cold'
+        status = ' FULL SCAN' if entry.violations else ''
+        lines.append(f"== {entry.case} [{flag}]{status}")
+        lines.append(f"   {entry.sql}")
+        lines.extend(f"   | {line}" for line in entry.plan)
+        lines.append('')
+    violations = [entry for entry in plans if entry.violations]
+    lines.append(f"{len(plans)} statement(s) planned, {len(violations)} hot-path full scan(s).")
+    return '\n'.join(lines) + '\n'
@@ -8,7 +8,9 @@ sample data. It ensures a consistent starting state for the application.
 
 import random
 from datetime import date, timedelta, datetime
+from app.analysis_cache import get_analysis_cache
 from app.db_connection import get_db
+from utils.migrate import apply_migrations
 from werkzeug.security import generate_password_hash
 import sqlite3 # Explicitly import sqlite3 for specific error handling.
 from flask import current_app # Used for logging within the Flask application context.
@@ -40,7 +42,8 @@ def seed_data():
 
     This function performs a series of critical database operations:
     1. Drops all existing tables to ensure a clean slate.
-    2. Creates all necessary tables with their defined schemas.
+    2. Creates all necessary tables and indexes by applying the schema
+       migrations (see `utils/migrate.py`).
     3. Inserts a comprehensive set of demo data for users, students, modules,
        enrolments, attendance, submissions, survey responses, grades, alerts,
        and stress events.
@@ -68,6 +71,8 @@ def seed_data():
         # ======================================================================
         current_app.logger.info("Dropping existing tables...")
         drop_statements = [
+            "DROP TABLE IF EXISTS detection_jobs;",
+            "DROP TABLE IF EXISTS alert_changes;",
             "DROP TABLE IF EXISTS stress_events;",
             "DROP TABLE IF EXISTS alerts;",
             "DROP TABLE IF EXISTS grades;",
@@ -78,6 +83,12 @@ def seed_data():
             "DROP TABLE IF EXISTS modules;",
             "DROP TABLE IF EXISTS users;",
             "DROP TABLE IF EXISTS students;",
+            "DROP TABLE IF EXISTS import_checkpoints;",
+            "DROP TABLE IF EXISTS student_metrics;",
+            "DROP TABLE IF EXISTS student_module_metrics;",
+            "DROP TABLE IF EXISTS module_week_rollups;",
+            "DROP TABLE IF EXISTS metric_histograms;",
+            "DROP TABLE IF EXISTS schema_migrations;",
         ]
         for stmt in drop_statements:
             cursor.execute(stmt)
@@ -85,143 +96,11 @@ def seed_data():
         current_app.logger.info("Existing tables dropped successfully.")
 
         # ======================================================================
-        # Phase 2: Create all necessary tables with their defined schemas.
-        # This establishes the database structure for the application.
+        # Phase 2: Create all necessary tables and indexes by applying the
+        # versioned schema migrations in `migrations/` to the empty database.
         # ======================================================================
         current_app.logger.info("Creating tables...")
-        cursor.execute("""
-            CREATE TABLE students (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_number TEXT NOT NULL UNIQUE,
-                full_name TEXT NOT NULL,
-                email TEXT,
-                course_name TEXT,
-                year_of_study INTEGER,
-                is_active INTEGER NOT NULL DEFAULT 1
-            );
-        """)
-        cursor.execute("""
-            CREATE TABLE users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL UNIQUE,
-                password_hash TEXT NOT NULL,
-                role TEXT NOT NULL,
-                student_id INTEGER,
-                created_at TEXT,
-                is_active INTEGER NOT NULL DEFAULT 1,
-                FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE SET NULL
-            );
-        """)
-        cursor.execute("""
-            CREATE TABLE modules (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                module_code TEXT NOT NULL UNIQUE,
-                module_title TEXT NOT NULL,
-                credit INTEGER,
-                academic_year TEXT,
-                is_active INTEGER NOT NULL DEFAULT 1
-            );
-        """)
-        cursor.execute("""
-            CREATE TABLE enrolments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER NOT NULL,
-                module_id INTEGER NOT NULL,
-                enrol_date TEXT,
-                is_active INTEGER NOT NULL DEFAULT 1,
-                FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
-                FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE CASCADE
-            );
-        """)
-        cursor.execute("""
-            CREATE TABLE attendance_records (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER NOT NULL,
-                module_id INTEGER NOT NULL,
-                week_number INTEGER NOT NULL,
-                attended_sessions INTEGER,
-                total_sessions INTEGER,
-                attendance_rate REAL,
-                is_active INTEGER NOT NULL DEFAULT 1,
-                FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
-                FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE CASCADE
-            );
-        """)
-        cursor.execute("""
-            CREATE TABLE submission_records (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER NOT NULL,
-                module_id INTEGER NOT NULL,
-                assessment_name TEXT NOT NULL,
-                due_date TEXT,
-                submitted_date TEXT,
-                is_submitted INTEGER NOT NULL DEFAULT 0,
-                is_late INTEGER NOT NULL DEFAULT 0,
-                is_active INTEGER NOT NULL DEFAULT 1,
-                FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
-                FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE CASCADE
-            );
-        """)
-        cursor.execute("""
-            CREATE TABLE survey_responses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER NOT NULL,
-                module_id INTEGER,
-                week_number INTEGER NOT NULL,
-                stress_level INTEGER NOT NULL,
-                hours_slept REAL,
-                mood_comment TEXT,
-                created_at TEXT,
-                is_active INTEGER NOT NULL DEFAULT 1,
-                FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
-                FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE SET NULL
-            );
-        """)
-        cursor.execute("""
-            CREATE TABLE grades (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER NOT NULL,
-                module_id INTEGER NOT NULL,
-                assessment_name TEXT NOT NULL,
-                grade REAL,
-                is_active INTEGER NOT NULL DEFAULT 1,
-                FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
-                FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE CASCADE
-            );
-        """)
-        cursor.execute("""
-            CREATE TABLE alerts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER NOT NULL,
-                module_id INTEGER,
-                week_number INTEGER,
-                reason TEXT NOT NULL,
-                created_at TEXT,
-                resolved INTEGER NOT NULL DEFAULT 0,
-                is_active INTEGER NOT NULL DEFAULT 1,
-                FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
-                FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE SET NULL
-            );
-        """)
-        cursor.execute("""
-            CREATE TABLE stress_events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER NOT NULL,
-                module_id INTEGER,
-                survey_response_id INTEGER,
-                week_number INTEGER,
-                stress_level INTEGER NOT NULL,
-                cause_category TEXT NOT NULL,
-                description TEXT,
-                source TEXT NOT NULL,
-                created_at TEXT,
-                is_active INTEGER NOT NULL DEFAULT 1,
-                FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
-                FOREIGN KEY (module_id) REFERENCES modules(id) ON DELETE SET NULL,
-                FOREIGN KEY (survey_response_id) REFERENCES survey_responses(id) ON DELETE SET NULL
-            );
-        """)
-        db.commit() # Commit changes after creating all tables.
+        apply_migrations(db)
         current_app.logger.info("Tables created successfully.")
 
         # ======================================================================
@@ -379,6 +258,8 @@ def seed_data():
                                (current['student_id'], current['module_id'], current['week_number'], reason, alert_time.isoformat()))
         db.commit() # Commit all generated alerts.
 
+        # Every table was rewritten with raw statements, so drop all cached analysis results.
+        get_analysis_cache().clear()
         current_app.logger.info("Database seeding completed successfully.")
 
     except ConnectionError as e:
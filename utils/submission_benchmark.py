@@ -0,0 +1,93 @@
+"""
+Benchmark of the survey submission path.
+
+`run_submission_benchmark()`, started with `flask benchmark-submissions`,
+submits survey responses through `submit_survey_response()` exactly as
+`POST /api/admin/survey-responses` does and reports what one submission costs:
+the SQL statements and commits it issued and its latency percentiles. Run it
+against a generated snapshot (`flask generate --install`) so that the numbers
+reflect realistic table and index sizes.
+
+The responses are submitted for active enrolments at weeks after the last
+surveyed week with a high stress level, so that with inline detection every
+submission after the first of a student and module also creates a stress
+event and an alert. Everything the benchmark created is deleted again
+afterwards; the read models are corrected by their delete triggers.
+"""
+
+import time
+from collections import namedtuple
+from app.admin.services import submit_survey_response
+from app.db_connection import get_db
+
+SubmissionBenchmark = namedtuple('SubmissionBenchmark', [
+    'submissions', 'statements', 'commits', 'stress_events', 'alerts', 'p50_ms', 'p95_ms', 'max_ms'
+])
+
+def _percentile(sorted_values, fraction):
+    """Returns the nearest-rank percentile of an ascending list."""
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def run_submission_benchmark(count=200, detect_inline=False, pairs=20):
+    """
+    Submits `count` survey responses and measures each submission.
+
+    Args:
+        count (int, optional): The number of survey responses submitted. Defaults to 200.
+        detect_inline (bool, optional): Run the stress checks in the submission instead of
+                                        enqueueing detection jobs. Defaults to False.
+        pairs (int, optional): The number of student/module enrolments the responses are spread
+                               over; each receives consecutive weeks. Defaults to 20.
+
+    Returns:
+        SubmissionBenchmark: The number of submissions, the statements and commits per submission
+                             (the highest seen), the stress events and alerts created in total, and
+                             the p50, p95 and maximum latency in milliseconds.
+
+    Raises:
+        ValueError: If the database has no active enrolment to submit responses for.
+    """
+    db = get_db()
+    enrolments = db.execute(
+        "SELECT student_id, module_id FROM enrolments WHERE is_active = 1 ORDER BY id LIMIT ?", (pairs,)
+    ).fetchall()
+    if not enrolments:
+        raise ValueError("No active enrolment to submit survey responses for.")
+    first_week = (db.execute("SELECT MAX(week_number) FROM survey_responses").fetchone()[0] or 0) + 1
+    last_alert_id = db.execute("SELECT COALESCE(MAX(id), 0) FROM alerts").fetchone()[0]
+
+    response_ids, timings = [], []
+    statements = commits = stress_events = alerts = 0
+    try:
+        for i in range(count):
+            student_id, module_id = enrolments[i % len(enrolments)]
+            started_at = time.perf_counter()
+            submission = submit_survey_response(student_id, module_id, first_week + i // len(enrolments), 5, 6.0,
+                                                'Submission benchmark', detect_inline=detect_inline)
+            timings.append((time.perf_counter() - started_at) * 1000)
+            response_ids.append(submission.response.id)
+            statements = max(statements, submission.statements)
+            commits = max(commits, submission.commits)
+            stress_events += submission.stress_events
+            alerts += submission.alerts
+    finally:
+        _remove_submissions(db, response_ids, last_alert_id, first_week)
+
+    timings.sort()
+    return SubmissionBenchmark(count, statements, commits, stress_events, alerts,
+                               _percentile(timings, 0.5), _percentile(timings, 0.95), timings[-1])
+
+def _remove_submissions(db, response_ids, last_alert_id, first_week):
+    """Deletes the survey responses of a benchmark run and the jobs, stress events and alerts they created."""
+    if not response_ids:
+        return
+    placeholders = ', '.join('?' for _ in response_ids)
+    try:
+        db.execute(f"DELETE FROM detection_jobs WHERE survey_response_id IN ({placeholders})", response_ids)
+        db.execute(f"DELETE FROM stress_events WHERE survey_response_id IN ({placeholders})", response_ids)
+        db.execute("DELETE FROM alerts WHERE id > ? AND week_number >= ?", (last_alert_id, first_week))
+        db.execute(f"DELETE FROM survey_responses WHERE id IN ({placeholders})", response_ids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise